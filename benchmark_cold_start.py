@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío de la Lambda.
+
+Cada corrida es un proceso nuevo con un /tmp vacío (como un contenedor recién
+creado) y mide:
+
+- import: carga de handler.py (en Lambda, fase de inicialización), incluido
+  prime() si se simula el entorno de Lambda
+- primera invocación: latencia de la primera exportación del contenedor
+- segunda invocación: la misma exportación con el contenedor caliente
+
+Usa las variables POSTGRES_* del entorno (exportar antes de ejecutar).
+
+Uso:
+    python benchmark_cold_start.py --tenant-id 1843 [--runs 5] [--profile lite]
+                                   [--no-lambda-init] [--importtime 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# Proceso hijo: importa el handler e invoca dos veces la misma exportación
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import handler
+imported = time.perf_counter()
+event = json.loads(sys.argv[1])
+first = handler.lambda_handler(event, None)
+first_done = time.perf_counter()
+second = handler.lambda_handler(event, None)
+second_done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_ms': (first_done - imported) * 1000,
+    'second_ms': (second_done - first_done) * 1000,
+    'first_status': first['statusCode'],
+    'first_cache': first['headers'].get('X-Cache'),
+    'second_cache': second['headers'].get('X-Cache')
+}))
+"""
+
+
+def run_once(event: dict, lambda_init: bool) -> dict:
+    """Ejecuta una corrida en un proceso nuevo y retorna sus tiempos."""
+    with tempfile.TemporaryDirectory(prefix='cold_start_') as temp_dir:
+        env = {**os.environ, 'TEMP_DIR': temp_dir, 'ARTIFACT_CACHE_DIR': '', 'LOG_LEVEL': 'WARNING'}
+        if lambda_init:
+            env.setdefault('AWS_LAMBDA_FUNCTION_NAME', 'cold-start-benchmark')
+        else:
+            env.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+        completed = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, json.dumps(event)],
+            cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def import_profile(top: int) -> list:
+    """Módulos de mayor tiempo de import acumulado (python -X importtime)."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import handler'],
+        cwd=SRC_DIR, env={k: v for k, v in os.environ.items() if k != 'AWS_LAMBDA_FUNCTION_NAME'},
+        capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def summarize(values: list) -> str:
+    """Mediana, mínimo y máximo en milisegundos."""
+    return (
+        f"mediana {statistics.median(values):8.1f}ms   "
+        f"min {min(values):8.1f}ms   max {max(values):8.1f}ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío de la Lambda")
+    parser.add_argument('--tenant-id', required=True, help="Tenant a exportar")
+    parser.add_argument('--profile', default=None, help="Perfil de exportación")
+    parser.add_argument('--runs', type=int, default=5, help="Corridas (procesos nuevos)")
+    parser.add_argument('--no-lambda-init', action='store_true',
+                        help="No simula el entorno de Lambda (sin prime() al importar)")
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help="Muestra los N módulos de import más lento")
+    args = parser.parse_args()
+
+    event = {
+        'pathParameters': {'tenant_id': args.tenant_id},
+        'queryStringParameters': {'profile': args.profile} if args.profile else None,
+        'headers': {}
+    }
+
+    results = []
+    for run in range(1, args.runs + 1):
+        result = run_once(event, lambda_init=not args.no_lambda_init)
+        results.append(result)
+        print(
+            f"Corrida {run}: import {result['import_ms']:.1f}ms, "
+            f"primera {result['first_ms']:.1f}ms "
+            f"({result['first_status']} {result['first_cache']}), "
+            f"segunda {result['second_ms']:.1f}ms ({result['second_cache']})"
+        )
+
+    print("=" * 60)
+    print(f"Import:              {summarize([r['import_ms'] for r in results])}")
+    print(f"Primera invocación:  {summarize([r['first_ms'] for r in results])}")
+    print(f"Segunda invocación:  {summarize([r['second_ms'] for r in results])}")
+    print(f"Arranque total:      {summarize([r['import_ms'] + r['first_ms'] for r in results])}")
+
+    if args.importtime:
+        print("=" * 60)
+        print("Módulos de import más lento (acumulado):")
+        for cumulative_ms, name in import_profile(args.importtime):
+            print(f"  {cumulative_ms:8.1f}ms  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+-- ============================================================
+-- TRIGGERS DE INVALIDACIÓN POR CAMBIOS (LISTEN/NOTIFY)
+-- ============================================================
+--
+-- Cada fila insertada, modificada o eliminada en las tablas de origen de la
+-- exportación notifica en el canal 'export_invalidation' el tenant afectado
+-- (parent_id del cliente) y la entidad exportada:
+--
+--   {"tenant_id": 12, "entity": "customers"}
+--   {"tenant_id": null, "entity": "products"}   (tablas globales: todos los tenants)
+--
+-- El listener (python src/listen_invalidations.py) registra los cambios y las
+-- exportaciones sirven el artefacto sin calcular huellas si su tenant no cambió.
+--
+-- IMPORTANTE:
+-- - Ejecutar en el primario (las notificaciones no llegan a las réplicas)
+-- - PostgreSQL agrupa notificaciones idénticas de una misma transacción: una
+--   actualización masiva de un tenant produce una notificación por entidad
+-- - Los triggers son por fila: en cargas masivas de listas de precios el costo
+--   es una búsqueda por índice de los tenants de cada fila (ver create_indexes.sql)
+--
+-- ============================================================
+
+\echo '============================================================'
+\echo 'CREANDO TRIGGERS DE INVALIDACIÓN'
+\echo '============================================================'
+
+-- Tenants afectados por una fila (como JSON, para leer las columnas de cualquier tabla)
+CREATE OR REPLACE FUNCTION export_row_tenants(table_name text, row_data jsonb)
+RETURNS bigint[] AS $$
+BEGIN
+    CASE table_name
+        WHEN 'customer_customer', 'location_location' THEN
+            RETURN ARRAY[(row_data->>'parent_id')::bigint];
+        WHEN 'customer_customer_list_price', 'cobranza_cobranza' THEN
+            RETURN ARRAY(
+                SELECT c.parent_id
+                FROM customer_customer c
+                WHERE c.id = (row_data->>'customer_id')::bigint
+            );
+        WHEN 'cobranza_cobranzadetail' THEN
+            RETURN ARRAY(
+                SELECT c.parent_id
+                FROM cobranza_cobranza cob
+                INNER JOIN customer_customer c ON cob.customer_id = c.id
+                WHERE cob.id = (row_data->>'cobranza_id')::bigint
+            );
+        WHEN 'list_price_pricelist' THEN
+            RETURN ARRAY(
+                SELECT DISTINCT cc.parent_id
+                FROM customer_customer_list_price clp
+                INNER JOIN customer_customer cc ON clp.customer_id = cc.id
+                WHERE clp.pricelist_id = (row_data->>'id')::bigint
+            );
+        WHEN 'list_price_pricelistdetail' THEN
+            RETURN ARRAY(
+                SELECT DISTINCT cc.parent_id
+                FROM customer_customer_list_price clp
+                INNER JOIN customer_customer cc ON clp.customer_id = cc.id
+                WHERE clp.pricelist_id = (row_data->>'price_list_id')::bigint
+            );
+        ELSE
+            RAISE EXCEPTION 'export_row_tenants: tabla sin tenant %', table_name;
+    END CASE;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Trigger genérico: TG_ARGV[0] = entidad exportada, TG_ARGV[1] = 'global' si la
+-- tabla no depende del tenant. Una modificación notifica el tenant de la fila
+-- anterior y el de la nueva (la fila pudo cambiar de tenant)
+CREATE OR REPLACE FUNCTION export_notify_change()
+RETURNS trigger AS $$
+DECLARE
+    entity text := TG_ARGV[0];
+    tenant_ids bigint[] := '{}';
+    tenant bigint;
+BEGIN
+    IF TG_NARGS > 1 AND TG_ARGV[1] = 'global' THEN
+        PERFORM pg_notify(
+            'export_invalidation',
+            json_build_object('tenant_id', NULL, 'entity', entity)::text
+        );
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        tenant_ids := tenant_ids || export_row_tenants(TG_TABLE_NAME, to_jsonb(NEW));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        tenant_ids := tenant_ids || export_row_tenants(TG_TABLE_NAME, to_jsonb(OLD));
+    END IF;
+
+    FOR tenant IN SELECT DISTINCT t FROM unnest(tenant_ids) AS t WHERE t IS NOT NULL LOOP
+        PERFORM pg_notify(
+            'export_invalidation',
+            json_build_object('tenant_id', tenant, 'entity', entity)::text
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- TABLAS POR TENANT
+-- ============================================================
+DROP TRIGGER IF EXISTS export_invalidation ON customer_customer;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON customer_customer
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('customers');
+
+DROP TRIGGER IF EXISTS export_invalidation ON location_location;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON location_location
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('locations');
+
+DROP TRIGGER IF EXISTS export_invalidation ON customer_customer_list_price;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON customer_customer_list_price
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('client_list_prices');
+
+DROP TRIGGER IF EXISTS export_invalidation ON list_price_pricelist;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON list_price_pricelist
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('list_prices');
+
+DROP TRIGGER IF EXISTS export_invalidation ON list_price_pricelistdetail;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON list_price_pricelistdetail
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('list_price_details');
+
+DROP TRIGGER IF EXISTS export_invalidation ON cobranza_cobranza;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON cobranza_cobranza
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('cobranzas');
+
+DROP TRIGGER IF EXISTS export_invalidation ON cobranza_cobranzadetail;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON cobranza_cobranzadetail
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('cobranza_details');
+
+-- ============================================================
+-- TABLAS GLOBALES (categoría y marca se exportan dentro de productos)
+-- ============================================================
+DROP TRIGGER IF EXISTS export_invalidation ON product_product;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON product_product
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('products', 'global');
+
+DROP TRIGGER IF EXISTS export_invalidation ON category_category;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON category_category
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('products', 'global');
+
+DROP TRIGGER IF EXISTS export_invalidation ON brand_brand;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON brand_brand
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('products', 'global');
+
+DROP TRIGGER IF EXISTS export_invalidation ON bank_accounts_bankaccounts;
+CREATE TRIGGER export_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON bank_accounts_bankaccounts
+FOR EACH ROW EXECUTE FUNCTION export_notify_change('bank_accounts', 'global');
+
+\echo ''
+\echo '============================================================'
+\echo '✅ TRIGGERS CREADOS'
+\echo '============================================================'
+\echo ''
+\echo 'Verificar con: LISTEN export_invalidation; y modificar una fila de prueba'
+\echo ''
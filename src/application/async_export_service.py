@@ -0,0 +1,709 @@
+"""
+Servicio de aplicación asíncrono (asyncio) para exportar datos a SQLite.
+Sigue el principio de Responsabilidad Única (SRP) y el de Inversión de Dependencias (DIP).
+
+Variante de ExportService.export_tenant_data para el servidor asíncrono (ver
+async_server.py): cada exportación es una corrutina, así un solo proceso atiende
+cientos de exportaciones concurrentes con un pool de conexiones compartido.
+
+- Las queries de todas las tablas se lanzan a la vez (cada una con su timeout, ver
+  AsyncPostgresRepository); al fallar una obligatoria o agotarse el plazo, las
+  pendientes se cancelan en el servidor.
+- Cada tabla pasa al escritor de SQLite por una cola asyncio en cuanto llega: la
+  construcción del archivo avanza mientras las demás queries siguen en curso. El
+  orden de inserción no altera el archivo final (finalize lo deja byte-reproducible).
+- SQLite es bloqueante: cada paso del escritor corre en un pool de hilos propio
+  (build_workers), un paso a la vez por archivo.
+
+Comparte con ExportService la caché negativa, los cupos de exportación del clúster
+(con las exportaciones síncronas) y el HIT por registro de cambios. No cubre:
+
+- las deltas, los paquetes ni el reporte de poda del catálogo (ver ExportService)
+- el lock de exportación por tenant: esperarlo retendría una conexión del pool
+  compartido por cada exportación en espera; las solicitudes concurrentes del mismo
+  tenant ya comparten una exportación en el proceso (ver async_server.py)
+- stale-while-revalidate: el servidor asíncrono responde siempre datos confirmados
+  contra PostgreSQL (o el registro de cambios); servir un artefacto viejo queda para
+  lambda_handler
+"""
+import asyncio
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from application.export_service import (
+    DEFAULT_WATERMARK_OVERLAP_SECONDS, BaseExportService, format_watermark
+)
+from domain.interfaces import (
+    IArtifactStore, IAsyncDataRepository, IInvalidationStore, ISQLiteBuilder
+)
+from domain.models import ENTITY_MODELS, CachedArtifact, Deadline, ExportResult
+from domain.profiles import (
+    DEADLINE_OPTIONAL_ENTITIES, OPTIONAL_ENTITY_DEPENDENTS, ExportProfile, get_profile
+)
+from utils.circuit_breaker import CircuitBreaker
+from utils.exceptions import (
+    ExportError, DataFetchError, DeadlineExceededError, ExportOverloadedError
+)
+from utils.hashing import file_sha256
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Mensajes de control de la cola del escritor: fin de los datos y exportación abortada
+_END_OF_DATA = object()
+_ABORT = object()
+
+# Entidad de la que depende cada entidad opcional (ej: detalles de cobranza -> cobranzas)
+_OPTIONAL_PARENTS = {
+    dependent: entity_name
+    for entity_name, dependents in OPTIONAL_ENTITY_DEPENDENTS.items()
+    for dependent in dependents
+}
+
+
+class AsyncExportService(BaseExportService):
+    """
+    Servicio de exportación de datos asíncrono.
+    Coordina el proceso de exportar datos de PostgreSQL a SQLite sin bloquear el event loop.
+    """
+
+    def __init__(
+        self,
+        data_repository: IAsyncDataRepository,
+        sqlite_builder_factory: Callable[[], ISQLiteBuilder],
+        watermark_overlap_seconds: int = DEFAULT_WATERMARK_OVERLAP_SECONDS,
+        artifact_store: Optional[IArtifactStore] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        negative_cache: Optional[TTLCache] = None,
+        build_workers: int = 4,
+        max_concurrent_exports: int = 0,
+        export_slot_wait_seconds: float = 0,
+        invalidation_store: Optional[IInvalidationStore] = None,
+        invalidation_max_heartbeat_age_seconds: float = 30
+    ):
+        """
+        Inicializa el servicio de exportación.
+
+        Args:
+            data_repository: Repositorio asíncrono de datos (PostgreSQL)
+            sqlite_builder_factory: Crea un builder por archivo (las exportaciones son concurrentes)
+            watermark_overlap_seconds: Margen de solape de la marca de sincronización
+            artifact_store: Almacén de artefactos para reconstrucciones incrementales
+                            (None = cada exportación consulta todas las tablas)
+            circuit_breaker: Circuit breaker de PostgreSQL donde se registra el resultado
+                             de cada exportación (None = sin registro)
+            negative_cache: Caché de tenants sin datos (inexistentes o vacíos para un perfil)
+            build_workers: Hilos para los pasos bloqueantes (SQLite y almacén de artefactos)
+            max_concurrent_exports: Exportaciones que pueden consultar PostgreSQL a la vez en
+                                    todo el clúster (0 = sin límite)
+            export_slot_wait_seconds: Espera máxima por un cupo libre; sin cupo la exportación
+                                      falla con result.overloaded
+            invalidation_store: Registro de cambios notificados por PostgreSQL (None = siempre
+                                se calculan las huellas)
+            invalidation_max_heartbeat_age_seconds: Antigüedad máxima del latido del listener
+        """
+        super().__init__(
+            watermark_overlap_seconds=watermark_overlap_seconds,
+            artifact_store=artifact_store,
+            circuit_breaker=circuit_breaker,
+            negative_cache=negative_cache,
+            max_concurrent_exports=max_concurrent_exports,
+            export_slot_wait_seconds=export_slot_wait_seconds,
+            invalidation_store=invalidation_store,
+            invalidation_max_heartbeat_age_seconds=invalidation_max_heartbeat_age_seconds
+        )
+        self.data_repository = data_repository
+        self.sqlite_builder_factory = sqlite_builder_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, build_workers), thread_name_prefix='sqlite-build'
+        )
+
+    def close(self) -> None:
+        """Espera los pasos bloqueantes en curso y libera sus hilos."""
+        self._executor.shutdown(wait=True)
+
+    async def export_tenant_data(
+        self,
+        tenant_id: int,
+        output_path: str,
+        profile: Optional[ExportProfile] = None,
+        deadline: Optional[Deadline] = None
+    ) -> ExportResult:
+        """
+        Exporta los datos de un tenant a un archivo SQLite (ver ExportService.export_tenant_data).
+
+        Con plazo, las tablas opcionales pendientes al agotarse se omiten
+        (result.skipped_tables) y sus queries se cancelan; si falta una tabla
+        obligatoria la exportación falla con result.timed_out. Si se cancela la
+        corrutina, se cancelan todas sus queries.
+
+        Args:
+            tenant_id: ID del tenant a exportar
+            output_path: Ruta del archivo SQLite de salida
+            profile: Perfil con las tablas y columnas a exportar (None = perfil por defecto)
+            deadline: Plazo para obtener los datos (None = sin plazo)
+
+        Returns:
+            Resultado de la operación de exportación
+        """
+        start_time = time.time()
+        profile = profile or get_profile()
+        records_exported: Dict[str, int] = {}
+        postgres_fetch_time_ms = 0
+        sqlite_build_time_ms = 0
+        fetch_times_by_table: Dict[str, int] = {}
+        artifact_key: Optional[str] = None
+        previous_artifact: Optional[CachedArtifact] = None
+        fingerprints: Dict[str, str] = {}
+        reused_tables: List[str] = []
+        cache_status: Optional[str] = None
+        derived_tables: Dict[str, Dict[str, int]] = {}
+        skipped_tables: List[str] = []
+        export_slot: Optional[int] = None
+
+        # Tenant sin datos visto hace poco: responder sin consultar PostgreSQL
+        if self._known_empty(tenant_id, profile):
+            return self._not_found_result(tenant_id, profile, start_time)
+
+        # Sin cambios notificados desde el artefacto: servirlo sin consultar PostgreSQL
+        unchanged_result = await self._run_blocking(
+            self._export_if_unchanged, tenant_id, output_path, profile
+        )
+        if unchanged_result is not None:
+            return unchanged_result
+
+        try:
+            # Verificación barata antes de lanzar las queries de exportación
+            if not await self._tenant_exists(tenant_id, fetch_times_by_table, deadline):
+                return self._not_found_result(tenant_id, profile, start_time, fetch_times_by_table)
+
+            # Control de admisión del clúster (los mismos cupos que las exportaciones síncronas)
+            export_slot = await self._acquire_export_slot(fetch_times_by_table, deadline)
+
+            postgres_start_time = time.time()
+
+            # Marca de sincronización y huellas de las tablas, en paralelo
+            if self.artifact_store:
+                artifact_key = self._artifact_key(tenant_id, profile)
+                previous_artifact = await self._run_blocking(self._cached_artifact, artifact_key)
+                sync_watermark, fingerprints = await asyncio.gather(
+                    self._sync_watermark(deadline),
+                    self._safe_table_fingerprints(
+                        tenant_id, profile, fetch_times_by_table, deadline
+                    )
+                )
+                if previous_artifact and fingerprints:
+                    reused_tables = [
+                        entity_name for entity_name, fingerprint in fingerprints.items()
+                        if previous_artifact.fingerprints.get(entity_name) == fingerprint
+                    ]
+                logger.info(f"Tablas sin cambios respecto al artefacto previo: {reused_tables}")
+            else:
+                sync_watermark = await self._sync_watermark(deadline)
+
+            # Tablas del perfil que cambiaron
+            entity_names = [
+                entity_name for entity_name in ENTITY_MODELS
+                if profile.includes(entity_name) and entity_name not in reused_tables
+            ]
+            logger.info(f"Perfil de exportación '{profile.name}': {entity_names}")
+
+            sqlite_start_time = time.time()
+            if entity_names:
+                # Escritor del SQLite: consume las tablas de la cola a medida que llegan
+                queue: asyncio.Queue = asyncio.Queue()
+                builder = self.sqlite_builder_factory()
+                writer = asyncio.create_task(
+                    self._write_sqlite(
+                        builder, queue, output_path, profile, previous_artifact, reused_tables
+                    )
+                )
+                end_message = _ABORT
+                try:
+                    fetched = await self._fetch_concurrently(
+                        tenant_id, profile, entity_names, queue, fetch_times_by_table, deadline
+                    )
+                    postgres_fetch_time_ms = int((time.time() - postgres_start_time) * 1000)
+                    logger.info(f"Datos obtenidos de PostgreSQL en {postgres_fetch_time_ms}ms")
+                    self._record_postgres_outcome()
+
+                    # El resto de la construcción no usa PostgreSQL: el cupo queda libre
+                    await self._release_export_slot(export_slot)
+                    export_slot = None
+
+                    reused_records = sum(
+                        previous_artifact.records_exported.get(entity_name, 0)
+                        for entity_name in reused_tables
+                    ) if reused_tables else 0
+                    if sum(fetched.values()) + reused_records > 0:
+                        end_message = _END_OF_DATA
+                finally:
+                    # Sin datos, con error o cancelada: el escritor cierra el builder sin finalizar
+                    queue.put_nowait(end_message)
+                    written = await writer
+
+                if written is None:
+                    logger.warning(f"No se encontraron datos para tenant {tenant_id}")
+                    self._remember_empty(tenant_id, profile)
+                    return self._not_found_result(
+                        tenant_id, profile, start_time, fetch_times_by_table
+                    )
+
+                records_exported, dropped_tables, derived_tables, content_hash = written
+                skipped_tables = [
+                    entity_name for entity_name in ENTITY_MODELS
+                    if entity_name in entity_names
+                    and (entity_name not in fetched or entity_name in dropped_tables)
+                ]
+            else:
+                # Ninguna tabla cambió: el artefacto previo es el resultado
+                logger.info(
+                    f"Sin cambios desde el artefacto previo: copiando {previous_artifact.key}"
+                )
+                postgres_fetch_time_ms = int((time.time() - postgres_start_time) * 1000)
+                self._record_postgres_outcome()
+                await self._run_blocking(shutil.copyfile, previous_artifact.path, output_path)
+                records_exported = {
+                    entity_name: previous_artifact.records_exported.get(entity_name, 0)
+                    for entity_name in reused_tables
+                }
+                content_hash = previous_artifact.metadata.get('content_hash')
+                if not content_hash:
+                    content_hash = await self._run_blocking(file_sha256, output_path)
+                derived_tables = previous_artifact.metadata.get('derived_tables', {})
+
+            sqlite_build_time_ms = int((time.time() - sqlite_start_time) * 1000)
+            logger.info(f"Base de datos SQLite construida en {sqlite_build_time_ms}ms")
+
+            if self.artifact_store:
+                cache_status = (
+                    'PARTIAL' if entity_names and reused_tables
+                    else ('MISS' if entity_names else 'HIT')
+                )
+                if skipped_tables:
+                    # Archivo parcial: no debe servirse como exportación completa
+                    logger.warning(
+                        f"Tablas omitidas por plazo: {skipped_tables}; no se guarda el artefacto"
+                    )
+                elif not entity_names:
+                    await self._run_blocking(
+                        self._touch_artifact, artifact_key,
+                        {'sync_watermark': format_watermark(sync_watermark)}
+                    )
+                elif fingerprints:
+                    await self._run_blocking(
+                        self._store_artifact, artifact_key, output_path, fingerprints,
+                        records_exported,
+                        {
+                            'profile': profile.name,
+                            'sync_watermark': format_watermark(sync_watermark),
+                            'content_hash': content_hash,
+                            'derived_tables': derived_tables
+                        }
+                    )
+
+            file_size = os.path.getsize(output_path) if os.path.exists(output_path) else None
+            execution_time_ms = int((time.time() - start_time) * 1000)
+            logger.info(
+                f"Exportación completada exitosamente. "
+                f"Registros: {records_exported}, "
+                f"Tamaño: {file_size} bytes, "
+                f"Tiempo total: {execution_time_ms}ms, "
+                f"Tiempo PostgreSQL: {postgres_fetch_time_ms}ms, "
+                f"Tiempo SQLite: {sqlite_build_time_ms}ms"
+            )
+
+            return ExportResult(
+                success=True,
+                file_path=output_path,
+                file_size=file_size,
+                records_exported=records_exported,
+                execution_time_ms=execution_time_ms,
+                postgres_fetch_time_ms=postgres_fetch_time_ms,
+                sqlite_build_time_ms=sqlite_build_time_ms,
+                fetch_times_by_table=fetch_times_by_table,
+                profile=profile.name,
+                sync_watermark=format_watermark(sync_watermark),
+                reused_tables=reused_tables,
+                cache_status=cache_status,
+                content_hash=content_hash,
+                derived_tables=derived_tables,
+                skipped_tables=skipped_tables
+            )
+
+        except Exception as e:
+            logger.error(f"Error durante la exportación: {str(e)}", exc_info=True)
+            self._record_postgres_outcome(e)
+            return ExportResult(
+                success=False,
+                error_message=str(e),
+                records_exported=records_exported,
+                execution_time_ms=int((time.time() - start_time) * 1000),
+                postgres_fetch_time_ms=postgres_fetch_time_ms,
+                sqlite_build_time_ms=sqlite_build_time_ms,
+                fetch_times_by_table=fetch_times_by_table,
+                profile=profile.name,
+                timed_out=isinstance(e, DeadlineExceededError),
+                overloaded=isinstance(e, ExportOverloadedError)
+            )
+
+        finally:
+            await self._release_export_slot(export_slot)
+
+    async def _acquire_export_slot(
+        self,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline] = None
+    ) -> Optional[int]:
+        """
+        Toma un cupo de exportación del clúster (ver ExportService._acquire_export_slot).
+
+        Returns:
+            Número de cupo, o None sin límite configurado o si no se pudo consultar
+
+        Raises:
+            ExportOverloadedError: Si todos los cupos siguen ocupados al terminar la espera
+        """
+        if self.max_concurrent_exports <= 0:
+            return None
+        try:
+            start = time.time()
+            slot = await self.data_repository.acquire_export_slot(
+                self.max_concurrent_exports, self._export_slot_timeout(deadline)
+            )
+            fetch_times_by_table['export_slot_wait'] = int((time.time() - start) * 1000)
+        except Exception as e:
+            logger.warning(f"No se pudo tomar un cupo de exportación: {e}")
+            return None
+        if slot is None:
+            raise ExportOverloadedError(
+                f"Límite de {self.max_concurrent_exports} exportaciones simultáneas alcanzado"
+            )
+        return slot
+
+    async def _release_export_slot(self, slot: Optional[int]) -> None:
+        """Libera el cupo de exportación, si se tomó uno."""
+        if slot is None:
+            return
+        try:
+            await self.data_repository.release_export_slot(slot)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el cupo de exportación {slot}: {e}")
+
+    async def _fetch_concurrently(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        entity_names: Sequence[str],
+        queue: asyncio.Queue,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, int]:
+        """
+        Lanza la query de cada tabla a la vez y encola cada resultado en cuanto llega.
+
+        Con plazo, las tablas opcionales (DEADLINE_OPTIONAL_ENTITIES) pendientes al
+        agotarse se omiten. Al salir (con éxito, error o cancelación) se cancelan las
+        queries pendientes y se espera a que terminen.
+
+        Returns:
+            Filas obtenidas por tabla (sin las omitidas)
+
+        Raises:
+            DeadlineExceededError: Si se agota el plazo con una tabla obligatoria pendiente
+            ExportError: Si falla la query de una tabla obligatoria
+        """
+        optional_entities = DEADLINE_OPTIONAL_ENTITIES if deadline else ()
+        tasks = {
+            asyncio.create_task(
+                self._fetch_entity(
+                    tenant_id, profile, entity_name, queue, fetch_times_by_table, deadline
+                )
+            ): entity_name
+            for entity_name in entity_names
+        }
+        fetched: Dict[str, int] = {}
+        pending: Set[asyncio.Task] = set(tasks)
+        try:
+            while pending:
+                timeout = max(0.0, deadline.remaining_seconds()) if deadline else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION
+                )
+                if not done:
+                    break
+                for task in done:
+                    entity_name = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        fetched[entity_name] = task.result()
+                    elif not (deadline and (
+                        deadline.expired() or isinstance(error, DeadlineExceededError)
+                    )):
+                        raise error
+                    elif entity_name not in optional_entities:
+                        raise DeadlineExceededError(
+                            f"Plazo agotado obteniendo {entity_name}: {error}"
+                        )
+                    else:
+                        logger.warning(f"Plazo agotado: se omite {entity_name}")
+
+            if pending:
+                pending_entities = [tasks[task] for task in pending]
+                required = [
+                    entity_name for entity_name in pending_entities
+                    if entity_name not in optional_entities
+                ]
+                if required:
+                    raise DeadlineExceededError(f"Plazo agotado esperando {required}")
+                logger.warning(f"Plazo agotado: se omiten {pending_entities}")
+        finally:
+            # Cancelar las queries pendientes (en el servidor) y esperar a que liberen su conexión
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return fetched
+
+    async def _fetch_entity(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        entity_name: str,
+        queue: asyncio.Queue,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline]
+    ) -> int:
+        """
+        Obtiene las filas de una tabla y las encola para el escritor.
+
+        Returns:
+            Cantidad de filas obtenidas
+
+        Raises:
+            DeadlineExceededError: Si se agota el plazo
+            DataFetchError: Si hay error obteniendo los datos
+        """
+        try:
+            start = time.time()
+            items = await self.data_repository.get_entity_by_tenant(
+                entity_name, tenant_id, profile.columns_for(entity_name),
+                referenced_products=entity_name == 'products' and self._prunes_products(profile),
+                deadline=deadline
+            )
+        except (DeadlineExceededError, DataFetchError):
+            raise
+        except Exception as e:
+            logger.error(f"Error obteniendo {entity_name}: {e}")
+            raise DataFetchError(f"Error obteniendo {entity_name}: {str(e)}")
+        fetch_times_by_table[entity_name] = int((time.time() - start) * 1000)
+        queue.put_nowait((entity_name, items))
+        return len(items)
+
+    async def _write_sqlite(
+        self,
+        builder: ISQLiteBuilder,
+        queue: asyncio.Queue,
+        output_path: str,
+        profile: ExportProfile,
+        previous_artifact: Optional[CachedArtifact],
+        reused_tables: List[str]
+    ) -> Optional[Tuple[Dict[str, int], List[str], Dict[str, Dict[str, int]], str]]:
+        """
+        Construye el SQLite con las tablas que llegan por la cola (en orden de llegada).
+
+        Una tabla dependiente de una opcional (ej: detalles de cobranza) espera a su
+        tabla padre; si el padre no llega (omitido por plazo), se descarta.
+
+        Returns:
+            (filas por tabla, tablas descartadas, extras, hash del contenido), o None si
+            la exportación se abortó
+
+        Raises:
+            ExportError: Si hay error construyendo el SQLite
+        """
+        inserters = self._builder_inserters(builder)
+        records_exported: Dict[str, int] = {}
+        inserted = set(reused_tables)
+        held: Dict[str, List[Any]] = {}
+        aborted = False
+        try:
+            try:
+                logger.info(f"Creando base de datos SQLite en {output_path}")
+                await self._run_blocking(builder.create_database, output_path)
+                await self._run_blocking(builder.create_schema)
+                if reused_tables:
+                    logger.info(
+                        f"Copiando tablas sin cambios del artefacto previo: {reused_tables}"
+                    )
+                    records_exported.update(
+                        await self._run_blocking(
+                            builder.copy_tables_from, previous_artifact.path, reused_tables
+                        )
+                    )
+            except Exception as e:
+                aborted = True
+                raise ExportError(f"Error creando base de datos SQLite: {str(e)}")
+
+            while True:
+                message = await queue.get()
+                if message is _ABORT:
+                    aborted = True
+                    return None
+                if message is _END_OF_DATA:
+                    break
+                entity_name, items = message
+                parent = _OPTIONAL_PARENTS.get(entity_name)
+                parent_pending = (
+                    parent and parent in ENTITY_MODELS
+                    and profile.includes(parent) and parent not in inserted
+                )
+                if parent_pending:
+                    held[entity_name] = items
+                    continue
+                for name, rows in [(entity_name, items)] + [
+                    (dependent, held.pop(dependent))
+                    for dependent in OPTIONAL_ENTITY_DEPENDENTS.get(entity_name, ())
+                    if dependent in held
+                ]:
+                    await self._run_blocking(self._insert_entity, inserters, name, rows, profile)
+                    records_exported[name] = len(rows)
+                    inserted.add(name)
+
+            dropped_tables = list(held)
+            if dropped_tables:
+                logger.warning(f"Se descartan {dropped_tables}: su tabla padre se omitió por plazo")
+
+            derived_tables: Dict[str, Dict[str, int]] = {}
+            try:
+                for name in profile.extras:
+                    derived_tables[name] = await self._run_blocking(builder.build_extra, name)
+            except Exception as e:
+                raise ExportError(f"Error construyendo extras en SQLite: {str(e)}")
+
+            # Cerrar SQLite dejando el archivo byte-reproducible (misma entrada => mismo hash)
+            content_hash = await self._run_blocking(builder.finalize)
+            records_exported = {
+                e: records_exported[e] for e in ENTITY_MODELS if e in records_exported
+            }
+            return records_exported, dropped_tables, derived_tables, content_hash
+
+        except BaseException:
+            aborted = True
+            raise
+        finally:
+            if aborted:
+                # Vaciar la cola: nadie más consume las tablas pendientes
+                while not queue.empty():
+                    queue.get_nowait()
+            try:
+                await self._run_blocking(builder.close)
+            except Exception as e:
+                logger.warning(f"Error cerrando base de datos SQLite: {e}")
+
+    @staticmethod
+    def _insert_entity(
+        inserters: Dict[str, Callable],
+        entity_name: str,
+        items: List[Any],
+        profile: ExportProfile
+    ) -> None:
+        """
+        Inserta las filas de una tabla en SQLite.
+
+        Raises:
+            ExportError: Si hay error insertando los datos
+        """
+        try:
+            inserters[entity_name](items, profile.columns_for(entity_name))
+        except Exception as e:
+            logger.error(f"Error insertando {entity_name} en SQLite: {e}")
+            raise ExportError(f"Error insertando {entity_name} en SQLite: {str(e)}")
+
+    @staticmethod
+    def _builder_inserters(builder: ISQLiteBuilder) -> Dict[str, Callable]:
+        """Retorna el método del builder que inserta cada entidad."""
+        return {
+            'customers': builder.insert_customers,
+            'products': builder.insert_products,
+            'bank_accounts': builder.insert_bank_accounts,
+            'list_prices': builder.insert_list_prices,
+            'locations': builder.insert_locations,
+            'list_price_details': builder.insert_list_price_details,
+            'client_list_prices': builder.insert_client_list_prices,
+            'cobranzas': builder.insert_cobranzas,
+            'cobranza_details': builder.insert_cobranza_details
+        }
+
+    async def _run_blocking(self, fn: Callable, *args: Any) -> Any:
+        """Ejecuta una función bloqueante en el pool de hilos del servicio."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _sync_watermark(self, deadline: Optional[Deadline]) -> datetime:
+        """
+        Obtiene la marca de sincronización del servidor, con un margen de solape
+        (ver ExportService._sync_watermark).
+
+        Raises:
+            DataFetchError: Si no se pudo leer la marca
+        """
+        try:
+            watermark = await self.data_repository.get_sync_watermark(deadline)
+        except (DeadlineExceededError, DataFetchError):
+            raise
+        except Exception as e:
+            raise DataFetchError(f"Error obteniendo la marca de sincronización: {str(e)}")
+        return self._watermark_with_overlap(watermark)
+
+    async def _safe_table_fingerprints(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline]
+    ) -> Dict[str, str]:
+        """
+        Obtiene las huellas de las tablas del perfil (ver ExportService._safe_table_fingerprints).
+        Un fallo no invalida la exportación: retorna un diccionario vacío.
+        """
+        try:
+            start = time.time()
+            fingerprints = await self.data_repository.get_table_fingerprints(
+                tenant_id, self._fingerprint_columns(profile),
+                referenced_products=self._prunes_products(profile), deadline=deadline
+            )
+            fetch_times_by_table['table_fingerprints'] = int((time.time() - start) * 1000)
+            return fingerprints
+        except Exception as e:
+            logger.warning(f"No se pudieron calcular las huellas de las tablas: {e}")
+            return {}
+
+    async def _tenant_exists(
+        self,
+        tenant_id: int,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline]
+    ) -> bool:
+        """
+        Verifica que el tenant tenga datos propios antes de lanzar las queries.
+        Un tenant inexistente se guarda en la caché negativa. Si la verificación
+        falla, se asume que existe (la exportación decide).
+        """
+        try:
+            start = time.time()
+            exists = await self.data_repository.tenant_exists(tenant_id, deadline)
+            fetch_times_by_table['tenant_exists'] = int((time.time() - start) * 1000)
+        except Exception as e:
+            logger.warning(f"No se pudo verificar la existencia del tenant {tenant_id}: {e}")
+            return True
+
+        if not exists:
+            logger.warning(f"Tenant {tenant_id} sin clientes ni ubicaciones: no se exporta")
+            self._record_postgres_outcome()
+            self._remember_empty(tenant_id)
+        return exists
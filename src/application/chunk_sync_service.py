@@ -0,0 +1,135 @@
+"""
+Servicio de aplicación para descargas incrementales por fragmentos (estilo rsync).
+Publica cada archivo exportado como fragmentos direccionados por contenido y calcula,
+frente al manifiesto que ya tiene el cliente, qué fragmentos le faltan.
+Sigue el principio de Responsabilidad Única (SRP) y el de Inversión de Dependencias (DIP).
+
+Protocolo del cliente:
+1. Pide el manifiesto actual indicando el hash de su archivo previo (base).
+2. Descarga el paquete con los fragmentos faltantes (cada fragmento una vez,
+   en el orden del manifiesto).
+3. Reconstruye el archivo recorriendo el manifiesto: cada fragmento sale de su archivo
+   previo (si el id estaba en el manifiesto base) o del paquete, y verifica el SHA-256.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from domain.interfaces import IChunkStore
+from utils.chunking import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkSyncService:
+    """
+    Servicio de sincronización por fragmentos.
+    Coordina el fragmentado de archivos y el almacén de fragmentos.
+    """
+
+    def __init__(self, chunk_store: IChunkStore):
+        """
+        Inicializa el servicio.
+
+        Args:
+            chunk_store: Almacén de fragmentos (local o compatible con S3)
+        """
+        self.chunk_store = chunk_store
+
+    def publish(self, file_path: str, content_hash: str) -> Dict[str, Any]:
+        """
+        Publica un archivo en el almacén de fragmentos.
+        Solo se suben los fragmentos que el almacén no tiene (de este u otros tenants).
+        Si el manifiesto ya existe (mismo contenido), no se vuelve a fragmentar.
+
+        Args:
+            file_path: Ruta del archivo exportado
+            content_hash: SHA-256 del archivo
+
+        Returns:
+            Manifiesto del archivo (content_hash, file_size, chunks)
+        """
+        manifest = self.chunk_store.get_manifest(content_hash)
+        if manifest is not None:
+            logger.info(
+                f"Manifiesto existente para {content_hash}: {len(manifest['chunks'])} fragmentos"
+            )
+            return manifest
+
+        start = time.time()
+        chunks: List[Dict[str, Any]] = []
+        uploaded_chunks = 0
+        uploaded_bytes = 0
+        for chunk_id, offset, data in iter_chunks(file_path):
+            chunks.append({'id': chunk_id, 'offset': offset, 'size': len(data)})
+            if self.chunk_store.missing([chunk_id]):
+                self.chunk_store.put_chunk(chunk_id, data)
+                uploaded_chunks += 1
+                uploaded_bytes += len(data)
+
+        manifest = {
+            'content_hash': content_hash,
+            'file_size': sum(c['size'] for c in chunks),
+            'chunks': chunks
+        }
+        self.chunk_store.put_manifest(content_hash, manifest)
+
+        logger.info(
+            f"Archivo publicado en {int((time.time() - start) * 1000)}ms: "
+            f"{len(chunks)} fragmentos, {uploaded_chunks} nuevos ({uploaded_bytes} bytes), "
+            f"{len(chunks) - uploaded_chunks} ya existían"
+        )
+        return manifest
+
+    def get_manifest(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un manifiesto publicado, o None si no existe."""
+        return self.chunk_store.get_manifest(content_hash)
+
+    def plan(self, manifest: Dict[str, Any], base_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Calcula los fragmentos que le faltan a un cliente que tiene el archivo `base_hash`.
+
+        Args:
+            manifest: Manifiesto del archivo actual
+            base_hash: Hash del archivo que ya tiene el cliente (None = no tiene ninguno)
+
+        Returns:
+            Plan con la base reconocida, los fragmentos faltantes (sin repetir, en orden
+            del manifiesto) y los bytes a descargar frente a los reutilizados
+        """
+        base_manifest = self.chunk_store.get_manifest(base_hash) if base_hash else None
+        base_ids = {c['id'] for c in base_manifest['chunks']} if base_manifest else set()
+
+        missing: List[str] = []
+        missing_bytes = 0
+        seen = set(base_ids)
+        for chunk in manifest['chunks']:
+            if chunk['id'] not in seen:
+                seen.add(chunk['id'])
+                missing.append(chunk['id'])
+                missing_bytes += chunk['size']
+
+        if base_hash and base_manifest is None:
+            logger.info(f"Manifiesto base desconocido ({base_hash}): se envía el archivo completo")
+
+        return {
+            'base': base_hash if base_manifest else None,
+            'missing': missing,
+            'missing_bytes': missing_bytes,
+            'reused_bytes': sum(c['size'] for c in manifest['chunks'] if c['id'] in base_ids)
+        }
+
+    def read_pack(self, chunk_ids: List[str]) -> bytes:
+        """
+        Concatena los fragmentos indicados, en orden.
+
+        Raises:
+            KeyError: Si algún fragmento no está en el almacén
+        """
+        parts = []
+        for chunk_id in chunk_ids:
+            data = self.chunk_store.get_chunk(chunk_id)
+            if data is None:
+                raise KeyError(f"Fragmento no encontrado: {chunk_id}")
+            parts.append(data)
+        return b''.join(parts)
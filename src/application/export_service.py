@@ -5,18 +5,374 @@ Sigue el principio de Responsabilidad Única (SRP) y el de Inversión de Depende
 """
 import logging
 import os
+import shutil
 import time
-from typing import Dict
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
-from domain.interfaces import IDataRepository, ISQLiteBuilder
-from domain.models import ExportResult
-from utils.exceptions import ExportError, DatabaseConnectionError
+from domain.interfaces import IArtifactStore, IDataRepository, IInvalidationStore, ISQLiteBuilder
+from domain.models import ENTITY_MODELS, CachedArtifact, Deadline, ExportResult
+from domain.profiles import (
+    ALL_ENTITIES, BUNDLE_CORE_ENTITIES, DEADLINE_OPTIONAL_ENTITIES, DEFAULT_BUNDLE_PARTS,
+    GLOBAL_ENTITIES, OPTIONAL_ENTITY_DEPENDENTS, ExportProfile, get_profile
+)
+from utils.circuit_breaker import CircuitBreaker
+from utils.exceptions import (
+    ExportError, DatabaseConnectionError, DataFetchError, DeadlineExceededError,
+    ExportOverloadedError
+)
+from utils.hashing import file_sha256
+from utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Tarea paralela que mide el catálogo completo frente al podado
+PRODUCT_STATS_TASK = 'product_catalog_stats'
 
-class ExportService:
+# Entidades que en una delta se envían completas: client_list_prices no tiene updated_at,
+# y las listas de precios y sus detalles entran o salen del alcance del tenant cuando
+# cambian sus asignaciones a clientes (client_list_prices) o se da de baja un cliente,
+# sin que cambie su propio updated_at
+FULL_REPLACE_ENTITIES = ('list_prices', 'list_price_details', 'client_list_prices')
+
+# Margen de solape de la marca de sincronización
+DEFAULT_WATERMARK_OVERLAP_SECONDS = 60
+
+# Archivo de cada tenant en una exportación por lotes (mismo nombre que descarga el cliente)
+BATCH_FILE_NAME = 'database_catalog_master_{tenant_id}.sqlite'
+
+# Versión del formato de los artefactos cacheados: cambiarla invalida los artefactos previos
+ARTIFACT_FORMAT_VERSION = 2
+
+
+def format_watermark(watermark: datetime) -> str:
+    """Serializa una marca de sincronización como ISO-8601 en UTC (sufijo Z)."""
+    return watermark.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def parse_watermark(value: str) -> datetime:
+    """
+    Interpreta una marca de sincronización ISO-8601 (ej: 2026-10-19T12:00:00.000000Z).
+    Sin zona horaria se asume UTC.
+
+    Raises:
+        ValueError: Si el valor no es una fecha ISO-8601 válida
+    """
+    try:
+        watermark = datetime.fromisoformat(value.strip())
+    except (ValueError, AttributeError):
+        raise ValueError(f"Marca de sincronización inválida: {value}")
+    if watermark.tzinfo is None:
+        watermark = watermark.replace(tzinfo=timezone.utc)
+    return watermark
+
+
+def build_artifact_key(tenant_id: int, profile: ExportProfile) -> str:
+    """
+    Retorna la clave del artefacto cacheado de un tenant y perfil.
+    Si el perfil depende de la fecha de construcción, la clave incluye la fecha UTC:
+    el artefacto de otro día no se reutiliza aunque los datos no hayan cambiado.
+    """
+    key = f"{tenant_id}_{profile.cache_key()}_v{ARTIFACT_FORMAT_VERSION}"
+    if profile.is_date_dependent():
+        key += f"_{datetime.now(timezone.utc):%Y%m%d}"
+    return key
+
+
+class BaseExportService:
+    """
+    Configuración y pasos comunes de ExportService y AsyncExportService: caché
+    negativa, circuit breaker, almacén de artefactos y registro de cambios. Sus pasos
+    son bloqueantes: el servicio asíncrono los ejecuta en su pool de hilos. Las
+    consultas a PostgreSQL quedan en cada servicio (síncronas o no).
+    """
+
+    def __init__(
+        self,
+        watermark_overlap_seconds: int = DEFAULT_WATERMARK_OVERLAP_SECONDS,
+        artifact_store: Optional[IArtifactStore] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        negative_cache: Optional[TTLCache] = None,
+        max_concurrent_exports: int = 0,
+        export_slot_wait_seconds: float = 0,
+        invalidation_store: Optional[IInvalidationStore] = None,
+        invalidation_max_heartbeat_age_seconds: float = 30
+    ):
+        """Inicializa la configuración común (ver los Args de ExportService)."""
+        self.watermark_overlap_seconds = watermark_overlap_seconds
+        self.artifact_store = artifact_store
+        self.circuit_breaker = circuit_breaker
+        self.negative_cache = negative_cache
+        self.max_concurrent_exports = max_concurrent_exports
+        self.export_slot_wait_seconds = export_slot_wait_seconds
+        self.invalidation_store = invalidation_store
+        self.invalidation_max_heartbeat_age_seconds = invalidation_max_heartbeat_age_seconds
+
+    def export_from_cache(
+        self,
+        tenant_id: int,
+        output_path: str,
+        profile: Optional[ExportProfile] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[ExportResult]:
+        """
+        Sirve la exportación completa desde el artefacto cacheado, sin consultar PostgreSQL.
+        Se usa para responder de inmediato con un artefacto que puede estar desactualizado
+        (stale-while-revalidate) o cuando PostgreSQL no está disponible.
+
+        Args:
+            tenant_id: ID del tenant
+            output_path: Ruta donde se copia el archivo
+            profile: Perfil de exportación (None = perfil por defecto)
+            max_age_seconds: Antigüedad máxima aceptada del artefacto (None = cualquiera)
+
+        Returns:
+            Resultado con cache_status 'STALE' y la antigüedad del artefacto, o None si
+            no hay almacén o no existe un artefacto suficientemente reciente
+        """
+        if not self.artifact_store:
+            return None
+
+        start_time = time.time()
+        profile = profile or get_profile()
+        artifact = self._cached_artifact(self._artifact_key(tenant_id, profile))
+        if artifact is None:
+            return None
+
+        age_seconds = artifact.age_seconds()
+        if max_age_seconds is not None and age_seconds > max_age_seconds:
+            logger.info(
+                f"Artefacto {artifact.key} demasiado antiguo "
+                f"({int(age_seconds)}s > {int(max_age_seconds)}s)"
+            )
+            return None
+
+        try:
+            shutil.copyfile(artifact.path, output_path)
+        except OSError as e:
+            # El artefacto pudo reemplazarse o eliminarse entre la lectura y la copia
+            logger.warning(f"No se pudo copiar el artefacto {artifact.key}: {e}")
+            return None
+
+        logger.info(
+            f"Sirviendo artefacto cacheado {artifact.key} ({int(age_seconds)}s de antigüedad)"
+        )
+        return ExportResult(
+            success=True,
+            file_path=output_path,
+            file_size=os.path.getsize(output_path),
+            records_exported=dict(artifact.records_exported),
+            execution_time_ms=int((time.time() - start_time) * 1000),
+            postgres_fetch_time_ms=0,
+            sqlite_build_time_ms=0,
+            profile=profile.name,
+            sync_watermark=artifact.metadata.get('sync_watermark'),
+            cache_status='STALE',
+            cache_age_seconds=int(age_seconds),
+            content_hash=artifact.metadata.get('content_hash') or file_sha256(output_path),
+            derived_tables=artifact.metadata.get('derived_tables', {})
+        )
+
+    def cached_artifact(
+        self, tenant_id: int, profile: Optional[ExportProfile] = None
+    ) -> Optional[CachedArtifact]:
+        """Artefacto vigente de un tenant y perfil, o None si no hay almacén o artefacto."""
+        if not self.artifact_store:
+            return None
+        return self._cached_artifact(self._artifact_key(tenant_id, profile or get_profile()))
+
+    @staticmethod
+    def _prunes_products(profile: ExportProfile) -> bool:
+        """Indica si el perfil exporta solo los productos referenciados por el tenant."""
+        return profile.includes('products') and profile.product_scope == 'referenced'
+
+    def _known_empty(self, tenant_id: int, profile: ExportProfile) -> bool:
+        """Indica si el tenant (o el tenant con este perfil) está en la caché negativa."""
+        if not self.negative_cache:
+            return False
+        if (
+            self.negative_cache.get(tenant_id)
+            or self.negative_cache.get((tenant_id, profile.cache_key()))
+        ):
+            logger.info(f"Tenant {tenant_id} sin datos (caché negativa): no se consulta PostgreSQL")
+            return True
+        return False
+
+    def _remember_empty(self, tenant_id: int, profile: Optional[ExportProfile] = None) -> None:
+        """Guarda el tenant (inexistente) o el tenant con un perfil (vacío) en la caché negativa."""
+        if self.negative_cache:
+            self.negative_cache.put(
+                tenant_id if profile is None else (tenant_id, profile.cache_key())
+            )
+
+    def _not_found_result(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        start_time: float,
+        fetch_times_by_table: Optional[Dict[str, int]] = None
+    ) -> ExportResult:
+        """Resultado de un tenant sin datos (sin ejecutar las queries de exportación)."""
+        return ExportResult(
+            success=False,
+            not_found=True,
+            error_message=f"No se encontraron datos para el tenant {tenant_id}",
+            execution_time_ms=int((time.time() - start_time) * 1000),
+            postgres_fetch_time_ms=sum((fetch_times_by_table or {}).values()),
+            sqlite_build_time_ms=0,
+            fetch_times_by_table=fetch_times_by_table or {},
+            profile=profile.name
+        )
+
+    def _record_postgres_outcome(self, error: Optional[Exception] = None) -> None:
+        """
+        Registra en el circuit breaker el resultado de una exportación contra PostgreSQL
+        (un resultado por exportación). Solo los errores de conexión o de lectura
+        cuentan como fallo; un error al construir el SQLite no es culpa de PostgreSQL.
+        """
+        if not self.circuit_breaker:
+            return
+        if error is None:
+            self.circuit_breaker.record_success()
+        elif isinstance(error, (DatabaseConnectionError, DataFetchError)):
+            self.circuit_breaker.record_failure()
+
+    @staticmethod
+    def _artifact_key(tenant_id: int, profile: ExportProfile) -> str:
+        """Clave del artefacto cacheado de un tenant y perfil (ver build_artifact_key)."""
+        return build_artifact_key(tenant_id, profile)
+
+    def _cached_artifact(self, artifact_key: str) -> Optional[CachedArtifact]:
+        """
+        Obtiene el artefacto previo del almacén.
+        Un fallo del almacén no invalida la exportación: retorna None.
+        """
+        try:
+            return self.artifact_store.get(artifact_key)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el artefacto {artifact_key}: {e}")
+            return None
+
+    def _export_if_unchanged(
+        self,
+        tenant_id: int,
+        output_path: str,
+        profile: ExportProfile
+    ) -> Optional[ExportResult]:
+        """
+        Sirve el artefacto sin consultar PostgreSQL (ni siquiera las huellas) si el
+        registro de cambios asegura que ninguna entidad del perfil cambió después de
+        la marca de sincronización del artefacto.
+
+        Returns:
+            Resultado con cache_status 'HIT', o None si no hay registro ni artefacto,
+            si el registro no lo puede asegurar o si alguna entidad del perfil cambió
+        """
+        if not (self.invalidation_store and self.artifact_store):
+            return None
+        artifact_key = self._artifact_key(tenant_id, profile)
+        artifact = self._cached_artifact(artifact_key)
+        if artifact is None or not artifact.metadata.get('sync_watermark'):
+            return None
+
+        try:
+            since = parse_watermark(artifact.metadata['sync_watermark']).timestamp()
+            changed = self.invalidation_store.changed_entities(
+                tenant_id, since, self.invalidation_max_heartbeat_age_seconds
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el registro de cambios: {e}")
+            return None
+        if changed is None:
+            return None
+
+        relevant = self._invalidating_entities(profile)
+        modified = [
+            entity_name for entity_name in changed
+            if entity_name == ALL_ENTITIES or entity_name in relevant
+        ]
+        if modified:
+            logger.info(f"Entidades modificadas desde el artefacto {artifact_key}: {modified}")
+            return None
+
+        result = self.export_from_cache(tenant_id, output_path, profile)
+        if result is None:
+            return None
+        self._touch_artifact(artifact_key)
+        result.cache_status = 'HIT'
+        result.cache_age_seconds = None
+        logger.info(
+            f"Sin cambios notificados desde el artefacto {artifact_key}: "
+            f"se sirve sin consultar PostgreSQL"
+        )
+        return result
+
+    def _invalidating_entities(self, profile: ExportProfile) -> Set[str]:
+        """Entidades cuyos cambios invalidan el artefacto del perfil."""
+        entities = {entity_name for entity_name in ENTITY_MODELS if profile.includes(entity_name)}
+        if self._prunes_products(profile):
+            # El catálogo podado depende de las filas que referencian productos
+            entities.update(('list_price_details', 'cobranza_details'))
+        return entities
+
+    def _store_artifact(
+        self,
+        artifact_key: str,
+        output_path: str,
+        fingerprints: Dict[str, str],
+        records_exported: Dict[str, int],
+        metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Guarda el archivo generado como artefacto para la siguiente reconstrucción.
+        Un fallo del almacén no invalida la exportación.
+        """
+        try:
+            self.artifact_store.put(
+                artifact_key, output_path, fingerprints, records_exported, metadata
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el artefacto {artifact_key}: {e}")
+
+    def _touch_artifact(self, artifact_key: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Marca el artefacto como confirmado contra PostgreSQL.
+        Un fallo del almacén no invalida la exportación.
+        """
+        try:
+            self.artifact_store.touch(artifact_key, metadata)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el artefacto {artifact_key}: {e}")
+
+    def _watermark_with_overlap(self, watermark: datetime) -> datetime:
+        """
+        Aplica el margen de solape a la marca de sincronización del servidor.
+        El margen cubre transacciones que confirmaron tarde con updated_at anterior
+        a la marca; las filas repetidas en la siguiente delta son inocuas.
+        """
+        return watermark - timedelta(seconds=self.watermark_overlap_seconds)
+
+    @staticmethod
+    def _fingerprint_columns(profile: ExportProfile) -> Dict[str, Optional[Sequence[str]]]:
+        """Columnas de cada tabla del perfil para calcular sus huellas."""
+        return {
+            entity_name: profile.columns_for(entity_name)
+            for entity_name in ENTITY_MODELS
+            if profile.includes(entity_name)
+        }
+
+    def _export_slot_timeout(self, deadline: Optional[Deadline] = None) -> float:
+        """Espera máxima por un cupo: export_slot_wait_seconds, o el plazo si es menos."""
+        timeout_seconds = self.export_slot_wait_seconds
+        if deadline is not None:
+            timeout_seconds = min(timeout_seconds, deadline.remaining_seconds())
+        return max(0.0, timeout_seconds)
+
+
+class ExportService(BaseExportService):
     """
     Servicio de exportación de datos.
     Coordina el proceso de exportar datos de PostgreSQL a SQLite.
@@ -25,7 +381,17 @@ class ExportService:
     def __init__(
         self,
         data_repository: IDataRepository,
-        sqlite_builder: ISQLiteBuilder
+        sqlite_builder: ISQLiteBuilder,
+        watermark_overlap_seconds: int = DEFAULT_WATERMARK_OVERLAP_SECONDS,
+        artifact_store: Optional[IArtifactStore] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        tenant_lock_timeout_seconds: float = 0,
+        negative_cache: Optional[TTLCache] = None,
+        max_concurrent_exports: int = 0,
+        export_slot_wait_seconds: float = 0,
+        sqlite_builder_factory: Optional[Callable[[], ISQLiteBuilder]] = None,
+        invalidation_store: Optional[IInvalidationStore] = None,
+        invalidation_max_heartbeat_age_seconds: float = 30
     ):
         """
         Inicializa el servicio de exportación.
@@ -33,17 +399,62 @@ class ExportService:
         Args:
             data_repository: Repositorio de datos (PostgreSQL)
             sqlite_builder: Constructor de SQLite
+            watermark_overlap_seconds: Margen de solape de la marca de sincronización
+            artifact_store: Almacén de artefactos para reconstrucciones incrementales
+                            (None = cada exportación consulta todas las tablas)
+            circuit_breaker: Circuit breaker de PostgreSQL donde se registra el resultado
+                             de cada exportación (None = sin registro)
+            tenant_lock_timeout_seconds: Espera máxima por otra exportación completa del
+                                         mismo tenant en curso en otro proceso (0 = sin lock)
+            negative_cache: Caché de tenants sin datos (inexistentes o vacíos para un perfil);
+                            un tenant en caché se responde sin consultar PostgreSQL
+            max_concurrent_exports: Exportaciones que pueden consultar PostgreSQL a la vez en
+                                    todo el clúster (0 = sin límite)
+            export_slot_wait_seconds: Espera máxima por un cupo libre; sin cupo la exportación
+                                      falla con result.overloaded
+            sqlite_builder_factory: Crea un builder por archivo para construir en paralelo
+                                    los archivos de un lote (None = en serie con sqlite_builder)
+            invalidation_store: Registro de cambios notificados por PostgreSQL; si asegura que
+                                nada cambió desde el artefacto, se sirve sin calcular huellas
+                                (None = siempre se calculan)
+            invalidation_max_heartbeat_age_seconds: Antigüedad máxima del latido del listener
+                                                    para confiar en el registro
         """
+        super().__init__(
+            watermark_overlap_seconds=watermark_overlap_seconds,
+            artifact_store=artifact_store,
+            circuit_breaker=circuit_breaker,
+            negative_cache=negative_cache,
+            max_concurrent_exports=max_concurrent_exports,
+            export_slot_wait_seconds=export_slot_wait_seconds,
+            invalidation_store=invalidation_store,
+            invalidation_max_heartbeat_age_seconds=invalidation_max_heartbeat_age_seconds
+        )
         self.data_repository = data_repository
         self.sqlite_builder = sqlite_builder
+        self.tenant_lock_timeout_seconds = tenant_lock_timeout_seconds
+        self.sqlite_builder_factory = sqlite_builder_factory
 
-    def export_tenant_data(self, tenant_id: int, output_path: str) -> ExportResult:
+    def export_tenant_data(
+        self,
+        tenant_id: int,
+        output_path: str,
+        profile: Optional[ExportProfile] = None,
+        deadline: Optional[Deadline] = None
+    ) -> ExportResult:
         """
-        Exporta todos los datos de un tenant a un archivo SQLite.
+        Exporta los datos de un tenant a un archivo SQLite.
+
+        Con plazo, cada query se limita al tiempo restante y, si se agota, se omiten
+        las tablas opcionales pendientes (DEADLINE_OPTIONAL_ENTITIES, ver
+        result.skipped_tables); si falta una tabla obligatoria la exportación falla
+        con result.timed_out. Un archivo con tablas omitidas no se guarda como artefacto.
 
         Args:
             tenant_id: ID del tenant a exportar
             output_path: Ruta del archivo SQLite de salida
+            profile: Perfil con las tablas y columnas a exportar (None = perfil por defecto)
+            deadline: Plazo para obtener los datos (None = sin plazo)
 
         Returns:
             Resultado de la operación de exportación
@@ -53,73 +464,114 @@ class ExportService:
             ExportError: Si hay error durante la exportación
         """
         start_time = time.time()
+        profile = profile or get_profile()
         records_exported: Dict[str, int] = {}
         postgres_fetch_time_ms = 0
         sqlite_build_time_ms = 0
         fetch_times_by_table: Dict[str, int] = {}
+        product_pruning: Dict[str, int] = {}
+        artifact_key: Optional[str] = None
+        previous_artifact: Optional[CachedArtifact] = None
+        fingerprints: Dict[str, str] = {}
+        reused_tables: List[str] = []
+        cache_status: Optional[str] = None
+        content_hash: Optional[str] = None
+        derived_tables: Dict[str, Dict[str, int]] = {}
+        skipped_tables: List[str] = []
+        tenant_locked = False
+        export_slot: Optional[int] = None
+
+        # Tenant sin datos visto hace poco: responder sin consultar PostgreSQL
+        if self._known_empty(tenant_id, profile):
+            return self._not_found_result(tenant_id, profile, start_time)
+
+        # Sin cambios notificados desde el artefacto: responder sin consultar PostgreSQL
+        unchanged_result = self._export_if_unchanged(tenant_id, output_path, profile)
+        if unchanged_result is not None:
+            return unchanged_result
 
         try:
             # Paso 1: Conectar a PostgreSQL
             logger.info(f"Conectando a PostgreSQL para tenant {tenant_id}")
             self._connect_to_postgres()
+            self.data_repository.set_deadline(deadline)
+
+            # Verificación barata antes de lanzar las queries de exportación
+            if not self._tenant_exists(tenant_id, fetch_times_by_table):
+                return self._not_found_result(tenant_id, profile, start_time, fetch_times_by_table)
+
+            # Si otro contenedor está exportando el mismo tenant, esperar a que termine:
+            # el artefacto que deja se reutiliza por huellas (con un almacén compartido)
+            tenant_locked = self._acquire_tenant_lock(tenant_id, fetch_times_by_table, deadline)
+
+            # Control de admisión: limita las exportaciones que consultan PostgreSQL a la vez
+            export_slot = self._acquire_export_slot(fetch_times_by_table, deadline)
 
             # Paso 2: Obtener datos de PostgreSQL en paralelo
             logger.info("Obteniendo datos de PostgreSQL en paralelo")
             postgres_start_time = time.time()
 
-            # Definir todas las queries a ejecutar
+            # Marca de sincronización tomada antes de leer los datos (base para deltas)
+            sync_watermark = self._sync_watermark()
+
+            # Reconstrucción incremental: comparar huellas con el artefacto previo
+            if self.artifact_store:
+                artifact_key = self._artifact_key(tenant_id, profile)
+                previous_artifact = self._cached_artifact(artifact_key)
+                fingerprints = self._safe_table_fingerprints(
+                    tenant_id, profile, fetch_times_by_table
+                )
+                if previous_artifact and fingerprints:
+                    reused_tables = [
+                        entity_name for entity_name, fingerprint in fingerprints.items()
+                        if previous_artifact.fingerprints.get(entity_name) == fingerprint
+                    ]
+                logger.info(f"Tablas sin cambios respecto al artefacto previo: {reused_tables}")
+
+            # Definir las queries a ejecutar (solo tablas y columnas del perfil que cambiaron)
+            fetchers = self._repository_fetchers(profile)
             fetch_tasks = {
-                'customers': lambda: self.data_repository.get_customers_by_tenant(tenant_id),
-                'products': lambda: self.data_repository.get_products_by_tenant(tenant_id),
-                'bank_accounts': lambda: self.data_repository.get_bank_accounts_by_tenant(tenant_id),
-                'list_prices': lambda: self.data_repository.get_list_prices_by_tenant(tenant_id),
-                'list_price_details': lambda: self.data_repository.get_list_price_details_by_tenant(tenant_id),
-                'client_list_prices': lambda: self.data_repository.get_client_list_prices_by_tenant(tenant_id),
-                'locations': lambda: self.data_repository.get_locations_by_tenant(tenant_id),
-                'cobranzas': lambda: self.data_repository.get_cobranzas_by_tenant(tenant_id),
-                'cobranza_details': lambda: self.data_repository.get_cobranza_details_by_tenant(tenant_id)
+                entity_name: partial(
+                    fetchers[entity_name], tenant_id, profile.columns_for(entity_name)
+                )
+                for entity_name in ENTITY_MODELS
+                if profile.includes(entity_name) and entity_name not in reused_tables
             }
+            logger.info(f"Perfil de exportación '{profile.name}': {list(fetch_tasks)}")
 
-            # Ejecutar queries en paralelo
-            results = {}
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_entity = {
-                    executor.submit(self._fetch_data, entity_name, fetch_fn): entity_name
-                    for entity_name, fetch_fn in fetch_tasks.items()
-                }
+            # Con catálogo podado, medir en paralelo cuánto se ahorra frente al catálogo completo
+            if 'products' in fetch_tasks and self._prunes_products(profile):
+                fetch_tasks[PRODUCT_STATS_TASK] = partial(
+                    self._safe_product_catalog_stats, tenant_id
+                )
 
-                for future in as_completed(future_to_entity):
-                    entity_name = future_to_entity[future]
-                    try:
-                        data, elapsed_ms = future.result()
-                        results[entity_name] = data
-                        fetch_times_by_table[entity_name] = elapsed_ms
-                    except Exception as e:
-                        logger.error(f"Error obteniendo {entity_name}: {e}")
-                        raise
-
-            # Asignar resultados
-            customers = results['customers']
-            products = results['products']
-            bank_accounts = results['bank_accounts']
-            list_prices = results['list_prices']
-            list_price_details = results['list_price_details']
-            client_list_prices = results['client_list_prices']
-            locations = results['locations']
-            cobranzas = results['cobranzas']
-            cobranza_details = results['cobranza_details']
-
-            # Registrar conteos
+            # Ejecutar queries en paralelo (con plazo, las tablas opcionales pueden omitirse)
+            optional_entities = (
+                DEADLINE_OPTIONAL_ENTITIES + (PRODUCT_STATS_TASK,) if deadline else ()
+            )
+            results = self._fetch_in_parallel(
+                fetch_tasks, fetch_times_by_table, deadline, optional_entities
+            )
+            skipped_tables = self._skipped_tables(fetch_tasks, results)
+            self._record_postgres_outcome()
+
+            # Construir el SQLite no usa PostgreSQL: el cupo queda libre para otra exportación
+            self._release_export_slot(export_slot)
+            export_slot = None
+
+            if PRODUCT_STATS_TASK in results:
+                product_pruning = self._product_pruning_report(
+                    results.pop(PRODUCT_STATS_TASK), results['products']
+                )
+
+            # Registrar conteos (las tablas reutilizadas cuentan lo que tenía el artefacto previo)
             records_exported = {
-                'customers': len(customers),
-                'products': len(products),
-                'bank_accounts': len(bank_accounts),
-                'list_prices': len(list_prices),
-                'list_price_details': len(list_price_details),
-                'client_list_prices': len(client_list_prices),
-                'locations': len(locations),
-                'cobranzas': len(cobranzas),
-                'cobranza_details': len(cobranza_details)
+                entity_name: (
+                    len(results[entity_name]) if entity_name in results
+                    else previous_artifact.records_exported.get(entity_name, 0)
+                )
+                for entity_name in ENTITY_MODELS
+                if entity_name in results or entity_name in reused_tables
             }
 
             # Calcular tiempo de extracción de PostgreSQL
@@ -135,42 +587,86 @@ class ExportService:
             total_records = sum(records_exported.values())
             if total_records == 0:
                 logger.warning(f"No se encontraron datos para tenant {tenant_id}")
+                self._remember_empty(tenant_id, profile)
                 query_timings_detailed = self.data_repository.get_query_timings()
                 return ExportResult(
                     success=False,
+                    not_found=True,
                     error_message=f"No se encontraron datos para el tenant {tenant_id}",
                     records_exported=records_exported,
                     execution_time_ms=int((time.time() - start_time) * 1000),
                     postgres_fetch_time_ms=postgres_fetch_time_ms,
                     sqlite_build_time_ms=0,
                     fetch_times_by_table=fetch_times_by_table,
-                    query_timings_detailed=query_timings_detailed
+                    query_timings_detailed=query_timings_detailed,
+                    retries=self._retry_counts(),
+                    profile=profile.name,
+                    product_pruning=product_pruning
                 )
 
-            # Paso 3: Crear base de datos SQLite
-            logger.info(f"Creando base de datos SQLite en {output_path}")
             sqlite_start_time = time.time()
-            self._create_sqlite_database(output_path)
+            if fetch_tasks:
+                # Paso 3: Crear base de datos SQLite
+                logger.info(f"Creando base de datos SQLite en {output_path}")
+                self._create_sqlite_database(output_path)
 
-            # Paso 4: Insertar datos en SQLite (en orden correcto por relaciones)
-            logger.info("Insertando datos en SQLite")
-            self._insert_all_data(
-                customers=customers,
-                products=products,
-                bank_accounts=bank_accounts,
-                list_prices=list_prices,
-                list_price_details=list_price_details,
-                client_list_prices=client_list_prices,
-                locations=locations,
-                cobranzas=cobranzas,
-                cobranza_details=cobranza_details
-            )
+                # Paso 4: Copiar las tablas sin cambios e insertar el resto (orden por relaciones)
+                if reused_tables:
+                    logger.info(
+                        f"Copiando tablas sin cambios del artefacto previo: {reused_tables}"
+                    )
+                    records_exported.update(
+                        self.sqlite_builder.copy_tables_from(previous_artifact.path, reused_tables)
+                    )
+                logger.info("Insertando datos en SQLite")
+                self._insert_all_data(results, profile)
+
+                # Paso 5: Construir las estructuras derivadas del perfil
+                # (índices, tablas precalculadas)
+                derived_tables = self._build_extras(profile)
+
+                # Cerrar SQLite dejando el archivo byte-reproducible (misma entrada => mismo hash)
+                content_hash = self.sqlite_builder.finalize()
+            else:
+                # Ninguna tabla cambió: el artefacto previo es el resultado
+                logger.info(
+                    f"Sin cambios desde el artefacto previo: copiando {previous_artifact.key}"
+                )
+                shutil.copyfile(previous_artifact.path, output_path)
+                content_hash = (
+                    previous_artifact.metadata.get('content_hash') or file_sha256(output_path)
+                )
+                derived_tables = previous_artifact.metadata.get('derived_tables', {})
 
             # Calcular tiempo de construcción de SQLite
             sqlite_build_time_ms = int((time.time() - sqlite_start_time) * 1000)
             logger.info(f"Base de datos SQLite construida en {sqlite_build_time_ms}ms")
 
-            # Paso 5: Obtener tamaño del archivo
+            if self.artifact_store:
+                cache_status = self._cache_status(reused_tables, fetch_tasks)
+                if skipped_tables:
+                    # Archivo parcial: no debe servirse como exportación completa
+                    logger.warning(
+                        f"Tablas omitidas por plazo: {skipped_tables}; no se guarda el artefacto"
+                    )
+                elif not fetch_tasks:
+                    # El artefacto sigue vigente: se reinicia su antigüedad (ver export_from_cache)
+                    # y su marca pasa a la de esta lectura (ver _export_if_unchanged)
+                    self._touch_artifact(
+                        artifact_key, {'sync_watermark': format_watermark(sync_watermark)}
+                    )
+                elif fingerprints:
+                    self._store_artifact(
+                        artifact_key, output_path, fingerprints, records_exported,
+                        {
+                            'profile': profile.name,
+                            'sync_watermark': format_watermark(sync_watermark),
+                            'content_hash': content_hash,
+                            'derived_tables': derived_tables
+                        }
+                    )
+
+            # Paso 6: Obtener tamaño del archivo
             file_size = os.path.getsize(output_path) if os.path.exists(output_path) else None
 
             execution_time_ms = int((time.time() - start_time) * 1000)
@@ -196,15 +692,214 @@ class ExportService:
                 postgres_fetch_time_ms=postgres_fetch_time_ms,
                 sqlite_build_time_ms=sqlite_build_time_ms,
                 fetch_times_by_table=fetch_times_by_table,
-                query_timings_detailed=query_timings_detailed
+                query_timings_detailed=query_timings_detailed,
+                retries=self._retry_counts(),
+                profile=profile.name,
+                product_pruning=product_pruning,
+                sync_watermark=format_watermark(sync_watermark),
+                reused_tables=reused_tables,
+                cache_status=cache_status,
+                content_hash=content_hash,
+                derived_tables=derived_tables,
+                skipped_tables=skipped_tables
             )
 
         except Exception as e:
             logger.error(f"Error durante la exportación: {str(e)}", exc_info=True)
+            self._record_postgres_outcome(e)
             # Intentar obtener timings detallados incluso en caso de error
             try:
                 query_timings_detailed = self.data_repository.get_query_timings()
-            except:
+            except Exception as timings_error:
+                logger.warning(f"No se pudieron obtener los tiempos: {timings_error}")
+                query_timings_detailed = {}
+
+            return ExportResult(
+                success=False,
+                error_message=str(e),
+                records_exported=records_exported,
+                execution_time_ms=int((time.time() - start_time) * 1000),
+                postgres_fetch_time_ms=postgres_fetch_time_ms,
+                sqlite_build_time_ms=sqlite_build_time_ms,
+                fetch_times_by_table=fetch_times_by_table,
+                query_timings_detailed=query_timings_detailed,
+                retries=self._retry_counts(),
+                profile=profile.name,
+                product_pruning=product_pruning,
+                timed_out=isinstance(e, DeadlineExceededError),
+                overloaded=isinstance(e, ExportOverloadedError)
+            )
+
+        finally:
+            # Limpieza de recursos (el lock se libera después de guardar el artefacto)
+            self._release_export_slot(export_slot)
+            if tenant_locked:
+                self._release_tenant_lock(tenant_id)
+            self._cleanup()
+
+    def export_tenant_delta(
+        self,
+        tenant_id: int,
+        output_path: str,
+        since: datetime,
+        profile: Optional[ExportProfile] = None,
+        deadline: Optional[Deadline] = None
+    ) -> ExportResult:
+        """
+        Exporta solo los cambios de un tenant desde la última sincronización del cliente.
+
+        El archivo SQLite resultante tiene el mismo esquema que la exportación completa,
+        con las filas insertadas o modificadas desde `since`, más las tablas SyncInfo,
+        SyncDeletedRow y SyncApplyStep (ver SQLiteBuilder.write_delta_metadata).
+        Las entidades cuyo alcance no se puede seguir por updated_at
+        (FULL_REPLACE_ENTITIES) y los productos con alcance 'referenced' se envían completos.
+
+        Args:
+            tenant_id: ID del tenant a exportar
+            output_path: Ruta del archivo SQLite de salida
+            since: Marca de la última sincronización del cliente
+            profile: Perfil con las tablas y columnas a exportar (None = perfil por defecto)
+            deadline: Plazo para obtener los datos (None = sin plazo); una delta nunca
+                      omite tablas: si se agota falla con result.timed_out
+
+        Returns:
+            Resultado de la operación; sync_watermark es la marca para la siguiente delta
+        """
+        start_time = time.time()
+        profile = profile or get_profile()
+        records_exported: Dict[str, int] = {}
+        postgres_fetch_time_ms = 0
+        sqlite_build_time_ms = 0
+        fetch_times_by_table: Dict[str, int] = {}
+        export_slot: Optional[int] = None
+
+        if self._known_empty(tenant_id, profile):
+            return self._not_found_result(tenant_id, profile, start_time)
+
+        try:
+            logger.info(
+                f"Conectando a PostgreSQL para delta del tenant {tenant_id} "
+                f"desde {format_watermark(since)}"
+            )
+            self._connect_to_postgres()
+            self.data_repository.set_deadline(deadline)
+
+            if not self._tenant_exists(tenant_id, fetch_times_by_table):
+                return self._not_found_result(tenant_id, profile, start_time, fetch_times_by_table)
+
+            export_slot = self._acquire_export_slot(fetch_times_by_table, deadline)
+
+            postgres_start_time = time.time()
+            sync_watermark = self._sync_watermark()
+
+            # Entidades completas (sin updated_at o cuyo alcance depende de otras tablas)
+            replaced_entities = [
+                entity_name for entity_name in ENTITY_MODELS
+                if profile.includes(entity_name) and (
+                    entity_name in FULL_REPLACE_ENTITIES
+                    or (entity_name == 'products' and self._prunes_products(profile))
+                )
+            ]
+
+            fetchers = self._repository_fetchers(profile)
+            fetch_tasks = {}
+            for entity_name in ENTITY_MODELS:
+                if not profile.includes(entity_name):
+                    continue
+                columns = profile.columns_for(entity_name)
+                if entity_name in replaced_entities:
+                    fetch_tasks[entity_name] = partial(fetchers[entity_name], tenant_id, columns)
+                else:
+                    fetch_tasks[entity_name] = partial(
+                        self.data_repository.get_changes_since,
+                        entity_name, tenant_id, since, columns
+                    )
+
+            fetched = self._fetch_in_parallel(fetch_tasks, fetch_times_by_table, deadline)
+            self._record_postgres_outcome()
+            self._release_export_slot(export_slot)
+            export_slot = None
+
+            results: Dict[str, List] = {}
+            deleted_ids: Dict[str, List[int]] = {}
+            for entity_name, data in fetched.items():
+                if entity_name in replaced_entities:
+                    results[entity_name] = data
+                else:
+                    results[entity_name], deleted_ids[entity_name] = data
+
+            records_exported = {
+                entity_name: len(results[entity_name])
+                for entity_name in ENTITY_MODELS
+                if entity_name in results
+            }
+            deleted_counts = {
+                entity_name: len(deleted_ids[entity_name])
+                for entity_name in ENTITY_MODELS
+                if entity_name in deleted_ids
+            }
+            postgres_fetch_time_ms = int((time.time() - postgres_start_time) * 1000)
+            logger.info(
+                f"Cambios obtenidos de PostgreSQL en {postgres_fetch_time_ms}ms. "
+                f"Altas/modificaciones: {records_exported}, bajas: {deleted_counts}"
+            )
+
+            # Construir la delta: mismo esquema + tablas de sincronización
+            sqlite_start_time = time.time()
+            self._create_sqlite_database(output_path)
+            self._insert_all_data(results, profile)
+            self.sqlite_builder.write_delta_metadata(
+                sync_info={
+                    'mode': 'delta',
+                    'tenant_id': str(tenant_id),
+                    'profile': profile.name,
+                    'since': format_watermark(since),
+                    'watermark': format_watermark(sync_watermark)
+                },
+                deleted_ids=deleted_ids,
+                upserted_entities=[e for e in results if e not in replaced_entities],
+                replaced_entities=replaced_entities,
+                extras=profile.extras
+            )
+            content_hash = self.sqlite_builder.finalize()
+            sqlite_build_time_ms = int((time.time() - sqlite_start_time) * 1000)
+
+            file_size = os.path.getsize(output_path) if os.path.exists(output_path) else None
+            execution_time_ms = int((time.time() - start_time) * 1000)
+            logger.info(
+                f"Delta completada: {sum(records_exported.values())} filas, "
+                f"{sum(deleted_counts.values())} bajas, {file_size} bytes, {execution_time_ms}ms"
+            )
+
+            return ExportResult(
+                success=True,
+                file_path=output_path,
+                file_size=file_size,
+                records_exported=records_exported,
+                execution_time_ms=execution_time_ms,
+                postgres_fetch_time_ms=postgres_fetch_time_ms,
+                sqlite_build_time_ms=sqlite_build_time_ms,
+                fetch_times_by_table=fetch_times_by_table,
+                query_timings_detailed=self.data_repository.get_query_timings(),
+                retries=self._retry_counts(),
+                profile=profile.name,
+                sync_watermark=format_watermark(sync_watermark),
+                content_hash=content_hash,
+                sync={
+                    'mode': 'delta',
+                    'since': format_watermark(since),
+                    'deleted': deleted_counts,
+                    'replaced': replaced_entities
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Error durante la exportación delta: {str(e)}", exc_info=True)
+            self._record_postgres_outcome(e)
+            try:
+                query_timings_detailed = self.data_repository.get_query_timings()
+            except Exception as timings_error:
+                logger.warning(f"No se pudieron obtener los tiempos: {timings_error}")
                 query_timings_detailed = {}
 
             return ExportResult(
@@ -215,13 +910,335 @@ class ExportService:
                 postgres_fetch_time_ms=postgres_fetch_time_ms,
                 sqlite_build_time_ms=sqlite_build_time_ms,
                 fetch_times_by_table=fetch_times_by_table,
-                query_timings_detailed=query_timings_detailed
+                query_timings_detailed=query_timings_detailed,
+                retries=self._retry_counts(),
+                profile=profile.name,
+                timed_out=isinstance(e, DeadlineExceededError),
+                overloaded=isinstance(e, ExportOverloadedError)
             )
 
         finally:
-            # Limpieza de recursos
+            self._release_export_slot(export_slot)
+            self._cleanup()
+
+    def export_tenant_bundle(
+        self,
+        tenant_id: int,
+        output_dir: str,
+        profile: Optional[ExportProfile] = None,
+        part_entities: Optional[Sequence[str]] = None
+    ) -> ExportResult:
+        """
+        Exporta los datos de un tenant como paquete: un archivo núcleo y un archivo por
+        cada tabla pesada, descargables en paralelo (ver SQLiteBuilder.split_bundle).
+
+        Se construye el archivo completo (con caché de artefactos y reconstrucción
+        incremental) y luego se divide; result.bundle es el manifiesto del paquete.
+
+        Args:
+            tenant_id: ID del tenant a exportar
+            output_dir: Directorio donde escribir las partes
+            profile: Perfil con las tablas y columnas a exportar (None = perfil por defecto)
+            part_entities: Entidades en archivos separados (None = DEFAULT_BUNDLE_PARTS)
+
+        Returns:
+            Resultado de la exportación del archivo completo, con el manifiesto en bundle
+
+        Raises:
+            ValueError: Si alguna entidad no puede separarse del núcleo
+        """
+        profile = profile or get_profile()
+        part_entities = self._bundle_part_entities(profile, part_entities)
+
+        full_path = os.path.join(output_dir, 'full.sqlite')
+        result = self.export_tenant_data(tenant_id, full_path, profile)
+        if not result.success:
+            return result
+
+        try:
+            split_start_time = time.time()
+            parts = self.sqlite_builder.split_bundle(full_path, output_dir, part_entities)
+            split_time_ms = int((time.time() - split_start_time) * 1000)
+        except Exception as e:
+            logger.error(f"Error dividiendo el archivo en paquete: {e}", exc_info=True)
+            result.success = False
+            result.error_message = f"Error generando paquete: {str(e)}"
+            return result
+        finally:
+            self.sqlite_builder.close()
+            if os.path.exists(full_path):
+                os.remove(full_path)
+
+        result.file_path = None
+        result.file_size = sum(part['file_size'] for part in parts)
+        result.sqlite_build_time_ms = (result.sqlite_build_time_ms or 0) + split_time_ms
+        result.execution_time_ms = (result.execution_time_ms or 0) + split_time_ms
+        result.bundle = {
+            'tenant_id': tenant_id,
+            'profile': profile.name,
+            'sync_watermark': result.sync_watermark,
+            'content_hash': result.content_hash,
+            'parts': parts
+        }
+        logger.info(
+            f"Paquete de tenant {tenant_id}: {len(parts)} partes, {result.file_size} bytes "
+            f"(división en {split_time_ms}ms)"
+        )
+        return result
+
+    def export_tenants_batch(
+        self,
+        tenant_ids: Sequence[int],
+        output_dir: str,
+        profile: Optional[ExportProfile] = None,
+        max_build_workers: int = 4
+    ) -> Dict[int, ExportResult]:
+        """
+        Exporta varios tenants compartiendo las queries (pre-sincronización nocturna).
+
+        Cada tabla se consulta una sola vez para todo el lote y sus filas se reparten
+        por tenant (ver IDataRepository.get_entity_by_tenants); las tablas globales
+        (GLOBAL_ENTITIES) se consultan una vez y las comparten todos los archivos.
+        Luego se construye un archivo por tenant en output_dir (BATCH_FILE_NAME), en
+        paralelo si hay sqlite_builder_factory. Cada archivo es idéntico al de la
+        exportación individual.
+
+        Con almacén de artefactos, cada archivo queda como artefacto del tenant para
+        stale-while-revalidate (ver _store_batch_artifact).
+
+        Args:
+            tenant_ids: IDs de los tenants a exportar
+            output_dir: Directorio donde escribir los archivos
+            profile: Perfil con las tablas y columnas a exportar (None = perfil por defecto)
+            max_build_workers: Archivos SQLite que se construyen a la vez
+
+        Returns:
+            Resultado por tenant (not_found para los tenants sin datos propios)
+        """
+        start_time = time.time()
+        profile = profile or get_profile()
+        results: Dict[int, ExportResult] = {}
+        fetch_times_by_table: Dict[str, int] = {}
+        export_slot: Optional[int] = None
+
+        pending = []
+        for tenant_id in dict.fromkeys(tenant_ids):
+            if self._known_empty(tenant_id, profile):
+                results[tenant_id] = self._not_found_result(tenant_id, profile, start_time)
+            else:
+                pending.append(tenant_id)
+        if not pending:
+            return results
+
+        try:
+            logger.info(f"Conectando a PostgreSQL para lote de {len(pending)} tenants")
+            self._connect_to_postgres()
+            self.data_repository.set_deadline(None)
+            export_slot = self._acquire_export_slot(fetch_times_by_table)
+
+            postgres_start_time = time.time()
+            sync_watermark = self._sync_watermark()
+
+            # Una query por tabla para todo el lote
+            referenced_products = self._prunes_products(profile)
+            fetch_tasks = {
+                entity_name: partial(
+                    self.data_repository.get_entity_by_tenants,
+                    entity_name, pending, profile.columns_for(entity_name), referenced_products
+                )
+                for entity_name in ENTITY_MODELS
+                if profile.includes(entity_name)
+            }
+            fetched = self._fetch_in_parallel(fetch_tasks, fetch_times_by_table)
+            self._record_postgres_outcome()
+            postgres_fetch_time_ms = int((time.time() - postgres_start_time) * 1000)
+            query_timings_detailed = self.data_repository.get_query_timings()
+            logger.info(f"Datos del lote obtenidos de PostgreSQL en {postgres_fetch_time_ms}ms")
+
+        except Exception as e:
+            logger.error(f"Error durante la exportación por lotes: {str(e)}", exc_info=True)
+            self._record_postgres_outcome(e)
+            for tenant_id in pending:
+                results[tenant_id] = ExportResult(
+                    success=False,
+                    error_message=str(e),
+                    execution_time_ms=int((time.time() - start_time) * 1000),
+                    fetch_times_by_table=fetch_times_by_table,
+                    retries=self._retry_counts(),
+                    profile=profile.name,
+                    overloaded=isinstance(e, ExportOverloadedError)
+                )
+            return results
+
+        finally:
+            self._release_export_slot(export_slot)
             self._cleanup()
 
+        # Un tenant sin filas propias no existe (o está vacío para el perfil)
+        tenant_entities = [
+            entity_name for entity_name in fetched
+            if entity_name not in GLOBAL_ENTITIES
+            or (entity_name == 'products' and referenced_products)
+        ]
+        to_build: Dict[int, Dict[str, List]] = {}
+        for tenant_id in pending:
+            data = {entity_name: rows[tenant_id] for entity_name, rows in fetched.items()}
+            if tenant_entities and not any(data[entity_name] for entity_name in tenant_entities):
+                logger.warning(f"No se encontraron datos para tenant {tenant_id}")
+                self._remember_empty(tenant_id, profile)
+                results[tenant_id] = self._not_found_result(tenant_id, profile, start_time)
+            else:
+                to_build[tenant_id] = data
+
+        # Construir los archivos por tenant (cada uno con su propio builder)
+        workers = max(1, max_build_workers) if self.sqlite_builder_factory else 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_tenant = {
+                executor.submit(
+                    self._build_batch_file,
+                    data,
+                    os.path.join(output_dir, BATCH_FILE_NAME.format(tenant_id=tenant_id)),
+                    profile
+                ): tenant_id
+                for tenant_id, data in to_build.items()
+            }
+            for future in as_completed(future_to_tenant):
+                tenant_id = future_to_tenant[future]
+                data = to_build[tenant_id]
+                records_exported = {
+                    entity_name: len(data[entity_name])
+                    for entity_name in ENTITY_MODELS if entity_name in data
+                }
+                try:
+                    (
+                        output_path, content_hash, derived_tables, sqlite_build_time_ms
+                    ) = future.result()
+                except Exception as e:
+                    logger.error(f"Error construyendo el archivo del tenant {tenant_id}: {e}")
+                    results[tenant_id] = ExportResult(
+                        success=False,
+                        error_message=str(e),
+                        records_exported=records_exported,
+                        execution_time_ms=int((time.time() - start_time) * 1000),
+                        postgres_fetch_time_ms=postgres_fetch_time_ms,
+                        profile=profile.name
+                    )
+                    continue
+                cache_status = None
+                if self.artifact_store:
+                    cache_status = self._store_batch_artifact(
+                        tenant_id, profile, output_path, records_exported,
+                        {
+                            'profile': profile.name,
+                            'sync_watermark': format_watermark(sync_watermark),
+                            'content_hash': content_hash,
+                            'derived_tables': derived_tables
+                        }
+                    )
+                results[tenant_id] = ExportResult(
+                    success=True,
+                    file_path=output_path,
+                    file_size=os.path.getsize(output_path),
+                    records_exported=records_exported,
+                    execution_time_ms=int((time.time() - start_time) * 1000),
+                    postgres_fetch_time_ms=postgres_fetch_time_ms,
+                    sqlite_build_time_ms=sqlite_build_time_ms,
+                    fetch_times_by_table=fetch_times_by_table,
+                    query_timings_detailed=query_timings_detailed,
+                    retries=self._retry_counts(),
+                    profile=profile.name,
+                    sync_watermark=format_watermark(sync_watermark),
+                    cache_status=cache_status,
+                    content_hash=content_hash,
+                    derived_tables=derived_tables
+                )
+
+        built = sum(1 for result in results.values() if result.success)
+        total_time_ms = int((time.time() - start_time) * 1000)
+        logger.info(
+            f"Lote de {len(results)} tenants: {built} archivos, "
+            f"PostgreSQL {postgres_fetch_time_ms}ms, total {total_time_ms}ms"
+        )
+        return {tenant_id: results[tenant_id] for tenant_id in dict.fromkeys(tenant_ids)}
+
+    def _store_batch_artifact(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        output_path: str,
+        records_exported: Dict[str, int],
+        metadata: Dict[str, Any]
+    ) -> str:
+        """
+        Guarda el archivo de un tenant del lote como su artefacto.
+
+        El lote no calcula huellas (son por tenant): si el artefacto vigente tiene el
+        mismo contenido solo se reinicia su antigüedad y conserva sus huellas; si no, se
+        reemplaza por uno sin huellas, que se sirve con stale-while-revalidate y que la
+        siguiente exportación individual reconstruye completo.
+
+        Returns:
+            'HIT' si se conservó el artefacto vigente, 'MISS' si se reemplazó
+        """
+        artifact_key = self._artifact_key(tenant_id, profile)
+        previous_artifact = self._cached_artifact(artifact_key)
+        if (
+            previous_artifact
+            and previous_artifact.metadata.get('content_hash') == metadata['content_hash']
+        ):
+            self._touch_artifact(artifact_key, {'sync_watermark': metadata['sync_watermark']})
+            return 'HIT'
+        self._store_artifact(artifact_key, output_path, {}, records_exported, metadata)
+        return 'MISS'
+
+    def _build_batch_file(
+        self,
+        data: Dict[str, List],
+        output_path: str,
+        profile: ExportProfile
+    ) -> Tuple[str, str, Dict[str, Dict[str, int]], int]:
+        """
+        Construye el archivo SQLite de un tenant del lote con su propio builder.
+
+        Returns:
+            Tupla (ruta, hash de contenido, estructuras derivadas, tiempo de construcción ms)
+        """
+        builder = (
+            self.sqlite_builder_factory() if self.sqlite_builder_factory else self.sqlite_builder
+        )
+        start = time.time()
+        try:
+            self._create_sqlite_database(output_path, builder)
+            self._insert_all_data(data, profile, builder)
+            derived_tables = self._build_extras(profile, builder)
+            content_hash = builder.finalize()
+        finally:
+            builder.close()
+        return output_path, content_hash, derived_tables, int((time.time() - start) * 1000)
+
+    @staticmethod
+    def _bundle_part_entities(
+        profile: ExportProfile,
+        part_entities: Optional[Sequence[str]]
+    ) -> List[str]:
+        """
+        Valida las entidades a separar del núcleo.
+
+        Raises:
+            ValueError: Si una entidad es del núcleo o no está en el perfil
+        """
+        requested = DEFAULT_BUNDLE_PARTS if part_entities is None else part_entities
+        invalid = [
+            e for e in requested
+            if e in BUNDLE_CORE_ENTITIES or e not in ENTITY_MODELS
+        ]
+        if invalid:
+            raise ValueError(
+                f"Tablas que no pueden separarse del núcleo: {invalid}. "
+                f"Permitidas: {[e for e in ENTITY_MODELS if e not in BUNDLE_CORE_ENTITIES]}"
+            )
+        return [e for e in ENTITY_MODELS if e in requested and profile.includes(e)]
+
     def _connect_to_postgres(self) -> None:
         """
         Conecta al repositorio de datos.
@@ -247,75 +1264,414 @@ class ExportService:
             Tupla (datos, tiempo_ms): Lista de datos y tiempo de ejecución en milisegundos
 
         Raises:
-            ExportError: Si hay error obteniendo los datos
+            DataFetchError: Si hay error obteniendo los datos
         """
         try:
             start = time.time()
             data = fetch_fn()
             elapsed_ms = int((time.time() - start) * 1000)
-            logger.info(f"Obtenidos {len(data)} registros de {entity_name} en {elapsed_ms}ms")
+            logger.info(
+                f"Obtenidos {self._describe_fetched(data)} de {entity_name} en {elapsed_ms}ms"
+            )
             return data, elapsed_ms
+        except DeadlineExceededError:
+            raise
         except Exception as e:
             logger.error(f"Error obteniendo {entity_name}: {e}")
-            raise ExportError(f"Error obteniendo {entity_name}: {str(e)}")
+            raise DataFetchError(f"Error obteniendo {entity_name}: {str(e)}")
+
+    @staticmethod
+    def _describe_fetched(data: Any) -> str:
+        """
+        Describe para el log lo obtenido por una tarea: filas, altas y bajas de una delta,
+        o filas de un lote sumadas sobre sus tenants.
+        """
+        if isinstance(data, tuple):
+            upserts, deleted_ids = data
+            return f"{len(upserts)} altas/modificaciones y {len(deleted_ids)} bajas"
+        if isinstance(data, dict) and all(isinstance(rows, list) for rows in data.values()):
+            return f"{sum(len(rows) for rows in data.values())} registros de {len(data)} tenants"
+        return f"{len(data)} registros"
 
-    def _create_sqlite_database(self, output_path: str) -> None:
+    def _create_sqlite_database(
+        self, output_path: str, builder: Optional[ISQLiteBuilder] = None
+    ) -> None:
         """
         Crea la base de datos SQLite.
 
         Args:
             output_path: Ruta del archivo
+            builder: Builder a usar (None = sqlite_builder del servicio)
 
         Raises:
             ExportError: Si hay error creando la base de datos
         """
+        builder = builder or self.sqlite_builder
         try:
-            self.sqlite_builder.create_database(output_path)
-            self.sqlite_builder.create_schema()
+            builder.create_database(output_path)
+            builder.create_schema()
         except Exception as e:
             logger.error(f"Error creando base de datos SQLite: {e}")
             raise ExportError(f"Error creando base de datos SQLite: {str(e)}")
 
+    def _safe_product_catalog_stats(self, tenant_id: int) -> Dict[str, int]:
+        """
+        Obtiene las estadísticas del catálogo de productos.
+        Un fallo no invalida la exportación: retorna un diccionario vacío.
+        """
+        try:
+            return self.data_repository.get_product_catalog_stats(tenant_id)
+        except Exception as e:
+            logger.warning(f"No se pudieron obtener estadísticas del catálogo: {e}")
+            return {}
+
+    def _product_pruning_report(self, stats: Dict[str, int], products: List) -> Dict[str, int]:
+        """Construye el reporte de poda del catálogo de productos."""
+        if not stats:
+            return {'exported_rows': len(products)}
+
+        report = {
+            'catalog_rows': stats['catalog_rows'],
+            'exported_rows': len(products),
+            'rows_saved': stats['catalog_rows'] - len(products),
+            'estimated_bytes_saved': stats['catalog_bytes'] - stats['referenced_bytes']
+        }
+        logger.info(
+            f"Catálogo de productos podado: "
+            f"{report['exported_rows']}/{report['catalog_rows']} filas, "
+            f"~{report['estimated_bytes_saved']} bytes ahorrados"
+        )
+        return report
+
+    def _sync_watermark(self) -> datetime:
+        """
+        Obtiene la marca de sincronización del servidor, con un margen de solape
+        (ver _watermark_with_overlap).
+
+        Raises:
+            DataFetchError: Si no se pudo leer la marca
+        """
+        try:
+            watermark = self.data_repository.get_sync_watermark()
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            raise DataFetchError(f"Error obteniendo la marca de sincronización: {str(e)}")
+        return self._watermark_with_overlap(watermark)
+
+    def _tenant_exists(self, tenant_id: int, fetch_times_by_table: Dict[str, int]) -> bool:
+        """
+        Verifica que el tenant tenga datos propios antes de lanzar las queries.
+        Un tenant inexistente se guarda en la caché negativa. Si la verificación
+        falla, se asume que existe (la exportación decide).
+        """
+        try:
+            start = time.time()
+            exists = self.data_repository.tenant_exists(tenant_id)
+            fetch_times_by_table['tenant_exists'] = int((time.time() - start) * 1000)
+        except Exception as e:
+            logger.warning(f"No se pudo verificar la existencia del tenant {tenant_id}: {e}")
+            return True
+
+        if not exists:
+            logger.warning(f"Tenant {tenant_id} sin clientes ni ubicaciones: no se exporta")
+            self._record_postgres_outcome()
+            self._remember_empty(tenant_id)
+        return exists
+
+    def _acquire_tenant_lock(
+        self,
+        tenant_id: int,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """
+        Toma el lock de exportación del tenant, esperando hasta tenant_lock_timeout_seconds
+        (o lo que quede del plazo, si es menos).
+        Sin el lock la exportación sigue igual (solo se pierde la coalescencia).
+        """
+        timeout_seconds = self.tenant_lock_timeout_seconds
+        if deadline is not None:
+            timeout_seconds = min(timeout_seconds, deadline.remaining_seconds())
+        if timeout_seconds <= 0:
+            return False
+        try:
+            start = time.time()
+            acquired = self.data_repository.acquire_tenant_lock(tenant_id, timeout_seconds)
+            fetch_times_by_table['tenant_lock_wait'] = int((time.time() - start) * 1000)
+            return acquired
+        except Exception as e:
+            logger.warning(f"No se pudo tomar el lock del tenant {tenant_id}: {e}")
+            return False
+
+    def _release_tenant_lock(self, tenant_id: int) -> None:
+        """Libera el lock de exportación del tenant (desconectar también lo libera)."""
+        try:
+            self.data_repository.release_tenant_lock(tenant_id)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el lock del tenant {tenant_id}: {e}")
+
+    def _acquire_export_slot(
+        self,
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline] = None
+    ) -> Optional[int]:
+        """
+        Toma un cupo de exportación del clúster, esperando hasta export_slot_wait_seconds
+        (o lo que quede del plazo, si es menos).
+
+        Returns:
+            Número de cupo, o None sin límite configurado o si no se pudo consultar
+            (la exportación sigue sin cupo)
+
+        Raises:
+            ExportOverloadedError: Si todos los cupos siguen ocupados al terminar la espera
+        """
+        if self.max_concurrent_exports <= 0:
+            return None
+        try:
+            start = time.time()
+            slot = self.data_repository.acquire_export_slot(
+                self.max_concurrent_exports, self._export_slot_timeout(deadline)
+            )
+            fetch_times_by_table['export_slot_wait'] = int((time.time() - start) * 1000)
+        except Exception as e:
+            logger.warning(f"No se pudo tomar un cupo de exportación: {e}")
+            return None
+        if slot is None:
+            raise ExportOverloadedError(
+                f"Límite de {self.max_concurrent_exports} exportaciones simultáneas alcanzado"
+            )
+        return slot
+
+    def _release_export_slot(self, slot: Optional[int]) -> None:
+        """Libera el cupo de exportación, si se tomó uno (desconectar también lo libera)."""
+        if slot is None:
+            return
+        try:
+            self.data_repository.release_export_slot(slot)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el cupo de exportación {slot}: {e}")
+
+    def _retry_counts(self) -> Dict[str, int]:
+        """Reintentos por tabla del repositorio (vacío si no se pueden obtener)."""
+        try:
+            return self.data_repository.get_retry_counts()
+        except Exception:
+            return {}
+
+    def _safe_table_fingerprints(
+        self,
+        tenant_id: int,
+        profile: ExportProfile,
+        fetch_times_by_table: Dict[str, int]
+    ) -> Dict[str, str]:
+        """
+        Obtiene las huellas de las tablas del perfil.
+        Se calculan antes de leer los datos: si una tabla cambia entre la huella y la
+        lectura, la huella guardada queda desactualizada y la tabla se vuelve a leer
+        en la siguiente exportación (nunca se reutilizan datos viejos).
+        Un fallo no invalida la exportación: retorna un diccionario vacío.
+        """
+        try:
+            start = time.time()
+            fingerprints = self.data_repository.get_table_fingerprints(
+                tenant_id, self._fingerprint_columns(profile),
+                referenced_products=self._prunes_products(profile)
+            )
+            fetch_times_by_table['table_fingerprints'] = int((time.time() - start) * 1000)
+            return fingerprints
+        except Exception as e:
+            logger.warning(f"No se pudieron calcular las huellas de las tablas: {e}")
+            return {}
+
+    @staticmethod
+    def _cache_status(reused_tables: List[str], fetch_tasks: Dict[str, Callable]) -> str:
+        """Retorna el estado de caché: HIT (sin cambios), PARTIAL o MISS."""
+        if not fetch_tasks:
+            return 'HIT'
+        return 'PARTIAL' if reused_tables else 'MISS'
+
+    def _fetch_in_parallel(
+        self,
+        fetch_tasks: Dict[str, Callable],
+        fetch_times_by_table: Dict[str, int],
+        deadline: Optional[Deadline] = None,
+        optional_entities: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta las tareas de obtención de datos en paralelo.
+
+        Con plazo, se deja de esperar al agotarse: las tareas opcionales pendientes
+        se omiten (no aparecen en el resultado), las que no empezaron se descartan y las
+        queries en curso se cancelan en PostgreSQL sin esperarlas (ver
+        cancel_running_queries), así la respuesta sale en el plazo.
+
+        Args:
+            fetch_tasks: Función de obtención por nombre de tarea
+            fetch_times_by_table: Diccionario donde se registran los tiempos por tarea
+            deadline: Plazo para obtener los datos (None = sin plazo)
+            optional_entities: Tareas que pueden omitirse si se agota el plazo
+
+        Returns:
+            Resultado de cada tarea por nombre
+
+        Raises:
+            DeadlineExceededError: Si se agota el plazo con una tarea obligatoria pendiente
+            ExportError: Si alguna tarea falla
+        """
+        results: Dict[str, Any] = {}
+        executor = ThreadPoolExecutor(max_workers=5)
+        try:
+            future_to_entity = {
+                executor.submit(self._fetch_data, entity_name, fetch_fn): entity_name
+                for entity_name, fetch_fn in fetch_tasks.items()
+            }
+
+            timeout = deadline.remaining_seconds() if deadline else None
+            try:
+                for future in as_completed(future_to_entity, timeout=timeout):
+                    entity_name = future_to_entity[future]
+                    try:
+                        data, elapsed_ms = future.result()
+                        results[entity_name] = data
+                        fetch_times_by_table[entity_name] = elapsed_ms
+                    except Exception as e:
+                        if not (deadline and deadline.expired()):
+                            logger.error(f"Error obteniendo {entity_name}: {e}")
+                            raise
+                        if entity_name not in optional_entities:
+                            raise DeadlineExceededError(
+                                f"Plazo agotado obteniendo {entity_name}: {e}"
+                            )
+                        logger.warning(f"Plazo agotado: se omite {entity_name}")
+            except FuturesTimeoutError:
+                pending = [
+                    entity_name for future, entity_name in future_to_entity.items()
+                    if not future.done()
+                ]
+                required = [
+                    entity_name for entity_name in pending if entity_name not in optional_entities
+                ]
+                if required:
+                    raise DeadlineExceededError(f"Plazo agotado esperando {required}")
+                logger.warning(f"Plazo agotado: se omiten {pending}")
+        finally:
+            # Las tareas que no empezaron se descartan. Con el plazo agotado las queries en
+            # curso se cancelan y no se las espera: sus hilos terminan con el error de la
+            # cancelación, que nadie lee
+            timed_out = deadline is not None and deadline.expired()
+            if timed_out:
+                self._cancel_running_queries()
+            executor.shutdown(wait=not timed_out, cancel_futures=True)
+
+        return results
+
+    def _cancel_running_queries(self) -> None:
+        """Cancela las queries en curso del repositorio (un fallo solo se registra)."""
+        try:
+            self.data_repository.cancel_running_queries()
+        except Exception as e:
+            logger.warning(f"No se pudieron cancelar las queries en curso: {e}")
+
+    @staticmethod
+    def _skipped_tables(fetch_tasks: Dict[str, Callable], results: Dict[str, Any]) -> List[str]:
+        """
+        Retorna las entidades omitidas por plazo y descarta de results las que
+        dependen de una omitida (ej: detalles de cobranza sin sus cobranzas).
+        """
+        skipped = [e for e in ENTITY_MODELS if e in fetch_tasks and e not in results]
+        for entity_name in list(skipped):
+            for dependent in OPTIONAL_ENTITY_DEPENDENTS.get(entity_name, ()):
+                if dependent in results:
+                    del results[dependent]
+                    skipped.append(dependent)
+        return [e for e in ENTITY_MODELS if e in skipped]
+
+    def _repository_fetchers(self, profile: ExportProfile) -> Dict[str, Callable]:
+        """Retorna el método del repositorio que obtiene cada entidad según el perfil."""
+        if self._prunes_products(profile):
+            products_fetcher = self.data_repository.get_referenced_products_by_tenant
+        else:
+            products_fetcher = self.data_repository.get_products_by_tenant
+
+        return {
+            'customers': self.data_repository.get_customers_by_tenant,
+            'products': products_fetcher,
+            'bank_accounts': self.data_repository.get_bank_accounts_by_tenant,
+            'list_prices': self.data_repository.get_list_prices_by_tenant,
+            'list_price_details': self.data_repository.get_list_price_details_by_tenant,
+            'client_list_prices': self.data_repository.get_client_list_prices_by_tenant,
+            'locations': self.data_repository.get_locations_by_tenant,
+            'cobranzas': self.data_repository.get_cobranzas_by_tenant,
+            'cobranza_details': self.data_repository.get_cobranza_details_by_tenant
+        }
+
+    def _builder_inserters(self, builder: Optional[ISQLiteBuilder] = None) -> Dict[str, Callable]:
+        """Retorna el método del builder que inserta cada entidad."""
+        builder = builder or self.sqlite_builder
+        return {
+            'customers': builder.insert_customers,
+            'products': builder.insert_products,
+            'bank_accounts': builder.insert_bank_accounts,
+            'list_prices': builder.insert_list_prices,
+            'locations': builder.insert_locations,
+            'list_price_details': builder.insert_list_price_details,
+            'client_list_prices': builder.insert_client_list_prices,
+            'cobranzas': builder.insert_cobranzas,
+            'cobranza_details': builder.insert_cobranza_details
+        }
+
     def _insert_all_data(
         self,
-        customers,
-        products,
-        bank_accounts,
-        list_prices,
-        list_price_details,
-        client_list_prices,
-        locations,
-        cobranzas,
-        cobranza_details
+        results: Dict[str, List],
+        profile: ExportProfile,
+        builder: Optional[ISQLiteBuilder] = None
     ) -> None:
         """
-        Inserta todos los datos en SQLite.
+        Inserta en SQLite los datos obtenidos de las tablas incluidas en el perfil.
 
-        IMPORTANTE: El orden de inserción respeta las relaciones de foreign keys.
+        IMPORTANTE: El orden de inserción (ENTITY_MODELS) respeta las relaciones
+        de foreign keys: tablas base, luego las que dependen de ellas.
 
         Raises:
             ExportError: Si hay error insertando los datos
         """
         try:
-            # 1. Insertar tablas base (sin dependencias)
-            self.sqlite_builder.insert_customers(customers)
-            self.sqlite_builder.insert_products(products)
-            self.sqlite_builder.insert_bank_accounts(bank_accounts)
-            self.sqlite_builder.insert_list_prices(list_prices)
-            self.sqlite_builder.insert_locations(locations)
-
-            # 2. Insertar tablas con foreign keys a las bases
-            self.sqlite_builder.insert_list_price_details(list_price_details)
-            self.sqlite_builder.insert_client_list_prices(client_list_prices)
-            self.sqlite_builder.insert_cobranzas(cobranzas)
-
-            # 3. Insertar tablas con foreign keys a las secundarias
-            self.sqlite_builder.insert_cobranza_details(cobranza_details)
+            inserters = self._builder_inserters(builder)
+            for entity_name in ENTITY_MODELS:
+                if entity_name in results:
+                    inserters[entity_name](results[entity_name], profile.columns_for(entity_name))
 
         except Exception as e:
             logger.error(f"Error insertando datos en SQLite: {e}")
             raise ExportError(f"Error insertando datos en SQLite: {str(e)}")
 
+    def _build_extras(
+        self,
+        profile: ExportProfile,
+        builder: Optional[ISQLiteBuilder] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Construye los extras del perfil sobre las tablas ya insertadas.
+
+        Returns:
+            Estadísticas por extra (filas, bytes agregados, tiempo de construcción)
+
+        Raises:
+            ExportError: Si hay error construyendo algún extra
+        """
+        builder = builder or self.sqlite_builder
+        derived_tables: Dict[str, Dict[str, int]] = {}
+        try:
+            for name in profile.extras:
+                derived_tables[name] = builder.build_extra(name)
+            return derived_tables
+
+        except Exception as e:
+            logger.error(f"Error construyendo extras en SQLite: {e}")
+            raise ExportError(f"Error construyendo extras en SQLite: {str(e)}")
+
     def _cleanup(self) -> None:
         """Limpia recursos y cierra conexiones."""
         try:
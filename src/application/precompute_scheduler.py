@@ -0,0 +1,247 @@
+"""
+Planificador de precálculo de artefactos.
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+
+Elige qué tenants exportar antes de que los pidan, para que sus sincronizaciones
+encuentren el artefacto en caché:
+
+- demanda: requests por tenant y perfil (ver infrastructure/access_log.py)
+- antigüedad: tiempo desde que el artefacto se confirmó contra PostgreSQL
+  (sin artefacto cuenta como la antigüedad máxima)
+- cambios: datos del tenant modificados después de la marca de sincronización
+  del artefacto (ver IDataRepository.get_tenant_change_times)
+
+Prioridad = requests * (antigüedad / frescura, con tope + bonificación si cambió).
+Un artefacto más nuevo que la frescura y sin cambios no se recalcula. Con el
+listener de LISTEN/NOTIFY, plan_changed recalcula los artefactos de los tenants
+modificados apenas se notifica el cambio. Las
+exportaciones corren en procesos separados, tantos como el presupuesto de
+conexiones a PostgreSQL.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from application.export_service import ExportService, parse_watermark
+from domain.interfaces import IDataRepository
+from domain.profiles import get_profile
+
+logger = logging.getLogger(__name__)
+
+# Tope del factor de antigüedad (también el de un tenant sin artefacto)
+MAX_STALENESS_FACTOR = 4.0
+
+# Bonificación de prioridad de un tenant con datos modificados después de su artefacto
+CHANGE_BOOST = 2.0
+
+
+@dataclass
+class PrecomputeCandidate:
+    """Tenant y perfil a precalcular, con los datos de su prioridad."""
+
+    tenant_id: int
+    profile: Optional[str]
+    requests: int
+    age_seconds: Optional[float] = None
+    changed: Optional[bool] = None
+    score: float = 0.0
+
+    def to_dict(self) -> dict:
+        """Convierte el candidato a diccionario."""
+        return {
+            'tenant_id': self.tenant_id,
+            'profile': self.profile,
+            'requests': self.requests,
+            'age_seconds': None if self.age_seconds is None else int(self.age_seconds),
+            'changed': self.changed,
+            'score': round(self.score, 3)
+        }
+
+
+class PrecomputeScheduler:
+    """Ordena tenants por prioridad de precálculo y los exporta en paralelo."""
+
+    def __init__(
+        self,
+        export_service: ExportService,
+        data_repository: Optional[IDataRepository] = None,
+        freshness_seconds: float = 900,
+        max_workers: int = 4
+    ):
+        """
+        Inicializa el planificador.
+
+        Args:
+            export_service: Servicio con el almacén de artefactos donde se precalcula
+            data_repository: Repositorio para las señales de cambio (None = sin señales)
+            freshness_seconds: Antigüedad a partir de la cual un artefacto se recalcula
+            max_workers: Exportaciones simultáneas (presupuesto de conexiones a PostgreSQL)
+        """
+        self.export_service = export_service
+        self.data_repository = data_repository
+        self.freshness_seconds = freshness_seconds
+        self.max_workers = max_workers
+
+    def plan(
+        self,
+        request_counts: Mapping[Tuple[int, Optional[str]], int],
+        max_tenants: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> List[PrecomputeCandidate]:
+        """
+        Ordena por prioridad los tenants y perfiles con demanda.
+
+        Args:
+            request_counts: Requests por (tenant_id, perfil)
+            max_tenants: Cantidad máxima de candidatos (None = todos)
+            now: Instante de referencia de la antigüedad (None = ahora)
+
+        Returns:
+            Candidatos de mayor a menor prioridad (sin los que están al día)
+        """
+        now = now if now is not None else time.time()
+        candidates: List[PrecomputeCandidate] = []
+        watermarks: Dict[Tuple[int, Optional[str]], datetime] = {}
+        for (tenant_id, profile_name), requests in request_counts.items():
+            try:
+                profile = get_profile(profile_name)
+            except ValueError:
+                logger.warning(f"Perfil desconocido en el log de acceso: {profile_name}")
+                continue
+            artifact = self.export_service.cached_artifact(tenant_id, profile)
+            candidate = PrecomputeCandidate(
+                tenant_id=tenant_id, profile=profile_name, requests=requests
+            )
+            if artifact is not None:
+                candidate.age_seconds = artifact.age_seconds(now)
+                if artifact.metadata.get('sync_watermark'):
+                    watermarks[(tenant_id, profile_name)] = parse_watermark(
+                        artifact.metadata['sync_watermark']
+                    )
+            candidates.append(candidate)
+
+        change_times = self._change_times(
+            sorted({c.tenant_id for c in candidates if c.age_seconds is not None})
+        )
+        for candidate in candidates:
+            watermark = watermarks.get((candidate.tenant_id, candidate.profile))
+            if watermark is not None and candidate.tenant_id in change_times:
+                candidate.changed = change_times[candidate.tenant_id] > watermark
+            candidate.score = self._score(candidate)
+
+        planned = [
+            candidate for candidate in candidates
+            if candidate.age_seconds is None
+            or candidate.changed
+            or candidate.age_seconds >= self.freshness_seconds
+        ]
+        planned.sort(key=lambda candidate: (-candidate.score, candidate.tenant_id))
+        logger.info(
+            f"Precálculo: {len(planned)} de {len(candidates)} tenants con demanda "
+            f"necesitan artefacto"
+        )
+        return planned[:max_tenants] if max_tenants is not None else planned
+
+    def plan_changed(
+        self,
+        tenant_ids: Iterable[int],
+        profile_names: Sequence[Optional[str]] = (None,)
+    ) -> List[PrecomputeCandidate]:
+        """
+        Candidatos de tenants con cambios notificados (ver InvalidationListener).
+        Solo se recalculan los perfiles que ya tienen artefacto: sin artefacto no hay
+        demanda conocida y la siguiente exportación lo construye de todos modos.
+
+        Args:
+            tenant_ids: Tenants modificados
+            profile_names: Perfiles a recalcular (None = perfil por defecto)
+
+        Returns:
+            Candidatos ordenados por tenant
+        """
+        candidates: List[PrecomputeCandidate] = []
+        for tenant_id in sorted(set(tenant_ids)):
+            for profile_name in profile_names:
+                artifact = self.export_service.cached_artifact(tenant_id, get_profile(profile_name))
+                if artifact is None:
+                    continue
+                candidates.append(PrecomputeCandidate(
+                    tenant_id=tenant_id, profile=profile_name, requests=0,
+                    age_seconds=artifact.age_seconds(), changed=True
+                ))
+        return candidates
+
+    def run(
+        self,
+        candidates: List[PrecomputeCandidate],
+        worker: Callable[[int, Optional[str]], Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Exporta los candidatos en orden de prioridad, en hasta max_workers procesos.
+
+        Args:
+            candidates: Candidatos ordenados (ver plan)
+            worker: Función de nivel de módulo (se ejecuta en otro proceso) que exporta
+                    un tenant y perfil al almacén y retorna un resumen
+
+        Returns:
+            Resumen de cada exportación, con los datos del candidato
+        """
+        summaries: List[Dict[str, Any]] = []
+        if not candidates:
+            return summaries
+
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            future_to_candidate = {
+                executor.submit(worker, candidate.tenant_id, candidate.profile): candidate
+                for candidate in candidates
+            }
+            for future in as_completed(future_to_candidate):
+                candidate = future_to_candidate[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logger.error(f"Precálculo del tenant {candidate.tenant_id} falló: {e}")
+                    summary = {'success': False, 'error': str(e)}
+                summaries.append({**candidate.to_dict(), **summary})
+
+        succeeded = sum(1 for summary in summaries if summary.get('success'))
+        logger.info(
+            f"Precálculo terminado: {succeeded}/{len(summaries)} artefactos en "
+            f"{int((time.time() - start) * 1000)}ms con {self.max_workers} procesos"
+        )
+        return summaries
+
+    def _change_times(self, tenant_ids: List[int]) -> Dict[int, datetime]:
+        """
+        Última modificación de los datos de cada tenant.
+        Sin repositorio, o si la consulta falla, no hay señales de cambio.
+        """
+        if self.data_repository is None or not tenant_ids:
+            return {}
+        try:
+            self.data_repository.connect()
+            return self.data_repository.get_tenant_change_times(tenant_ids)
+        except Exception as e:
+            logger.warning(f"No se pudieron obtener las señales de cambio: {e}")
+            return {}
+        finally:
+            try:
+                self.data_repository.disconnect()
+            except Exception as e:
+                logger.warning(f"Error cerrando repositorio de datos: {e}")
+
+    def _score(self, candidate: PrecomputeCandidate) -> float:
+        """Prioridad del candidato: demanda ponderada por antigüedad y cambios."""
+        if candidate.age_seconds is None:
+            staleness = MAX_STALENESS_FACTOR
+        else:
+            staleness = min(
+                candidate.age_seconds / max(self.freshness_seconds, 1), MAX_STALENESS_FACTOR
+            )
+        boost = CHANGE_BOOST if candidate.changed else 0.0
+        return candidate.requests * (staleness + boost)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP asíncrono (asyncio) para cientos de exportaciones concurrentes en un proceso.
+
+Atiende GET /export/{tenant_id} con la misma API que la Lambda (ver src/server.py),
+pero cada exportación completa es una corrutina de AsyncExportService en lugar de un
+hilo: las queries de todas las exportaciones comparten un pool de conexiones psycopg 3
+(async_pool_max_connections) y el límite de exportaciones simultáneas es
+async_max_concurrent_exports, no la cantidad de hilos.
+
+- Las solicitudes concurrentes del mismo tenant y perfil comparten una exportación.
+- Si el cliente se desconecta, la exportación sigue para las demás solicitudes que la
+  comparten (el artefacto queda guardado); al detener el servidor se cancelan sus queries.
+- Las deltas, los paquetes y los fragmentos se atienden con lambda_handler en un pool
+  de hilos (server_max_concurrent_requests), con los pools de conexiones síncronos.
+- Las exportaciones completas toman los mismos cupos del clúster que las síncronas
+  (export_max_concurrency); no usan el lock por tenant ni stale-while-revalidate
+  (ver AsyncExportService).
+
+GET /health responde el estado del proceso, con el del pool asíncrono.
+
+Requiere psycopg y psycopg-pool (ver requirements.txt).
+
+Uso:
+    python src/async_server.py [--host 0.0.0.0] [--port 8080]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import signal
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import handler
+from config.settings import get_settings
+from domain.models import Deadline, ExportResult
+from domain.profiles import ExportProfile
+from server import RequestContext, build_export_event
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Espera máxima por el siguiente request de una conexión keep-alive
+KEEP_ALIVE_TIMEOUT_SECONDS = 15
+
+# Headers máximos por request
+MAX_REQUEST_HEADERS = 100
+
+# Cuerpo máximo que se descarta de un request
+# (la API solo usa GET; ver MAX_BATCH_BODY_BYTES en server.py)
+MAX_REQUEST_BODY_BYTES = 64 * 1024
+
+
+class AsyncExportServer:
+    """Atiende las conexiones HTTP con el servicio de exportación asíncrono."""
+
+    def __init__(self, settings, data_repository, export_service):
+        """
+        Args:
+            settings: Configuración de la aplicación
+            data_repository: Repositorio asíncrono abierto (ver handler.create_async_repository)
+            export_service: Servicio de exportación asíncrono
+        """
+        self.settings = settings
+        self.data_repository = data_repository
+        self.export_service = export_service
+        # Exportaciones en curso por tenant y perfil (coalescencia)
+        self._exports: Dict[str, asyncio.Task] = {}
+        # Hilos para lambda_handler y para armar las respuestas (base64)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.server_max_concurrent_requests),
+            thread_name_prefix='export-sync'
+        )
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Atiende los requests de una conexión (HTTP/1.1 con keep-alive)."""
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers = request
+                if self._body_too_large(headers):
+                    # El cuerpo no se leyó: la conexión no puede seguir
+                    response = self._json_response(
+                        413, {'error': 'Cuerpo demasiado grande', 'status': 413}
+                    )
+                    await self._write_response(writer, response, keep_alive=False)
+                    logger.info(f"{peer} - {method} {path} 413")
+                    break
+                response = await self._dispatch(method, path, headers)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, response, keep_alive)
+                logger.info(f"{peer} - {method} {path} {response.get('statusCode', 200)}")
+                if not keep_alive:
+                    break
+        except (
+            ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        """Cancela las exportaciones en curso (y sus queries) y libera los hilos."""
+        tasks = list(self._exports.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        """
+        Lee la línea de request y los headers. Descarta el cuerpo si no supera
+        MAX_REQUEST_BODY_BYTES; uno mayor no se lee (ver _body_too_large).
+
+        Returns:
+            (método, ruta, headers en minúsculas), o None si el cliente cerró la conexión
+        """
+        try:
+            line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+        if not line.strip():
+            return None
+        method, path, _ = line.decode('latin-1').split(' ', 2)
+
+        headers: Dict[str, str] = {}
+        while True:
+            header_line = await reader.readline()
+            if header_line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_REQUEST_HEADERS:
+                raise ValueError("Demasiados headers")
+            name, _, value = header_line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = self._content_length(headers)
+        if 0 < length <= MAX_REQUEST_BODY_BYTES:
+            await reader.readexactly(length)
+        return method.upper(), path, headers
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> int:
+        """Content-Length del request (ValueError si no es un entero no negativo)."""
+        length = int(headers.get('content-length') or 0)
+        if length < 0:
+            raise ValueError(f"Content-Length inválido: {length}")
+        return length
+
+    def _body_too_large(self, headers: Dict[str, str]) -> bool:
+        """Indica si el cuerpo del request supera MAX_REQUEST_BODY_BYTES."""
+        return self._content_length(headers) > MAX_REQUEST_BODY_BYTES
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """Resuelve un request y retorna su respuesta con el formato de API Gateway."""
+        if method != 'GET':
+            return self._json_response(405, {'error': 'Método no permitido', 'status': 405})
+        if urlsplit(path).path == '/health':
+            return self._json_response(200, {
+                **handler.health_status(self.settings),
+                'postgres_pool': self.data_repository.pool_stats(),
+                'exports_in_progress': len(self._exports)
+            })
+        event = build_export_event(path, headers)
+        if event is None:
+            return self._json_response(404, {'error': 'Ruta no encontrada', 'status': 404})
+
+        try:
+            parsed = handler.parse_full_export(event)
+        except ValueError as e:
+            return self._json_response(400, {'error': str(e), 'status': 400})
+        if parsed is None:
+            # Delta, paquete o fragmentos: camino síncrono de la Lambda
+            context = RequestContext(self.settings.server_request_timeout_seconds)
+            return await self._run_sync(handler.lambda_handler, event, context)
+
+        # Admisión: una solicitud que comparte una exportación en curso no ocupa cupo
+        tenant_id, profile = parsed
+        key = f"{tenant_id}_{profile.cache_key()}"
+        if key not in self._exports:
+            unavailable = handler.circuit_open_response(self.settings)
+            if unavailable is not None:
+                return unavailable
+            if len(self._exports) >= self.settings.async_max_concurrent_exports:
+                return self._json_response(
+                    503,
+                    {
+                        'error': 'Demasiadas exportaciones en curso, reintente más tarde',
+                        'status': 503
+                    },
+                    {'Retry-After': str(self.settings.export_overload_retry_after_seconds)}
+                )
+
+        result, sqlite_data = await self._coalesced_export(key, tenant_id, profile)
+        if not result.success:
+            return handler.export_failure_response(result, self.settings)
+        return await self._run_sync(
+            handler.export_response, event, tenant_id, profile, result, sqlite_data
+        )
+
+    async def _coalesced_export(
+        self,
+        key: str,
+        tenant_id: int,
+        profile: ExportProfile
+    ) -> Tuple[ExportResult, Optional[bytes]]:
+        """
+        Exportación completa con coalescencia: las solicitudes concurrentes del mismo
+        tenant y perfil esperan la misma tarea (con el plazo de la primera).
+
+        Returns:
+            Tupla (resultado, bytes del archivo); bytes es None si no hubo archivo
+        """
+        task = self._exports.get(key)
+        if task is None:
+            task = asyncio.create_task(self._export_to_memory(tenant_id, profile))
+            self._exports[key] = task
+            task.add_done_callback(lambda done: self._forget_export(key, done))
+        else:
+            logger.info(f"Exportación de tenant {tenant_id} compartida con otra solicitud en curso")
+        # Si el cliente se desconecta, la exportación sigue para las demás solicitudes
+        return await asyncio.shield(task)
+
+    def _forget_export(self, key: str, task: asyncio.Task) -> None:
+        """Quita una exportación terminada del registro de exportaciones en curso."""
+        if self._exports.get(key) is task:
+            del self._exports[key]
+
+    async def _export_to_memory(
+        self, tenant_id: int, profile: ExportProfile
+    ) -> Tuple[ExportResult, Optional[bytes]]:
+        """Exporta a un archivo temporal único y retorna su contenido (ver handler)."""
+        fd, output_path = tempfile.mkstemp(
+            prefix=f"database_catalog_{tenant_id}_", suffix='.sqlite', dir=self.settings.temp_dir
+        )
+        os.close(fd)
+        try:
+            deadline = Deadline.after(
+                self.settings.server_request_timeout_seconds
+                - self.settings.deadline_reserve_ms / 1000
+            )
+            result = await self.export_service.export_tenant_data(
+                tenant_id, output_path, profile, deadline
+            )
+            if not result.success:
+                return result, None
+            return result, await self._run_sync(_read_file, output_path)
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    async def _run_sync(self, fn, *args: Any) -> Any:
+        """Ejecuta una función bloqueante en el pool de hilos del servidor."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    @staticmethod
+    async def _write_response(
+        writer: asyncio.StreamWriter, response: Dict[str, Any], keep_alive: bool
+    ) -> None:
+        """Escribe una respuesta con el formato de API Gateway (cuerpo base64 si es binario)."""
+        body = response.get('body') or ''
+        data = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+        status_code = response.get('statusCode', 200)
+        lines = [f"HTTP/1.1 {status_code} {HTTPStatus(status_code).phrase}", 'Server: ExportSQLite']
+        for name, value in (response.get('headers') or {}).items():
+            if name.lower() not in ('content-length', 'connection'):
+                lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(data)}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    @staticmethod
+    def _json_response(
+        status_code: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Crea una respuesta JSON."""
+        return {
+            'statusCode': status_code,
+            'headers': {'Content-Type': 'application/json', **(headers or {})},
+            'body': json.dumps(payload)
+        }
+
+
+def _read_file(path: str) -> bytes:
+    """Lee un archivo completo."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+async def serve(host: str, port: int, settings) -> None:
+    """Atiende requests hasta recibir SIGINT o SIGTERM."""
+    connection_pools = handler.use_persistent_connections(settings)
+    repository = handler.create_async_repository(settings)
+    await repository.open()
+    export_service = handler.create_async_export_service(settings, repository)
+    app = AsyncExportServer(settings, repository, export_service)
+    server = await asyncio.start_server(app.handle_connection, host, port)
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    logger.info(f"Servidor de exportación asíncrono escuchando en {host}:{port}")
+    try:
+        await stopped.wait()
+    finally:
+        server.close()
+        await app.close()
+        export_service.close()
+        await repository.close()
+        connection_pools.close_all()
+        logger.info("Servidor de exportación asíncrono detenido")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ejecuta el servidor; retorna el código de salida del proceso."""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Servidor HTTP asíncrono de exportación a SQLite")
+    parser.add_argument('--host', default=settings.server_host, help="Dirección de escucha")
+    parser.add_argument('--port', type=int, default=settings.server_port, help="Puerto de escucha")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, settings))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,11 +4,15 @@ Usa Pydantic para validación y gestión de configuración.
 Sigue el principio de Responsabilidad Única (SRP).
 """
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
 
+# Espera por defecto por el lock del tenant cuando el almacén de artefactos es compartido
+DEFAULT_TENANT_LOCK_TIMEOUT_SECONDS = 15.0
+
 
 class Settings(BaseSettings):
     """
@@ -23,6 +27,14 @@ class Settings(BaseSettings):
     postgres_user: str = Field(..., env='POSTGRES_USER')
     postgres_password: str = Field(..., env='POSTGRES_PASSWORD')
 
+    # Réplicas de lectura para las exportaciones, separadas por coma: host[:puerto]
+    # (vacío = todo al primario). Se elige la sana de menor latencia con retraso de
+    # replicación <= replica_max_lag_seconds (debe ser menor que el solape de la marca
+    # de sincronización, 60 s); si ninguna cumple, se lee del primario
+    postgres_replica_hosts: str = Field(default='', env='POSTGRES_REPLICA_HOSTS')
+    replica_max_lag_seconds: float = Field(default=5, env='REPLICA_MAX_LAG_SECONDS')
+    replica_probe_interval_seconds: int = Field(default=30, env='REPLICA_PROBE_INTERVAL_SECONDS')
+
     # Configuración de la aplicación
     log_level: str = Field(default='INFO', env='LOG_LEVEL')
     environment: str = Field(default='dev', env='ENVIRONMENT')
@@ -30,6 +42,137 @@ class Settings(BaseSettings):
     # Configuración de archivos temporales
     temp_dir: str = Field(default='/tmp', env='TEMP_DIR')
 
+    # Caché de artefactos para reconstrucciones incrementales
+    # (vacío = subdirectorio 'artifacts' dentro de temp_dir)
+    artifact_cache_enabled: bool = Field(default=True, env='ARTIFACT_CACHE_ENABLED')
+    artifact_cache_dir: str = Field(default='', env='ARTIFACT_CACHE_DIR')
+
+    # Almacén de fragmentos para descargas incrementales (local | s3)
+    # (directorio vacío = subdirectorio 'chunks' dentro de temp_dir)
+    chunk_store_backend: str = Field(default='local', env='CHUNK_STORE_BACKEND')
+    chunk_store_dir: str = Field(default='', env='CHUNK_STORE_DIR')
+    chunk_store_bucket: str = Field(default='', env='CHUNK_STORE_BUCKET')
+    chunk_store_prefix: str = Field(default='sqlite-chunks/', env='CHUNK_STORE_PREFIX')
+    chunk_store_endpoint_url: str = Field(default='', env='CHUNK_STORE_ENDPOINT_URL')
+
+    # Pool de conexiones de lectura (0 = todas las queries en una sola conexión compartida;
+    # la exportación lanza hasta 5 queries en paralelo, más los duplicados: p. ej. 8).
+    # Con pool, una query que supera el percentil query_hedge_percentile de su historial
+    # se duplica en otra conexión del pool y se usa la primera respuesta (hedging)
+    postgres_pool_max_connections: int = Field(default=0, env='POSTGRES_POOL_MAX_CONNECTIONS')
+    query_hedge_enabled: bool = Field(default=True, env='QUERY_HEDGE_ENABLED')
+    query_hedge_percentile: float = Field(default=0.95, env='QUERY_HEDGE_PERCENTILE')
+    query_hedge_min_samples: int = Field(default=10, env='QUERY_HEDGE_MIN_SAMPLES')
+
+    # Reintentos de una query ante errores transitorios (corte de conexión, fallo de
+    # serialización, statement_timeout), en una conexión nueva y con backoff exponencial
+    # con jitter (0 = sin reintentos)
+    query_max_retries: int = Field(default=2, env='QUERY_MAX_RETRIES')
+    query_retry_base_delay_ms: int = Field(default=100, env='QUERY_RETRY_BASE_DELAY_MS')
+    query_retry_max_delay_ms: int = Field(default=2000, env='QUERY_RETRY_MAX_DELAY_MS')
+
+    # Vigencia de la caché negativa de tenants sin datos en el contenedor (0 = desactivada)
+    negative_cache_ttl_seconds: int = Field(default=60, env='NEGATIVE_CACHE_TTL_SECONDS')
+
+    # Espera máxima por la exportación del mismo tenant en curso en otro contenedor
+    # (advisory lock de PostgreSQL; 0 = sin lock). El que espera reutiliza el artefacto que
+    # dejó el otro, así que solo sirve con un almacén compartido (artifact_cache_dir, ej:
+    # EFS): sin él el lock queda desactivado por defecto y activarlo es un error
+    tenant_lock_timeout_seconds: Optional[float] = Field(
+        default=None, env='TENANT_LOCK_TIMEOUT_SECONDS'
+    )
+
+    # Control de admisión del clúster: exportaciones que consultan PostgreSQL a la vez entre
+    # todos los contenedores (cupos con advisory locks; 0 = sin límite). Sin cupo libre tras
+    # la espera se sirve el artefacto cacheado o un 503 con Retry-After
+    export_max_concurrency: int = Field(default=0, env='EXPORT_MAX_CONCURRENCY')
+    export_slot_wait_seconds: float = Field(default=2, env='EXPORT_SLOT_WAIT_SECONDS')
+    export_overload_retry_after_seconds: int = Field(
+        default=5, env='EXPORT_OVERLOAD_RETRY_AFTER_SECONDS'
+    )
+
+    # Exportación por lotes (evento {"batch": true, "tenant_ids": [...]}): tenants por
+    # invocación y archivos SQLite que se construyen a la vez
+    batch_max_tenants: int = Field(default=200, env='BATCH_MAX_TENANTS')
+    batch_build_workers: int = Field(default=4, env='BATCH_BUILD_WORKERS')
+
+    # Precálculo de artefactos (src/precompute.py): exportaciones simultáneas (presupuesto de
+    # conexiones a PostgreSQL, una por proceso), antigüedad a partir de la cual se recalcula
+    # un artefacto sin cambios, tenants por corrida y ventana del log de acceso
+    precompute_max_workers: int = Field(default=4, env='PRECOMPUTE_MAX_WORKERS')
+    precompute_freshness_seconds: int = Field(default=900, env='PRECOMPUTE_FRESHNESS_SECONDS')
+    precompute_max_tenants: int = Field(default=100, env='PRECOMPUTE_MAX_TENANTS')
+    precompute_window_hours: float = Field(default=24, env='PRECOMPUTE_WINDOW_HOURS')
+
+    # Invalidación por cambios (LISTEN/NOTIFY, ver src/listen_invalidations.py): registro de
+    # cambios compartido con el listener (vacío = subdirectorio 'invalidation' dentro de
+    # temp_dir), canal de los triggers y antigüedad máxima del latido del listener para
+    # servir un artefacto sin calcular huellas (un cambio puede tardar en verse hasta el
+    # retraso del listener, acotado por esa antigüedad)
+    invalidation_enabled: bool = Field(default=False, env='INVALIDATION_ENABLED')
+    invalidation_dir: str = Field(default='', env='INVALIDATION_DIR')
+    invalidation_channel: str = Field(default='export_invalidation', env='INVALIDATION_CHANNEL')
+    invalidation_max_heartbeat_age_seconds: float = Field(
+        default=30, env='INVALIDATION_MAX_HEARTBEAT_AGE_SECONDS'
+    )
+    invalidation_heartbeat_interval_seconds: float = Field(
+        default=5, env='INVALIDATION_HEARTBEAT_INTERVAL_SECONDS'
+    )
+
+    # Servidor HTTP de larga duración (src/server.py): dirección, exportaciones simultáneas
+    # (las demás reciben 503), plazo por request y pools de conexiones persistentes por
+    # endpoint (las min_connections se conservan abiertas entre exportaciones; una
+    # exportación usa la principal más hasta 5 de lectura)
+    server_host: str = Field(default='0.0.0.0', env='SERVER_HOST')
+    server_port: int = Field(default=8080, env='SERVER_PORT')
+    server_max_concurrent_requests: int = Field(default=16, env='SERVER_MAX_CONCURRENT_REQUESTS')
+    server_request_timeout_seconds: float = Field(default=29, env='SERVER_REQUEST_TIMEOUT_SECONDS')
+    server_pool_min_connections: int = Field(default=8, env='SERVER_POOL_MIN_CONNECTIONS')
+    server_pool_max_connections: int = Field(default=48, env='SERVER_POOL_MAX_CONNECTIONS')
+
+    # Servidor asíncrono (src/async_server.py): exportaciones simultáneas (las demás
+    # reciben 503), pool de conexiones compartido por todas (una query toma una conexión
+    # solo mientras se ejecuta), timeout de cada query sin plazo e hilos para construir
+    # los SQLite. Usa server_host, server_port y server_request_timeout_seconds
+    async_max_concurrent_exports: int = Field(default=256, env='ASYNC_MAX_CONCURRENT_EXPORTS')
+    async_pool_min_connections: int = Field(default=4, env='ASYNC_POOL_MIN_CONNECTIONS')
+    async_pool_max_connections: int = Field(default=32, env='ASYNC_POOL_MAX_CONNECTIONS')
+    async_query_timeout_seconds: float = Field(default=25, env='ASYNC_QUERY_TIMEOUT_SECONDS')
+    async_build_workers: int = Field(default=4, env='ASYNC_BUILD_WORKERS')
+
+    # Fase de inicialización de Lambda (ver handler.prime): al cargar el módulo se crea
+    # el esquema SQLite precreado y, con lambda_persistent_connections, se abre la
+    # conexión al primario, que se conserva entre invocaciones del contenedor (una
+    # conexión de PostgreSQL por contenedor caliente; las que estuvieron inactivas más
+    # de pool_validate_idle_seconds se verifican antes de usarse)
+    init_priming_enabled: bool = Field(default=True, env='INIT_PRIMING_ENABLED')
+    lambda_persistent_connections: bool = Field(default=False, env='LAMBDA_PERSISTENT_CONNECTIONS')
+    pool_validate_idle_seconds: float = Field(default=30, env='POOL_VALIDATE_IDLE_SECONDS')
+
+    # Tiempo reservado del plazo de la invocación para construir el SQLite y responder:
+    # las queries se limitan a lo que queda de get_remaining_time_in_millis() menos la reserva
+    deadline_reserve_ms: int = Field(default=2000, env='DEADLINE_RESERVE_MS')
+
+    # Stale-while-revalidate: un artefacto con hasta max_stale segundos se sirve de inmediato
+    # (0 = desactivado) y, si tiene más de revalidate_after, se refresca en segundo plano
+    # (thread = hilo del mismo contenedor, lambda = invocación asíncrona de la función)
+    artifact_max_stale_seconds: int = Field(default=0, env='ARTIFACT_MAX_STALE_SECONDS')
+    artifact_revalidate_after_seconds: int = Field(
+        default=60, env='ARTIFACT_REVALIDATE_AFTER_SECONDS'
+    )
+    refresh_backend: str = Field(default='thread', env='REFRESH_BACKEND')
+    refresh_function_name: str = Field(default='', env='REFRESH_FUNCTION_NAME')
+
+    # Circuit breaker de PostgreSQL: con una tasa de errores alta se deja de consultar
+    # PostgreSQL y se sirven artefactos de hasta circuit_breaker_max_stale_seconds
+    circuit_breaker_failure_rate: float = Field(default=0.5, env='CIRCUIT_BREAKER_FAILURE_RATE')
+    circuit_breaker_window: int = Field(default=20, env='CIRCUIT_BREAKER_WINDOW')
+    circuit_breaker_min_calls: int = Field(default=5, env='CIRCUIT_BREAKER_MIN_CALLS')
+    circuit_breaker_open_seconds: int = Field(default=30, env='CIRCUIT_BREAKER_OPEN_SECONDS')
+    circuit_breaker_max_stale_seconds: int = Field(
+        default=86400, env='CIRCUIT_BREAKER_MAX_STALE_SECONDS'
+    )
+
     @validator('log_level')
     def validate_log_level(cls, v):
         """Valida que el nivel de log sea válido."""
@@ -38,6 +181,56 @@ class Settings(BaseSettings):
             raise ValueError(f'log_level debe ser uno de {valid_levels}')
         return v.upper()
 
+    @validator('chunk_store_backend')
+    def validate_chunk_store_backend(cls, v):
+        """Valida que el backend del almacén de fragmentos sea válido."""
+        if v.lower() not in ('local', 's3'):
+            raise ValueError('chunk_store_backend debe ser local o s3')
+        return v.lower()
+
+    @validator('refresh_backend')
+    def validate_refresh_backend(cls, v):
+        """Valida que el backend de refresco sea válido."""
+        if v.lower() not in ('thread', 'lambda'):
+            raise ValueError('refresh_backend debe ser thread o lambda')
+        return v.lower()
+
+    @validator('tenant_lock_timeout_seconds', always=True)
+    def validate_tenant_lock_timeout_seconds(cls, v, values):
+        """Activa el lock del tenant solo con un almacén de artefactos compartido."""
+        shared_store = values.get('artifact_cache_enabled') and values.get('artifact_cache_dir')
+        if v is None:
+            return DEFAULT_TENANT_LOCK_TIMEOUT_SECONDS if shared_store else 0.0
+        if v > 0 and not shared_store:
+            raise ValueError(
+                'tenant_lock_timeout_seconds requiere un almacén de artefactos compartido '
+                '(artifact_cache_dir): el artefacto del otro contenedor no es visible en su /tmp'
+            )
+        return v
+
+    @validator('circuit_breaker_failure_rate')
+    def validate_circuit_breaker_failure_rate(cls, v):
+        """Valida que la tasa de errores esté entre 0 y 1."""
+        if not 0 < v <= 1:
+            raise ValueError('circuit_breaker_failure_rate debe estar entre 0 y 1')
+        return v
+
+    @validator('query_hedge_percentile')
+    def validate_query_hedge_percentile(cls, v):
+        """Valida que el percentil de hedging esté entre 0 y 1."""
+        if not 0 < v <= 1:
+            raise ValueError('query_hedge_percentile debe estar entre 0 y 1')
+        return v
+
+    @validator('postgres_replica_hosts')
+    def validate_postgres_replica_hosts(cls, v):
+        """Valida que cada réplica tenga la forma host[:puerto]."""
+        for endpoint in filter(None, (item.strip() for item in v.split(','))):
+            host, _, port = endpoint.partition(':')
+            if not host or (port and not port.isdigit()):
+                raise ValueError(f'postgres_replica_hosts: réplica inválida {endpoint}')
+        return v
+
     @validator('postgres_port')
     def validate_postgres_port(cls, v):
         """Valida que el puerto de PostgreSQL sea válido."""
@@ -45,6 +238,15 @@ class Settings(BaseSettings):
             raise ValueError('postgres_port debe estar entre 1 y 65535')
         return v
 
+    def replica_endpoints(self) -> List[Tuple[str, int]]:
+        """Réplicas de lectura (host, puerto); sin puerto se usa el del primario."""
+        endpoints = []
+        items = (item.strip() for item in self.postgres_replica_hosts.split(','))
+        for endpoint in filter(None, items):
+            host, _, port = endpoint.partition(':')
+            endpoints.append((host, int(port) if port else self.postgres_port))
+        return endpoints
+
     class Config:
         """Configuración de Pydantic."""
         env_file = '.env'
@@ -52,10 +254,13 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
+@lru_cache(maxsize=None)
 def get_settings() -> Settings:
     """
     Obtiene la configuración de la aplicación.
-    Implementa patrón Singleton para evitar múltiples lecturas.
+    Implementa patrón Singleton para evitar múltiples lecturas: las variables de
+    entorno se leen y validan una vez por proceso (get_settings.cache_clear()
+    fuerza una nueva lectura).
 
     Returns:
         Instancia de Settings
@@ -4,11 +4,12 @@ Siguiendo el principio de Inversión de Dependencias (DIP) de SOLID.
 Las capas de alto nivel dependen de abstracciones, no de implementaciones concretas.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 from domain.models import (
     Customer, Product, BankAccount, ListPrice, ListPriceDetail,
-    ClientListPrice, Location, Cobranza, CobranzaDetail
+    ClientListPrice, Location, Cobranza, CobranzaDetail, CachedArtifact, Deadline
 )
 
 
@@ -16,6 +17,9 @@ class IDataRepository(ABC):
     """
     Interfaz para repositorios de datos.
     Define el contrato para acceder a datos sin especificar la fuente.
+
+    Los métodos get_*_by_tenant aceptan `columns`: los campos del modelo a
+    consultar (None = todos). Los campos omitidos quedan en None.
     """
 
     @abstractmethod
@@ -29,60 +33,218 @@ class IDataRepository(ABC):
         pass
 
     @abstractmethod
-    def get_customers_by_tenant(self, tenant_id: int) -> List[Customer]:
+    def get_customers_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Customer]:
         """Obtiene todos los clientes de un tenant."""
         pass
 
     @abstractmethod
-    def get_products_by_tenant(self, tenant_id: int) -> List[Product]:
+    def get_products_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Product]:
         """Obtiene todos los productos de un tenant."""
         pass
 
     @abstractmethod
-    def get_bank_accounts_by_tenant(self, tenant_id: int) -> List[BankAccount]:
+    def get_referenced_products_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Product]:
+        """Obtiene solo los productos referenciados por listas de precios y cobranzas del tenant."""
+        pass
+
+    @abstractmethod
+    def get_product_catalog_stats(self, tenant_id: int) -> Dict[str, int]:
+        """Retorna filas y bytes del catálogo completo frente al referenciado por el tenant."""
+        pass
+
+    @abstractmethod
+    def get_bank_accounts_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[BankAccount]:
         """Obtiene todas las cuentas bancarias de un tenant."""
         pass
 
     @abstractmethod
-    def get_list_prices_by_tenant(self, tenant_id: int) -> List[ListPrice]:
+    def get_list_prices_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[ListPrice]:
         """Obtiene todas las listas de precios de un tenant."""
         pass
 
     @abstractmethod
-    def get_list_price_details_by_tenant(self, tenant_id: int) -> List[ListPriceDetail]:
+    def get_list_price_details_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[ListPriceDetail]:
         """Obtiene todos los detalles de listas de precios de un tenant."""
         pass
 
     @abstractmethod
-    def get_client_list_prices_by_tenant(self, tenant_id: int) -> List[ClientListPrice]:
+    def get_client_list_prices_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[ClientListPrice]:
         """Obtiene todas las relaciones cliente-lista de precios de un tenant."""
         pass
 
     @abstractmethod
-    def get_locations_by_tenant(self, tenant_id: int) -> List[Location]:
+    def get_locations_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Location]:
         """Obtiene todas las ubicaciones de un tenant."""
         pass
 
     @abstractmethod
-    def get_cobranzas_by_tenant(self, tenant_id: int) -> List[Cobranza]:
+    def get_cobranzas_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Cobranza]:
         """Obtiene todas las cobranzas de un tenant."""
         pass
 
     @abstractmethod
-    def get_cobranza_details_by_tenant(self, tenant_id: int) -> List[CobranzaDetail]:
+    def get_cobranza_details_by_tenant(
+        self,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[CobranzaDetail]:
         """Obtiene todos los detalles de cobranza de un tenant."""
         pass
 
+    @abstractmethod
+    def tenant_exists(self, tenant_id: int) -> bool:
+        """
+        Indica si el tenant tiene datos propios (clientes o ubicaciones).
+        Es una verificación barata previa a las queries de exportación.
+        """
+        pass
+
+    @abstractmethod
+    def get_table_fingerprints(
+        self,
+        tenant_id: int,
+        columns_by_entity: Dict[str, Optional[Sequence[str]]],
+        referenced_products: bool = False
+    ) -> Dict[str, str]:
+        """
+        Calcula una huella de lo que se exportaría de cada entidad, sin transferir filas.
+        Debe ser barata (metadatos como conteos y último updated_at): se calcula antes de
+        cada reconstrucción incremental.
+        """
+        pass
+
+    @abstractmethod
+    def get_sync_watermark(self) -> datetime:
+        """Retorna la hora actual de la fuente de datos (marca de sincronización)."""
+        pass
+
+    @abstractmethod
+    def get_changes_since(
+        self,
+        entity_name: str,
+        tenant_id: int,
+        since: datetime,
+        columns: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Any], List[int]]:
+        """Obtiene las filas modificadas y los ids dados de baja de una entidad desde `since`."""
+        pass
+
+    @abstractmethod
+    def get_entity_by_tenants(
+        self,
+        entity_name: str,
+        tenant_ids: Sequence[int],
+        columns: Optional[Sequence[str]] = None,
+        referenced_products: bool = False
+    ) -> Dict[int, List[Any]]:
+        """
+        Obtiene una entidad para varios tenants con una sola consulta, repartida por tenant.
+        Las entidades globales (catálogo de productos, cuentas bancarias) se comparten.
+        """
+        pass
+
+    @abstractmethod
+    def get_tenant_change_times(self, tenant_ids: Sequence[int]) -> Dict[int, datetime]:
+        """Retorna la última modificación de los datos exportados de cada tenant."""
+        pass
+
+    @abstractmethod
+    def set_deadline(self, deadline: Optional[Deadline]) -> None:
+        """
+        Fija el plazo de las queries siguientes: cada query recibe como timeout el tiempo
+        restante (None = timeout fijo de la conexión).
+        """
+        pass
+
+    @abstractmethod
+    def cancel_running_queries(self) -> None:
+        """
+        Cancela en la fuente de datos las queries en curso (se llama desde otro hilo al
+        agotarse el plazo); las que se cancelan fallan en sus hilos.
+        """
+        pass
+
+    @abstractmethod
+    def acquire_tenant_lock(self, tenant_id: int, timeout_seconds: float) -> bool:
+        """
+        Toma un lock exclusivo por tenant, compartido entre procesos y contenedores.
+        Espera hasta `timeout_seconds` si otro proceso lo tiene; retorna False si no lo obtuvo.
+        """
+        pass
+
+    @abstractmethod
+    def release_tenant_lock(self, tenant_id: int) -> None:
+        """Libera el lock del tenant (también se libera al desconectar)."""
+        pass
+
+    @abstractmethod
+    def acquire_export_slot(self, max_slots: int, timeout_seconds: float) -> Optional[int]:
+        """
+        Toma uno de `max_slots` cupos de exportación, compartidos entre procesos y
+        contenedores. Espera hasta `timeout_seconds` a que se libere alguno; retorna
+        el número de cupo o None si están todos ocupados.
+        """
+        pass
+
+    @abstractmethod
+    def release_export_slot(self, slot: int) -> None:
+        """Libera un cupo de exportación (también se libera al desconectar)."""
+        pass
+
     @abstractmethod
     def get_query_timings(self) -> Dict[str, Dict[str, float]]:
         """Retorna los timings detallados de las queries ejecutadas."""
         pass
 
+    @abstractmethod
+    def get_retry_counts(self) -> Dict[str, int]:
+        """Retorna los reintentos por query ante errores transitorios (solo las reintentadas)."""
+        pass
+
 
 class ISQLiteBuilder(ABC):
     """
     Interfaz para construcción de archivos SQLite.
     Define el contrato para crear y poblar bases de datos SQLite.
+
+    Los métodos insert_* aceptan `columns`: los campos del modelo a escribir
+    (None = todos). Las columnas omitidas quedan en NULL.
     """
 
     @abstractmethod
@@ -96,51 +258,337 @@ class ISQLiteBuilder(ABC):
         pass
 
     @abstractmethod
-    def insert_customers(self, customers: List[Customer]) -> int:
+    def insert_customers(
+        self,
+        customers: List[Customer],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta clientes en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_products(self, products: List[Product]) -> int:
+    def insert_products(
+        self,
+        products: List[Product],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta productos en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_bank_accounts(self, bank_accounts: List[BankAccount]) -> int:
+    def insert_bank_accounts(
+        self,
+        bank_accounts: List[BankAccount],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta cuentas bancarias en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_list_prices(self, list_prices: List[ListPrice]) -> int:
+    def insert_list_prices(
+        self,
+        list_prices: List[ListPrice],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta listas de precios en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_list_price_details(self, list_price_details: List[ListPriceDetail]) -> int:
+    def insert_list_price_details(
+        self,
+        list_price_details: List[ListPriceDetail],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta detalles de listas de precios en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_client_list_prices(self, client_list_prices: List[ClientListPrice]) -> int:
+    def insert_client_list_prices(
+        self,
+        client_list_prices: List[ClientListPrice],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta relaciones cliente-lista de precios en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_locations(self, locations: List[Location]) -> int:
+    def insert_locations(
+        self,
+        locations: List[Location],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta ubicaciones en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_cobranzas(self, cobranzas: List[Cobranza]) -> int:
+    def insert_cobranzas(
+        self,
+        cobranzas: List[Cobranza],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta cobranzas en la base de datos."""
         pass
 
     @abstractmethod
-    def insert_cobranza_details(self, cobranza_details: List[CobranzaDetail]) -> int:
+    def insert_cobranza_details(
+        self,
+        cobranza_details: List[CobranzaDetail],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta detalles de cobranza en la base de datos."""
         pass
 
+    @abstractmethod
+    def write_delta_metadata(
+        self,
+        sync_info: Dict[str, str],
+        deleted_ids: Dict[str, List[int]],
+        upserted_entities: Sequence[str],
+        replaced_entities: Sequence[str],
+        extras: Sequence[str] = ()
+    ) -> None:
+        """Escribe la información de sincronización, las bajas y los pasos para aplicar la delta."""
+        pass
+
+    @abstractmethod
+    def build_extra(self, name: str) -> Dict[str, int]:
+        """
+        Construye una estructura derivada (índice o tabla precalculada) y retorna sus
+        estadísticas.
+        """
+        pass
+
+    @abstractmethod
+    def copy_tables_from(self, source_path: str, entity_names: Sequence[str]) -> Dict[str, int]:
+        """Copia tablas completas desde otro archivo SQLite con el mismo esquema."""
+        pass
+
+    @abstractmethod
+    def split_bundle(
+        self,
+        source_path: str,
+        output_dir: str,
+        entity_names: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """Divide un archivo exportado en un núcleo y un archivo por cada tabla indicada."""
+        pass
+
+    @abstractmethod
+    def finalize(self) -> str:
+        """Cierra el archivo dejándolo byte-reproducible y retorna su hash (SHA-256)."""
+        pass
+
     @abstractmethod
     def close(self) -> None:
         """Cierra la conexión con la base de datos SQLite."""
         pass
+
+
+class IArtifactStore(ABC):
+    """
+    Interfaz para almacenes de artefactos exportados.
+    Guarda cada archivo SQLite junto con las huellas de sus tablas, para
+    reutilizarlo en exportaciones posteriores.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedArtifact]:
+        """Obtiene un artefacto por clave, o None si no existe."""
+        pass
+
+    @abstractmethod
+    def put(
+        self,
+        key: str,
+        source_path: str,
+        fingerprints: Dict[str, str],
+        records_exported: Dict[str, int],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> CachedArtifact:
+        """Guarda una copia del archivo y sus metadatos bajo la clave."""
+        pass
+
+    @abstractmethod
+    def touch(self, key: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Marca un artefacto como confirmado contra PostgreSQL (sus tablas no cambiaron).
+        `metadata` actualiza esas claves de los metadatos (ej: la marca de sincronización).
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Elimina un artefacto."""
+        pass
+
+
+class IChunkStore(ABC):
+    """
+    Interfaz para almacenes de fragmentos direccionados por contenido.
+    Cada fragmento se guarda una sola vez bajo su SHA-256, sin importar cuántas
+    exportaciones o tenants lo contengan. Cada exportación tiene un manifiesto
+    (lista ordenada de fragmentos) guardado bajo el hash de contenido del archivo.
+    """
+
+    @abstractmethod
+    def missing(self, chunk_ids: Sequence[str]) -> List[str]:
+        """Retorna los fragmentos que aún no están en el almacén."""
+        pass
+
+    @abstractmethod
+    def put_chunk(self, chunk_id: str, data: bytes) -> None:
+        """Guarda un fragmento."""
+        pass
+
+    @abstractmethod
+    def get_chunk(self, chunk_id: str) -> Optional[bytes]:
+        """Obtiene un fragmento, o None si no existe."""
+        pass
+
+    @abstractmethod
+    def put_manifest(self, content_hash: str, manifest: Dict[str, Any]) -> None:
+        """Guarda el manifiesto de un archivo."""
+        pass
+
+    @abstractmethod
+    def get_manifest(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el manifiesto de un archivo, o None si no existe."""
+        pass
+
+
+class IRefreshDispatcher(ABC):
+    """
+    Interfaz para lanzar en segundo plano la reconstrucción de un artefacto
+    (stale-while-revalidate): la respuesta actual no espera al refresco.
+    """
+
+    @abstractmethod
+    def dispatch(self, refresh_key: str, event: Dict[str, Any]) -> bool:
+        """
+        Lanza el refresco descrito por `event`.
+
+        Returns:
+            False si ya hay un refresco en curso (o reciente) para la misma clave
+        """
+        pass
+
+
+class IInvalidationStore(ABC):
+    """
+    Interfaz para el registro de cambios notificados por PostgreSQL (LISTEN/NOTIFY).
+    Un listener anota cuándo cambió cada entidad de cada tenant; las exportaciones lo
+    consultan para servir un artefacto sin calcular huellas si nada cambió desde él.
+    """
+
+    @abstractmethod
+    def mark_changed(self, changes: Dict[Optional[int], Sequence[str]], changed_at: float) -> None:
+        """
+        Registra entidades modificadas.
+
+        Args:
+            changes: Entidades modificadas por tenant (None = entidades globales, afectan
+                     a todos los tenants)
+            changed_at: Instante (epoch) en que se recibió el cambio
+        """
+        pass
+
+    @abstractmethod
+    def heartbeat(self, live_since: float) -> None:
+        """
+        Confirma que el listener está escuchando sin interrupciones desde live_since.
+        Un cambio anterior a live_since pudo perderse (listener caído o reconectando).
+        """
+        pass
+
+    @abstractmethod
+    def changed_entities(
+        self, tenant_id: int, since: float, max_heartbeat_age_seconds: float
+    ) -> Optional[List[str]]:
+        """
+        Entidades del tenant (incluidas las globales) modificadas después de `since`.
+
+        Returns:
+            Entidades modificadas (vacía = sin cambios), o None si no se puede asegurar:
+            sin latido reciente del listener o escuchando desde después de `since`
+        """
+        pass
+
+
+class IAsyncDataRepository(ABC):
+    """
+    Interfaz para repositorios de datos asíncronos (asyncio).
+    Una instancia la comparten todas las exportaciones concurrentes del proceso:
+    cada consulta toma una conexión solo mientras se ejecuta.
+
+    Con plazo, cada consulta se limita al tiempo restante; al vencer (o si se cancela
+    la tarea que la espera) la consulta se cancela también en la fuente de datos.
+    """
+
+    @abstractmethod
+    async def open(self) -> None:
+        """Abre las conexiones con la fuente de datos."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Cierra las conexiones con la fuente de datos."""
+        pass
+
+    @abstractmethod
+    async def tenant_exists(self, tenant_id: int, deadline: Optional[Deadline] = None) -> bool:
+        """Indica si el tenant tiene datos propios (clientes o ubicaciones)."""
+        pass
+
+    @abstractmethod
+    async def get_sync_watermark(self, deadline: Optional[Deadline] = None) -> datetime:
+        """Retorna la hora actual de la fuente de datos (marca de sincronización)."""
+        pass
+
+    @abstractmethod
+    async def get_table_fingerprints(
+        self,
+        tenant_id: int,
+        columns_by_entity: Dict[str, Optional[Sequence[str]]],
+        referenced_products: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, str]:
+        """
+        Calcula una huella de lo que se exportaría de cada entidad, sin transferir filas
+        (ver IDataRepository.get_table_fingerprints).
+        """
+        pass
+
+    @abstractmethod
+    async def get_entity_by_tenant(
+        self,
+        entity_name: str,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None,
+        referenced_products: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> List[Any]:
+        """
+        Obtiene las filas a exportar de una entidad (instancias de ENTITY_MODELS).
+
+        Args:
+            entity_name: Nombre de la entidad
+            tenant_id: ID del tenant
+            columns: Campos a consultar (None = todos)
+            referenced_products: Limitar productos a los referenciados por el tenant
+            deadline: Plazo de la consulta (None = solo el timeout por consulta)
+        """
+        pass
+
+    @abstractmethod
+    async def acquire_export_slot(self, max_slots: int, timeout_seconds: float) -> Optional[int]:
+        """
+        Toma uno de `max_slots` cupos de exportación, los mismos que los de
+        IDataRepository.acquire_export_slot (compartidos con las exportaciones
+        síncronas). Espera hasta `timeout_seconds`; retorna el número de cupo o None.
+        """
+        pass
+
+    @abstractmethod
+    async def release_export_slot(self, slot: int) -> None:
+        """Libera un cupo de exportación (también se libera al cerrar)."""
+        pass
@@ -2,8 +2,9 @@
 Modelos de dominio para la aplicación.
 Representa las entidades del negocio sin dependencias de infraestructura.
 """
+import time
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict, Optional
 
 
 @dataclass
@@ -173,6 +174,89 @@ class CobranzaDetail:
     price: Optional[str] = None
 
 
+# Entidades exportables, en el orden de inserción en SQLite.
+# El orden respeta las relaciones de foreign keys: primero las tablas base,
+# luego las que dependen de ellas.
+ENTITY_MODELS: Dict[str, type] = {
+    'customers': Customer,
+    'products': Product,
+    'bank_accounts': BankAccount,
+    'list_prices': ListPrice,
+    'locations': Location,
+    'list_price_details': ListPriceDetail,
+    'client_list_prices': ClientListPrice,
+    'cobranzas': Cobranza,
+    'cobranza_details': CobranzaDetail,
+}
+
+
+class Deadline:
+    """
+    Plazo absoluto de una operación (reloj monotónico).
+    Se crea a partir del tiempo restante de la invocación y se propaga a las capas
+    inferiores, que derivan de él sus propios timeouts.
+    """
+
+    def __init__(self, expires_at: float):
+        """
+        Inicializa el plazo.
+
+        Args:
+            expires_at: Instante límite según time.monotonic()
+        """
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> 'Deadline':
+        """Crea un plazo que vence dentro de `seconds` segundos."""
+        return cls(time.monotonic() + seconds)
+
+    def remaining_seconds(self) -> float:
+        """Segundos restantes (negativo si ya venció)."""
+        return self.expires_at - time.monotonic()
+
+    def remaining_ms(self) -> int:
+        """Milisegundos restantes (0 si ya venció)."""
+        return max(0, int(self.remaining_seconds() * 1000))
+
+    def expired(self) -> bool:
+        """Indica si el plazo ya venció."""
+        return self.remaining_seconds() <= 0
+
+
+@dataclass
+class CachedArtifact:
+    """Archivo SQLite exportado y guardado en el almacén de artefactos."""
+
+    key: str
+    path: str
+    created_at: float
+    file_size: Optional[int] = None
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+    records_exported: dict = field(default_factory=dict)
+    metadata: dict = field(default_factory=dict)
+    validated_at: Optional[float] = None
+
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        """
+        Retorna la antigüedad del artefacto en segundos: el tiempo desde la última
+        vez que se confirmó contra PostgreSQL (o desde su creación).
+        """
+        return (now if now is not None else time.time()) - (self.validated_at or self.created_at)
+
+    def to_dict(self) -> dict:
+        """Convierte el artefacto a diccionario (sin la ruta local)."""
+        return {
+            'key': self.key,
+            'created_at': self.created_at,
+            'file_size': self.file_size,
+            'fingerprints': self.fingerprints,
+            'records_exported': self.records_exported,
+            'metadata': self.metadata,
+            'validated_at': self.validated_at
+        }
+
+
 @dataclass
 class ExportResult:
     """Resultado de la operación de exportación."""
@@ -187,6 +271,21 @@ class ExportResult:
     sqlite_build_time_ms: Optional[int] = None
     fetch_times_by_table: dict = field(default_factory=dict)
     query_timings_detailed: dict = field(default_factory=dict)
+    profile: Optional[str] = None
+    product_pruning: dict = field(default_factory=dict)
+    sync_watermark: Optional[str] = None
+    sync: dict = field(default_factory=dict)
+    reused_tables: list = field(default_factory=list)
+    cache_status: Optional[str] = None
+    cache_age_seconds: Optional[int] = None
+    content_hash: Optional[str] = None
+    derived_tables: dict = field(default_factory=dict)
+    bundle: dict = field(default_factory=dict)
+    not_found: bool = False
+    skipped_tables: list = field(default_factory=list)
+    timed_out: bool = False
+    retries: dict = field(default_factory=dict)
+    overloaded: bool = False
 
     def to_dict(self) -> dict:
         """Convierte el resultado a diccionario."""
@@ -200,5 +299,20 @@ class ExportResult:
             'postgres_fetch_time_ms': self.postgres_fetch_time_ms,
             'sqlite_build_time_ms': self.sqlite_build_time_ms,
             'fetch_times_by_table': self.fetch_times_by_table,
-            'query_timings_detailed': self.query_timings_detailed
+            'query_timings_detailed': self.query_timings_detailed,
+            'profile': self.profile,
+            'product_pruning': self.product_pruning,
+            'sync_watermark': self.sync_watermark,
+            'sync': self.sync,
+            'reused_tables': self.reused_tables,
+            'cache_status': self.cache_status,
+            'cache_age_seconds': self.cache_age_seconds,
+            'content_hash': self.content_hash,
+            'derived_tables': self.derived_tables,
+            'bundle': self.bundle,
+            'not_found': self.not_found,
+            'skipped_tables': self.skipped_tables,
+            'timed_out': self.timed_out,
+            'retries': self.retries,
+            'overloaded': self.overloaded
         }
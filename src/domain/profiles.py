@@ -0,0 +1,235 @@
+"""
+Perfiles de exportación.
+Un perfil declara qué tablas y qué columnas se incluyen en el archivo SQLite.
+Las columnas omitidas no se consultan en PostgreSQL, no se convierten a modelos
+y no se escriben en SQLite (quedan en NULL para mantener el esquema estable).
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field, fields, MISSING
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from domain.models import ENTITY_MODELS, Customer, Location
+
+DEFAULT_PROFILE = 'full'
+
+# Alcance del catálogo de productos:
+#   catalog:    todos los productos activos (catálogo global)
+#   referenced: solo productos referenciados por ListPriceDetail o CobranzaDetail del tenant
+PRODUCT_SCOPES = ('catalog', 'referenced')
+
+# Estructuras derivadas opcionales que se construyen dentro del archivo SQLite:
+#   search: índices de texto completo (FTS5) de productos y clientes
+#   geo:    índices espaciales (R*Tree) de las coordenadas de clientes y ubicaciones
+#   prices: tabla CustomerProductPrice con el precio ya resuelto por cliente y producto
+#   receivables: saldos de cobranza por cliente y antigüedad de vencimientos
+EXPORT_EXTRAS = ('search', 'geo', 'prices', 'receivables')
+
+# Extras cuyo contenido depende de la fecha de construcción (no solo de los datos)
+DATE_DEPENDENT_EXTRAS = frozenset({'receivables'})
+
+# Modo paquete: entidades que siempre viajan en el archivo núcleo (la app las necesita
+# para abrir, y los índices de búsqueda apuntan a ellas) y partes separadas por defecto
+BUNDLE_CORE_ENTITIES = ('customers', 'products', 'bank_accounts', 'list_prices')
+DEFAULT_BUNDLE_PARTS = ('list_price_details', 'cobranza_details')
+
+# Entidades que una exportación completa puede omitir si se agota el plazo (el cliente
+# puede operar sin ellas); cada una arrastra a las que dependen de ella
+DEADLINE_OPTIONAL_ENTITIES = ('locations', 'cobranzas', 'cobranza_details')
+OPTIONAL_ENTITY_DEPENDENTS: Dict[str, Tuple[str, ...]] = {'cobranzas': ('cobranza_details',)}
+
+# Entidades que no dependen del tenant: todos los tenants exportan las mismas filas
+# (los productos solo si el perfil no poda el catálogo, ver ExportProfile.product_scope)
+GLOBAL_ENTITIES = ('products', 'bank_accounts')
+
+# Registro de cambios (ver IInvalidationStore): entidad comodín de un cambio que no se
+# pudo atribuir a una entidad; invalida todos los artefactos
+ALL_ENTITIES = '*'
+
+
+def model_fields(entity_name: str) -> Tuple[str, ...]:
+    """Retorna los campos del modelo de una entidad, en el orden del modelo."""
+    return tuple(f.name for f in fields(ENTITY_MODELS[entity_name]))
+
+
+def required_fields(entity_name: str) -> FrozenSet[str]:
+    """
+    Retorna los campos obligatorios de una entidad (id y foreign keys).
+    Son los campos del modelo sin valor por defecto y siempre se exportan.
+    """
+    return frozenset(
+        f.name for f in fields(ENTITY_MODELS[entity_name])
+        if f.default is MISSING and f.default_factory is MISSING
+    )
+
+
+@dataclass(frozen=True)
+class ExportProfile:
+    """
+    Perfil de exportación.
+
+    Attributes:
+        name: Nombre del perfil (seleccionable desde el request)
+        tables: Entidades incluidas (ver ENTITY_MODELS)
+        columns: Campos incluidos por entidad. Si una entidad no aparece,
+                 se exportan todas sus columnas.
+        product_scope: Alcance del catálogo de productos (ver PRODUCT_SCOPES)
+        extras: Estructuras derivadas a construir (ver EXPORT_EXTRAS)
+    """
+
+    name: str
+    tables: Tuple[str, ...] = tuple(ENTITY_MODELS)
+    columns: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    product_scope: str = 'catalog'
+    extras: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        """Valida que las tablas, columnas y opciones existan."""
+        if self.product_scope not in PRODUCT_SCOPES:
+            raise ValueError(
+                f"product_scope inválido en perfil '{self.name}': {self.product_scope}. "
+                f"Valores permitidos: {list(PRODUCT_SCOPES)}"
+            )
+
+        unknown_extras = [e for e in self.extras if e not in EXPORT_EXTRAS]
+        if unknown_extras:
+            raise ValueError(
+                f"Extras desconocidos en perfil '{self.name}': {unknown_extras}. "
+                f"Valores permitidos: {list(EXPORT_EXTRAS)}"
+            )
+
+        unknown_tables = [t for t in self.tables if t not in ENTITY_MODELS]
+        if unknown_tables:
+            raise ValueError(f"Tablas desconocidas en perfil '{self.name}': {unknown_tables}")
+
+        for entity_name, selected in self.columns.items():
+            if entity_name not in self.tables:
+                raise ValueError(
+                    f"Perfil '{self.name}' declara columnas de '{entity_name}' sin incluir la tabla"
+                )
+            unknown_columns = set(selected) - set(model_fields(entity_name))
+            if unknown_columns:
+                raise ValueError(
+                    f"Columnas desconocidas en perfil '{self.name}' para {entity_name}: "
+                    f"{sorted(unknown_columns)}"
+                )
+
+    def includes(self, entity_name: str) -> bool:
+        """Indica si la entidad se incluye en la exportación."""
+        return entity_name in self.tables
+
+    def columns_for(self, entity_name: str) -> Optional[Tuple[str, ...]]:
+        """
+        Retorna los campos a exportar de una entidad.
+
+        Returns:
+            Tupla de campos en el orden del modelo (incluye id y foreign keys),
+            o None si se exportan todas las columnas
+        """
+        selected = self.columns.get(entity_name)
+        if selected is None:
+            return None
+
+        required = required_fields(entity_name)
+        return tuple(
+            name for name in model_fields(entity_name)
+            if name in required or name in selected
+        )
+
+    def to_dict(self) -> dict:
+        """Convierte el perfil a diccionario."""
+        return {
+            'name': self.name,
+            'tables': list(self.tables),
+            'columns': {entity: list(cols) for entity, cols in self.columns.items()},
+            'product_scope': self.product_scope,
+            'extras': list(self.extras)
+        }
+
+    def is_date_dependent(self) -> bool:
+        """Indica si el archivo depende de la fecha de construcción (ver DATE_DEPENDENT_EXTRAS)."""
+        return not DATE_DEPENDENT_EXTRAS.isdisjoint(self.extras)
+
+    def cache_key(self) -> str:
+        """
+        Retorna una clave estable para cachear artefactos de este perfil.
+        Incluye un hash de la definición: si el perfil cambia, la clave también.
+        """
+        definition = json.dumps(self.to_dict(), sort_keys=True)
+        digest = hashlib.sha256(definition.encode('utf-8')).hexdigest()[:12]
+        return f"{self.name}-{digest}"
+
+
+def _all_fields_except(model: type, *excluded: str) -> Tuple[str, ...]:
+    """Retorna todos los campos del modelo excepto los indicados."""
+    return tuple(f.name for f in fields(model) if f.name not in excluded)
+
+
+EXPORT_PROFILES: Dict[str, ExportProfile] = {
+    # Todas las tablas y columnas (comportamiento histórico)
+    'full': ExportProfile(name='full'),
+
+    # Todas las tablas, sin las geocercas (campo de texto más pesado)
+    'lite': ExportProfile(
+        name='lite',
+        columns={
+            'customers': _all_fields_except(Customer, 'geofence'),
+            'locations': _all_fields_except(Location, 'geofence'),
+        }
+    ),
+
+    # Pantallas de venta: clientes, productos y listas de precios
+    'pricing': ExportProfile(
+        name='pricing',
+        tables=(
+            'customers', 'products', 'list_prices',
+            'list_price_details', 'client_list_prices'
+        ),
+        columns={
+            'customers': (
+                'slug', 'name', 'code', 'type_sale', 'way_to_pay',
+                'credit_limit', 'deuda'
+            ),
+        },
+        product_scope='referenced'
+    ),
+
+    # Pantallas de cobranza: clientes, cuentas bancarias y cobranzas
+    'collections': ExportProfile(
+        name='collections',
+        tables=(
+            'customers', 'products', 'bank_accounts',
+            'cobranzas', 'cobranza_details'
+        ),
+        columns={
+            'customers': (
+                'slug', 'name', 'tel', 'email', 'code', 'way_to_pay',
+                'credit_limit', 'deuda'
+            ),
+            'products': ('sku', 'name'),
+        },
+        product_scope='referenced'
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> ExportProfile:
+    """
+    Obtiene un perfil de exportación por nombre.
+
+    Args:
+        name: Nombre del perfil (None para el perfil por defecto)
+
+    Returns:
+        Perfil de exportación
+
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    profile_name = (name or DEFAULT_PROFILE).strip().lower()
+    if profile_name not in EXPORT_PROFILES:
+        raise ValueError(
+            f"Perfil de exportación desconocido: {name}. "
+            f"Disponibles: {sorted(EXPORT_PROFILES)}"
+        )
+    return EXPORT_PROFILES[profile_name]
@@ -1,21 +1,86 @@
 """
 Lambda handler - Punto de entrada de la función Lambda.
 Orquesta la creación de dependencias y ejecuta el servicio de exportación.
+
+Arranque en frío: al cargar el módulo (fase de inicialización de Lambda) se importa
+lo que usa toda exportación (configuración, psycopg2, SQLite) y se ejecuta prime().
+Los módulos de funciones poco frecuentes (fragmentos, refrescos en segundo plano,
+invalidación, precálculo) se importan en su primer uso.
 """
 import json
 import os
 import base64
-from typing import Dict, Any
+import shutil
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Any, Callable, Optional, Tuple
 
 from config.settings import get_settings
 from utils.logger import setup_logger
 from infrastructure.postgres_repository import PostgresRepository
-from infrastructure.sqlite_builder import SQLiteBuilder
-from application.export_service import ExportService
+from infrastructure.sqlite_builder import SchemaTemplate, SQLiteBuilder
+from infrastructure.artifact_store import LocalArtifactStore
+from infrastructure.connection_pools import ConnectionPools
+from infrastructure.replica_router import ReplicaRouter
+from application.export_service import ExportService, parse_watermark
+from domain.models import Deadline, ExportResult
+from domain.interfaces import IChunkStore, IInvalidationStore, IRefreshDispatcher
+from domain.profiles import ExportProfile, get_profile
+from utils.circuit_breaker import CLOSED, CircuitBreaker
+from utils.single_flight import SingleFlight
+from utils.latency_tracker import LatencyTracker
+from utils.retry import RetryPolicy
+from utils.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from application.async_export_service import AsyncExportService
+    from application.precompute_scheduler import PrecomputeScheduler
+    from domain.interfaces import IAsyncDataRepository
+    from infrastructure.async_postgres_repository import AsyncPostgresRepository
 
 # Configurar logger
 logger = setup_logger(__name__)
 
+# Plazo mínimo para obtener los datos cuando la reserva supera el tiempo restante
+MIN_DEADLINE_BUDGET_MS = 500
+
+# Almacén de artefactos: vive en /tmp y se reutiliza mientras el contenedor siga caliente
+_artifact_store: Optional[LocalArtifactStore] = None
+
+# Almacén de fragmentos (se crea en la primera invocación que lo usa)
+_chunk_store: Optional[IChunkStore] = None
+
+# Circuit breaker de PostgreSQL y despachador de refrescos: compartidos por las
+# invocaciones del contenedor (y por los refrescos en segundo plano)
+_circuit_breaker: Optional[CircuitBreaker] = None
+_refresh_dispatcher: Optional[IRefreshDispatcher] = None
+
+# Exportaciones completas en curso por tenant y perfil (coalescencia en el contenedor)
+_export_flights = SingleFlight()
+
+# Tenants sin datos vistos recientemente (se crea en la primera invocación)
+_negative_cache: Optional[TTLCache] = None
+
+# Historial de latencias por query para el hedging (se crea en la primera invocación)
+_latency_tracker: Optional[LatencyTracker] = None
+
+# Estado de las réplicas de lectura (se crea en la primera invocación)
+_replica_router: Optional[ReplicaRouter] = None
+
+# Registro de cambios que escribe el listener de LISTEN/NOTIFY (se crea en la primera invocación)
+_invalidation_store: Optional[IInvalidationStore] = None
+
+# Esquema SQLite precreado que se copia a cada archivo nuevo
+# (se crea en prime o en la primera exportación)
+_schema_template: Optional[SchemaTemplate] = None
+
+# Pools de conexiones persistentes: solo en procesos de larga duración
+# (ver use_persistent_connections)
+_connection_pools: Optional[ConnectionPools] = None
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -30,85 +95,722 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     logger.info(f"Recibido evento: {json.dumps(event)}")
 
+    # Refresco en segundo plano lanzado por otra invocación (LambdaRefreshDispatcher)
+    if event.get('refresh'):
+        return _run_refresh(event)
+
+    # Exportación por lotes (pre-sincronización nocturna): sin archivo en la respuesta
+    if event.get('batch'):
+        return _run_batch(event)
+
     try:
         # Obtener tenant_id del path
         tenant_id = _extract_tenant_id(event)
         logger.info(f"Procesando exportación para tenant: {tenant_id}")
 
+        # Obtener perfil de exportación (tablas y columnas a incluir)
+        profile = _extract_profile(event)
+        logger.info(f"Perfil de exportación: {profile.name}")
+
+        # Marca de la última sincronización del cliente (si existe se exporta una delta)
+        since = _extract_since(event)
+
         # Cargar configuración
         settings = get_settings()
 
-        # Crear ruta temporal para el archivo SQLite
-        output_path = os.path.join(settings.temp_dir, f"database_catalog_master_{tenant_id}.sqlite")
+        # Plazo de la invocación: las queries se limitan al tiempo que queda
+        deadline = _request_deadline(context, settings)
 
-        # Crear dependencias (Inyección de Dependencias)
-        postgres_repo = _create_postgres_repository(settings)
-        sqlite_builder = SQLiteBuilder()
+        # Descargas por fragmentos que se resuelven solo con el almacén (sin exportar)
+        chunk_mode = _extract_chunk_mode(event)
+        if chunk_mode in ('chunk', 'pack'):
+            return _chunk_store_response(event, chunk_mode, settings)
 
-        # Crear servicio de exportación
-        export_service = ExportService(
-            data_repository=postgres_repo,
-            sqlite_builder=sqlite_builder
-        )
+        # Crear servicio de exportación (Inyección de Dependencias)
+        export_service = _create_export_service(settings)
+        circuit_breaker = _get_circuit_breaker(settings)
 
-        # Ejecutar exportación
-        result = export_service.export_tenant_data(tenant_id, output_path)
+        # Modo paquete: manifiesto (JSON) o una de sus partes
+        if _is_bundle_request(event):
+            if not circuit_breaker.allow_request():
+                return _unavailable_response(circuit_breaker)
+            return _bundle_response(event, tenant_id, profile, settings, export_service)
+
+        # Ejecutar exportación (completa o delta)
+        if since:
+            if not circuit_breaker.allow_request():
+                return _unavailable_response(circuit_breaker)
+            result, sqlite_data = _export_to_memory(
+                settings, tenant_id,
+                lambda path: export_service.export_tenant_delta(
+                    tenant_id, path, since, profile, deadline
+                )
+            )
+        else:
+            exported = _export_or_serve_stale(
+                event, tenant_id, profile, settings, export_service, deadline
+            )
+            if exported is None:
+                return _unavailable_response(circuit_breaker)
+            result, sqlite_data = exported
 
         # Verificar resultado
         if not result.success:
-            logger.error(f"Exportación falló: {result.error_message}")
-            return _error_response(
-                status_code=500,
-                message=result.error_message or "Error durante la exportación"
+            return export_failure_response(result, settings)
+
+        # Manifiesto de fragmentos: el cliente descarga solo lo que no tiene (ver ChunkSyncService)
+        if chunk_mode == 'manifest' and not since:
+            return _chunk_manifest_response(
+                event, tenant_id, profile, settings, result, sqlite_data
             )
 
-        # Leer archivo SQLite y convertir a base64
-        with open(output_path, 'rb') as f:
-            sqlite_data = f.read()
+        return export_response(event, tenant_id, profile, result, sqlite_data, since)
+
+    except ValueError as e:
+        logger.error(f"Error de validación: {str(e)}")
+        return _error_response(status_code=400, message=str(e))
+
+    except Exception as e:
+        logger.error(f"Error inesperado: {str(e)}", exc_info=True)
+        return _error_response(
+            status_code=500,
+            message="Error interno del servidor"
+        )
+
+
+def export_failure_response(result: ExportResult, settings) -> Dict[str, Any]:
+    """
+    Crea la respuesta de una exportación fallida: 504 (plazo agotado), 503 (sin cupo
+    de exportación), 404 (tenant sin datos) o 500.
+    """
+    logger.error(f"Exportación falló: {result.error_message}")
+    if result.timed_out:
+        # Plazo agotado sin artefacto que servir: tiempos para diagnóstico
+        logger.error(f"Tiempos de la exportación sin terminar: {result.fetch_times_by_table}")
+        return _error_response(
+            status_code=504,
+            message="La exportación no terminó a tiempo, reintente más tarde"
+        )
+    if result.overloaded:
+        return _overloaded_response(settings)
+    return _error_response(
+        status_code=404 if result.not_found else 500,
+        message=result.error_message or "Error durante la exportación"
+    )
+
+
+def export_response(
+    event: Dict[str, Any],
+    tenant_id: int,
+    profile: ExportProfile,
+    result: ExportResult,
+    sqlite_data: bytes,
+    since: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Crea la respuesta de una exportación exitosa: 304 si el cliente ya tiene el
+    mismo contenido (If-None-Match), si no 200 con el archivo en base64.
+
+    Args:
+        event: Evento de API Gateway (headers del cliente)
+        tenant_id: ID del tenant exportado
+        profile: Perfil de la exportación
+        result: Resultado de la exportación
+        sqlite_data: Contenido del archivo SQLite
+        since: Marca de la sincronización previa si la exportación es una delta
+    """
+    # Nombre del archivo para el cliente (cada construcción usa su propio archivo temporal)
+    file_name = (
+        f"database_catalog_delta_{tenant_id}.sqlite" if since
+        else f"database_catalog_master_{tenant_id}.sqlite"
+    )
+
+    # El cliente ya tiene este mismo archivo (mismo hash de contenido): 304 sin cuerpo
+    etag = f'"{result.content_hash}"' if result.content_hash else None
+    if etag and _etag_matches(_get_header(event, 'If-None-Match'), etag):
+        logger.info(f"Contenido sin cambios para el cliente (ETag {etag})")
+        return {
+            'statusCode': 304,
+            'headers': {
+                'ETag': etag,
+                'Cache-Control': 'private, no-cache, no-transform',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'ETag, X-Content-Sha256',
+                'X-Content-Sha256': result.content_hash
+            },
+            'body': ''
+        }
+
+    # Guardar el tamaño del archivo binario original y convertir a base64
+    binary_size = len(sqlite_data)
+
+    sqlite_base64 = base64.b64encode(sqlite_data).decode('utf-8')
+
+    # Retornar respuesta con archivo binario
+    # API Gateway decodificará automáticamente el base64 a binario
+    # cuando el Content-Type esté en BinaryMediaTypes
+    logger.info(f"Exportación exitosa: {result.to_dict()}")
+    response = {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/x-sqlite3',  # Tipo MIME específico para SQLite
+            'Content-Disposition': f'attachment; filename="{file_name}"',
+            'Content-Length': str(binary_size),
+            'Cache-Control': 'private, no-cache, no-transform',
+            'ETag': etag or '',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': (
+                'Content-Length, Content-Type, X-File-Size, X-Export-Profile, X-Export-Extras, '
+                'X-Sync-Mode, X-Sync-Watermark, X-Cache, X-Reused-Tables, X-Skipped-Tables, '
+                'ETag, X-Content-Sha256, Age'
+            ),
+            'X-Tenant-Id': str(tenant_id),
+            'X-Export-Profile': profile.name,
+            'X-Product-Scope': profile.product_scope,
+            'X-Export-Extras': ','.join(profile.extras),
+            'X-Sync-Mode': 'delta' if since else 'full',
+            'X-Sync-Watermark': result.sync_watermark or '',
+            'X-Content-Sha256': result.content_hash or '',
+            'X-Cache': result.cache_status or 'BYPASS',
+            'X-Reused-Tables': ','.join(result.reused_tables),
+            'X-Skipped-Tables': ','.join(result.skipped_tables),
+            'X-File-Size': str(result.file_size),
+            'X-Execution-Time-Ms': str(result.execution_time_ms),
+            'X-Postgres-Fetch-Time-Ms': str(result.postgres_fetch_time_ms),
+            'X-Sqlite-Build-Time-Ms': str(result.sqlite_build_time_ms)
+        },
+        'body': sqlite_base64,
+        'isBase64Encoded': True  # API Gateway decodificará esto a binario puro
+    }
+    # Artefacto servido sin consultar PostgreSQL: antigüedad en segundos (RFC 9111)
+    if result.cache_age_seconds is not None:
+        response['headers']['Age'] = str(result.cache_age_seconds)
+    return response
 
-        # Guardar el tamaño del archivo binario original
-        binary_size = len(sqlite_data)
 
-        sqlite_base64 = base64.b64encode(sqlite_data).decode('utf-8')
+def circuit_open_response(settings) -> Optional[Dict[str, Any]]:
+    """
+    Respuesta 503 con Retry-After si el circuito de PostgreSQL no admite una exportación
+    (ver src/async_server.py).
+
+    Returns:
+        Respuesta 503, o None si la exportación puede consultar PostgreSQL
+    """
+    circuit_breaker = _get_circuit_breaker(settings)
+    if circuit_breaker.allow_request():
+        return None
+    return _unavailable_response(circuit_breaker)
+
+
+def parse_full_export(event: Dict[str, Any]) -> Optional[Tuple[int, ExportProfile]]:
+    """
+    Obtiene el tenant y el perfil de un evento de exportación completa (ver src/async_server.py).
+
+    Returns:
+        Tupla (tenant_id, perfil), o None si el evento pide una delta, un paquete o fragmentos
+
+    Raises:
+        ValueError: Si el tenant_id o el perfil son inválidos
+    """
+    if _extract_since(event) or _is_bundle_request(event) or _extract_chunk_mode(event):
+        return None
+    return _extract_tenant_id(event), _extract_profile(event)
+
+
+def _export_to_memory(
+    settings,
+    tenant_id: int,
+    export_fn: Callable[[str], Optional[ExportResult]]
+) -> Tuple[Optional[ExportResult], Optional[bytes]]:
+    """
+    Ejecuta una exportación sobre un archivo temporal único y retorna su contenido.
+    Cada construcción usa su propio archivo: exportaciones concurrentes del mismo
+    tenant (otra invocación, un refresco en segundo plano) no se pisan.
+
+    Args:
+        settings: Configuración de la aplicación
+        tenant_id: ID del tenant (prefijo del archivo temporal)
+        export_fn: Función que exporta a la ruta recibida (puede retornar None)
 
-        # Limpiar archivo temporal
+    Returns:
+        Tupla (resultado, bytes del archivo); bytes es None si no hubo archivo
+    """
+    fd, output_path = tempfile.mkstemp(
+        prefix=f"database_catalog_{tenant_id}_", suffix='.sqlite', dir=settings.temp_dir
+    )
+    os.close(fd)
+    try:
+        result = export_fn(output_path)
+        if result is None or not result.success:
+            return result, None
+        with open(output_path, 'rb') as f:
+            return result, f.read()
+    finally:
         if os.path.exists(output_path):
             os.remove(output_path)
-            logger.info(f"Archivo temporal eliminado: {output_path}")
 
-        # Retornar respuesta con archivo binario
-        # API Gateway decodificará automáticamente el base64 a binario
-        # cuando el Content-Type esté en BinaryMediaTypes
-        logger.info(f"Exportación exitosa: {result.to_dict()}")
+
+def _coalesced_export(
+    tenant_id: int,
+    profile: ExportProfile,
+    settings,
+    export_service: ExportService,
+    deadline: Optional[Deadline] = None
+) -> Tuple[ExportResult, Optional[bytes]]:
+    """
+    Exportación completa con coalescencia en el contenedor: las solicitudes concurrentes
+    del mismo tenant y perfil (incluido un refresco en segundo plano) comparten una
+    sola construcción y reciben el mismo resultado (con el plazo de la primera).
+    Entre contenedores coordina el advisory lock del tenant (ver ExportService).
+    """
+    (result, sqlite_data), shared = _export_flights.do(
+        f"{tenant_id}_{profile.cache_key()}",
+        lambda: _export_to_memory(
+            settings, tenant_id,
+            lambda path: export_service.export_tenant_data(tenant_id, path, profile, deadline)
+        )
+    )
+    if shared:
+        logger.info(f"Exportación de tenant {tenant_id} compartida con otra solicitud en curso")
+    return result, sqlite_data
+
+
+def _export_or_serve_stale(
+    event: Dict[str, Any],
+    tenant_id: int,
+    profile: ExportProfile,
+    settings,
+    export_service: ExportService,
+    deadline: Optional[Deadline] = None
+) -> Optional[Tuple[ExportResult, Optional[bytes]]]:
+    """
+    Exportación completa con stale-while-revalidate y circuit breaker.
+
+    1. Un artefacto con antigüedad <= artifact_max_stale_seconds se sirve de inmediato;
+       si tiene más de artifact_revalidate_after_seconds se refresca en segundo plano.
+    2. Con el circuito abierto no se consulta PostgreSQL: se sirve el artefacto si tiene
+       hasta circuit_breaker_max_stale_seconds.
+    3. Si la exportación falla (incluidos el plazo agotado y la falta de cupo de
+       exportación), también se sirve el artefacto dentro de ese margen.
+
+    Returns:
+        Tupla (resultado, bytes del archivo), o None si el circuito está abierto y no
+        hay artefacto que servir
+    """
+    circuit_breaker = _get_circuit_breaker(settings)
+    max_stale_seconds = settings.artifact_max_stale_seconds
+    if circuit_breaker.state != CLOSED:
+        max_stale_seconds = max(max_stale_seconds, settings.circuit_breaker_max_stale_seconds)
+
+    if max_stale_seconds > 0:
+        result, sqlite_data = _export_to_memory(
+            settings, tenant_id,
+            lambda path: export_service.export_from_cache(
+                tenant_id, path, profile, max_stale_seconds
+            )
+        )
+        if result:
+            if (
+                result.cache_age_seconds >= settings.artifact_revalidate_after_seconds
+                and circuit_breaker.allow_request()
+            ):
+                _dispatch_refresh(event, tenant_id, profile, settings)
+            return result, sqlite_data
+
+    if not circuit_breaker.allow_request():
+        logger.warning(f"Circuito de PostgreSQL abierto y sin artefacto para tenant {tenant_id}")
+        return None
+
+    result, sqlite_data = _coalesced_export(tenant_id, profile, settings, export_service, deadline)
+    serve_stale = settings.circuit_breaker_max_stale_seconds > 0
+    if not result.success and not result.not_found and serve_stale:
+        stale_result, stale_data = _export_to_memory(
+            settings, tenant_id,
+            lambda path: export_service.export_from_cache(
+                tenant_id, path, profile, settings.circuit_breaker_max_stale_seconds
+            )
+        )
+        if stale_result:
+            logger.warning(
+                f"Exportación fallida ({result.error_message}): "
+                f"se sirve el artefacto de hace {stale_result.cache_age_seconds}s"
+            )
+            return stale_result, stale_data
+    return result, sqlite_data
+
+
+def _dispatch_refresh(
+    event: Dict[str, Any],
+    tenant_id: int,
+    profile: ExportProfile,
+    settings
+) -> None:
+    """
+    Lanza el refresco del artefacto en segundo plano.
+    Un fallo al lanzarlo no afecta la respuesta (el artefacto ya se está sirviendo).
+    """
+    refresh_event = {
+        'refresh': True,
+        'pathParameters': event.get('pathParameters'),
+        'queryStringParameters': event.get('queryStringParameters'),
+        'headers': {
+            key: value for key, value in (event.get('headers') or {}).items()
+            if key.lower() == 'x-export-profile'
+        }
+    }
+    try:
+        _get_refresh_dispatcher(settings).dispatch(
+            f"{tenant_id}_{profile.cache_key()}", refresh_event
+        )
+    except Exception as e:
+        logger.warning(f"No se pudo lanzar el refresco del tenant {tenant_id}: {e}")
+
+
+def _run_refresh(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reconstruye el artefacto de un tenant y perfil sin responder el archivo.
+    Se coalesce con las exportaciones en primer plano del mismo tenant y perfil.
+    """
+    try:
+        tenant_id = _extract_tenant_id(event)
+        profile = _extract_profile(event)
+        settings = get_settings()
+
+        result, _ = _coalesced_export(
+            tenant_id, profile, settings, _create_export_service(settings)
+        )
+        logger.info(
+            f"Refresco de tenant {tenant_id} ({profile.name}): "
+            f"success={result.success}, cache={result.cache_status}, {result.execution_time_ms}ms"
+        )
+        return {
+            'statusCode': 200 if result.success else 500,
+            'body': json.dumps({
+                'success': result.success,
+                'cache_status': result.cache_status,
+                'content_hash': result.content_hash,
+                'error': result.error_message
+            })
+        }
+
+    except Exception as e:
+        logger.error(f"Error en el refresco: {str(e)}", exc_info=True)
+        return _error_response(status_code=500, message=str(e))
+
+
+def _run_batch(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Exporta un lote de tenants compartiendo las queries (ver ExportService.export_tenants_batch).
+    Los archivos quedan en el almacén de artefactos; la respuesta resume cada tenant.
+
+    Evento:
+        batch: true
+        tenant_ids: lista de IDs de tenants (hasta batch_max_tenants)
+        queryStringParameters / headers: perfil, igual que una exportación (opcional)
+    """
+    try:
+        settings = get_settings()
+        tenant_ids = [int(tenant_id) for tenant_id in event.get('tenant_ids') or []]
+        if not tenant_ids or any(tenant_id <= 0 for tenant_id in tenant_ids):
+            raise ValueError("tenant_ids debe ser una lista de enteros positivos")
+        if len(tenant_ids) > settings.batch_max_tenants:
+            raise ValueError(f"Máximo {settings.batch_max_tenants} tenants por lote")
+        profile = _extract_profile(event)
+    except (ValueError, TypeError) as e:
+        return _error_response(status_code=400, message=str(e))
+
+    output_dir = tempfile.mkdtemp(prefix="batch_", dir=settings.temp_dir)
+    try:
+        results = _create_export_service(settings).export_tenants_batch(
+            tenant_ids, output_dir, profile, settings.batch_build_workers
+        )
+        summary = {
+            str(tenant_id): {
+                'success': result.success,
+                'not_found': result.not_found,
+                'cache_status': result.cache_status,
+                'content_hash': result.content_hash,
+                'file_size': result.file_size,
+                'records_exported': result.records_exported,
+                'error': result.error_message
+            }
+            for tenant_id, result in results.items()
+        }
+        failed = [
+            tenant_id for tenant_id, result in results.items()
+            if not result.success and not result.not_found
+        ]
+        logger.info(f"Lote de {len(results)} tenants ({profile.name}): {len(failed)} con error")
+        return {
+            'statusCode': 500 if failed else 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'profile': profile.name, 'tenants': summary})
+        }
+
+    except Exception as e:
+        logger.error(f"Error en la exportación por lotes: {str(e)}", exc_info=True)
+        return _error_response(status_code=500, message=str(e))
+
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def create_precompute_scheduler(settings) -> 'PrecomputeScheduler':
+    """Crea el planificador de precálculo sobre el almacén de artefactos (ver src/precompute.py)."""
+    from application.precompute_scheduler import PrecomputeScheduler
+    return PrecomputeScheduler(
+        export_service=_create_export_service(settings),
+        data_repository=_create_postgres_repository(settings),
+        freshness_seconds=settings.precompute_freshness_seconds,
+        max_workers=settings.precompute_max_workers
+    )
+
+
+def precompute_tenant(tenant_id: int, profile_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Exporta un tenant al almacén de artefactos sin responder el archivo.
+    Se ejecuta en un proceso del planificador de precálculo (PrecomputeScheduler.run).
+    """
+    settings = get_settings()
+    profile = get_profile(profile_name)
+    result, _ = _coalesced_export(tenant_id, profile, settings, _create_export_service(settings))
+    return {
+        'success': result.success,
+        'cache_status': result.cache_status,
+        'content_hash': result.content_hash,
+        'execution_time_ms': result.execution_time_ms,
+        'error': result.error_message
+    }
+
+
+def _is_bundle_request(event: Dict[str, Any]) -> bool:
+    """Indica si se pidió el modo paquete (queryStringParameters['bundle'])."""
+    query_params = event.get('queryStringParameters') or {}
+    return str(query_params.get('bundle', '')).strip().lower() in ('1', 'true', 'yes')
+
+
+def _bundle_response(
+    event: Dict[str, Any],
+    tenant_id: int,
+    profile: ExportProfile,
+    settings,
+    export_service: ExportService
+) -> Dict[str, Any]:
+    """
+    Atiende el modo paquete.
+
+    Sin `part` retorna el manifiesto (partes con archivo, tamaño y SHA-256). Con
+    `part=<nombre>` retorna esa parte; cada parte se pide en un request separado,
+    así el cliente las descarga en paralelo y abre la app en cuanto llega `core`.
+    Con caché de artefactos, cada request reutiliza el archivo completo sin volver a
+    consultar tablas sin cambios, y las partes son byte-reproducibles: el hash del
+    manifiesto coincide con el de la parte descargada mientras los datos no cambien.
+
+    Query params:
+        bundle: true
+        parts: entidades separadas del núcleo, separadas por comas (opcional)
+        part: nombre de la parte a descargar (opcional)
+    """
+    query_params = event.get('queryStringParameters') or {}
+    part_entities = None
+    if query_params.get('parts'):
+        part_entities = [p.strip().lower() for p in query_params['parts'].split(',') if p.strip()]
+    part_name = query_params.get('part')
+
+    output_dir = tempfile.mkdtemp(prefix=f"bundle_{tenant_id}_", dir=settings.temp_dir)
+    try:
+        result = export_service.export_tenant_bundle(tenant_id, output_dir, profile, part_entities)
+        if not result.success:
+            logger.error(f"Exportación de paquete falló: {result.error_message}")
+            if result.overloaded:
+                return _overloaded_response(settings)
+            return _error_response(
+                status_code=404 if result.not_found else 500,
+                message=result.error_message or "Error durante la exportación"
+            )
+
+        parts = result.bundle['parts']
+        if not part_name:
+            logger.info(f"Manifiesto de paquete: {result.to_dict()}")
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Cache-Control': 'private, no-cache, no-transform',
+                    'Access-Control-Allow-Origin': '*',
+                    'X-Tenant-Id': str(tenant_id),
+                    'X-Export-Profile': profile.name,
+                    'X-Sync-Watermark': result.sync_watermark or ''
+                },
+                'body': json.dumps(result.bundle)
+            }
+
+        part = next((p for p in parts if p['name'] == part_name), None)
+        if part is None:
+            raise ValueError(
+                f"Parte desconocida: {part_name}. Disponibles: {[p['name'] for p in parts]}"
+            )
+
+        etag = f'"{part["sha256"]}"'
+        if _etag_matches(_get_header(event, 'If-None-Match'), etag):
+            return {
+                'statusCode': 304,
+                'headers': {'ETag': etag, 'Access-Control-Allow-Origin': '*'},
+                'body': ''
+            }
+
+        with open(os.path.join(output_dir, part['file']), 'rb') as f:
+            part_data = f.read()
+
         return {
             'statusCode': 200,
             'headers': {
-                'Content-Type': 'application/x-sqlite3',  # Tipo MIME específico para SQLite
-                'Content-Disposition': f'attachment; filename="database_catalog_master_{tenant_id}.sqlite"',
-                'Content-Length': str(binary_size),
-                'Cache-Control': 'no-cache, no-store, no-transform',
+                'Content-Type': 'application/x-sqlite3',
+                'Content-Disposition': f'attachment; filename="{part["file"]}"',
+                'Content-Length': str(len(part_data)),
+                'Cache-Control': 'private, no-cache, no-transform',
+                'ETag': etag,
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Expose-Headers': 'Content-Length, Content-Type, X-File-Size',
+                'Access-Control-Expose-Headers': (
+                    'Content-Length, ETag, X-Content-Sha256, X-Bundle-Part'
+                ),
                 'X-Tenant-Id': str(tenant_id),
-                'X-File-Size': str(result.file_size),
-                'X-Execution-Time-Ms': str(result.execution_time_ms),
-                'X-Postgres-Fetch-Time-Ms': str(result.postgres_fetch_time_ms),
-                'X-Sqlite-Build-Time-Ms': str(result.sqlite_build_time_ms)
+                'X-Bundle-Part': part['name'],
+                'X-Content-Sha256': part['sha256']
             },
-            'body': sqlite_base64,
-            'isBase64Encoded': True  # API Gateway decodificará esto a binario puro
+            'body': base64.b64encode(part_data).decode('utf-8'),
+            'isBase64Encoded': True
         }
 
-    except ValueError as e:
-        logger.error(f"Error de validación: {str(e)}")
-        return _error_response(status_code=400, message=str(e))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def _extract_chunk_mode(event: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrae el modo de descarga por fragmentos.
+
+    Returns:
+        'chunk' (?chunk=<id>), 'manifest' o 'pack' (?chunks=...), o None
+
+    Raises:
+        ValueError: Si el modo no es válido
+    """
+    query_params = event.get('queryStringParameters') or {}
+    if query_params.get('chunk'):
+        return 'chunk'
+    mode = query_params.get('chunks')
+    if not mode:
+        return None
+    mode = mode.strip().lower()
+    if mode not in ('manifest', 'pack'):
+        raise ValueError(f"Modo de fragmentos inválido: {mode}. Valores permitidos: manifest, pack")
+    return mode
+
+
+def _chunk_manifest_response(
+    event: Dict[str, Any],
+    tenant_id: int,
+    profile: ExportProfile,
+    settings,
+    result,
+    sqlite_data: bytes
+) -> Dict[str, Any]:
+    """
+    Publica el archivo exportado en el almacén de fragmentos y retorna su manifiesto,
+    con el plan de descarga frente al archivo previo del cliente.
+
+    Query params / headers:
+        base | X-Previous-Manifest: hash de contenido del archivo que ya tiene el cliente
+    """
+    query_params = event.get('queryStringParameters') or {}
+    base_hash = query_params.get('base') or _get_header(event, 'X-Previous-Manifest')
+
+    fd, output_path = tempfile.mkstemp(
+        prefix=f"chunks_{tenant_id}_", suffix='.sqlite', dir=settings.temp_dir
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(sqlite_data)
+        from application.chunk_sync_service import ChunkSyncService
+        chunk_service = ChunkSyncService(_get_chunk_store(settings))
+        manifest = chunk_service.publish(output_path, result.content_hash)
+        plan = chunk_service.plan(manifest, base_hash)
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    logger.info(
+        f"Manifiesto de fragmentos para tenant {tenant_id}: {len(manifest['chunks'])} fragmentos, "
+        f"{len(plan['missing'])} faltantes ({plan['missing_bytes']} bytes), "
+        f"{plan['reused_bytes']} bytes reutilizados"
+    )
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Cache-Control': 'private, no-cache, no-transform',
+            'ETag': f'"{result.content_hash}"',
+            'Access-Control-Allow-Origin': '*',
+            'X-Tenant-Id': str(tenant_id),
+            'X-Export-Profile': profile.name,
+            'X-Sync-Watermark': result.sync_watermark or ''
+        },
+        'body': json.dumps({
+            'manifest': manifest,
+            'plan': plan,
+            'sync_watermark': result.sync_watermark
+        })
+    }
 
-    except Exception as e:
-        logger.error(f"Error inesperado: {str(e)}", exc_info=True)
-        return _error_response(
-            status_code=500,
-            message="Error interno del servidor"
-        )
+
+def _chunk_store_response(event: Dict[str, Any], mode: str, settings) -> Dict[str, Any]:
+    """
+    Atiende las descargas que se resuelven solo con el almacén de fragmentos.
+
+    - ?chunk=<id>: un fragmento (inmutable, cacheable por CDN y compartido entre tenants)
+    - ?chunks=pack&target=<hash>[&base=<hash>]: los fragmentos faltantes del archivo
+      `target` frente a `base`, concatenados en el orden del plan
+    """
+    from application.chunk_sync_service import ChunkSyncService
+    query_params = event.get('queryStringParameters') or {}
+    chunk_service = ChunkSyncService(_get_chunk_store(settings))
+
+    if mode == 'chunk':
+        chunk_id = query_params['chunk'].strip().lower()
+        data = chunk_service.chunk_store.get_chunk(chunk_id)
+        if data is None:
+            return _error_response(status_code=404, message=f"Fragmento no encontrado: {chunk_id}")
+        cache_control = 'public, max-age=31536000, immutable'
+        content_hash = chunk_id
+    else:
+        target_hash = (query_params.get('target') or '').strip().lower()
+        if not target_hash:
+            raise ValueError("target es requerido para descargar un paquete de fragmentos")
+        manifest = chunk_service.get_manifest(target_hash)
+        if manifest is None:
+            return _error_response(
+                status_code=404, message=f"Manifiesto no encontrado: {target_hash}"
+            )
+        base_hash = query_params.get('base') or _get_header(event, 'X-Previous-Manifest')
+        plan = chunk_service.plan(manifest, base_hash)
+        data = chunk_service.read_pack(plan['missing'])
+        cache_control = 'private, max-age=3600'
+        content_hash = target_hash
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(len(data)),
+            'Cache-Control': cache_control,
+            'ETag': f'"{content_hash}"',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Content-Length, ETag'
+        },
+        'body': base64.b64encode(data).decode('utf-8'),
+        'isBase64Encoded': True
+    }
 
 
 def _extract_tenant_id(event: Dict[str, Any]) -> int:
@@ -143,6 +845,97 @@ def _extract_tenant_id(event: Dict[str, Any]) -> int:
         raise ValueError(f"tenant_id inválido: {tenant_id_str}")
 
 
+def _get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """
+    Obtiene un header del evento sin distinguir mayúsculas/minúsculas.
+
+    Args:
+        event: Evento de Lambda
+        name: Nombre del header
+
+    Returns:
+        Valor del header o None si no existe
+    """
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si el header If-None-Match del cliente incluye el ETag actual.
+
+    Args:
+        if_none_match: Valor del header (lista separada por comas, '*' o None)
+        etag: ETag del archivo generado
+
+    Returns:
+        True si el cliente ya tiene este contenido
+    """
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    # Se ignora el prefijo de ETag débil (W/): el hash identifica el contenido exacto
+    return '*' in candidates or etag in [c[2:] if c.startswith('W/') else c for c in candidates]
+
+
+def _extract_profile(event: Dict[str, Any]) -> ExportProfile:
+    """
+    Extrae el perfil de exportación del evento.
+    Se lee de queryStringParameters['profile'] o del header X-Export-Profile.
+    queryStringParameters['products'] (catalog | referenced) sobrescribe el
+    alcance del catálogo de productos del perfil, y queryStringParameters['extras']
+    (lista separada por comas, ej: search) sus estructuras derivadas.
+
+    Args:
+        event: Evento de Lambda
+
+    Returns:
+        Perfil de exportación (perfil por defecto si no se indica)
+
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    query_params = event.get('queryStringParameters') or {}
+    profile_name = query_params.get('profile') or _get_header(event, 'X-Export-Profile')
+    profile = get_profile(profile_name)
+
+    product_scope = query_params.get('products')
+    if product_scope:
+        profile = replace(profile, product_scope=product_scope.strip().lower())
+
+    extras = query_params.get('extras')
+    if extras is not None:
+        profile = replace(
+            profile,
+            extras=tuple(e.strip().lower() for e in extras.split(',') if e.strip())
+        )
+
+    return profile
+
+
+def _extract_since(event: Dict[str, Any]) -> Optional[datetime]:
+    """
+    Extrae la marca de la última sincronización del cliente.
+    Se lee de queryStringParameters['since'] o del header X-Sync-Since, con el
+    valor recibido en X-Sync-Watermark de la sincronización anterior.
+
+    Args:
+        event: Evento de Lambda
+
+    Returns:
+        Marca de sincronización o None para una exportación completa
+
+    Raises:
+        ValueError: Si la marca no es válida
+    """
+    query_params = event.get('queryStringParameters') or {}
+    since = query_params.get('since') or _get_header(event, 'X-Sync-Since')
+    return parse_watermark(since) if since else None
+
+
 def _create_postgres_repository(settings) -> PostgresRepository:
     """
     Crea una instancia del repositorio de PostgreSQL.
@@ -158,10 +951,426 @@ def _create_postgres_repository(settings) -> PostgresRepository:
         port=settings.postgres_port,
         database=settings.postgres_database,
         user=settings.postgres_user,
-        password=settings.postgres_password
+        password=settings.postgres_password,
+        pool_max_connections=settings.postgres_pool_max_connections,
+        latency_tracker=_get_latency_tracker(settings),
+        hedge_percentile=settings.query_hedge_percentile,
+        replica_router=_get_replica_router(settings),
+        retry_policy=RetryPolicy(
+            max_retries=settings.query_max_retries,
+            base_delay_seconds=settings.query_retry_base_delay_ms / 1000,
+            max_delay_seconds=settings.query_retry_max_delay_ms / 1000
+        ) if settings.query_max_retries > 0 else None,
+        connection_pools=_connection_pools
     )
 
 
+def _get_replica_router(settings) -> Optional[ReplicaRouter]:
+    """
+    Obtiene el selector de réplicas del contenedor (se crea en la primera invocación
+    y conserva el estado de los sondeos entre invocaciones).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de ReplicaRouter, o None sin réplicas configuradas
+    """
+    global _replica_router
+    endpoints = settings.replica_endpoints()
+    if not endpoints:
+        return None
+    if _replica_router is None:
+        _replica_router = ReplicaRouter(
+            endpoints,
+            connect_kwargs={
+                'database': settings.postgres_database,
+                'user': settings.postgres_user,
+                'password': settings.postgres_password,
+                'sslmode': 'prefer'
+            },
+            max_lag_seconds=settings.replica_max_lag_seconds,
+            probe_interval_seconds=settings.replica_probe_interval_seconds
+        )
+    return _replica_router
+
+
+def _get_latency_tracker(settings) -> Optional[LatencyTracker]:
+    """
+    Obtiene el historial de latencias por query del contenedor (se crea en la primera
+    invocación). Es la base del hedging: solo existe con pool y hedging activados.
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de LatencyTracker, o None sin hedging
+    """
+    global _latency_tracker
+    if not settings.query_hedge_enabled or settings.postgres_pool_max_connections <= 0:
+        return None
+    if _latency_tracker is None:
+        _latency_tracker = LatencyTracker(min_samples=settings.query_hedge_min_samples)
+    return _latency_tracker
+
+
+def _get_artifact_store(settings) -> Optional[LocalArtifactStore]:
+    """
+    Obtiene el almacén de artefactos del contenedor (se crea en la primera invocación).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de LocalArtifactStore, o None si la caché está deshabilitada
+    """
+    global _artifact_store
+    if not settings.artifact_cache_enabled:
+        return None
+    if _artifact_store is None:
+        root_dir = settings.artifact_cache_dir or os.path.join(settings.temp_dir, 'artifacts')
+        _artifact_store = LocalArtifactStore(root_dir)
+    return _artifact_store
+
+
+def get_invalidation_store(settings) -> Optional[IInvalidationStore]:
+    """
+    Obtiene el registro de cambios del contenedor (se crea en la primera invocación).
+    Lo comparten las exportaciones y el listener (src/listen_invalidations.py).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de LocalInvalidationStore, o None si la invalidación está deshabilitada
+    """
+    global _invalidation_store
+    if not settings.invalidation_enabled:
+        return None
+    if _invalidation_store is None:
+        from infrastructure.invalidation_store import LocalInvalidationStore
+        root_dir = settings.invalidation_dir or os.path.join(settings.temp_dir, 'invalidation')
+        _invalidation_store = LocalInvalidationStore(root_dir)
+    return _invalidation_store
+
+
+def use_persistent_connections(
+    settings,
+    min_connections: Optional[int] = None,
+    max_connections: Optional[int] = None
+) -> ConnectionPools:
+    """
+    Activa los pools de conexiones persistentes del proceso: las exportaciones
+    siguientes toman sus conexiones de ellos y las devuelven al terminar. Para
+    procesos de larga duración (ver src/server.py) y, con
+    lambda_persistent_connections, para los contenedores de Lambda (ver prime);
+    si no, cada invocación conecta y desconecta.
+
+    Args:
+        settings: Configuración de la aplicación
+        min_connections: Conexiones que se conservan abiertas (None = server_pool_min_connections)
+        max_connections: Conexiones máximas por endpoint (None = server_pool_max_connections)
+
+    Returns:
+        Pools del proceso (close_all al terminar)
+    """
+    global _connection_pools
+    if _connection_pools is None:
+        if min_connections is None:
+            min_connections = settings.server_pool_min_connections
+        if max_connections is None:
+            max_connections = settings.server_pool_max_connections
+        _connection_pools = ConnectionPools(
+            min_connections=min_connections,
+            max_connections=max_connections,
+            validate_idle_seconds=settings.pool_validate_idle_seconds
+        )
+    return _connection_pools
+
+
+def prime(settings=None) -> None:
+    """
+    Trabajo único de arranque, fuera de la primera invocación: en Lambda se ejecuta
+    al cargar el módulo (fase de inicialización, sin cobrarse a ningún request).
+
+    - lee y valida la configuración (get_settings la conserva)
+    - crea el esquema SQLite precreado
+    - con lambda_persistent_connections, abre la conexión al primario (y elige
+      réplica), que el contenedor conserva entre invocaciones
+
+    Con init_priming_enabled=False solo se lee la configuración. Un error no se
+    propaga: la primera invocación lo repite y lo responde.
+
+    Args:
+        settings: Configuración de la aplicación (None = get_settings())
+    """
+    start = time.time()
+    try:
+        settings = settings or get_settings()
+        if not settings.init_priming_enabled:
+            return
+        _get_schema_template()
+        if settings.lambda_persistent_connections:
+            # Una exportación a la vez por contenedor: la principal más las de lectura
+            use_persistent_connections(
+                settings,
+                min_connections=1,
+                max_connections=settings.postgres_pool_max_connections + 1
+            )
+            repository = _create_postgres_repository(settings)
+            repository.connect()
+            repository.disconnect()
+    except Exception as e:
+        logger.warning(
+            f"Inicialización anticipada incompleta (se reintenta en la primera invocación): {e}"
+        )
+        return
+    logger.info(f"Inicialización anticipada en {int((time.time() - start) * 1000)}ms")
+
+
+def health_status(settings) -> Dict[str, Any]:
+    """Estado del proceso para el health check del servidor (ver src/server.py)."""
+    return {
+        'status': 'ok',
+        'circuit_breaker': _get_circuit_breaker(settings).state,
+        'persistent_connections': _connection_pools is not None
+    }
+
+
+def _get_schema_template() -> SchemaTemplate:
+    """Obtiene el esquema SQLite precreado del proceso (se crea en la primera exportación)."""
+    global _schema_template
+    if _schema_template is None:
+        _schema_template = SchemaTemplate()
+    return _schema_template
+
+
+def _create_export_service(settings) -> ExportService:
+    """
+    Crea el servicio de exportación con sus dependencias.
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de ExportService
+    """
+    schema_template = _get_schema_template()
+    return ExportService(
+        data_repository=_create_postgres_repository(settings),
+        sqlite_builder=SQLiteBuilder(schema_template),
+        artifact_store=_get_artifact_store(settings),
+        circuit_breaker=_get_circuit_breaker(settings),
+        tenant_lock_timeout_seconds=settings.tenant_lock_timeout_seconds,
+        negative_cache=_get_negative_cache(settings),
+        max_concurrent_exports=settings.export_max_concurrency,
+        export_slot_wait_seconds=settings.export_slot_wait_seconds,
+        sqlite_builder_factory=partial(SQLiteBuilder, schema_template),
+        invalidation_store=get_invalidation_store(settings),
+        invalidation_max_heartbeat_age_seconds=settings.invalidation_max_heartbeat_age_seconds
+    )
+
+
+def create_async_repository(settings) -> 'AsyncPostgresRepository':
+    """
+    Crea el repositorio asíncrono de PostgreSQL del servidor asíncrono (ver
+    src/async_server.py), que lo abre al arrancar y lo cierra al terminar.
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de AsyncPostgresRepository (sin abrir)
+    """
+    from infrastructure.async_postgres_repository import AsyncPostgresRepository
+    return AsyncPostgresRepository(
+        host=settings.postgres_host,
+        port=settings.postgres_port,
+        database=settings.postgres_database,
+        user=settings.postgres_user,
+        password=settings.postgres_password,
+        min_connections=settings.async_pool_min_connections,
+        max_connections=settings.async_pool_max_connections,
+        query_timeout_seconds=settings.async_query_timeout_seconds,
+        retry_policy=RetryPolicy(
+            max_retries=settings.query_max_retries,
+            base_delay_seconds=settings.query_retry_base_delay_ms / 1000,
+            max_delay_seconds=settings.query_retry_max_delay_ms / 1000
+        ) if settings.query_max_retries > 0 else None
+    )
+
+
+def create_async_export_service(
+    settings, data_repository: 'IAsyncDataRepository'
+) -> 'AsyncExportService':
+    """
+    Crea el servicio de exportación asíncrono. Comparte con lambda_handler el almacén
+    de artefactos, la caché negativa, el circuit breaker, el registro de cambios, el
+    esquema precreado y el límite de exportaciones del clúster.
+
+    Args:
+        settings: Configuración de la aplicación
+        data_repository: Repositorio asíncrono (ver create_async_repository)
+
+    Returns:
+        Instancia de AsyncExportService (close al terminar)
+    """
+    from application.async_export_service import AsyncExportService
+    return AsyncExportService(
+        data_repository=data_repository,
+        sqlite_builder_factory=partial(SQLiteBuilder, _get_schema_template()),
+        artifact_store=_get_artifact_store(settings),
+        circuit_breaker=_get_circuit_breaker(settings),
+        negative_cache=_get_negative_cache(settings),
+        build_workers=settings.async_build_workers,
+        max_concurrent_exports=settings.export_max_concurrency,
+        export_slot_wait_seconds=settings.export_slot_wait_seconds,
+        invalidation_store=get_invalidation_store(settings),
+        invalidation_max_heartbeat_age_seconds=settings.invalidation_max_heartbeat_age_seconds
+    )
+
+
+def _get_negative_cache(settings) -> Optional[TTLCache]:
+    """
+    Obtiene la caché negativa del contenedor (se crea en la primera invocación).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de TTLCache, o None si negative_cache_ttl_seconds es 0
+    """
+    global _negative_cache
+    if settings.negative_cache_ttl_seconds <= 0:
+        return None
+    if _negative_cache is None:
+        _negative_cache = TTLCache(ttl_seconds=settings.negative_cache_ttl_seconds)
+    return _negative_cache
+
+
+def _get_circuit_breaker(settings) -> CircuitBreaker:
+    """
+    Obtiene el circuit breaker de PostgreSQL del contenedor (se crea en la primera invocación).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Instancia de CircuitBreaker
+    """
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=settings.circuit_breaker_failure_rate,
+            window_size=settings.circuit_breaker_window,
+            min_calls=settings.circuit_breaker_min_calls,
+            open_seconds=settings.circuit_breaker_open_seconds
+        )
+    return _circuit_breaker
+
+
+def _get_refresh_dispatcher(settings) -> IRefreshDispatcher:
+    """
+    Obtiene el despachador de refrescos del contenedor (se crea en la primera invocación).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        LambdaRefreshDispatcher o ThreadRefreshDispatcher según refresh_backend
+        (ThreadRefreshDispatcher si no hay función a la que invocar, ej: en local)
+    """
+    global _refresh_dispatcher
+    if _refresh_dispatcher is None:
+        from infrastructure.refresh_dispatcher import (
+            LambdaRefreshDispatcher, ThreadRefreshDispatcher
+        )
+        function_name = (
+            settings.refresh_function_name or os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+        )
+        if settings.refresh_backend == 'lambda' and not function_name:
+            logger.warning(
+                "REFRESH_BACKEND=lambda sin REFRESH_FUNCTION_NAME ni AWS_LAMBDA_FUNCTION_NAME: "
+                "los refrescos se ejecutan en un hilo del proceso"
+            )
+        if settings.refresh_backend == 'lambda' and function_name:
+            _refresh_dispatcher = LambdaRefreshDispatcher(
+                function_name=function_name,
+                min_interval_seconds=settings.artifact_revalidate_after_seconds
+            )
+        else:
+            _refresh_dispatcher = ThreadRefreshDispatcher(_run_refresh)
+    return _refresh_dispatcher
+
+
+def _get_chunk_store(settings) -> IChunkStore:
+    """
+    Obtiene el almacén de fragmentos del contenedor (se crea en la primera invocación).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        LocalChunkStore o S3ChunkStore según chunk_store_backend
+    """
+    global _chunk_store
+    if _chunk_store is None:
+        from infrastructure.chunk_store import LocalChunkStore, S3ChunkStore
+        if settings.chunk_store_backend == 's3':
+            _chunk_store = S3ChunkStore(
+                bucket=settings.chunk_store_bucket,
+                prefix=settings.chunk_store_prefix,
+                endpoint_url=settings.chunk_store_endpoint_url or None
+            )
+        else:
+            root_dir = settings.chunk_store_dir or os.path.join(settings.temp_dir, 'chunks')
+            _chunk_store = LocalChunkStore(root_dir)
+    return _chunk_store
+
+
+def _request_deadline(context: Any, settings) -> Optional[Deadline]:
+    """
+    Calcula el plazo para obtener los datos: el tiempo restante de la invocación
+    menos deadline_reserve_ms. Sin contexto de Lambda (ej: ejecución local) no hay plazo.
+    Si la reserva deja menos de MIN_DEADLINE_BUDGET_MS, se achica la reserva (el plazo
+    no pasa de la mitad del tiempo restante): con un plazo negativo toda exportación
+    fallaría antes de empezar.
+    """
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        return None
+    remaining_ms = get_remaining()
+    budget_ms = remaining_ms - settings.deadline_reserve_ms
+    if budget_ms < MIN_DEADLINE_BUDGET_MS:
+        budget_ms = max(0, min(MIN_DEADLINE_BUDGET_MS, remaining_ms // 2))
+        logger.warning(
+            f"Quedan {remaining_ms}ms para una reserva de {settings.deadline_reserve_ms}ms: "
+            f"se achica la reserva"
+        )
+    logger.info(f"Plazo para obtener los datos: {budget_ms}ms")
+    return Deadline.after(budget_ms / 1000)
+
+
+def _unavailable_response(circuit_breaker: CircuitBreaker) -> Dict[str, Any]:
+    """Crea la respuesta 503 con Retry-After mientras el circuito de PostgreSQL está abierto."""
+    response = _error_response(
+        status_code=503,
+        message="Base de datos no disponible temporalmente, reintente más tarde"
+    )
+    response['headers']['Retry-After'] = str(circuit_breaker.retry_after_seconds())
+    return response
+
+
+def _overloaded_response(settings) -> Dict[str, Any]:
+    """Crea la respuesta 503 con Retry-After cuando no hay cupo de exportación libre."""
+    response = _error_response(
+        status_code=503,
+        message="Demasiadas exportaciones en curso, reintente más tarde"
+    )
+    response['headers']['Retry-After'] = str(settings.export_overload_retry_after_seconds)
+    return response
+
+
 def _error_response(status_code: int, message: str) -> Dict[str, Any]:
     """
     Crea una respuesta de error HTTP.
@@ -184,3 +1393,8 @@ def _error_response(status_code: int, message: str) -> Dict[str, Any]:
             'status': status_code
         })
     }
+
+
+# Fase de inicialización de Lambda: el trabajo único se hace al cargar el módulo
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    prime()
@@ -0,0 +1,101 @@
+"""
+Lectura de logs de acceso para estimar la demanda de exportaciones.
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+
+Formato: una línea JSON por request (JSONL). Se aceptan registros planos
+({"tenant_id": 12, "profile": "lite", "timestamp": "2026-10-19T12:00:00Z"}) y el
+evento de API Gateway tal como lo registra lambda_handler (pathParameters.tenant_id,
+queryStringParameters.profile o el header X-Export-Profile). Las líneas que no se
+pueden interpretar se ignoran.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def count_requests(
+    path: str,
+    window_seconds: Optional[float] = None,
+    now: Optional[float] = None
+) -> "Counter[Tuple[int, Optional[str]]]":
+    """
+    Cuenta los requests de exportación por tenant y perfil.
+
+    Args:
+        path: Ruta del log JSONL
+        window_seconds: Solo cuenta los requests de los últimos N segundos
+                        (None = todos; los registros sin fecha siempre cuentan)
+        now: Instante de referencia de la ventana (None = ahora)
+
+    Returns:
+        Requests por (tenant_id, nombre de perfil o None = perfil por defecto)
+    """
+    now = now if now is not None else time.time()
+    counts: "Counter[Tuple[int, Optional[str]]]" = Counter()
+    skipped = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                tenant_id = _tenant_id(record)
+                timestamp = _timestamp(record)
+            except (ValueError, TypeError, AttributeError):
+                skipped += 1
+                continue
+            if tenant_id is None:
+                skipped += 1
+                continue
+            outside_window = (
+                window_seconds is not None and timestamp is not None
+                and now - timestamp > window_seconds
+            )
+            if outside_window:
+                continue
+            counts[(tenant_id, _profile_name(record))] += 1
+
+    if skipped:
+        logger.info(f"Log de acceso {path}: {skipped} líneas ignoradas")
+    return counts
+
+
+def _tenant_id(record: Dict[str, Any]) -> Optional[int]:
+    """Tenant del registro (campo tenant_id o pathParameters.tenant_id)."""
+    value = record.get('tenant_id')
+    if value is None:
+        value = (record.get('pathParameters') or {}).get('tenant_id')
+    if value is None:
+        return None
+    tenant_id = int(value)
+    return tenant_id if tenant_id > 0 else None
+
+
+def _profile_name(record: Dict[str, Any]) -> Optional[str]:
+    """Perfil pedido (campo profile, queryStringParameters.profile o header X-Export-Profile)."""
+    profile = record.get('profile') or (record.get('queryStringParameters') or {}).get('profile')
+    if not profile:
+        for key, value in (record.get('headers') or {}).items():
+            if key.lower() == 'x-export-profile':
+                profile = value
+                break
+    return profile.strip().lower() if profile else None
+
+
+def _timestamp(record: Dict[str, Any]) -> Optional[float]:
+    """Instante del registro (epoch o ISO-8601; sin zona horaria se asume UTC)."""
+    value = record.get('timestamp', record.get('time'))
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    moment = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
@@ -0,0 +1,150 @@
+"""
+Almacén local de artefactos exportados.
+Guarda cada archivo SQLite con un JSON de metadatos (huellas por tabla, conteos).
+En Lambda vive en /tmp, por lo que se conserva mientras el contenedor siga caliente.
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from domain.interfaces import IArtifactStore
+from domain.models import CachedArtifact
+
+logger = logging.getLogger(__name__)
+
+# Caracteres permitidos en el nombre de archivo de una clave
+_SAFE_KEY = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class LocalArtifactStore(IArtifactStore):
+    """
+    Almacén de artefactos en el sistema de archivos local.
+    Implementa IArtifactStore siguiendo el principio DIP.
+    """
+
+    def __init__(self, root_dir: str):
+        """
+        Inicializa el almacén.
+
+        Args:
+            root_dir: Directorio donde se guardan los artefactos
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[CachedArtifact]:
+        """Obtiene un artefacto por clave, o None si no existe o está incompleto."""
+        data_path, meta_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Metadatos de artefacto ilegibles ({key}): {e}")
+            return None
+
+        return CachedArtifact(
+            key=key,
+            path=data_path,
+            created_at=meta['created_at'],
+            file_size=meta.get('file_size'),
+            fingerprints=meta.get('fingerprints', {}),
+            records_exported=meta.get('records_exported', {}),
+            metadata=meta.get('metadata', {}),
+            validated_at=meta.get('validated_at')
+        )
+
+    def put(
+        self,
+        key: str,
+        source_path: str,
+        fingerprints: Dict[str, str],
+        records_exported: Dict[str, int],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> CachedArtifact:
+        """
+        Guarda una copia del archivo y sus metadatos bajo la clave.
+        La escritura es atómica (archivo temporal + os.replace): un lector
+        concurrente ve el artefacto anterior o el nuevo, nunca uno a medias.
+        """
+        data_path, meta_path = self._paths(key)
+        artifact = CachedArtifact(
+            key=key,
+            path=data_path,
+            created_at=time.time(),
+            file_size=os.path.getsize(source_path),
+            fingerprints=dict(fingerprints),
+            records_exported=dict(records_exported),
+            metadata=dict(metadata or {})
+        )
+
+        self._atomic_copy(source_path, data_path)
+        meta = artifact.to_dict()
+        del meta['key']
+        self._atomic_write(meta_path, json.dumps(meta, sort_keys=True).encode('utf-8'))
+
+        logger.info(f"Artefacto guardado: {key} ({artifact.file_size} bytes)")
+        return artifact
+
+    def touch(self, key: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Marca un artefacto como confirmado ahora (solo reescribe los metadatos,
+        actualizando las claves de `metadata`). Si el artefacto no existe no hace nada.
+        """
+        _, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        meta['validated_at'] = time.time()
+        if metadata:
+            meta.setdefault('metadata', {}).update(metadata)
+        self._atomic_write(meta_path, json.dumps(meta, sort_keys=True).encode('utf-8'))
+
+    def delete(self, key: str) -> None:
+        """Elimina un artefacto (los metadatos primero, para que deje de ser visible)."""
+        data_path, meta_path = self._paths(key)
+        for path in (meta_path, data_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _paths(self, key: str):
+        """Retorna las rutas del archivo SQLite y de los metadatos de una clave."""
+        safe_key = _SAFE_KEY.sub('_', key)
+        base = os.path.join(self.root_dir, safe_key)
+        return f"{base}.sqlite", f"{base}.json"
+
+    def _atomic_copy(self, source_path: str, target_path: str) -> None:
+        """Copia un archivo de forma atómica."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, target_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _atomic_write(self, target_path: str, content: bytes) -> None:
+        """Escribe contenido en un archivo de forma atómica."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, target_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
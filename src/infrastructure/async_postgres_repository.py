@@ -0,0 +1,385 @@
+"""
+Repositorio asíncrono de PostgreSQL (asyncio) para el servidor asíncrono (ver async_server.py).
+Sigue el principio de Inversión de Dependencias (DIP) de SOLID.
+
+Usa psycopg 3 con un pool de conexiones compartido por todas las exportaciones del
+proceso: cada query toma una conexión solo mientras se ejecuta, así cientos de
+exportaciones concurrentes comparten unas decenas de conexiones. Las queries son
+las de PostgresRepository (mismo SQL y parámetros, enlazados en el cliente como en
+psycopg2): el archivo resultante es idéntico al de la exportación síncrona.
+
+Cada query tiene su timeout (el menor entre query_timeout_seconds y el plazo). Al
+vencer, o si se cancela la exportación que la espera, la query se cancela en el
+servidor y su conexión se cierra en lugar de volver al pool: así la cancelación no
+puede alcanzar a la siguiente query de esa conexión.
+
+Los cupos de exportación del clúster son los advisory locks de sesión de
+PostgresRepository: cada cupo tomado retiene una conexión del pool hasta liberarlo
+(a lo sumo max_concurrent_exports conexiones).
+
+Requiere psycopg y psycopg-pool (ver requirements.txt); no forma parte del paquete
+de la Lambda.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from domain.interfaces import IAsyncDataRepository
+from domain.models import ENTITY_MODELS, Deadline
+from infrastructure.postgres_repository import (
+    DEFAULT_STATEMENT_TIMEOUT_MS, EXPORT_SLOT_NAMESPACE, EXPORT_SLOT_POLL_MAX_SECONDS,
+    EXPORT_SLOT_POLL_MIN_SECONDS, EXPORT_SLOT_QUERY, MIN_STATEMENT_TIMEOUT_MS,
+    SYNC_WATERMARK_QUERY, TENANT_EXISTS_QUERY,
+    TRANSIENT_SQLSTATE_PREFIXES, TRANSIENT_SQLSTATES, PostgresRepository
+)
+from utils.exceptions import DataFetchError, DeadlineExceededError
+from utils.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient_error(error: psycopg.Error) -> bool:
+    """
+    Indica si un error de PostgreSQL es transitorio (ver TRANSIENT_SQLSTATES).
+    Un OperationalError sin SQLSTATE es un corte de la conexión.
+    """
+    sqlstate = error.sqlstate
+    if sqlstate is None:
+        return isinstance(error, (psycopg.OperationalError, psycopg.InterfaceError))
+    return sqlstate in TRANSIENT_SQLSTATES or sqlstate.startswith(TRANSIENT_SQLSTATE_PREFIXES)
+
+
+class AsyncPostgresRepository(IAsyncDataRepository):
+    """
+    Repositorio asíncrono para acceder a datos en PostgreSQL.
+    Implementa IAsyncDataRepository siguiendo el principio DIP.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        database: str,
+        user: str,
+        password: str,
+        min_connections: int = 4,
+        max_connections: int = 32,
+        pool_timeout_seconds: float = 10,
+        query_timeout_seconds: float = DEFAULT_STATEMENT_TIMEOUT_MS / 1000,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        Inicializa el repositorio (el pool se abre en open).
+
+        Args:
+            min_connections: Conexiones que el pool mantiene abiertas
+            max_connections: Conexiones máximas: queries simultáneas de todo el proceso
+            pool_timeout_seconds: Espera máxima por una conexión libre del pool
+            query_timeout_seconds: Timeout de cada query sin plazo (con plazo, el menor)
+            retry_policy: Reintentos de una query ante errores transitorios (None = sin reintentos)
+        """
+        self.host = host
+        self.port = port
+        self.database = database
+        self.min_connections = max(0, min(min_connections, max_connections))
+        self.max_connections = max_connections
+        self.pool_timeout_seconds = pool_timeout_seconds
+        self.query_timeout_seconds = query_timeout_seconds
+        self.retry_policy = retry_policy
+        # Solo construye las queries: son las mismas de la exportación síncrona
+        self.queries = PostgresRepository(host, port, database, user, password)
+        self._connect_kwargs: Dict[str, Any] = dict(
+            host=host,
+            port=port,
+            dbname=database,
+            user=user,
+            password=password,
+            connect_timeout=10,
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=5,
+            sslmode='prefer',
+            # Tope del servidor por si la cancelación de una query no llega
+            options=f'-c statement_timeout={DEFAULT_STATEMENT_TIMEOUT_MS}',
+            # Cada query en su propia transacción: la conexión vuelve al pool sin
+            # transacción abierta
+            autocommit=True,
+            row_factory=dict_row,
+            # Parámetros enlazados en el cliente, como psycopg2 (mismo SQL generado)
+            cursor_factory=psycopg.AsyncClientCursor
+        )
+        self._pool: Optional[AsyncConnectionPool] = None
+        # Conexión que retiene el advisory lock de cada cupo de exportación tomado
+        self._slot_connections: Dict[int, psycopg.AsyncConnection] = {}
+
+    async def open(self) -> None:
+        """
+        Abre el pool y espera sus conexiones iniciales.
+
+        Raises:
+            psycopg_pool.PoolTimeout: Si no se pudieron abrir las conexiones iniciales
+        """
+        if self._pool is not None:
+            return
+        pool = AsyncConnectionPool(
+            kwargs=self._connect_kwargs,
+            min_size=self.min_connections,
+            max_size=self.max_connections,
+            timeout=self.pool_timeout_seconds,
+            name='export',
+            open=False
+        )
+        await pool.open(wait=self.min_connections > 0, timeout=self.pool_timeout_seconds)
+        self._pool = pool
+        logger.info(
+            f"Pool asíncrono de PostgreSQL para {self.host}:{self.port}/{self.database} "
+            f"({self.min_connections}-{self.max_connections} conexiones)"
+        )
+
+    async def close(self) -> None:
+        """Cierra el pool y sus conexiones."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+            logger.info("Pool asíncrono de PostgreSQL cerrado")
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Estado del pool (conexiones abiertas, libres y requests en espera)."""
+        if self._pool is None:
+            return {}
+        stats = self._pool.get_stats()
+        return {
+            'pool_size': stats.get('pool_size', 0),
+            'pool_available': stats.get('pool_available', 0),
+            'requests_waiting': stats.get('requests_waiting', 0)
+        }
+
+    async def tenant_exists(self, tenant_id: int, deadline: Optional[Deadline] = None) -> bool:
+        """
+        Indica si el tenant tiene clientes o ubicaciones (ver PostgresRepository.tenant_exists).
+        """
+        rows = await self._fetch(
+            'tenant_exists', TENANT_EXISTS_QUERY, (tenant_id, tenant_id), deadline
+        )
+        return bool(rows[0]['tenant_exists'])
+
+    async def get_sync_watermark(self, deadline: Optional[Deadline] = None) -> datetime:
+        """Retorna la marca de sincronización (ver PostgresRepository.get_sync_watermark)."""
+        rows = await self._fetch('sync_watermark', SYNC_WATERMARK_QUERY, None, deadline)
+        return rows[0]['now']
+
+    async def get_table_fingerprints(
+        self,
+        tenant_id: int,
+        columns_by_entity: Dict[str, Optional[Sequence[str]]],
+        referenced_products: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, str]:
+        """
+        Calcula una huella de cada tabla a exportar a partir de conteos y updated_at,
+        en un solo round-trip (ver PostgresRepository.get_table_fingerprints).
+        """
+        query, params = self.queries.table_fingerprints_query(
+            tenant_id, columns_by_entity, referenced_products
+        )
+        rows = await self._fetch('table_fingerprints', query, params, deadline)
+        return dict(rows[0])
+
+    async def get_entity_by_tenant(
+        self,
+        entity_name: str,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None,
+        referenced_products: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> List[Any]:
+        """Obtiene las filas a exportar de una entidad como instancias de su modelo."""
+        query, params = self.queries.entity_query(
+            entity_name, tenant_id, columns, referenced_products
+        )
+        rows = await self._fetch(entity_name, query, params, deadline)
+        model = ENTITY_MODELS[entity_name]
+        items = [model(**row) for row in rows]
+        logger.info(
+            f"Obtenidos {len(items)} {entity_name.replace('_', ' ')} para tenant {tenant_id}"
+        )
+        return items
+
+    async def acquire_export_slot(self, max_slots: int, timeout_seconds: float) -> Optional[int]:
+        """
+        Toma uno de los `max_slots` cupos de exportación (ver
+        PostgresRepository.acquire_export_slot). La conexión del intento que obtiene el
+        cupo queda fuera del pool hasta release_export_slot; las demás vuelven al pool
+        entre intentos.
+
+        Returns:
+            Número de cupo, o None si no se liberó ninguno a tiempo
+        """
+        if self._pool is None:
+            raise RuntimeError("El pool asíncrono de PostgreSQL no está abierto")
+
+        start = time.time()
+        give_up_at = start + max(0.0, timeout_seconds)
+        poll_seconds = EXPORT_SLOT_POLL_MIN_SECONDS
+        attempts = 0
+        while True:
+            attempts += 1
+            connection = await self._pool.getconn()
+            try:
+                rows = await self._execute(connection, EXPORT_SLOT_QUERY, {
+                    'offset': random.randrange(max_slots),
+                    'slots': max_slots,
+                    'namespace': EXPORT_SLOT_NAMESPACE
+                })
+            except BaseException:
+                # El lock pudo tomarse en el servidor: cerrar la sesión lo libera
+                await self._discard(connection)
+                await self._pool.putconn(connection)
+                raise
+            if rows:
+                slot = rows[0]['slot']
+                self._slot_connections[slot] = connection
+                logger.debug(f"Cupo de exportación {slot} tomado en {attempts} intentos")
+                return slot
+            await self._pool.putconn(connection)
+            remaining = give_up_at - time.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, random.uniform(poll_seconds / 2, poll_seconds)))
+            poll_seconds = min(poll_seconds * 2, EXPORT_SLOT_POLL_MAX_SECONDS)
+
+        logger.warning(
+            f"Sin cupo de exportación libre ({max_slots} en uso) "
+            f"tras {int((time.time() - start) * 1000)}ms"
+        )
+        return None
+
+    async def release_export_slot(self, slot: int) -> None:
+        """
+        Libera un cupo tomado con acquire_export_slot y devuelve su conexión al pool.
+        Si el unlock falla, la conexión se cierra (cerrar la sesión libera el lock).
+        """
+        connection = self._slot_connections.pop(slot, None)
+        if connection is None or self._pool is None:
+            return
+        try:
+            await self._execute(
+                connection, "SELECT pg_advisory_unlock(%s, %s) AS released",
+                (EXPORT_SLOT_NAMESPACE, slot)
+            )
+        except psycopg.Error as e:
+            logger.warning(f"No se pudo liberar el cupo de exportación {slot}: {e}")
+            await connection.close()
+        finally:
+            await self._pool.putconn(connection)
+
+    async def _fetch(
+        self,
+        label: str,
+        query: str,
+        params: Any,
+        deadline: Optional[Deadline]
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta una query con timeout y reintentos ante errores transitorios.
+
+        Raises:
+            DeadlineExceededError: Si el plazo no alcanza para lanzar la query o vence durante ella
+            DataFetchError: Si la query supera query_timeout_seconds
+            psycopg.Error: Si la query falla
+        """
+        if self._pool is None:
+            raise RuntimeError("El pool asíncrono de PostgreSQL no está abierto")
+
+        retries = 0
+        while True:
+            timeout_seconds, limited_by_deadline = self._query_timeout(label, deadline)
+            start = time.time()
+            try:
+                rows = await self._run(query, params, timeout_seconds)
+            except asyncio.TimeoutError:
+                if limited_by_deadline:
+                    raise DeadlineExceededError(f"Plazo agotado en la query de {label}")
+                raise DataFetchError(f"La query de {label} superó {timeout_seconds:.1f}s")
+            except psycopg.Error as e:
+                if (
+                    self.retry_policy is None
+                    or retries >= self.retry_policy.max_retries
+                    or not _is_transient_error(e)
+                ):
+                    logger.error(f"Error en la query de {label}: {e}")
+                    raise
+                delay = self.retry_policy.backoff(retries)
+                if (
+                    deadline is not None
+                    and deadline.remaining_seconds() - delay < MIN_STATEMENT_TIMEOUT_MS / 1000
+                ):
+                    raise
+                retries += 1
+                logger.warning(
+                    f"[{label.upper()}] Error transitorio ({e.sqlstate or type(e).__name__}): "
+                    f"reintento {retries} en {delay * 1000:.0f}ms"
+                )
+                await asyncio.sleep(delay)
+                continue
+            logger.debug(
+                f"[{label.upper()}] {len(rows)} filas en {(time.time() - start) * 1000:.2f}ms"
+            )
+            return rows
+
+    def _query_timeout(self, label: str, deadline: Optional[Deadline]) -> Tuple[float, bool]:
+        """
+        Retorna el timeout de la query y si lo limita el plazo.
+
+        Raises:
+            DeadlineExceededError: Si no queda tiempo suficiente para lanzar la query
+        """
+        if deadline is None or deadline.remaining_seconds() >= self.query_timeout_seconds:
+            return self.query_timeout_seconds, False
+        remaining_seconds = deadline.remaining_seconds()
+        if remaining_seconds * 1000 < MIN_STATEMENT_TIMEOUT_MS:
+            raise DeadlineExceededError(f"Sin tiempo para ejecutar la query de {label}")
+        return remaining_seconds, True
+
+    async def _run(self, query: str, params: Any, timeout_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Ejecuta una query en una conexión del pool. Si vence el timeout o se cancela
+        la tarea, cancela la query en el servidor y descarta la conexión.
+        """
+        async with self._pool.connection() as connection:
+            try:
+                return await asyncio.wait_for(
+                    self._execute(connection, query, params), timeout_seconds
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                await self._discard(connection)
+                raise
+
+    @staticmethod
+    async def _execute(
+        connection: psycopg.AsyncConnection, query: str, params: Any
+    ) -> List[Dict[str, Any]]:
+        """Ejecuta una query y retorna sus filas."""
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+    @staticmethod
+    async def _discard(connection: psycopg.AsyncConnection) -> None:
+        """
+        Cancela la query en curso de la conexión (pg_cancel_request) y la cierra:
+        el pool la reemplaza por una nueva.
+        """
+        try:
+            await asyncio.to_thread(connection.cancel)
+        except psycopg.Error as e:
+            logger.warning(f"No se pudo cancelar la query en el servidor: {e}")
+        await connection.close()
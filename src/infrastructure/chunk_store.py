@@ -0,0 +1,188 @@
+"""
+Almacenes de fragmentos direccionados por contenido (local y compatible con S3).
+Los fragmentos viven en un espacio de nombres global: un fragmento compartido por
+varios tenants (ej: páginas del catálogo global de productos) se guarda una sola vez.
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence
+
+from domain.interfaces import IChunkStore
+
+logger = logging.getLogger(__name__)
+
+# Ids válidos: SHA-256 en hexadecimal (evita rutas o claves arbitrarias)
+_HASH_ID = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _validate_id(value: str) -> str:
+    """Valida que un id sea un SHA-256 en hexadecimal."""
+    if not _HASH_ID.match(value or ''):
+        raise ValueError(f"Id de fragmento inválido: {value}")
+    return value
+
+
+class LocalChunkStore(IChunkStore):
+    """
+    Almacén de fragmentos en el sistema de archivos local.
+    Estructura: chunks/ab/<sha256> y manifests/<sha256>.json
+    Implementa IChunkStore siguiendo el principio DIP.
+    """
+
+    def __init__(self, root_dir: str):
+        """
+        Inicializa el almacén.
+
+        Args:
+            root_dir: Directorio raíz del almacén
+        """
+        self.root_dir = root_dir
+        os.makedirs(os.path.join(root_dir, 'chunks'), exist_ok=True)
+        os.makedirs(os.path.join(root_dir, 'manifests'), exist_ok=True)
+
+    def missing(self, chunk_ids: Sequence[str]) -> List[str]:
+        """Retorna los fragmentos que aún no están en el almacén."""
+        return [c for c in chunk_ids if not os.path.exists(self._chunk_path(c))]
+
+    def put_chunk(self, chunk_id: str, data: bytes) -> None:
+        """Guarda un fragmento (escritura atómica; si ya existe no se reescribe)."""
+        path = self._chunk_path(chunk_id)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._atomic_write(path, data)
+
+    def get_chunk(self, chunk_id: str) -> Optional[bytes]:
+        """Obtiene un fragmento, o None si no existe."""
+        try:
+            with open(self._chunk_path(chunk_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_manifest(self, content_hash: str, manifest: Dict[str, Any]) -> None:
+        """Guarda el manifiesto de un archivo."""
+        self._atomic_write(
+            self._manifest_path(content_hash),
+            json.dumps(manifest, sort_keys=True).encode('utf-8')
+        )
+
+    def get_manifest(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el manifiesto de un archivo, o None si no existe."""
+        try:
+            with open(self._manifest_path(content_hash), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _chunk_path(self, chunk_id: str) -> str:
+        """Ruta de un fragmento (subdirectorio por los 2 primeros caracteres)."""
+        _validate_id(chunk_id)
+        return os.path.join(self.root_dir, 'chunks', chunk_id[:2], chunk_id)
+
+    def _manifest_path(self, content_hash: str) -> str:
+        """Ruta del manifiesto de un archivo."""
+        _validate_id(content_hash)
+        return os.path.join(self.root_dir, 'manifests', f"{content_hash}.json")
+
+    def _atomic_write(self, target_path: str, content: bytes) -> None:
+        """Escribe un archivo de forma atómica (archivo temporal + os.replace)."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, target_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class S3ChunkStore(IChunkStore):
+    """
+    Almacén de fragmentos en S3 o un servicio compatible (MinIO, R2, ...).
+    Estructura: <prefix>chunks/ab/<sha256> y <prefix>manifests/<sha256>.json
+    Implementa IChunkStore siguiendo el principio DIP.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            bucket: Bucket de S3
+            prefix: Prefijo de las claves (ej: 'sqlite-chunks/')
+            endpoint_url: Endpoint de un servicio compatible con S3 (None = AWS)
+        """
+        # boto3 viene incluido en el runtime de Lambda; se importa solo si se usa S3
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self._client_error = ClientError
+
+    def missing(self, chunk_ids: Sequence[str]) -> List[str]:
+        """Retorna los fragmentos que aún no están en el almacén."""
+        return [c for c in chunk_ids if not self._exists(self._chunk_key(c))]
+
+    def put_chunk(self, chunk_id: str, data: bytes) -> None:
+        """Guarda un fragmento (inmutable: el contenido define la clave)."""
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._chunk_key(chunk_id),
+            Body=data,
+            ContentType='application/octet-stream'
+        )
+
+    def get_chunk(self, chunk_id: str) -> Optional[bytes]:
+        """Obtiene un fragmento, o None si no existe."""
+        return self._get(self._chunk_key(chunk_id))
+
+    def put_manifest(self, content_hash: str, manifest: Dict[str, Any]) -> None:
+        """Guarda el manifiesto de un archivo."""
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._manifest_key(content_hash),
+            Body=json.dumps(manifest, sort_keys=True).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def get_manifest(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el manifiesto de un archivo, o None si no existe."""
+        data = self._get(self._manifest_key(content_hash))
+        return json.loads(data) if data is not None else None
+
+    def _chunk_key(self, chunk_id: str) -> str:
+        """Clave S3 de un fragmento."""
+        _validate_id(chunk_id)
+        return f"{self.prefix}chunks/{chunk_id[:2]}/{chunk_id}"
+
+    def _manifest_key(self, content_hash: str) -> str:
+        """Clave S3 del manifiesto de un archivo."""
+        _validate_id(content_hash)
+        return f"{self.prefix}manifests/{content_hash}.json"
+
+    def _exists(self, key: str) -> bool:
+        """Indica si existe un objeto."""
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """Obtiene el contenido de un objeto, o None si no existe."""
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except self._client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
@@ -0,0 +1,157 @@
+"""
+Pools de conexiones de PostgreSQL de un proceso de larga duración (ver server.py).
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+
+En Lambda cada exportación abre y cierra sus conexiones. En un proceso que
+atiende muchas exportaciones, PostgresRepository toma las conexiones de estos
+pools (uno por endpoint: primario y cada réplica) y las devuelve al terminar,
+así la latencia estable no incluye el handshake TCP/TLS ni la autenticación.
+
+Antes de volver al pool, la conexión principal de una exportación se limpia con
+DISCARD ALL: libera los advisory locks de sesión (tenant y cupo) que hubieran
+quedado tomados y restablece los parámetros de sesión. Una conexión que estuvo
+inactiva más de validate_idle_seconds (ej: contenedor de Lambda congelado entre
+invocaciones, o cortada por un timeout de inactividad) se verifica con SELECT 1
+antes de entregarse.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+logger = logging.getLogger(__name__)
+
+Endpoint = Tuple[str, int]
+
+
+class ConnectionPools:
+    """Pools de conexiones persistentes por endpoint, compartidos por los hilos del proceso."""
+
+    def __init__(
+        self, min_connections: int, max_connections: int, validate_idle_seconds: float = 30
+    ):
+        """
+        Inicializa los pools (se crean a demanda, uno por endpoint).
+
+        Args:
+            min_connections: Conexiones que se abren al crear el pool y que se conservan
+                             abiertas entre exportaciones; las demás se cierran al devolverse
+            max_connections: Conexiones máximas por endpoint; con el pool agotado, la
+                             exportación usa una conexión propia (ver PostgresRepository)
+            validate_idle_seconds: Inactividad a partir de la cual una conexión se verifica
+                                   antes de entregarse
+        """
+        self.min_connections = max(0, min(min_connections, max_connections))
+        self.max_connections = max_connections
+        self.validate_idle_seconds = validate_idle_seconds
+        self._pools: Dict[Endpoint, psycopg2.pool.ThreadedConnectionPool] = {}
+        # Instante en que cada conexión principal volvió al pool (por id de la conexión);
+        # las que no volvieron nunca cuentan desde la creación del pool (las iniciales)
+        self._returned_at: Dict[int, float] = {}
+        self._created_at: Dict[Endpoint, float] = {}
+        self._lock = threading.Lock()
+
+    def pool(
+        self, endpoint: Endpoint, connect_kwargs: Dict[str, Any]
+    ) -> psycopg2.pool.ThreadedConnectionPool:
+        """
+        Retorna el pool del endpoint, creándolo con `connect_kwargs` si no existe.
+
+        Raises:
+            psycopg2.Error: Si no se pudieron abrir las conexiones iniciales
+        """
+        with self._lock:
+            pool = self._pools.get(endpoint)
+            if pool is None:
+                pool = psycopg2.pool.ThreadedConnectionPool(
+                    self.min_connections, self.max_connections, **connect_kwargs
+                )
+                self._pools[endpoint] = pool
+                self._created_at[endpoint] = time.time()
+                logger.info(
+                    f"Pool persistente de PostgreSQL para {endpoint[0]}:{endpoint[1]} "
+                    f"({self.min_connections}-{self.max_connections} conexiones)"
+                )
+            return pool
+
+    def getconn(
+        self,
+        endpoint: Endpoint,
+        connect_kwargs: Dict[str, Any]
+    ) -> Optional[psycopg2.extensions.connection]:
+        """
+        Toma una conexión del pool del endpoint, descartando las que se cerraron o
+        no responden tras estar inactivas.
+
+        Returns:
+            Conexión, o None si el pool está agotado
+        """
+        pool = self.pool(endpoint, connect_kwargs)
+        while True:
+            try:
+                connection = pool.getconn()
+            except psycopg2.pool.PoolError:
+                return None
+            if not connection.closed and self._is_alive(endpoint, connection):
+                return connection
+            pool.putconn(connection, close=True)
+
+    def _is_alive(self, endpoint: Endpoint, connection: psycopg2.extensions.connection) -> bool:
+        """Verifica con SELECT 1 una conexión que estuvo inactiva más de validate_idle_seconds."""
+        idle_since = (
+            self._returned_at.pop(id(connection), None) or self._created_at.get(endpoint, 0)
+        )
+        if time.time() - idle_since < self.validate_idle_seconds:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Conexión inactiva de PostgreSQL descartada: {e}")
+            return False
+
+    def putconn(self, endpoint: Endpoint, connection: psycopg2.extensions.connection) -> None:
+        """
+        Devuelve la conexión principal de una exportación, limpiando su sesión
+        (transacción, advisory locks y parámetros). Una conexión que no se pudo
+        limpiar se cierra en lugar de reutilizarse.
+        """
+        pool = self._pools.get(endpoint)
+        broken = False
+        try:
+            connection.rollback()
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute("DISCARD ALL")
+            connection.autocommit = False
+        except psycopg2.Error as e:
+            logger.warning(f"Conexión de PostgreSQL descartada al devolverla al pool: {e}")
+            broken = True
+        if pool is None:
+            connection.close()
+            return
+        if not broken:
+            self._returned_at[id(connection)] = time.time()
+        try:
+            pool.putconn(connection, close=broken)
+        except psycopg2.pool.PoolError:
+            # El pool ya se cerró (close_all): solo queda cerrar la conexión
+            connection.close()
+        if connection.closed:
+            # El pool la cerró (sobraba respecto de min_connections)
+            self._returned_at.pop(id(connection), None)
+
+    def close_all(self) -> None:
+        """Cierra todos los pools y sus conexiones."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+            self._returned_at.clear()
+            self._created_at.clear()
+        for pool in pools.values():
+            pool.closeall()
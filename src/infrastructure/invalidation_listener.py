@@ -0,0 +1,162 @@
+"""
+Listener de cambios de PostgreSQL (LISTEN/NOTIFY).
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+
+Los triggers de create_invalidation_triggers.sql notifican en el canal cada fila
+modificada con su tenant y entidad ({"tenant_id": 12, "entity": "customers"};
+tenant_id null = entidad global). El listener agrupa las notificaciones de cada
+ciclo y las registra en el IInvalidationStore, y escribe un latido periódico tras
+comprobar la conexión: sin latido reciente las exportaciones no confían en el
+registro y vuelven a calcular huellas.
+
+Las notificaciones solo llegan a sesiones conectadas al primario (no a réplicas) y
+se pierden mientras el listener está desconectado: cada reconexión empieza un
+nuevo período de escucha (live_since), y los artefactos anteriores a él no se
+sirven sin huellas.
+"""
+import json
+import logging
+import re
+import select
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+import psycopg2
+import psycopg2.extensions
+
+from domain.interfaces import IInvalidationStore
+from domain.profiles import ALL_ENTITIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = 'export_invalidation'
+
+# Nombre de canal válido (se interpola en LISTEN, no admite parámetros)
+_CHANNEL_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Espera entre reconexiones tras perder la conexión (backoff exponencial)
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+class InvalidationListener:
+    """Escucha las notificaciones de cambios y las registra en el almacén."""
+
+    def __init__(
+        self,
+        store: IInvalidationStore,
+        host: str,
+        port: int,
+        database: str,
+        user: str,
+        password: str,
+        channel: str = DEFAULT_CHANNEL,
+        heartbeat_interval_seconds: float = 5,
+        on_change: Optional[Callable[[Dict[Optional[int], Set[str]]], None]] = None
+    ):
+        """
+        Inicializa el listener.
+
+        Args:
+            store: Registro donde se anotan los cambios y el latido
+            host: Host del primario de PostgreSQL
+            port: Puerto de PostgreSQL
+            database: Nombre de la base de datos
+            user: Usuario de PostgreSQL
+            password: Contraseña de PostgreSQL
+            channel: Canal de las notificaciones
+            heartbeat_interval_seconds: Intervalo entre latidos
+            on_change: Se llama con los cambios de cada ciclo, después de registrarlos
+                       (ej: encolar precálculos); un error no detiene el listener
+        """
+        if not _CHANNEL_NAME.match(channel):
+            raise ValueError(f"Canal de notificaciones inválido: {channel}")
+        self.store = store
+        self.connect_kwargs = dict(
+            host=host, port=port, database=database, user=user, password=password,
+            connect_timeout=10, keepalives=1, keepalives_idle=30, keepalives_interval=10,
+            keepalives_count=5
+        )
+        self.channel = channel
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self.on_change = on_change
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Escucha hasta que se active stop_event, reconectando con backoff si se pierde
+        la conexión.
+        """
+        stop_event = stop_event or threading.Event()
+        delay = RECONNECT_MIN_SECONDS
+        while not stop_event.is_set():
+            try:
+                self._listen(stop_event)
+                delay = RECONNECT_MIN_SECONDS
+            except (psycopg2.Error, OSError) as e:
+                logger.error(f"Listener de cambios desconectado: {e}; reintento en {delay:.0f}s")
+                stop_event.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _listen(self, stop_event: threading.Event) -> None:
+        """Una sesión de escucha: termina al activarse stop_event o al fallar la conexión."""
+        connection = psycopg2.connect(**self.connect_kwargs)
+        try:
+            connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            # Los cambios anteriores a este instante pudieron perderse
+            live_since = time.time()
+            self.store.heartbeat(live_since)
+            logger.info(f"Escuchando cambios en el canal {self.channel}")
+            last_heartbeat = time.time()
+
+            while not stop_event.is_set():
+                ready = select.select([connection], [], [], self.heartbeat_interval_seconds)
+                if ready != ([], [], []):
+                    connection.poll()
+                    self._drain(connection)
+
+                if time.time() - last_heartbeat >= self.heartbeat_interval_seconds:
+                    # Comprobar la conexión antes del latido: select no detecta un corte silencioso
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    connection.poll()
+                    self._drain(connection)
+                    self.store.heartbeat(live_since)
+                    last_heartbeat = time.time()
+        finally:
+            connection.close()
+
+    def _drain(self, connection) -> None:
+        """Registra las notificaciones pendientes de la conexión, agrupadas por tenant."""
+        if not connection.notifies:
+            return
+        changes: Dict[Optional[int], Set[str]] = {}
+        received = len(connection.notifies)
+        while connection.notifies:
+            notify = connection.notifies.pop(0)
+            tenant_id, entity_name = _parse_payload(notify.payload)
+            changes.setdefault(tenant_id, set()).add(entity_name)
+
+        self.store.mark_changed(changes, time.time())
+        logger.info(f"{received} notificaciones de cambios: {len(changes)} tenants marcados")
+        if self.on_change:
+            try:
+                self.on_change(changes)
+            except Exception as e:
+                logger.warning(f"Error procesando cambios notificados: {e}")
+
+
+def _parse_payload(payload: str):
+    """
+    Tenant y entidad de una notificación.
+    Una notificación ilegible cuenta como cambio global de todas las entidades.
+    """
+    try:
+        data = json.loads(payload)
+        tenant_id = data.get('tenant_id')
+        return (int(tenant_id) if tenant_id is not None else None), str(data['entity'])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        logger.warning(f"Notificación de cambios ilegible: {payload!r}")
+        return None, ALL_ENTITIES
@@ -0,0 +1,114 @@
+"""
+Registro local de cambios notificados por PostgreSQL (ver invalidation_listener.py).
+Un JSON por tenant con la última modificación de cada entidad, uno para las
+entidades globales y uno con el latido del listener. Para que las exportaciones
+vean los cambios, el directorio debe ser compartido con el listener (ej: EFS).
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+from domain.interfaces import IInvalidationStore
+from domain.profiles import ALL_ENTITIES
+
+logger = logging.getLogger(__name__)
+
+
+class LocalInvalidationStore(IInvalidationStore):
+    """
+    Registro de cambios en el sistema de archivos local.
+    Implementa IInvalidationStore siguiendo el principio DIP.
+    Admite un solo escritor (el listener); las lecturas no toman locks.
+    """
+
+    def __init__(self, root_dir: str):
+        """
+        Inicializa el registro.
+
+        Args:
+            root_dir: Directorio donde se guardan los cambios y el latido
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def mark_changed(self, changes: Dict[Optional[int], Sequence[str]], changed_at: float) -> None:
+        """Registra entidades modificadas (una escritura por tenant)."""
+        for tenant_id, entities in changes.items():
+            path = self._changes_path(tenant_id)
+            try:
+                recorded = self._read_json(path)
+            except (OSError, ValueError) as e:
+                # Sin el historial del tenant, todo cuenta como modificado desde ahora
+                logger.warning(f"Registro de cambios ilegible ({path}): {e}")
+                recorded = {ALL_ENTITIES: changed_at}
+            for entity_name in entities:
+                recorded[entity_name] = max(recorded.get(entity_name, 0), changed_at)
+            self._atomic_write(path, recorded)
+
+    def heartbeat(self, live_since: float) -> None:
+        """Confirma que el listener está escuchando desde live_since."""
+        self._atomic_write(
+            self._feed_path(), {'live_since': live_since, 'heartbeat_at': time.time()}
+        )
+
+    def changed_entities(
+        self, tenant_id: int, since: float, max_heartbeat_age_seconds: float
+    ) -> Optional[List[str]]:
+        """Entidades del tenant (incluidas las globales) modificadas después de `since`."""
+        try:
+            feed = self._read_json(self._feed_path())
+            recorded = [
+                self._read_json(self._changes_path(None)),
+                self._read_json(self._changes_path(tenant_id))
+            ]
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el registro de cambios: {e}")
+            return None
+
+        live_since = feed.get('live_since')
+        heartbeat_at = feed.get('heartbeat_at')
+        if live_since is None or heartbeat_at is None:
+            return None
+        if time.time() - heartbeat_at > max_heartbeat_age_seconds or live_since > since:
+            return None
+
+        changed = set()
+        for changes in recorded:
+            for entity_name, changed_at in changes.items():
+                if changed_at > since:
+                    changed.add(entity_name)
+        return sorted(changed)
+
+    def _feed_path(self) -> str:
+        """Ruta del latido del listener."""
+        return os.path.join(self.root_dir, 'feed.json')
+
+    def _changes_path(self, tenant_id: Optional[int]) -> str:
+        """Ruta de los cambios de un tenant (None = entidades globales)."""
+        name = 'global' if tenant_id is None else f"tenant_{int(tenant_id)}"
+        return os.path.join(self.root_dir, f"{name}.json")
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, float]:
+        """Lee un JSON del registro; si no existe retorna vacío."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _atomic_write(self, target_path: str, content: Dict[str, float]) -> None:
+        """Escribe un JSON de forma atómica."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(content, f, sort_keys=True)
+            os.replace(tmp_path, target_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,106 @@
+"""
+Despachadores de refrescos en segundo plano (stale-while-revalidate).
+El evento de refresco tiene la forma del evento de API Gateway más {'refresh': True}
+y lo ejecuta el mismo handler (ver handler._run_refresh).
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from domain.interfaces import IRefreshDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadRefreshDispatcher(IRefreshDispatcher):
+    """
+    Ejecuta el refresco en un hilo del mismo proceso.
+    Sirve en un proceso de larga duración o en local. En Lambda el contenedor se
+    congela al responder: el hilo avanza solo mientras haya invocaciones en curso.
+    Implementa IRefreshDispatcher siguiendo el principio DIP.
+    """
+
+    def __init__(self, runner: Callable[[Dict[str, Any]], Any]):
+        """
+        Inicializa el despachador.
+
+        Args:
+            runner: Función que ejecuta el evento de refresco
+        """
+        self.runner = runner
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def dispatch(self, refresh_key: str, event: Dict[str, Any]) -> bool:
+        """Lanza el refresco en un hilo, salvo que ya haya uno en curso para la clave."""
+        with self._lock:
+            if refresh_key in self._in_flight:
+                logger.info(f"Refresco en curso para {refresh_key}: no se lanza otro")
+                return False
+            self._in_flight.add(refresh_key)
+
+        thread = threading.Thread(
+            target=self._run, args=(refresh_key, event),
+            name=f"refresh-{refresh_key}", daemon=True
+        )
+        thread.start()
+        logger.info(f"Refresco lanzado en segundo plano: {refresh_key}")
+        return True
+
+    def _run(self, refresh_key: str, event: Dict[str, Any]) -> None:
+        """Ejecuta el refresco y libera la clave."""
+        try:
+            self.runner(event)
+        except Exception as e:
+            logger.error(f"Error en el refresco de {refresh_key}: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._in_flight.discard(refresh_key)
+
+
+class LambdaRefreshDispatcher(IRefreshDispatcher):
+    """
+    Invoca la función Lambda de forma asíncrona (InvocationType='Event') con el evento
+    de refresco. El artefacto lo escribe otro contenedor: requiere un directorio de
+    artefactos compartido (ARTIFACT_CACHE_DIR en EFS).
+    Implementa IRefreshDispatcher siguiendo el principio DIP.
+    """
+
+    def __init__(self, function_name: str, min_interval_seconds: float = 60.0):
+        """
+        Inicializa el despachador.
+
+        Args:
+            function_name: Nombre o ARN de la función a invocar
+            min_interval_seconds: Tiempo mínimo entre refrescos de una misma clave
+                                  lanzados desde este contenedor
+        """
+        # boto3 viene incluido en el runtime de Lambda; se importa solo si se usa
+        import boto3
+
+        self.function_name = function_name
+        self.min_interval_seconds = min_interval_seconds
+        self.client = boto3.client('lambda')
+        self._last_dispatch: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def dispatch(self, refresh_key: str, event: Dict[str, Any]) -> bool:
+        """Invoca la función de forma asíncrona, salvo que la clave se haya refrescado hace poco."""
+        now = time.time()
+        with self._lock:
+            last: Optional[float] = self._last_dispatch.get(refresh_key)
+            if last is not None and now - last < self.min_interval_seconds:
+                logger.info(f"Refresco reciente para {refresh_key}: no se lanza otro")
+                return False
+            self._last_dispatch[refresh_key] = now
+
+        self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType='Event',
+            Payload=json.dumps(event).encode('utf-8')
+        )
+        logger.info(f"Refresco asíncrono invocado en {self.function_name}: {refresh_key}")
+        return True
@@ -0,0 +1,181 @@
+"""
+Selección de réplica de lectura para las queries de exportación.
+Sigue el principio de Responsabilidad Única (SRP) de SOLID.
+
+Sondea periódicamente cada réplica (latencia de ida y vuelta y retraso de
+replicación) y elige la sana de menor latencia cuyo retraso no supera el
+máximo; si ninguna cumple, las lecturas van al primario. Vive mientras el
+contenedor siga caliente y es segura entre hilos.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Retraso de replicación de la réplica (0 si está al día o si es un primario)
+REPLICATION_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_seconds
+"""
+
+# Peso de la última medición en la latencia suavizada (media móvil exponencial)
+RTT_SMOOTHING = 0.3
+
+
+@dataclass
+class ReplicaStatus:
+    """Estado de una réplica según el último sondeo."""
+
+    host: str
+    port: int
+    healthy: bool = False
+    rtt_ms: Optional[float] = None
+    lag_seconds: Optional[float] = None
+    checked_at: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Identificador host:puerto."""
+        return f"{self.host}:{self.port}"
+
+    def to_dict(self) -> dict:
+        """Convierte el estado a diccionario."""
+        return {
+            'host': self.name,
+            'healthy': self.healthy,
+            'rtt_ms': self.rtt_ms,
+            'lag_seconds': self.lag_seconds,
+            'error': self.error
+        }
+
+
+class ReplicaRouter:
+    """Elige la réplica de lectura más rápida con retraso aceptable."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Tuple[str, int]],
+        connect_kwargs: Dict[str, Any],
+        max_lag_seconds: float = 5,
+        probe_interval_seconds: float = 30,
+        probe_timeout_seconds: int = 2
+    ):
+        """
+        Inicializa el selector.
+
+        Args:
+            endpoints: Réplicas (host, puerto)
+            connect_kwargs: Parámetros de conexión comunes (database, user, password...)
+            max_lag_seconds: Retraso de replicación máximo para leer de una réplica
+            probe_interval_seconds: Vigencia de un sondeo
+            probe_timeout_seconds: Timeout de conexión del sondeo
+        """
+        self.connect_kwargs = dict(connect_kwargs)
+        self.max_lag_seconds = max_lag_seconds
+        self.probe_interval_seconds = probe_interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._status: Dict[str, ReplicaStatus] = {}
+        for host, port in endpoints:
+            status = ReplicaStatus(host=host, port=port)
+            self._status[status.name] = status
+        self._lock = threading.Lock()
+
+    def select(self) -> Optional[ReplicaStatus]:
+        """
+        Retorna la réplica sana de menor latencia con retraso <= max_lag_seconds,
+        o None si ninguna cumple (las lecturas van al primario).
+        Sondea antes las réplicas si el último sondeo venció.
+        """
+        self._refresh_if_stale()
+        with self._lock:
+            candidates = [
+                status for status in self._status.values()
+                if status.healthy and status.lag_seconds is not None
+                and status.lag_seconds <= self.max_lag_seconds
+            ]
+            if not candidates:
+                return None
+            return min(candidates, key=lambda status: status.rtt_ms)
+
+    def mark_failed(self, name: str, error: str) -> None:
+        """Marca una réplica como no disponible hasta el próximo sondeo."""
+        with self._lock:
+            status = self._status.get(name)
+            if status is not None:
+                status.healthy = False
+                status.error = error
+        logger.warning(f"Réplica {name} marcada como no disponible: {error}")
+
+    def snapshot(self) -> List[dict]:
+        """Estado de todas las réplicas (para métricas)."""
+        with self._lock:
+            return [status.to_dict() for status in self._status.values()]
+
+    def _refresh_if_stale(self) -> None:
+        """Sondea en paralelo las réplicas cuyo último sondeo venció."""
+        now = time.time()
+        with self._lock:
+            stale = [
+                status for status in self._status.values()
+                if now - status.checked_at >= self.probe_interval_seconds
+            ]
+            # Marcarlas como sondeadas evita que otra invocación las sondee a la vez
+            for status in stale:
+                status.checked_at = now
+        if not stale:
+            return
+        with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+            measurements = list(executor.map(self._probe, stale))
+        with self._lock:
+            for status, (rtt_ms, lag_seconds, error) in zip(stale, measurements):
+                status.healthy = error is None
+                status.error = error
+                status.lag_seconds = lag_seconds
+                if rtt_ms is not None:
+                    status.rtt_ms = rtt_ms if status.rtt_ms is None else (
+                        RTT_SMOOTHING * rtt_ms + (1 - RTT_SMOOTHING) * status.rtt_ms
+                    )
+                logger.info(
+                    f"Réplica {status.name}: sana={status.healthy}, "
+                    f"rtt={status.rtt_ms}ms, retraso={lag_seconds}s"
+                )
+
+    def _probe(
+        self,
+        status: ReplicaStatus
+    ) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """
+        Mide la latencia de ida y vuelta y el retraso de replicación de una réplica.
+
+        Returns:
+            Tupla (rtt ms, retraso s, error); sin error, un retraso desconocido es infinito
+        """
+        connection = None
+        try:
+            connection = psycopg2.connect(
+                host=status.host,
+                port=status.port,
+                connect_timeout=self.probe_timeout_seconds,
+                **self.connect_kwargs
+            )
+            with connection.cursor() as cursor:
+                start = time.time()
+                cursor.execute(REPLICATION_LAG_QUERY)
+                lag = cursor.fetchone()[0]
+                rtt_ms = (time.time() - start) * 1000
+            return rtt_ms, float(lag) if lag is not None else float('inf'), None
+        except psycopg2.Error as e:
+            return None, None, str(e).strip()
+        finally:
+            if connection is not None:
+                connection.close()
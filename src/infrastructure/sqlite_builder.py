@@ -3,17 +3,100 @@ Constructor de archivos SQLite.
 Sigue el principio de Responsabilidad Única (SRP) de SOLID.
 """
 import logging
+import os
+import shutil
 import sqlite3
-from typing import List, Optional
+import threading
+import time
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from domain.interfaces import ISQLiteBuilder
 from domain.models import (
-    Customer, Product, BankAccount, ListPrice, ListPriceDetail,
+    ENTITY_MODELS, Customer, Product, BankAccount, ListPrice, ListPriceDetail,
     ClientListPrice, Location, Cobranza, CobranzaDetail
 )
+from infrastructure.sqlite_extras import SQLITE_EXTRAS
+from utils.hashing import file_sha256
 
 logger = logging.getLogger(__name__)
 
+# Campos fijos del archivo SQLite (misma entrada => mismos bytes)
+SQLITE_PAGE_SIZE = 4096
+SQLITE_APPLICATION_ID = 0x45585053  # 'EXPS'
+SQLITE_SCHEMA_VERSION = 1
+
+# Contadores del encabezado que dependen del historial de escrituras, no del contenido:
+# file change counter (offset 24) y version-valid-for (offset 92)
+_HEADER_COUNTER_OFFSETS = (24, 92)
+_HEADER_COUNTER_VALUE = (1).to_bytes(4, 'big')
+
+# Tabla SQLite de cada entidad
+SQLITE_TABLES: Dict[str, str] = {
+    'customers': 'Customer',
+    'products': 'Product',
+    'bank_accounts': 'BankAccount',
+    'list_prices': 'ListPrice',
+    'locations': 'Location',
+    'list_price_details': 'ListPriceDetail',
+    'client_list_prices': 'ClientListPrice',
+    'cobranzas': 'Cobranza',
+    'cobranza_details': 'CobranzaDetail',
+}
+
+
+def sqlite_column(field_name: str) -> str:
+    """
+    Retorna el nombre de la columna SQLite de un campo del modelo.
+    Ej: 'type_sale' -> 'TypeSale', 'sequence_times_up_to1' -> 'SequenceTimesUpTo1'
+    """
+    return ''.join(part.capitalize() for part in field_name.split('_'))
+
+
+def _column_spec(entity_name: str, columns: Optional[Sequence[str]]) -> List[Tuple[str, bool]]:
+    """
+    Retorna los campos a escribir de una entidad y si son booleanos.
+    Los booleanos se guardan como 1/0 (None se guarda como 0).
+    """
+    return [
+        (f.name, f.type == Optional[bool])
+        for f in fields(ENTITY_MODELS[entity_name])
+        if columns is None or f.name in columns
+    ]
+
+
+class SchemaTemplate:
+    """
+    Base SQLite vacía en memoria con el esquema ya creado (encabezado y tablas).
+    Se crea una vez por proceso y se copia a cada archivo nuevo con la API de backup
+    de SQLite, en lugar de ejecutar el DDL en cada exportación. El archivo resultante
+    es idéntico al creado con create_schema.
+    """
+
+    def __init__(self):
+        """Construye el esquema en una base en memoria compartida por los hilos del proceso."""
+        builder = SQLiteBuilder()
+        builder.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        builder.file_path = ':memory:'
+        cursor = builder.connection.cursor()
+        cursor.execute(f"PRAGMA page_size={SQLITE_PAGE_SIZE}")
+        cursor.execute(f"PRAGMA application_id={SQLITE_APPLICATION_ID}")
+        cursor.execute(f"PRAGMA user_version={SQLITE_SCHEMA_VERSION}")
+        builder.create_schema()
+        self._connection = builder.connection
+        self._schema_version = self._connection.execute("PRAGMA schema_version").fetchone()[0]
+        self._lock = threading.Lock()
+
+    def copy_to(self, connection: sqlite3.Connection) -> None:
+        """
+        Reemplaza el contenido de la base de `connection` por el esquema vacío.
+        El backup fija el contador de cambios de esquema del destino a su valor previo
+        más uno: se restaura el del DDL para que el archivo final no cambie (ver finalize).
+        """
+        with self._lock:
+            self._connection.backup(connection)
+        connection.execute(f"PRAGMA schema_version={self._schema_version}")
+
 
 class SQLiteBuilder(ISQLiteBuilder):
     """
@@ -21,10 +104,17 @@ class SQLiteBuilder(ISQLiteBuilder):
     Implementa ISQLiteBuilder siguiendo el principio DIP.
     """
 
-    def __init__(self):
-        """Inicializa el constructor SQLite."""
+    def __init__(self, schema_template: Optional[SchemaTemplate] = None):
+        """
+        Inicializa el constructor SQLite.
+
+        Args:
+            schema_template: Esquema precreado que create_schema copia en lugar de
+                             ejecutar el DDL (None = se ejecuta el DDL)
+        """
         self.connection: Optional[sqlite3.Connection] = None
         self.file_path: Optional[str] = None
+        self.schema_template = schema_template
 
     def create_database(self, file_path: str) -> None:
         """
@@ -35,16 +125,23 @@ class SQLiteBuilder(ISQLiteBuilder):
         """
         try:
             self.file_path = file_path
-            self.connection = sqlite3.connect(file_path)
+            # El builder puede usarse desde distintos hilos, de a uno por vez
+            # (ver AsyncExportService: cada paso corre en un hilo del executor)
+            self.connection = sqlite3.connect(file_path, check_same_thread=False)
 
             # Optimizaciones de rendimiento para SQLite
             cursor = self.connection.cursor()
 
-            # WAL mode para mejor concurrencia y rendimiento
-            cursor.execute("PRAGMA journal_mode=WAL")
+            # Tamaño de página fijo (debe definirse antes de crear la primera tabla)
+            cursor.execute(f"PRAGMA page_size={SQLITE_PAGE_SIZE}")
+
+            # Journal en memoria: el archivo se descarta si la construcción falla,
+            # y el archivo final queda en modo rollback (sin -wal/-shm en el cliente)
+            cursor.execute("PRAGMA journal_mode=MEMORY")
 
-            # Reducir sincronización para mejor rendimiento (seguro en Lambda)
-            cursor.execute("PRAGMA synchronous=NORMAL")
+            # Sin sincronización a disco durante la construcción
+            # (el archivo es desechable hasta finalize)
+            cursor.execute("PRAGMA synchronous=OFF")
 
             # Aumentar cache size (10MB)
             cursor.execute("PRAGMA cache_size=-10000")
@@ -55,6 +152,10 @@ class SQLiteBuilder(ISQLiteBuilder):
             # Locking mode para mejor rendimiento en escritura única
             cursor.execute("PRAGMA locking_mode=EXCLUSIVE")
 
+            # Campos fijos del encabezado: identifican el formato del archivo
+            cursor.execute(f"PRAGMA application_id={SQLITE_APPLICATION_ID}")
+            cursor.execute(f"PRAGMA user_version={SQLITE_SCHEMA_VERSION}")
+
             logger.info(f"Base de datos SQLite creada con optimizaciones: {file_path}")
         except sqlite3.Error as e:
             logger.error(f"Error creando base de datos SQLite: {e}")
@@ -65,6 +166,15 @@ class SQLiteBuilder(ISQLiteBuilder):
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
+        if self.schema_template is not None:
+            try:
+                self.schema_template.copy_to(self.connection)
+            except sqlite3.Error as e:
+                logger.error(f"Error copiando el esquema precreado: {e}")
+                raise
+            logger.info("Esquema de base de datos copiado del esquema precreado")
+            return
+
         try:
             cursor = self.connection.cursor()
 
@@ -255,457 +365,459 @@ class SQLiteBuilder(ISQLiteBuilder):
             logger.error(f"Error creando esquema: {e}")
             raise
 
-    def insert_customers(self, customers: List[Customer]) -> int:
+    def insert_customers(
+        self,
+        customers: List[Customer],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
         """Inserta clientes en la base de datos usando batch insert."""
-        if not self.connection:
-            raise RuntimeError("No hay conexión activa a SQLite")
-
-        if not customers:
-            logger.warning("No hay customers para insertar")
-            return 0
+        return self._insert_entities('customers', customers, columns)
 
-        try:
-            cursor = self.connection.cursor()
-
-            # Preparar datos para batch insert
-            customer_data = [
-                (
-                    customer.id,
-                    customer.slug,
-                    customer.name,
-                    customer.tel,
-                    customer.email,
-                    customer.code,
-                    customer.sequence,
-                    customer.format,
-                    customer.type_sale,
-                    customer.way_to_pay,
-                    customer.street,
-                    customer.ext_number,
-                    customer.int_number,
-                    customer.suburb,
-                    customer.code_postal,
-                    customer.city,
-                    customer.state,
-                    customer.country,
-                    customer.lat,
-                    customer.lng,
-                    customer.geofence,
-                    customer.sequence_times_from1,
-                    customer.sequence_times_up_to1,
-                    customer.sequence_times_from2,
-                    customer.sequence_times_up_to2,
-                    customer.sequence_times_from3,
-                    customer.sequence_times_up_to3,
-                    1 if customer.is_pay_sun else 0,
-                    1 if customer.is_pay_mon else 0,
-                    1 if customer.is_pay_tues else 0,
-                    1 if customer.is_pay_wed else 0,
-                    1 if customer.is_pay_thurs else 0,
-                    1 if customer.is_pay_fri else 0,
-                    1 if customer.is_pay_sat else 0,
-                    customer.code_netsuit,
-                    customer.credit_limit,
-                    1 if customer.checked else 0,
-                    customer.deuda
-                )
-                for customer in customers
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO Customer (
-                    Id, Slug, Name, Tel, Email, Code, Sequence, Format,
-                    TypeSale, WayToPay, Street, ExtNumber, IntNumber, Suburb,
-                    CodePostal, City, State, Country, Lat, Lng, Geofence,
-                    SequenceTimesFrom1, SequenceTimesUpTo1, SequenceTimesFrom2,
-                    SequenceTimesUpTo2, SequenceTimesFrom3, SequenceTimesUpTo3,
-                    IsPaySun, IsPayMon, IsPayTues, IsPayWed, IsPayThurs, IsPayFri,
-                    IsPaySat, CodeNetsuit, CreditLimit, Checked, Deuda
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, customer_data)
-
-            self.connection.commit()
-            count = len(customers)
-            logger.info(f"Insertados {count} customers en batch")
-            return count
+    def insert_products(
+        self,
+        products: List[Product],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta productos en la base de datos usando batch insert."""
+        return self._insert_entities('products', products, columns)
 
-        except sqlite3.Error as e:
-            logger.error(f"Error insertando customers: {e}")
-            self.connection.rollback()
-            raise
+    def insert_bank_accounts(
+        self,
+        bank_accounts: List[BankAccount],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta cuentas bancarias en la base de datos usando batch insert."""
+        return self._insert_entities('bank_accounts', bank_accounts, columns)
 
-    def insert_products(self, products: List[Product]) -> int:
-        """Inserta productos en la base de datos usando batch insert."""
-        if not self.connection:
-            raise RuntimeError("No hay conexión activa a SQLite")
+    def insert_list_prices(
+        self,
+        list_prices: List[ListPrice],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta listas de precios en la base de datos usando batch insert."""
+        return self._insert_entities('list_prices', list_prices, columns)
 
-        if not products:
-            logger.warning("No hay products para insertar")
-            return 0
+    def insert_list_price_details(
+        self,
+        list_price_details: List[ListPriceDetail],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta detalles de listas de precios en la base de datos usando batch insert."""
+        return self._insert_entities('list_price_details', list_price_details, columns)
 
-        try:
-            cursor = self.connection.cursor()
+    def insert_client_list_prices(
+        self,
+        client_list_prices: List[ClientListPrice],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta relaciones cliente-lista de precios en la base de datos usando batch insert."""
+        return self._insert_entities('client_list_prices', client_list_prices, columns)
 
-            # Preparar datos para batch insert
-            product_data = [
-                (
-                    product.id,
-                    product.sku,
-                    product.name,
-                    product.description,
-                    product.bard_code,
-                    product.type,
-                    product.brand,
-                    product.category
-                )
-                for product in products
-            ]
+    def insert_locations(
+        self,
+        locations: List[Location],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta ubicaciones en la base de datos usando batch insert."""
+        return self._insert_entities('locations', locations, columns)
 
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO Product (
-                    Id, Sku, Name, Description, BardCode, Type, Brand, Category
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, product_data)
+    def insert_cobranzas(
+        self,
+        cobranzas: List[Cobranza],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta cobranzas en la base de datos usando batch insert."""
+        return self._insert_entities('cobranzas', cobranzas, columns)
 
-            self.connection.commit()
-            count = len(products)
-            logger.info(f"Insertados {count} products en batch")
-            return count
+    def insert_cobranza_details(
+        self,
+        cobranza_details: List[CobranzaDetail],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Inserta detalles de cobranza en la base de datos usando batch insert."""
+        return self._insert_entities('cobranza_details', cobranza_details, columns)
+
+    def _insert_entities(
+        self,
+        entity_name: str,
+        items: List[Any],
+        columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Inserta instancias de un modelo en su tabla usando batch insert.
+        Solo escribe las columnas solicitadas; el resto queda en NULL.
 
-        except sqlite3.Error as e:
-            logger.error(f"Error insertando products: {e}")
-            self.connection.rollback()
-            raise
+        Args:
+            entity_name: Nombre de la entidad (ver SQLITE_TABLES)
+            items: Instancias del modelo
+            columns: Campos a escribir (None = todos)
 
-    def insert_bank_accounts(self, bank_accounts: List[BankAccount]) -> int:
-        """Inserta cuentas bancarias en la base de datos usando batch insert."""
+        Returns:
+            Número de registros insertados
+        """
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
-        if not bank_accounts:
-            logger.warning("No hay bank accounts para insertar")
+        label = entity_name.replace('_', ' ')
+        if not items:
+            logger.warning(f"No hay {label} para insertar")
             return 0
 
         try:
             cursor = self.connection.cursor()
 
-            # Preparar datos para batch insert
-            account_data = [
-                (
-                    account.id,
-                    account.name,
-                    account.bank_name,
-                    account.number,
-                    account.accounting_account_name
+            spec = _column_spec(entity_name, columns)
+            column_names = ', '.join(sqlite_column(name) for name, _ in spec)
+            placeholders = ', '.join('?' for _ in spec)
+
+            # Preparar datos para batch insert, ordenados por Id (orden estable e
+            # independiente de cómo llegaron los datos, ver finalize)
+            rows = [
+                tuple(
+                    (1 if getattr(item, name) else 0) if is_bool else getattr(item, name)
+                    for name, is_bool in spec
                 )
-                for account in bank_accounts
+                for item in sorted(items, key=lambda item: item.id)
             ]
 
             # Batch insert
-            cursor.executemany("""
-                INSERT INTO BankAccount (
-                    Id, Name, BankName, Number, AccountingAccountName
-                ) VALUES (?, ?, ?, ?, ?)
-            """, account_data)
+            table_name = SQLITE_TABLES[entity_name]
+            cursor.executemany(
+                f"INSERT INTO {table_name} ({column_names}) VALUES ({placeholders})",
+                rows
+            )
 
             self.connection.commit()
-            count = len(bank_accounts)
-            logger.info(f"Insertados {count} bank accounts en batch")
+            count = len(items)
+            logger.info(f"Insertados {count} {label} en batch")
             return count
 
         except sqlite3.Error as e:
-            logger.error(f"Error insertando bank accounts: {e}")
+            logger.error(f"Error insertando {label}: {e}")
             self.connection.rollback()
             raise
 
-    def insert_list_prices(self, list_prices: List[ListPrice]) -> int:
-        """Inserta listas de precios en la base de datos usando batch insert."""
-        if not self.connection:
-            raise RuntimeError("No hay conexión activa a SQLite")
-
-        if not list_prices:
-            logger.warning("No hay list prices para insertar")
-            return 0
-
-        try:
-            cursor = self.connection.cursor()
-
-            # Preparar datos para batch insert
-            list_price_data = [
-                (
-                    list_price.id,
-                    list_price.name,
-                    list_price.max,
-                    list_price.min,
-                    list_price.customer_sync
-                )
-                for list_price in list_prices
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO ListPrice (
-                    Id, Name, Max, Min, CustomerSync
-                ) VALUES (?, ?, ?, ?, ?)
-            """, list_price_data)
-
-            self.connection.commit()
-            count = len(list_prices)
-            logger.info(f"Insertados {count} list prices en batch")
-            return count
+    def build_extra(self, name: str) -> Dict[str, int]:
+        """
+        Construye una estructura derivada (ver sqlite_extras) a partir de las tablas ya insertadas.
 
-        except sqlite3.Error as e:
-            logger.error(f"Error insertando list prices: {e}")
-            self.connection.rollback()
-            raise
+        Args:
+            name: Nombre del extra
 
-    def insert_list_price_details(self, list_price_details: List[ListPriceDetail]) -> int:
-        """Inserta detalles de listas de precios en la base de datos usando batch insert."""
+        Returns:
+            Diccionario con filas indexadas, bytes agregados al archivo y tiempo de construcción
+        """
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
-        if not list_price_details:
-            logger.warning("No hay list price details para insertar")
-            return 0
-
+        extra = SQLITE_EXTRAS[name]
         try:
+            start = time.time()
             cursor = self.connection.cursor()
+            pages_before = self._used_pages(cursor)
 
-            # Preparar datos para batch insert
-            detail_data = [
-                (
-                    detail.id,
-                    detail.id_price_list,
-                    detail.id_product,
-                    detail.price,
-                    1 if detail.is_vat_applicable else 0
-                )
-                for detail in list_price_details
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO ListPriceDetail (
-                    Id, IdPriceList, IdProduct, Price, IsVatApplicable
-                ) VALUES (?, ?, ?, ?, ?)
-            """, detail_data)
-
+            for statement in extra.create:
+                cursor.execute(statement)
+            for statement in extra.populate:
+                cursor.execute(statement.format(db='main'))
             self.connection.commit()
-            count = len(list_price_details)
-            logger.info(f"Insertados {count} list price details en batch")
-            return count
+
+            pages_after = self._used_pages(cursor)
+            rows = sum(
+                cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in extra.tables
+            )
+            stats = {
+                'rows': rows,
+                'bytes': (pages_after - pages_before) * SQLITE_PAGE_SIZE,
+                'build_time_ms': int((time.time() - start) * 1000)
+            }
+            logger.info(
+                f"Extra '{name}' construido: {stats['rows']} filas, "
+                f"{stats['bytes']} bytes, {stats['build_time_ms']}ms"
+            )
+            return stats
 
         except sqlite3.Error as e:
-            logger.error(f"Error insertando list price details: {e}")
+            logger.error(f"Error construyendo extra '{name}': {e}")
             self.connection.rollback()
             raise
 
-    def insert_client_list_prices(self, client_list_prices: List[ClientListPrice]) -> int:
-        """Inserta relaciones cliente-lista de precios en la base de datos usando batch insert."""
+    @staticmethod
+    def _used_pages(cursor: sqlite3.Cursor) -> int:
+        """Retorna las páginas en uso del archivo (sin las páginas libres)."""
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_count - freelist_count
+
+    def write_delta_metadata(
+        self,
+        sync_info: Dict[str, str],
+        deleted_ids: Dict[str, List[int]],
+        upserted_entities: Sequence[str],
+        replaced_entities: Sequence[str],
+        extras: Sequence[str] = ()
+    ) -> None:
+        """
+        Escribe las tablas de sincronización de un archivo delta.
+
+        - SyncInfo: pares clave/valor (since, watermark, perfil, ...)
+        - SyncDeletedRow: filas dadas de baja (TableName, Id)
+        - SyncApplyStep: sentencias SQL, en orden, que aplican la delta sobre la base
+          del cliente. Se ejecutan en una sola transacción con este archivo adjunto
+          como `delta` (ATTACH DATABASE '<archivo delta>' AS delta).
+
+        Args:
+            sync_info: Información de la sincronización
+            deleted_ids: Ids dados de baja por entidad
+            upserted_entities: Entidades cuyas filas de la delta reemplazan a las del cliente
+            replaced_entities: Entidades que se envían completas (reemplazan la tabla entera)
+            extras: Extras del archivo del cliente que se recalculan si cambió alguna de sus fuentes
+        """
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
-        if not client_list_prices:
-            logger.warning("No hay client list prices para insertar")
-            return 0
-
         try:
             cursor = self.connection.cursor()
-
-            # Preparar datos para batch insert
-            client_list_price_data = [
-                (
-                    client_list_price.id,
-                    client_list_price.id_client,
-                    client_list_price.id_list_price
+            cursor.execute("CREATE TABLE SyncInfo (Key TEXT PRIMARY KEY, Value TEXT)")
+            cursor.execute("""
+                CREATE TABLE SyncDeletedRow (
+                    TableName TEXT,
+                    Id INTEGER,
+                    PRIMARY KEY (TableName, Id)
                 )
-                for client_list_price in client_list_prices
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO ClientListPrice (
-                    Id, IdClient, IdListPrice
-                ) VALUES (?, ?, ?)
-            """, client_list_price_data)
+            """)
+            cursor.execute("CREATE TABLE SyncApplyStep (Step INTEGER PRIMARY KEY, Sql TEXT)")
+
+            cursor.executemany(
+                "INSERT INTO SyncInfo (Key, Value) VALUES (?, ?)",
+                sorted(sync_info.items())
+            )
+            cursor.executemany(
+                "INSERT INTO SyncDeletedRow (TableName, Id) VALUES (?, ?)",
+                [
+                    (SQLITE_TABLES[entity_name], row_id)
+                    for entity_name, ids in deleted_ids.items()
+                    for row_id in ids
+                ]
+            )
+
+            steps = []
+            changed_entities = set(replaced_entities)
+            # 1. Bajas y tablas completas: primero las dependientes (orden inverso de FKs)
+            for entity_name in reversed(list(SQLITE_TABLES)):
+                table = SQLITE_TABLES[entity_name]
+                if entity_name in replaced_entities:
+                    steps.append(f"DELETE FROM main.{table}")
+                elif deleted_ids.get(entity_name):
+                    changed_entities.add(entity_name)
+                    steps.append(
+                        f"DELETE FROM main.{table} WHERE Id IN "
+                        f"(SELECT Id FROM delta.SyncDeletedRow WHERE TableName = '{table}')"
+                    )
+
+            # 2. Altas y modificaciones: primero las tablas base (orden de FKs)
+            for entity_name in SQLITE_TABLES:
+                table = SQLITE_TABLES[entity_name]
+                if entity_name in replaced_entities:
+                    steps.append(f"INSERT INTO main.{table} SELECT * FROM delta.{table}")
+                elif entity_name in upserted_entities:
+                    has_rows = cursor.execute(
+                        f"SELECT EXISTS (SELECT 1 FROM {table})"
+                    ).fetchone()[0]
+                    if has_rows:
+                        changed_entities.add(entity_name)
+                        # ListPrice no tiene PRIMARY KEY: se borra y se inserta en vez de REPLACE
+                        steps.append(
+                            f"DELETE FROM main.{table} WHERE Id IN (SELECT Id FROM delta.{table})"
+                        )
+                        steps.append(f"INSERT INTO main.{table} SELECT * FROM delta.{table}")
+
+            # 3. Extras derivados de tablas que cambiaron
+            for name in extras:
+                extra = SQLITE_EXTRAS[name]
+                if changed_entities.intersection(extra.sources):
+                    steps.extend(statement.format(db='main') for statement in extra.populate)
+
+            cursor.executemany(
+                "INSERT INTO SyncApplyStep (Step, Sql) VALUES (?, ?)",
+                list(enumerate(steps, start=1))
+            )
 
             self.connection.commit()
-            count = len(client_list_prices)
-            logger.info(f"Insertados {count} client list prices en batch")
-            return count
+            deleted_count = sum(len(ids) for ids in deleted_ids.values())
+            logger.info(
+                f"Metadatos de delta escritos: {deleted_count} bajas, "
+                f"{len(steps)} pasos de aplicación"
+            )
 
         except sqlite3.Error as e:
-            logger.error(f"Error insertando client list prices: {e}")
+            logger.error(f"Error escribiendo metadatos de delta: {e}")
             self.connection.rollback()
             raise
 
-    def insert_locations(self, locations: List[Location]) -> int:
-        """Inserta ubicaciones en la base de datos usando batch insert."""
+    def copy_tables_from(self, source_path: str, entity_names: Sequence[str]) -> Dict[str, int]:
+        """
+        Copia tablas completas desde un archivo SQLite previo con el mismo esquema.
+        Se usa en reconstrucciones incrementales: las tablas sin cambios se copian
+        con INSERT ... SELECT dentro de SQLite en vez de volver a consultarlas.
+
+        Args:
+            source_path: Ruta del archivo SQLite previo
+            entity_names: Entidades a copiar (ver SQLITE_TABLES)
+
+        Returns:
+            Diccionario {entidad: registros copiados}
+        """
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
-        if not locations:
-            logger.warning("No hay locations para insertar")
-            return 0
+        counts: Dict[str, int] = {}
+        if not entity_names:
+            return counts
 
         try:
             cursor = self.connection.cursor()
-
-            # Preparar datos para batch insert
-            location_data = [
-                (
-                    location.id,
-                    location.slug,
-                    location.name,
-                    location.tel,
-                    location.email,
-                    location.code,
-                    location.sequence,
-                    location.format,
-                    location.zone,
-                    location.use,
-                    location.category,
-                    location.type_location,
-                    location.street,
-                    location.ext_number,
-                    location.int_number,
-                    location.suburb,
-                    location.code_postal,
-                    location.city,
-                    location.state,
-                    location.country,
-                    location.lat,
-                    location.lng,
-                    location.geofence,
-                    location.sequence_times_from1,
-                    location.sequence_times_up_to1,
-                    location.sequence_times_from2,
-                    location.sequence_times_up_to2,
-                    location.sequence_times_from3,
-                    location.sequence_times_up_to3,
-                    1 if location.is_pay_sun else 0,
-                    1 if location.is_pay_mon else 0,
-                    1 if location.is_pay_tues else 0,
-                    1 if location.is_pay_wed else 0,
-                    1 if location.is_pay_thurs else 0,
-                    1 if location.is_pay_fri else 0,
-                    1 if location.is_pay_sat else 0,
-                    location.seller,
-                    1 if location.checked else 0
-                )
-                for location in locations
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO Location (
-                    Id, Slug, Name, Tel, Email, Code, Sequence, Format, Zone, Use,
-                    Category, TypeLocation, Street, ExtNumber, IntNumber, Suburb,
-                    CodePostal, City, State, Country, Lat, Lng, Geofence,
-                    SequenceTimesFrom1, SequenceTimesUpTo1, SequenceTimesFrom2,
-                    SequenceTimesUpTo2, SequenceTimesFrom3, SequenceTimesUpTo3,
-                    IsPaySun, IsPayMon, IsPayTues, IsPayWed, IsPayThurs, IsPayFri,
-                    IsPaySat, Seller, Checked
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, location_data)
-
-            self.connection.commit()
-            count = len(locations)
-            logger.info(f"Insertados {count} locations en batch")
-            return count
+            cursor.execute("ATTACH DATABASE ? AS previous", (source_path,))
+            try:
+                # Orden de FKs para mantener el orden de inserción original
+                for entity_name in SQLITE_TABLES:
+                    if entity_name not in entity_names:
+                        continue
+                    table = SQLITE_TABLES[entity_name]
+                    cursor.execute(
+                        f"INSERT INTO main.{table} SELECT * FROM previous.{table} ORDER BY rowid"
+                    )
+                    counts[entity_name] = cursor.rowcount
+                self.connection.commit()
+            finally:
+                cursor.execute("DETACH DATABASE previous")
+
+            logger.info(f"Tablas copiadas del artefacto previo: {counts}")
+            return counts
 
         except sqlite3.Error as e:
-            logger.error(f"Error insertando locations: {e}")
+            logger.error(f"Error copiando tablas del artefacto previo: {e}")
             self.connection.rollback()
             raise
 
-    def insert_cobranzas(self, cobranzas: List[Cobranza]) -> int:
-        """Inserta cobranzas en la base de datos usando batch insert."""
+    def finalize(self) -> str:
+        """
+        Cierra el archivo dejándolo byte-reproducible y retorna su hash de contenido.
+
+        Con la misma entrada el archivo resultante es idéntico byte a byte:
+        - Las tablas se crean y se llenan siempre en el mismo orden (esquema fijo, filas por Id)
+        - VACUUM reconstruye el archivo compacto, sin páginas libres ni restos del historial
+        - Los contadores del encabezado que cuentan transacciones se fijan a un valor constante
+
+        Returns:
+            SHA-256 del archivo en hexadecimal
+        """
         if not self.connection:
             raise RuntimeError("No hay conexión activa a SQLite")
 
-        if not cobranzas:
-            logger.warning("No hay cobranzas para insertar")
-            return 0
-
         try:
-            cursor = self.connection.cursor()
-
-            # Preparar datos para batch insert
-            cobranza_data = [
-                (
-                    cobranza.id,
-                    cobranza.id_client,
-                    cobranza.bill_number,
-                    cobranza.total,
-                    cobranza.issue,
-                    cobranza.validity
-                )
-                for cobranza in cobranzas
-            ]
-
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO Cobranza (
-                    Id, IdClient, BillNumber, Total, Issue, Validity
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, cobranza_data)
-
             self.connection.commit()
-            count = len(cobranzas)
-            logger.info(f"Insertados {count} cobranzas en batch")
-            return count
-
+            self.connection.execute("VACUUM")
+            self.connection.close()
+            self.connection = None
         except sqlite3.Error as e:
-            logger.error(f"Error insertando cobranzas: {e}")
-            self.connection.rollback()
+            logger.error(f"Error finalizando base de datos SQLite: {e}")
             raise
 
-    def insert_cobranza_details(self, cobranza_details: List[CobranzaDetail]) -> int:
-        """Inserta detalles de cobranza en la base de datos usando batch insert."""
-        if not self.connection:
-            raise RuntimeError("No hay conexión activa a SQLite")
+        with open(self.file_path, 'r+b') as f:
+            for offset in _HEADER_COUNTER_OFFSETS:
+                f.seek(offset)
+                f.write(_HEADER_COUNTER_VALUE)
+
+        content_hash = file_sha256(self.file_path)
+        logger.info(f"Base de datos SQLite finalizada: sha256={content_hash}")
+        return content_hash
+
+    def split_bundle(
+        self,
+        source_path: str,
+        output_dir: str,
+        entity_names: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Divide un archivo exportado en un paquete: un archivo núcleo y un archivo por tabla.
 
-        if not cobranza_details:
-            logger.warning("No hay cobranza details para insertar")
-            return 0
+        - core.sqlite: copia del archivo completo con las tablas separadas vacías (el esquema
+          no cambia, la app abre el núcleo y funciona mientras descarga el resto)
+        - <Tabla>.sqlite: una sola tabla con la misma definición, para adjuntar con
+          ATTACH DATABASE '<Tabla>.sqlite' AS part y consultar, o integrar al núcleo con
+          INSERT INTO main.<Tabla> SELECT * FROM part.<Tabla>
 
-        try:
-            cursor = self.connection.cursor()
+        Todos los archivos quedan byte-reproducibles (ver finalize).
 
-            # Preparar datos para batch insert
-            detail_data = [
-                (
-                    detail.id,
-                    detail.id_cobranza,
-                    detail.id_product,
-                    detail.amount,
-                    detail.price
-                )
-                for detail in cobranza_details
-            ]
+        Args:
+            source_path: Archivo SQLite completo ya finalizado
+            output_dir: Directorio donde escribir las partes
+            entity_names: Entidades que van en archivos separados
 
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO CobranzaDetail (
-                    Id, IdCobranza, IdProduct, Amount, Price
-                ) VALUES (?, ?, ?, ?, ?)
-            """, detail_data)
+        Returns:
+            Partes del paquete (núcleo primero) con archivo, tablas, filas, tamaño y hash
+        """
+        parts: List[Dict[str, Any]] = []
+        split_tables = [SQLITE_TABLES[e] for e in SQLITE_TABLES if e in entity_names]
 
-            self.connection.commit()
-            count = len(cobranza_details)
-            logger.info(f"Insertados {count} cobranza details en batch")
-            return count
+        try:
+            # Núcleo: el archivo completo sin las filas de las tablas separadas
+            core_path = os.path.join(output_dir, 'core.sqlite')
+            shutil.copyfile(source_path, core_path)
+            self.create_database(core_path)
+            for table in split_tables:
+                self.connection.execute(f"DELETE FROM {table}")
+            parts.append(self._bundle_part('core', core_path, [], self.finalize()))
+
+            # Un archivo por tabla separada
+            for table in split_tables:
+                part_path = os.path.join(output_dir, f"{table}.sqlite")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                self.create_database(part_path)
+                cursor = self.connection.cursor()
+                cursor.execute("ATTACH DATABASE ? AS source", (source_path,))
+                ddl = cursor.execute(
+                    "SELECT sql FROM source.sqlite_master WHERE type = 'table' AND name = ?",
+                    (table,)
+                ).fetchone()[0]
+                cursor.execute(ddl)
+                cursor.execute(
+                    f"INSERT INTO main.{table} SELECT * FROM source.{table} ORDER BY rowid"
+                )
+                records = cursor.rowcount
+                self.connection.commit()
+                cursor.execute("DETACH DATABASE source")
+                part = self._bundle_part(table, part_path, [table], self.finalize())
+                part['records'] = records
+                parts.append(part)
+
+            logger.info(
+                f"Paquete generado: {[(p['name'], p['file_size']) for p in parts]}"
+            )
+            return parts
 
         except sqlite3.Error as e:
-            logger.error(f"Error insertando cobranza details: {e}")
-            self.connection.rollback()
+            logger.error(f"Error generando paquete SQLite: {e}")
+            self.close()
             raise
 
+    @staticmethod
+    def _bundle_part(name: str, path: str, tables: List[str], sha256: str) -> Dict[str, Any]:
+        """Describe una parte del paquete para el manifiesto."""
+        return {
+            'name': name,
+            'file': os.path.basename(path),
+            'tables': tables,
+            'file_size': os.path.getsize(path),
+            'sha256': sha256
+        }
+
     def close(self) -> None:
         """Cierra la conexión con la base de datos SQLite."""
         if self.connection:
             self.connection.close()
+            self.connection = None
             logger.info("Conexión SQLite cerrada")
@@ -0,0 +1,251 @@
+"""
+Estructuras derivadas opcionales del archivo SQLite (extras de exportación).
+Cada extra se construye en el servidor a partir de las tablas ya insertadas,
+para que el dispositivo consulte un índice en vez de recorrer tablas completas.
+
+Las sentencias de `populate` usan el marcador {db} como esquema y son idempotentes:
+se ejecutan al construir el archivo (db = main) y, después de aplicar una delta,
+como pasos de SyncApplyStep para mantener el extra al día en el cliente.
+"""
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class SQLiteExtra:
+    """
+    Definición de un extra.
+
+    Attributes:
+        name: Nombre del extra (ver domain.profiles.EXPORT_EXTRAS)
+        sources: Entidades de las que se deriva (si ninguna cambia, no se recalcula)
+        tables: Tablas que crea el extra (para reportar filas)
+        create: Sentencias DDL
+        populate: Sentencias que llenan (o rellenan desde cero) el extra
+    """
+
+    name: str
+    sources: Tuple[str, ...]
+    tables: Tuple[str, ...]
+    create: Tuple[str, ...]
+    populate: Tuple[str, ...]
+
+
+# Búsqueda de texto completo (FTS5) sobre productos y clientes.
+# - content=...: tablas de contenido externo; el índice no duplica el texto de las filas
+# - unicode61 remove_diacritics 2: 'cafe' encuentra 'Café'
+# - detail=column: sin posiciones de tokens (no hay búsqueda por frase), índice mucho más chico
+# - sin índices de prefijo: "coca*" se resuelve igual con un rango sobre el vocabulario;
+#   prefix='2 3' aceleraría el autocompletado a costa de ~70% más de tamaño del índice
+# Uso en el dispositivo:
+#   SELECT p.* FROM ProductSearch s JOIN Product p ON p.Id = s.rowid
+#   WHERE ProductSearch MATCH 'coca*' ORDER BY rank
+_FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', detail=column"
+
+SEARCH_EXTRA = SQLiteExtra(
+    name='search',
+    sources=('products', 'customers'),
+    tables=('ProductSearch', 'CustomerSearch'),
+    create=(
+        f"""
+        CREATE VIRTUAL TABLE ProductSearch USING fts5(
+            Name, Sku, BardCode,
+            content='Product', content_rowid='Id', {_FTS_OPTIONS}
+        )
+        """,
+        f"""
+        CREATE VIRTUAL TABLE CustomerSearch USING fts5(
+            Name, Code,
+            content='Customer', content_rowid='Id', {_FTS_OPTIONS}
+        )
+        """,
+    ),
+    populate=(
+        "INSERT INTO {db}.ProductSearch(ProductSearch) VALUES ('rebuild')",
+        "INSERT INTO {db}.ProductSearch(ProductSearch) VALUES ('optimize')",
+        "INSERT INTO {db}.CustomerSearch(CustomerSearch) VALUES ('rebuild')",
+        "INSERT INTO {db}.CustomerSearch(CustomerSearch) VALUES ('optimize')",
+    )
+)
+
+
+def _geo_populate(index_table: str, source_table: str) -> Tuple[str, ...]:
+    """
+    Llena un índice R*Tree con las coordenadas (TEXT) de una tabla.
+    Cada punto es una caja degenerada (mín = máx). Se descartan coordenadas vacías,
+    no numéricas o fuera de rango y el (0, 0) que se usa como "sin ubicación".
+    """
+    return (
+        f"DELETE FROM {{db}}.{index_table}",
+        f"""
+        INSERT INTO {{db}}.{index_table} (Id, MinLat, MaxLat, MinLng, MaxLng)
+        SELECT Id, Lat, Lat, Lng, Lng
+        FROM (
+            SELECT Id, CAST(Lat AS REAL) AS Lat, CAST(Lng AS REAL) AS Lng
+            FROM {{db}}.{source_table}
+            WHERE TRIM(Lat) <> '' AND TRIM(Lng) <> ''
+        )
+        WHERE Lat BETWEEN -90 AND 90
+          AND Lng BETWEEN -180 AND 180
+          AND NOT (Lat = 0 AND Lng = 0)
+        ORDER BY Id
+        """,
+    )
+
+
+# Índice espacial (R*Tree) de clientes y ubicaciones.
+# El R*Tree guarda float de 32 bits (redondeando la caja hacia afuera): sirve como filtro
+# por caja y la distancia exacta se calcula con Lat/Lng de la tabla original.
+# Uso en el dispositivo (clientes dentro de una caja alrededor de un punto):
+#   SELECT c.* FROM CustomerGeo g JOIN Customer c ON c.Id = g.Id
+#   WHERE g.MinLat >= :lat - :d AND g.MaxLat <= :lat + :d
+#     AND g.MinLng >= :lng - :d AND g.MaxLng <= :lng + :d
+GEO_EXTRA = SQLiteExtra(
+    name='geo',
+    sources=('customers', 'locations'),
+    tables=('CustomerGeo', 'LocationGeo'),
+    create=(
+        "CREATE VIRTUAL TABLE CustomerGeo USING rtree(Id, MinLat, MaxLat, MinLng, MaxLng)",
+        "CREATE VIRTUAL TABLE LocationGeo USING rtree(Id, MinLat, MaxLat, MinLng, MaxLng)",
+    ),
+    populate=(
+        _geo_populate('CustomerGeo', 'Customer')
+        + _geo_populate('LocationGeo', 'Location')
+    )
+)
+
+# Precio resuelto por cliente y producto (ClientListPrice -> ListPriceDetail).
+# Si un producto aparece en varias listas del cliente, gana la primera lista asignada
+# (menor ClientListPrice.Id) y, dentro de ella, el detalle de menor Id.
+# WITHOUT ROWID: la clave primaria es el índice, la consulta es un solo sondeo:
+#   SELECT Price, IsVatApplicable FROM CustomerProductPrice WHERE IdClient = ? AND IdProduct = ?
+PRICES_EXTRA = SQLiteExtra(
+    name='prices',
+    sources=('client_list_prices', 'list_price_details'),
+    tables=('CustomerProductPrice',),
+    create=(
+        """
+        CREATE TABLE CustomerProductPrice (
+            IdClient INTEGER,
+            IdProduct INTEGER,
+            IdListPrice INTEGER,
+            Price TEXT,
+            IsVatApplicable INTEGER,
+            PRIMARY KEY (IdClient, IdProduct)
+        ) WITHOUT ROWID
+        """,
+    ),
+    populate=(
+        "DELETE FROM {db}.CustomerProductPrice",
+        # Filas en orden de la clave primaria (inserción al final del árbol); con OR IGNORE
+        # se queda la primera fila de cada (IdClient, IdProduct). ~2x más rápido que
+        # ROW_NUMBER() OVER (PARTITION BY ...), que ordena las filas dos veces
+        """
+        INSERT OR IGNORE INTO {db}.CustomerProductPrice
+            (IdClient, IdProduct, IdListPrice, Price, IsVatApplicable)
+        SELECT clp.IdClient, lpd.IdProduct, clp.IdListPrice, lpd.Price, lpd.IsVatApplicable
+        FROM {db}.ClientListPrice clp
+        JOIN {db}.ListPriceDetail lpd ON lpd.IdPriceList = clp.IdListPrice
+        WHERE clp.IdClient IS NOT NULL AND lpd.IdProduct IS NOT NULL
+        ORDER BY clp.IdClient, lpd.IdProduct, clp.Id, lpd.Id
+        """,
+    )
+)
+
+# Cobranzas pendientes por cliente: saldo, facturas y antigüedad del vencimiento.
+# La antigüedad se calcula respecto a la fecha UTC de construcción (columna AsOf);
+# al aplicar una delta se recalcula con la fecha del dispositivo.
+# Días vencidos = AsOf - Validity (sin Validity la factura cuenta como vigente).
+_RECEIVABLE_INVOICES = """
+        SELECT
+            c.Id,
+            c.IdClient,
+            CAST(c.Total AS REAL) AS Total,
+            date(c.Validity) AS DueDate,
+            CAST(julianday(date('now')) - julianday(date(c.Validity)) AS INTEGER) AS DaysOverdue
+        FROM {db}.Cobranza c
+        WHERE c.IdClient IS NOT NULL
+"""
+
+RECEIVABLES_EXTRA = SQLiteExtra(
+    name='receivables',
+    sources=('cobranzas', 'cobranza_details'),
+    tables=('ReceivableSummary', 'ReceivableAging'),
+    create=(
+        """
+        CREATE TABLE ReceivableSummary (
+            IdClient INTEGER PRIMARY KEY,
+            AsOf TEXT,
+            InvoiceCount INTEGER,
+            OverdueInvoiceCount INTEGER,
+            OpenBalance REAL,
+            CurrentBalance REAL,
+            Overdue1To30 REAL,
+            Overdue31To60 REAL,
+            Overdue61To90 REAL,
+            OverdueOver90 REAL,
+            OldestDueDate TEXT,
+            DetailAmount REAL
+        )
+        """,
+        """
+        CREATE TABLE ReceivableAging (
+            Bucket TEXT PRIMARY KEY,
+            AsOf TEXT,
+            InvoiceCount INTEGER,
+            Amount REAL
+        ) WITHOUT ROWID
+        """,
+    ),
+    populate=(
+        "DELETE FROM {db}.ReceivableSummary",
+        "DELETE FROM {db}.ReceivableAging",
+        f"""
+        INSERT INTO {{db}}.ReceivableSummary
+        SELECT
+            i.IdClient,
+            date('now'),
+            COUNT(*),
+            SUM(i.DaysOverdue > 0),
+            ROUND(TOTAL(i.Total), 2),
+            ROUND(TOTAL(CASE WHEN i.DaysOverdue IS NULL OR i.DaysOverdue <= 0 THEN i.Total END), 2),
+            ROUND(TOTAL(CASE WHEN i.DaysOverdue BETWEEN 1 AND 30 THEN i.Total END), 2),
+            ROUND(TOTAL(CASE WHEN i.DaysOverdue BETWEEN 31 AND 60 THEN i.Total END), 2),
+            ROUND(TOTAL(CASE WHEN i.DaysOverdue BETWEEN 61 AND 90 THEN i.Total END), 2),
+            ROUND(TOTAL(CASE WHEN i.DaysOverdue > 90 THEN i.Total END), 2),
+            MIN(CASE WHEN i.DaysOverdue > 0 THEN i.DueDate END),
+            ROUND(TOTAL(d.Amount), 2)
+        FROM ({_RECEIVABLE_INVOICES}) i
+        LEFT JOIN (
+            SELECT IdCobranza, TOTAL(CAST(Amount AS REAL)) AS Amount
+            FROM {{db}}.CobranzaDetail
+            GROUP BY IdCobranza
+        ) d ON d.IdCobranza = i.Id
+        GROUP BY i.IdClient
+        ORDER BY i.IdClient
+        """,
+        f"""
+        INSERT INTO {{db}}.ReceivableAging
+        SELECT
+            CASE
+                WHEN DaysOverdue IS NULL OR DaysOverdue <= 0 THEN 'current'
+                WHEN DaysOverdue <= 30 THEN '1-30'
+                WHEN DaysOverdue <= 60 THEN '31-60'
+                WHEN DaysOverdue <= 90 THEN '61-90'
+                ELSE '90+'
+            END AS Bucket,
+            date('now'),
+            COUNT(*),
+            ROUND(TOTAL(Total), 2)
+        FROM ({_RECEIVABLE_INVOICES})
+        GROUP BY Bucket
+        ORDER BY Bucket
+        """,
+    )
+)
+
+# Extras disponibles por nombre (se construyen en este orden)
+SQLITE_EXTRAS: Dict[str, SQLiteExtra] = {
+    extra.name: extra
+    for extra in (SEARCH_EXTRA, GEO_EXTRA, PRICES_EXTRA, RECEIVABLES_EXTRA)
+}
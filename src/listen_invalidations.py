@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Listener de cambios de PostgreSQL para la invalidación de artefactos (ver
+InvalidationListener y create_invalidation_triggers.sql).
+
+Registra en INVALIDATION_DIR los tenants y entidades modificados; con
+INVALIDATION_ENABLED, las exportaciones de tenants sin cambios sirven su artefacto
+sin consultar PostgreSQL. INVALIDATION_DIR y ARTIFACT_CACHE_DIR deben ser los que
+leen las exportaciones (ej: un volumen EFS compartido con la Lambda).
+
+Con --precompute, los artefactos existentes de los tenants modificados se
+recalculan en segundo plano (agrupando los cambios de --precompute-delay segundos).
+Los cambios de tablas globales no se precalculan: afectan a todos los tenants.
+
+Uso:
+    python src/listen_invalidations.py [--precompute] [--profiles full,lite]
+                                       [--precompute-delay 5] [--workers 4]
+"""
+import argparse
+import signal
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Set
+
+from config.settings import get_settings
+from domain.profiles import get_profile
+from handler import create_precompute_scheduler, get_invalidation_store, precompute_tenant
+from infrastructure.invalidation_listener import InvalidationListener
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PrecomputeQueue:
+    """Acumula los tenants modificados y los precalcula en un hilo, por tandas."""
+
+    def __init__(self, scheduler, profile_names: Sequence[Optional[str]], delay_seconds: float):
+        self.scheduler = scheduler
+        self.profile_names = profile_names
+        self.delay_seconds = delay_seconds
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def enqueue(self, changes: Dict[Optional[int], Set[str]]) -> None:
+        """Encola los tenants de los cambios notificados (se llama desde el listener)."""
+        tenant_ids = [tenant_id for tenant_id in changes if tenant_id is not None]
+        if not tenant_ids:
+            return
+        with self._lock:
+            self._pending.update(tenant_ids)
+        self._wakeup.set()
+
+    def run(self, stop_event: threading.Event) -> None:
+        """Precalcula las tandas hasta que se active stop_event."""
+        while not stop_event.is_set():
+            if not self._wakeup.wait(timeout=1):
+                continue
+            # Esperar a que termine la ráfaga de cambios antes de exportar
+            stop_event.wait(self.delay_seconds)
+            with self._lock:
+                tenant_ids, self._pending = self._pending, set()
+                self._wakeup.clear()
+            candidates = self.scheduler.plan_changed(tenant_ids, self.profile_names)
+            if candidates:
+                logger.info(
+                    f"Precalculando {len(candidates)} artefactos de "
+                    f"{len(tenant_ids)} tenants modificados"
+                )
+                self.scheduler.run(candidates, precompute_tenant)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Escucha cambios hasta recibir SIGINT o SIGTERM; retorna el código de salida del proceso."""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Registra los cambios notificados por PostgreSQL")
+    parser.add_argument('--precompute', action='store_true',
+                        help="Recalcula los artefactos existentes de los tenants modificados")
+    parser.add_argument('--profiles', default='',
+                        help="Perfiles a recalcular, separados por coma "
+                             "(vacío = perfil por defecto)")
+    parser.add_argument('--precompute-delay', type=float, default=5,
+                        help="Segundos que se agrupan los cambios antes de recalcular")
+    parser.add_argument('--workers', type=int, default=settings.precompute_max_workers,
+                        help="Exportaciones simultáneas (presupuesto de conexiones a PostgreSQL)")
+    args = parser.parse_args(argv)
+
+    store = get_invalidation_store(settings)
+    if store is None:
+        logger.error("El listener requiere el registro de cambios (INVALIDATION_ENABLED)")
+        return 2
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_event.set())
+
+    on_change = None
+    worker = None
+    if args.precompute:
+        if not settings.artifact_cache_enabled:
+            logger.error("El precálculo requiere el almacén de artefactos (ARTIFACT_CACHE_ENABLED)")
+            return 2
+        scheduler = create_precompute_scheduler(settings)
+        scheduler.max_workers = args.workers
+        profile_names = [
+            name.strip().lower() for name in args.profiles.split(',') if name.strip()
+        ] or [None]
+        for profile_name in profile_names:
+            try:
+                get_profile(profile_name)
+            except ValueError as e:
+                parser.error(str(e))
+        queue = PrecomputeQueue(scheduler, profile_names, args.precompute_delay)
+        on_change = queue.enqueue
+        worker = threading.Thread(
+            target=queue.run, args=(stop_event,), name='precompute', daemon=True
+        )
+        worker.start()
+
+    listener = InvalidationListener(
+        store,
+        host=settings.postgres_host,
+        port=settings.postgres_port,
+        database=settings.postgres_database,
+        user=settings.postgres_user,
+        password=settings.postgres_password,
+        channel=settings.invalidation_channel,
+        heartbeat_interval_seconds=settings.invalidation_heartbeat_interval_seconds,
+        on_change=on_change
+    )
+    listener.run(stop_event)
+    if worker is not None:
+        worker.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Precálculo de artefactos de los tenants con más demanda (ver PrecomputeScheduler).
+
+Ordena los tenants del log de acceso por demanda, antigüedad de su artefacto y
+cambios en sus datos, y los exporta al almacén de artefactos en procesos
+paralelos. ARTIFACT_CACHE_DIR debe apuntar al almacén que leen las exportaciones
+(ej: un volumen EFS compartido con la Lambda).
+
+El resultado (el plan con --dry-run, o el resumen por tenant) se escribe en
+stdout como un único documento JSON; el progreso se informa con el logger.
+
+Uso:
+    python src/precompute.py --access-log requests.jsonl [--window-hours 24]
+                             [--max-tenants 100] [--workers 4] [--dry-run]
+"""
+import argparse
+import json
+import sys
+from typing import Any, List, Optional
+
+from config.settings import get_settings
+from handler import create_precompute_scheduler, precompute_tenant
+from infrastructure.access_log import count_requests
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _write_result(result: Any) -> None:
+    """Escribe el resultado de la corrida en stdout (contrato de salida del CLI)."""
+    sys.stdout.write(json.dumps(result, indent=2) + '\n')
+    sys.stdout.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ejecuta una corrida de precálculo; retorna el código de salida del proceso."""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Precalcula artefactos de los tenants con más demanda"
+    )
+    parser.add_argument('--access-log', required=True, help="Log de acceso JSONL")
+    parser.add_argument('--window-hours', type=float, default=settings.precompute_window_hours,
+                        help="Ventana del log de acceso (horas)")
+    parser.add_argument('--max-tenants', type=int, default=settings.precompute_max_tenants,
+                        help="Tenants por corrida")
+    parser.add_argument('--workers', type=int, default=settings.precompute_max_workers,
+                        help="Exportaciones simultáneas (presupuesto de conexiones a PostgreSQL)")
+    parser.add_argument('--dry-run', action='store_true', help="Solo muestra el plan")
+    args = parser.parse_args(argv)
+
+    if not settings.artifact_cache_enabled:
+        logger.error("El precálculo requiere el almacén de artefactos (ARTIFACT_CACHE_ENABLED)")
+        return 2
+
+    request_counts = count_requests(args.access_log, window_seconds=args.window_hours * 3600)
+    scheduler = create_precompute_scheduler(settings)
+    scheduler.max_workers = args.workers
+    candidates = scheduler.plan(request_counts, max_tenants=args.max_tenants)
+
+    if args.dry_run:
+        logger.info(f"Plan de precálculo: {len(candidates)} tenants (dry-run)")
+        _write_result([candidate.to_dict() for candidate in candidates])
+        return 0
+
+    summaries = scheduler.run(candidates, precompute_tenant)
+    failed = sum(1 for summary in summaries if not summary.get('success'))
+    logger.info(f"Precálculo terminado: {len(summaries)} tenants, {failed} con error")
+    _write_result(summaries)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP de larga duración (ej: Fargate, o local) con la misma API que la Lambda.
+
+Atiende GET /export/{tenant_id} con los mismos parámetros y headers que API Gateway
+(profile, since, bundle, chunks, If-None-Match...) traduciendo cada request al evento
+de lambda_handler, y POST /batch con el evento de lotes. A diferencia de Lambda, el
+proceso conserva entre requests:
+
+- los pools de conexiones a PostgreSQL (sin handshake ni autenticación por exportación)
+- el esquema SQLite precreado que se copia a cada archivo nuevo
+- las cachés en memoria del handler (artefactos, caché negativa, latencias para el
+  hedging, estado de las réplicas y del circuit breaker)
+
+GET /health responde el estado del proceso (para el health check del balanceador).
+
+Uso:
+    python src/server.py [--host 0.0.0.0] [--port 8080]
+"""
+import argparse
+import base64
+import json
+import re
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import handler
+from config.settings import get_settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Ruta de exportación: /export/{tenant_id} (la validación del tenant es la de la Lambda)
+_EXPORT_PATH = re.compile(r'^/export/([^/]+)/?$')
+
+# Tamaño máximo del cuerpo de POST /batch
+MAX_BATCH_BODY_BYTES = 1024 * 1024
+
+
+class RequestContext:
+    """Contexto equivalente al de Lambda: el plazo de cada request (ver _request_deadline)."""
+
+    def __init__(self, timeout_seconds: float):
+        self._expires_at = time.time() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        """Milisegundos que le quedan al request."""
+        return max(0, int((self._expires_at - time.time()) * 1000))
+
+
+def build_export_event(path: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Traduce un GET a un evento de API Gateway para lambda_handler.
+
+    Returns:
+        Evento, o None si la ruta no es de exportación
+    """
+    url = urlsplit(path)
+    match = _EXPORT_PATH.match(url.path)
+    if not match:
+        return None
+    query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+    return {
+        'httpMethod': 'GET',
+        'path': url.path,
+        'pathParameters': {'tenant_id': unquote(match.group(1))},
+        'queryStringParameters': query or None,
+        'headers': headers
+    }
+
+
+class ExportRequestHandler(BaseHTTPRequestHandler):
+    """Atiende los requests HTTP con lambda_handler (un hilo por conexión)."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ExportSQLite'
+
+    def do_GET(self) -> None:
+        """Exportación o health check."""
+        if urlsplit(self.path).path == '/health':
+            self._send_json(200, handler.health_status(self.server.settings))
+            return
+        event = build_export_event(self.path, dict(self.headers.items()))
+        if event is None:
+            self._send_json(404, {'error': 'Ruta no encontrada', 'status': 404})
+            return
+        self._invoke(event)
+
+    def do_POST(self) -> None:
+        """Exportación por lotes: {"tenant_ids": [...], "profile": "..."}."""
+        if urlsplit(self.path).path.rstrip('/') != '/batch':
+            self._send_json(404, {'error': 'Ruta no encontrada', 'status': 404})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BATCH_BODY_BYTES:
+            self._send_json(413, {'error': 'Cuerpo demasiado grande', 'status': 413})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError("se esperaba un objeto JSON")
+        except ValueError as e:
+            self._send_json(400, {'error': f"JSON inválido: {e}", 'status': 400})
+            return
+        self._invoke({**body, 'batch': True})
+
+    def _invoke(self, event: Dict[str, Any]) -> None:
+        """Ejecuta lambda_handler si hay capacidad libre y escribe su respuesta."""
+        settings = self.server.settings
+        if not self.server.capacity.acquire(timeout=settings.export_slot_wait_seconds):
+            self._send_json(
+                503,
+                {'error': 'Demasiadas exportaciones en curso, reintente más tarde', 'status': 503},
+                {'Retry-After': str(settings.export_overload_retry_after_seconds)}
+            )
+            return
+        try:
+            context = RequestContext(settings.server_request_timeout_seconds)
+            response = handler.lambda_handler(event, context)
+        finally:
+            self.server.capacity.release()
+        self._send_response(response)
+
+    def _send_response(self, response: Dict[str, Any]) -> None:
+        """Escribe una respuesta con el formato de API Gateway (cuerpo base64 si es binario)."""
+        body = response.get('body') or ''
+        data = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+        self.send_response(response.get('statusCode', 200))
+        for name, value in (response.get('headers') or {}).items():
+            if name.lower() != 'content-length':
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(
+        self, status_code: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Escribe una respuesta JSON."""
+        self._send_response({
+            'statusCode': status_code,
+            'headers': {'Content-Type': 'application/json', **(headers or {})},
+            'body': json.dumps(payload)
+        })
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Registra cada request en el logger de la aplicación."""
+        logger.info(f"{self.address_string()} - {format % args}")
+
+
+class ExportServer(ThreadingHTTPServer):
+    """Servidor con la configuración y la capacidad (exportaciones simultáneas) del proceso."""
+
+    daemon_threads = True
+
+    def __init__(self, address, settings):
+        super().__init__(address, ExportRequestHandler)
+        self.settings = settings
+        self.capacity = threading.BoundedSemaphore(max(1, settings.server_max_concurrent_requests))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Atiende requests hasta recibir SIGINT o SIGTERM; retorna el código de salida del proceso."""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Servidor HTTP de exportación a SQLite")
+    parser.add_argument('--host', default=settings.server_host, help="Dirección de escucha")
+    parser.add_argument('--port', type=int, default=settings.server_port, help="Puerto de escucha")
+    args = parser.parse_args(argv)
+
+    connection_pools = handler.use_persistent_connections(settings)
+    server = ExportServer((args.host, args.port), settings)
+
+    def stop(*_):
+        # shutdown espera a que termine serve_forever: se llama desde otro hilo
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, stop)
+
+    logger.info(f"Servidor de exportación escuchando en {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        connection_pools.close_all()
+        logger.info("Servidor de exportación detenido")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
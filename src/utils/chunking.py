@@ -0,0 +1,59 @@
+"""
+Fragmentación de archivos por contenido (content-defined chunking).
+Sigue el principio DRY (Don't Repeat Yourself).
+
+Los cortes se deciden por el contenido y no por la posición, así un cambio local
+solo altera los fragmentos cercanos y el resto se reutiliza entre versiones.
+Como los archivos SQLite están formados por páginas, los cortes se buscan solo en
+límites de página: basta un hash por página en vez de un hash rodante por byte.
+"""
+import hashlib
+from typing import Iterator, Tuple
+
+# Páginas por fragmento: mínimo, promedio esperado y máximo (con páginas de 4 KB:
+# fragmentos de 16 KB a 256 KB, ~64 KB en promedio)
+DEFAULT_PAGE_SIZE = 4096
+DEFAULT_MIN_PAGES = 4
+DEFAULT_AVG_PAGES = 16
+DEFAULT_MAX_PAGES = 64
+
+
+def iter_chunks(
+    path: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    min_pages: int = DEFAULT_MIN_PAGES,
+    avg_pages: int = DEFAULT_AVG_PAGES,
+    max_pages: int = DEFAULT_MAX_PAGES
+) -> Iterator[Tuple[str, int, bytes]]:
+    """
+    Divide un archivo en fragmentos definidos por contenido.
+
+    Una página cierra el fragmento si su hash cae en 1 de cada `avg_pages` valores
+    (y el fragmento ya tiene `min_pages`), o si el fragmento llegó a `max_pages`.
+
+    Args:
+        path: Ruta del archivo
+        page_size: Tamaño de página (el de SQLite)
+        min_pages: Páginas mínimas por fragmento
+        avg_pages: Páginas promedio por fragmento
+        max_pages: Páginas máximas por fragmento
+
+    Yields:
+        Tuplas (sha256 del fragmento, offset en el archivo, bytes del fragmento)
+    """
+    offset = 0
+    pages = []
+    with open(path, 'rb') as f:
+        for page in iter(lambda: f.read(page_size), b''):
+            pages.append(page)
+            page_hash = int.from_bytes(hashlib.blake2b(page, digest_size=8).digest(), 'big')
+            at_boundary = len(pages) >= min_pages and page_hash % avg_pages == 0
+            if at_boundary or len(pages) >= max_pages:
+                data = b''.join(pages)
+                yield hashlib.sha256(data).hexdigest(), offset, data
+                offset += len(data)
+                pages = []
+
+    if pages:
+        data = b''.join(pages)
+        yield hashlib.sha256(data).hexdigest(), offset, data
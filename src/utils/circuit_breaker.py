@@ -0,0 +1,128 @@
+"""
+Circuit breaker por tasa de errores.
+Sigue el principio DRY (Don't Repeat Yourself).
+
+Estados:
+- CLOSED: las llamadas pasan; se registra el resultado de las últimas N.
+- OPEN: la tasa de errores superó el umbral; las llamadas se rechazan
+  durante `open_seconds` (el llamador sirve datos en caché o responde 503).
+- HALF_OPEN: pasado ese tiempo se deja pasar una llamada de prueba; si tiene
+  éxito el circuito se cierra, si falla se vuelve a abrir. Si la prueba no
+  reporta resultado en `open_seconds`, se deja pasar otra.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de errores sobre una ventana de llamadas recientes.
+    Es seguro entre hilos (exportación en primer plano y refrescos en segundo plano).
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        name: str = 'postgres'
+    ):
+        """
+        Inicializa el circuit breaker.
+
+        Args:
+            failure_rate_threshold: Fracción de fallos (0-1) que abre el circuito
+            window_size: Cantidad de llamadas recientes consideradas
+            min_calls: Llamadas mínimas en la ventana antes de evaluar la tasa
+            open_seconds: Tiempo que el circuito permanece abierto antes de probar
+            name: Nombre (para logging)
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.name = name
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Estado actual (OPEN pasa a HALF_OPEN al vencer `open_seconds`)."""
+        with self._lock:
+            self._refresh_state(time.time())
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Indica si se puede llamar al recurso protegido.
+        En HALF_OPEN solo autoriza una llamada de prueba a la vez.
+        """
+        now = time.time()
+        with self._lock:
+            self._refresh_state(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and now - self._trial_started_at >= self.open_seconds:
+                self._trial_started_at = now
+                logger.info(f"Circuito {self.name}: llamada de prueba")
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Registra una llamada exitosa (en HALF_OPEN cierra el circuito)."""
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuito {self.name}: cerrado tras una llamada exitosa")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Registra una llamada fallida (puede abrir el circuito)."""
+        now = time.time()
+        with self._lock:
+            self._refresh_state(now)
+            if self._state == HALF_OPEN:
+                self._open(now, 'falló la llamada de prueba')
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate_threshold
+            ):
+                self._open(now, f"{failures}/{len(self._outcomes)} llamadas fallidas")
+
+    def retry_after_seconds(self) -> int:
+        """Segundos hasta la próxima llamada de prueba (0 si el circuito está cerrado)."""
+        now = time.time()
+        with self._lock:
+            self._refresh_state(now)
+            if self._state == CLOSED:
+                return 0
+            next_trial = max(self._opened_at, self._trial_started_at) + self.open_seconds
+            return max(1, int(next_trial - now + 0.999))
+
+    def _open(self, now: float, reason: str) -> None:
+        """Abre el circuito."""
+        self._state = OPEN
+        self._opened_at = now
+        self._trial_started_at = 0.0
+        logger.warning(f"Circuito {self.name} abierto por {self.open_seconds}s: {reason}")
+
+    def _refresh_state(self, now: float) -> None:
+        """Pasa de OPEN a HALF_OPEN al vencer el tiempo de apertura."""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
@@ -27,3 +27,13 @@ class SQLiteCreationError(ExportError):
 class ValidationError(ExportError):
     """Error de validación de datos."""
     pass
+
+
+class DeadlineExceededError(ExportError):
+    """Se agotó el tiempo disponible para la exportación."""
+    pass
+
+
+class ExportOverloadedError(ExportError):
+    """Se alcanzó el límite de exportaciones simultáneas del clúster."""
+    pass
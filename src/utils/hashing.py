@@ -0,0 +1,25 @@
+"""
+Utilidades de hashing de archivos.
+Sigue el principio DRY (Don't Repeat Yourself).
+"""
+import hashlib
+
+# Tamaño de bloque de lectura (1 MB)
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """
+    Calcula el SHA-256 de un archivo leyéndolo por bloques.
+
+    Args:
+        path: Ruta del archivo
+
+    Returns:
+        Hash en hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
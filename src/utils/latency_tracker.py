@@ -0,0 +1,48 @@
+"""
+Latencias recientes por clave y sus percentiles.
+Sigue el principio DRY (Don't Repeat Yourself).
+
+Guarda una ventana deslizante de muestras por clave (ej: por tabla); vive
+mientras el contenedor siga caliente y es segura entre hilos.
+"""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Hashable, Optional
+
+
+class LatencyTracker:
+    """Ventana de las últimas `window` latencias por clave."""
+
+    def __init__(self, window: int = 50, min_samples: int = 10):
+        """
+        Inicializa el registro.
+
+        Args:
+            window: Cantidad de muestras que se conservan por clave
+            min_samples: Muestras necesarias para calcular un percentil
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, elapsed_ms: float) -> None:
+        """Registra una latencia (en milisegundos)."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(elapsed_ms)
+
+    def percentile(self, key: Hashable, q: float) -> Optional[float]:
+        """
+        Retorna el percentil `q` (0-1) de las latencias de una clave (método nearest-rank),
+        o None si todavía no hay min_samples muestras.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, self.min_samples):
+            return None
+        rank = max(1, math.ceil(q * len(samples)))
+        return samples[rank - 1]
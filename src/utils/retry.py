@@ -0,0 +1,36 @@
+"""
+Política de reintentos con backoff exponencial y jitter.
+Sigue el principio DRY (Don't Repeat Yourself).
+
+Usa "full jitter": la espera del reintento n es aleatoria entre 0 y
+min(max_delay, base_delay * 2^n), así los reintentos de varias queries
+que fallaron a la vez no vuelven a llegar juntos.
+"""
+import random
+
+
+class RetryPolicy:
+    """Cantidad de reintentos y espera entre ellos."""
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay_seconds: float = 0.1,
+        max_delay_seconds: float = 2.0
+    ):
+        """
+        Inicializa la política.
+
+        Args:
+            max_retries: Reintentos máximos por operación (0 = sin reintentos)
+            base_delay_seconds: Tope de la espera del primer reintento
+            max_delay_seconds: Tope de la espera de cualquier reintento
+        """
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+    def backoff(self, retry_number: int) -> float:
+        """Segundos a esperar antes del reintento `retry_number` (0 = primero)."""
+        cap = min(self.max_delay_seconds, self.base_delay_seconds * (2 ** retry_number))
+        return random.uniform(0, cap)
@@ -0,0 +1,67 @@
+"""
+Coalescencia de llamadas concurrentes (single-flight).
+Sigue el principio DRY (Don't Repeat Yourself).
+
+La primera llamada para una clave ejecuta la función; las que llegan mientras
+está en curso esperan y reciben el mismo resultado (o la misma excepción).
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """Llamada en curso para una clave."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes por clave. Es seguro entre hilos."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta `fn` una sola vez por clave entre las llamadas concurrentes.
+
+        Args:
+            key: Clave que identifica el trabajo
+            fn: Función a ejecutar
+
+        Returns:
+            Tupla (resultado, compartido): compartido es True si el resultado
+            lo calculó otra llamada en curso
+
+        Raises:
+            La excepción de `fn`, también en las llamadas que esperaban
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,58 @@
+"""
+Caché en memoria con vencimiento por entrada (TTL).
+Sigue el principio DRY (Don't Repeat Yourself).
+
+Vive mientras el contenedor siga caliente; es segura entre hilos y descarta
+las entradas más antiguas al superar el tamaño máximo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Caché clave -> valor con vencimiento a los `ttl_seconds` de guardada."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        """
+        Inicializa la caché.
+
+        Args:
+            ttl_seconds: Vigencia de cada entrada
+            max_entries: Cantidad máxima de entradas
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor vigente de una clave, o None si no existe o venció."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: Hashable, value: Any = True) -> None:
+        """Guarda un valor (reinicia su vigencia)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        """Elimina una clave si existe."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Elimina todas las entradas."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,10 @@
+"""
+Configuración común de los tests.
+El código de la aplicación importa sus módulos desde src/ (como en Lambda).
+"""
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
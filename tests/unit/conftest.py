@@ -0,0 +1,442 @@
+"""
+Fixtures compartidas de los tests unitarios.
+
+InMemoryRepository implementa IDataRepository sobre tablas en memoria con el mismo
+alcance por tenant que las queries de PostgresRepository (filas dadas de baja, tipos
+de producto exportados, listas de precios por asignación a clientes, ...), así los
+tests ejercitan el servicio completo y el SQLite real sin PostgreSQL.
+"""
+import dataclasses
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import pytest
+
+from application.export_service import ExportService
+from config.settings import get_settings
+from domain.interfaces import IDataRepository
+from domain.models import ENTITY_MODELS, Deadline
+from infrastructure.artifact_store import LocalArtifactStore
+from infrastructure.postgres_repository import PRODUCT_TYPES
+from infrastructure.sqlite_builder import SQLiteBuilder
+from utils.single_flight import SingleFlight
+
+# Entidades sin tenant: todos los tenants exportan las mismas filas
+_GLOBAL_ENTITIES = ('products', 'bank_accounts')
+
+# Entidades sin query de delta (se envían completas, ver FULL_REPLACE_ENTITIES)
+_NO_DELTA_ENTITIES = ('list_prices', 'list_price_details', 'client_list_prices')
+
+
+class InMemoryRepository(IDataRepository):
+    """Repositorio de datos en memoria con el alcance por tenant de PostgresRepository."""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[int, Dict[str, Any]]] = {entity_name: {} for entity_name in ENTITY_MODELS}
+        self.clock = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        self.calls: List[Tuple[Any, ...]] = []
+        self.failures: Dict[str, Exception] = {}
+        self.delays: Dict[str, float] = {}
+        self.deadline: Optional[Deadline] = None
+        self.connected = False
+        self._tenant_locks: Dict[int, threading.Lock] = {}
+        self._slots: Set[int] = set()
+        self._lock = threading.Lock()
+        # Esperas de las queries lentas en curso y cuántas se cancelaron
+        self._running: Set[threading.Event] = set()
+        self.cancelled_queries = 0
+
+    # Datos
+
+    def add(self, entity_name: str, tenant_id: Optional[int] = None, removed: bool = False, **values) -> None:
+        """Agrega una fila (tenant_id solo para clientes y ubicaciones)."""
+        self.tables[entity_name][values['id']] = {
+            'values': values, 'tenant_id': tenant_id, 'removed': removed, 'updated_at': self.tick()
+        }
+
+    def update(self, entity_name: str, row_id: int, **values) -> None:
+        """Modifica una fila (actualiza su updated_at)."""
+        row = self.tables[entity_name][row_id]
+        row['values'].update(values)
+        row['updated_at'] = self.tick()
+
+    def remove(self, entity_name: str, row_id: int) -> None:
+        """Da de baja una fila (is_removed; actualiza su updated_at)."""
+        row = self.tables[entity_name][row_id]
+        row['removed'] = True
+        row['updated_at'] = self.tick()
+
+    def delete(self, entity_name: str, row_id: int) -> None:
+        """Borra físicamente una fila (ej: una asignación de lista de precios)."""
+        del self.tables[entity_name][row_id]
+
+    def tick(self) -> datetime:
+        """Avanza el reloj del servidor un segundo y retorna la hora nueva."""
+        self.clock += timedelta(seconds=1)
+        return self.clock
+
+    # Alcance (mismo que las queries de PostgresRepository)
+
+    def _customer_ids(self, tenant_id: int, active_only: bool) -> Set[int]:
+        return {
+            row_id for row_id, row in self.tables['customers'].items()
+            if row['tenant_id'] == tenant_id and not (active_only and row['removed'])
+        }
+
+    def _linked_price_lists(self, tenant_id: int, active_customers_only: bool) -> Set[int]:
+        customer_ids = self._customer_ids(tenant_id, active_customers_only)
+        return {
+            row['values']['id_list_price'] for row in self.tables['client_list_prices'].values()
+            if row['values']['id_client'] in customer_ids
+        }
+
+    def _cobranza_ids(self, tenant_id: int) -> Set[int]:
+        customer_ids = self._customer_ids(tenant_id, active_only=False)
+        return {
+            row_id for row_id, row in self.tables['cobranzas'].items()
+            if row['values']['id_client'] in customer_ids
+        }
+
+    def _referenced_product_ids(self, tenant_id: int) -> Set[int]:
+        price_lists = self._linked_price_lists(tenant_id, active_customers_only=False)
+        cobranza_ids = self._cobranza_ids(tenant_id)
+        referenced = {
+            row['values']['id_product'] for row in self.tables['list_price_details'].values()
+            if row['values']['id_price_list'] in price_lists and not row['removed']
+        }
+        referenced.update(
+            row['values']['id_product'] for row in self.tables['cobranza_details'].values()
+            if row['values']['id_cobranza'] in cobranza_ids and not row['removed']
+        )
+        return referenced
+
+    def _in_scope(self, entity_name: str, row: Dict[str, Any], tenant_id: int) -> bool:
+        """Alcance del tenant sin el filtro de vigencia (el de las queries de delta)."""
+        values = row['values']
+        if entity_name in ('customers', 'locations'):
+            return row['tenant_id'] == tenant_id
+        if entity_name in _GLOBAL_ENTITIES:
+            return True
+        if entity_name == 'list_prices':
+            return values['id'] in self._linked_price_lists(tenant_id, active_customers_only=True)
+        if entity_name == 'list_price_details':
+            return values['id_price_list'] in self._linked_price_lists(tenant_id, active_customers_only=False)
+        if entity_name == 'client_list_prices':
+            return values['id_client'] in self._customer_ids(tenant_id, active_only=True)
+        if entity_name == 'cobranzas':
+            return values['id_client'] in self._customer_ids(tenant_id, active_only=False)
+        return values['id_cobranza'] in self._cobranza_ids(tenant_id)
+
+    @staticmethod
+    def _is_exported(entity_name: str, row: Dict[str, Any]) -> bool:
+        """Filtro de vigencia de las queries completas."""
+        if row['removed']:
+            return False
+        return entity_name != 'products' or row['values'].get('type') in PRODUCT_TYPES
+
+    @staticmethod
+    def _model(entity_name: str, row: Dict[str, Any], columns: Optional[Sequence[str]]) -> Any:
+        values = row['values']
+        if columns is not None:
+            values = {name: value for name, value in values.items() if name in columns}
+        return ENTITY_MODELS[entity_name](**values)
+
+    def rows(
+        self,
+        entity_name: str,
+        tenant_id: int,
+        columns: Optional[Sequence[str]] = None,
+        referenced_products: bool = False
+    ) -> List[Any]:
+        """Filas de la exportación completa de una entidad, ordenadas por id."""
+        referenced = self._referenced_product_ids(tenant_id) if referenced_products else None
+        return [
+            self._model(entity_name, row, columns)
+            for row_id, row in sorted(self.tables[entity_name].items())
+            if self._in_scope(entity_name, row, tenant_id)
+            and self._is_exported(entity_name, row)
+            and (referenced is None or row_id in referenced)
+        ]
+
+    # IDataRepository
+
+    def connect(self) -> None:
+        self.connected = True
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+    def _fetch(self, entity_name: str, tenant_id: int, columns=None, referenced_products: bool = False) -> List[Any]:
+        self.calls.append((entity_name, tenant_id, columns))
+        if entity_name in self.delays:
+            self._sleep(self.delays[entity_name])
+        if entity_name in self.failures:
+            raise self.failures[entity_name]
+        return self.rows(entity_name, tenant_id, columns, referenced_products)
+
+    def _sleep(self, seconds: float) -> None:
+        """
+        Espera como una query lenta: a lo sumo hasta el plazo (statement_timeout) o
+        hasta que se cancele (cancel_running_queries).
+        """
+        timed_out = self.deadline is not None and self.deadline.remaining_seconds() < seconds
+        if timed_out:
+            seconds = max(0.0, self.deadline.remaining_seconds())
+        running = threading.Event()
+        with self._lock:
+            self._running.add(running)
+        try:
+            if running.wait(seconds):
+                raise RuntimeError("canceling statement due to user request")
+        finally:
+            with self._lock:
+                self._running.discard(running)
+        if timed_out:
+            raise TimeoutError("canceling statement due to statement timeout")
+
+    def get_customers_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('customers', tenant_id, columns)
+
+    def get_products_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('products', tenant_id, columns)
+
+    def get_referenced_products_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('products', tenant_id, columns, referenced_products=True)
+
+    def get_product_catalog_stats(self, tenant_id):
+        catalog = self.rows('products', tenant_id)
+        referenced = self.rows('products', tenant_id, referenced_products=True)
+        return {
+            'catalog_rows': len(catalog),
+            'catalog_bytes': 100 * len(catalog),
+            'referenced_rows': len(referenced),
+            'referenced_bytes': 100 * len(referenced)
+        }
+
+    def get_bank_accounts_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('bank_accounts', tenant_id, columns)
+
+    def get_list_prices_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('list_prices', tenant_id, columns)
+
+    def get_list_price_details_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('list_price_details', tenant_id, columns)
+
+    def get_client_list_prices_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('client_list_prices', tenant_id, columns)
+
+    def get_locations_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('locations', tenant_id, columns)
+
+    def get_cobranzas_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('cobranzas', tenant_id, columns)
+
+    def get_cobranza_details_by_tenant(self, tenant_id, columns=None):
+        return self._fetch('cobranza_details', tenant_id, columns)
+
+    def tenant_exists(self, tenant_id: int) -> bool:
+        self.calls.append(('tenant_exists', tenant_id))
+        return any(
+            row['tenant_id'] == tenant_id
+            for entity_name in ('customers', 'locations')
+            for row in self.tables[entity_name].values()
+        )
+
+    def get_table_fingerprints(self, tenant_id, columns_by_entity, referenced_products=False):
+        self.calls.append(('table_fingerprints', tenant_id))
+        fingerprints = {}
+        for entity_name, columns in columns_by_entity.items():
+            rows = self.rows(entity_name, tenant_id, columns, referenced_products and entity_name == 'products')
+            content = repr([dataclasses.astuple(row) for row in rows]).encode('utf-8')
+            fingerprints[entity_name] = hashlib.md5(content).hexdigest()
+        return fingerprints
+
+    def get_sync_watermark(self) -> datetime:
+        return self.clock
+
+    def get_changes_since(self, entity_name, tenant_id, since, columns=None):
+        if entity_name in _NO_DELTA_ENTITIES:
+            raise ValueError(f"La entidad {entity_name} no soporta sincronización incremental")
+        self.calls.append((f"{entity_name}_delta", tenant_id, columns))
+        upserts, deleted_ids = [], []
+        for row_id, row in sorted(self.tables[entity_name].items()):
+            if row['updated_at'] <= since or not self._in_scope(entity_name, row, tenant_id):
+                continue
+            if self._is_exported(entity_name, row):
+                upserts.append(self._model(entity_name, row, columns))
+            else:
+                deleted_ids.append(row_id)
+        return upserts, deleted_ids
+
+    def get_entity_by_tenants(self, entity_name, tenant_ids, columns=None, referenced_products=False):
+        self.calls.append((f"{entity_name}_batch", tuple(tenant_ids), columns))
+        return {
+            tenant_id: self.rows(entity_name, tenant_id, columns, referenced_products)
+            for tenant_id in tenant_ids
+        }
+
+    def get_tenant_change_times(self, tenant_ids):
+        change_times = {}
+        for tenant_id in tenant_ids:
+            times = [
+                row['updated_at']
+                for entity_name, table in self.tables.items()
+                for row in table.values()
+                if self._in_scope(entity_name, row, tenant_id)
+            ]
+            if times:
+                change_times[tenant_id] = max(times)
+        return change_times
+
+    def set_deadline(self, deadline: Optional[Deadline]) -> None:
+        self.deadline = deadline
+
+    def cancel_running_queries(self) -> None:
+        with self._lock:
+            self.cancelled_queries += len(self._running)
+            for running in self._running:
+                running.set()
+
+    def acquire_tenant_lock(self, tenant_id: int, timeout_seconds: float) -> bool:
+        with self._lock:
+            lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+        return lock.acquire(timeout=timeout_seconds)
+
+    def release_tenant_lock(self, tenant_id: int) -> None:
+        self._tenant_locks[tenant_id].release()
+
+    def acquire_export_slot(self, max_slots: int, timeout_seconds: float) -> Optional[int]:
+        with self._lock:
+            for slot in range(max_slots):
+                if slot not in self._slots:
+                    self._slots.add(slot)
+                    self.calls.append(('export_slot', slot))
+                    return slot
+        return None
+
+    def release_export_slot(self, slot: int) -> None:
+        with self._lock:
+            self._slots.discard(slot)
+
+    def get_query_timings(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def get_retry_counts(self) -> Dict[str, int]:
+        return {}
+
+
+def build_sample_repository() -> InMemoryRepository:
+    """
+    Datos de ejemplo: tenant 1 (clientes 10, 11 y 12 dado de baja) y tenant 2 (cliente 20).
+    El producto 5 está dado de baja y el 6 es de un tipo que no se exporta.
+    """
+    repository = InMemoryRepository()
+    for product_id, product_type in enumerate(
+        ('Servicio', 'Assembly', 'Inventory Item', 'Service', 'Servicio', 'Kit'), start=1
+    ):
+        repository.add(
+            'products', id=product_id, sku=f'SKU-{product_id}', name=f'Producto {product_id}',
+            bard_code=f'75000{product_id}', type=product_type, removed=product_id == 5
+        )
+    for account_id in (1, 2):
+        repository.add('bank_accounts', id=account_id, name=f'Cuenta {account_id}', bank_name='Banco')
+    for customer_id, tenant_id in ((10, 1), (11, 1), (12, 1), (20, 2)):
+        repository.add(
+            'customers', tenant_id=tenant_id, removed=customer_id == 12, id=customer_id,
+            name=f'Cliente {customer_id}', code=f'C{customer_id}', lat='19.43', lng='-99.13',
+            geofence='POLYGON((0 0, 1 1, 1 0, 0 0))', is_pay_mon=True, credit_limit='1000', deuda='0'
+        )
+    for location_id, tenant_id in ((1, 1), (2, 2)):
+        repository.add(
+            'locations', tenant_id=tenant_id, id=location_id, name=f'Bodega {location_id}',
+            lat='19.50', lng='-99.20', geofence='POLYGON((0 0, 1 1, 1 0, 0 0))'
+        )
+    for list_id in (1, 2, 3, 4):
+        repository.add('list_prices', id=list_id, name=f'Lista {list_id}')
+    for link_id, (customer_id, list_id) in enumerate(((10, 1), (11, 2), (20, 3), (12, 4)), start=1):
+        repository.add('client_list_prices', id=link_id, id_client=customer_id, id_list_price=list_id)
+    for detail_id, (list_id, product_id) in enumerate(((1, 1), (1, 2), (2, 3), (3, 4), (4, 2)), start=1):
+        repository.add(
+            'list_price_details', id=detail_id, id_price_list=list_id, id_product=product_id,
+            price=f'{10 * detail_id}.50', is_vat_applicable=True
+        )
+    for cobranza_id, customer_id in ((1, 10), (2, 11), (3, 20)):
+        repository.add(
+            'cobranzas', id=cobranza_id, id_client=customer_id, bill_number=f'F-{cobranza_id}',
+            total='150.00', issue='2026-01-01', validity='2026-02-01'
+        )
+    for detail_id, (cobranza_id, product_id) in enumerate(((1, 1), (2, 3), (3, 4)), start=1):
+        repository.add(
+            'cobranza_details', id=detail_id, id_cobranza=cobranza_id, id_product=product_id,
+            amount='2', price='75.00'
+        )
+    # Los datos de ejemplo quedan fuera del margen de solape de la marca de sincronización
+    repository.clock += timedelta(hours=1)
+    return repository
+
+
+@pytest.fixture
+def repository() -> InMemoryRepository:
+    """Repositorio en memoria con los datos de ejemplo."""
+    return build_sample_repository()
+
+
+@pytest.fixture
+def export_service(repository) -> ExportService:
+    """Servicio de exportación sobre el repositorio en memoria y un SQLite real."""
+    return ExportService(repository, SQLiteBuilder(), sqlite_builder_factory=SQLiteBuilder)
+
+
+@pytest.fixture
+def artifact_store(tmp_path) -> LocalArtifactStore:
+    """Almacén de artefactos en un directorio temporal."""
+    return LocalArtifactStore(str(tmp_path / 'artifacts'))
+
+
+# Estado del contenedor en handler (singletons que se crean en la primera invocación)
+_HANDLER_GLOBALS = (
+    '_artifact_store', '_chunk_store', '_circuit_breaker', '_refresh_dispatcher', '_negative_cache',
+    '_latency_tracker', '_replica_router', '_invalidation_store', '_schema_template', '_connection_pools'
+)
+
+
+@pytest.fixture
+def settings_env(monkeypatch, tmp_path):
+    """
+    Configura las variables de entorno de Settings (temp_dir en un directorio temporal).
+    Retorna una función para sobrescribir variables: set_env(ARTIFACT_MAX_STALE_SECONDS=60).
+    """
+    for name in ('POSTGRES_HOST', 'POSTGRES_DATABASE', 'POSTGRES_USER', 'POSTGRES_PASSWORD'):
+        monkeypatch.setenv(name, 'test')
+    monkeypatch.setenv('TEMP_DIR', str(tmp_path))
+
+    def set_env(**values):
+        for name, value in values.items():
+            monkeypatch.setenv(name, str(value))
+        get_settings.cache_clear()
+
+    set_env()
+    yield set_env
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def handler_module(settings_env, repository, monkeypatch):
+    """Módulo handler con el estado del contenedor vacío y el repositorio en memoria."""
+    import handler
+    for name in _HANDLER_GLOBALS:
+        monkeypatch.setattr(handler, name, None)
+    monkeypatch.setattr(handler, '_export_flights', SingleFlight())
+    monkeypatch.setattr(handler, '_create_postgres_repository', lambda settings: repository)
+    return handler
+
+
+def export_event(tenant_id: int = 1, **query_params) -> Dict[str, Any]:
+    """Evento de API Gateway de una exportación."""
+    return {
+        'pathParameters': {'tenant_id': str(tenant_id)},
+        'queryStringParameters': query_params or None,
+        'headers': {}
+    }
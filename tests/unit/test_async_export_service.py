@@ -0,0 +1,153 @@
+"""
+Tests unitarios de AsyncExportService sobre el repositorio en memoria (sin psycopg).
+"""
+import asyncio
+
+import pytest
+
+from application.async_export_service import AsyncExportService
+from domain.interfaces import IAsyncDataRepository
+from domain.profiles import get_profile
+from infrastructure.invalidation_store import LocalInvalidationStore
+from infrastructure.sqlite_builder import SQLiteBuilder
+
+
+class AsyncInMemoryRepository(IAsyncDataRepository):
+    """Adaptador asíncrono del InMemoryRepository de conftest (comparte datos, llamadas y cupos)."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.slot_timeouts = []
+        self.released_slots = []
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def tenant_exists(self, tenant_id, deadline=None):
+        return self.repository.tenant_exists(tenant_id)
+
+    async def get_sync_watermark(self, deadline=None):
+        return self.repository.get_sync_watermark()
+
+    async def get_table_fingerprints(self, tenant_id, columns_by_entity, referenced_products=False, deadline=None):
+        return self.repository.get_table_fingerprints(tenant_id, columns_by_entity, referenced_products)
+
+    async def get_entity_by_tenant(self, entity_name, tenant_id, columns=None, referenced_products=False, deadline=None):
+        return self.repository._fetch(entity_name, tenant_id, columns, referenced_products)
+
+    async def acquire_export_slot(self, max_slots, timeout_seconds):
+        self.slot_timeouts.append(timeout_seconds)
+        return self.repository.acquire_export_slot(max_slots, timeout_seconds)
+
+    async def release_export_slot(self, slot):
+        self.released_slots.append(slot)
+        self.repository.release_export_slot(slot)
+
+
+@pytest.fixture
+def async_repository(repository):
+    return AsyncInMemoryRepository(repository)
+
+
+@pytest.fixture
+def new_service(async_repository):
+    """Crea servicios asíncronos (se cierran al terminar el test)."""
+    services = []
+
+    def create(**kwargs):
+        service = AsyncExportService(async_repository, SQLiteBuilder, **kwargs)
+        services.append(service)
+        return service
+
+    yield create
+    for service in services:
+        service.close()
+
+
+def export(service, tenant_id, path, profile=None):
+    return asyncio.run(service.export_tenant_data(tenant_id, str(path), profile))
+
+
+class TestAsyncExportService:
+    """Suite de tests de la exportación asíncrona."""
+
+    def test_export_matches_sync_export(self, new_service, export_service, tmp_path):
+        """El archivo asíncrono tiene el mismo contenido que el de ExportService."""
+        result = export(new_service(), 1, tmp_path / "async.sqlite")
+        expected = export_service.export_tenant_data(1, str(tmp_path / "sync.sqlite"))
+
+        assert result.success is True
+        assert result.content_hash == expected.content_hash
+        assert result.records_exported == expected.records_exported
+
+    def test_unknown_tenant_is_not_found(self, new_service, tmp_path):
+        """Un tenant sin datos no es un error de exportación."""
+        result = export(new_service(), 999, tmp_path / "missing.sqlite")
+
+        assert result.success is False
+        assert result.not_found is True
+
+
+class TestAsyncExportSlots:
+    """Suite de tests de los cupos de exportación del clúster en el camino asíncrono."""
+
+    def test_slot_is_released_after_export(self, new_service, async_repository, repository, tmp_path):
+        """El cupo se toma antes de consultar y se libera al terminar."""
+        result = export(new_service(max_concurrent_exports=1, export_slot_wait_seconds=2), 1, tmp_path / "a.sqlite")
+
+        assert result.success is True
+        assert ('export_slot', 0) in repository.calls
+        assert async_repository.released_slots == [0]
+        assert async_repository.slot_timeouts == [2]
+        assert 'export_slot_wait' in result.fetch_times_by_table
+        assert repository._slots == set()
+
+    def test_overloaded_when_all_slots_are_taken(self, new_service, repository, tmp_path):
+        """Con los cupos ocupados (por otra exportación, síncrona o no) la exportación falla con overloaded."""
+        held = repository.acquire_export_slot(1, 0)
+
+        result = export(new_service(max_concurrent_exports=1), 1, tmp_path / "a.sqlite")
+
+        assert result.success is False
+        assert result.overloaded is True
+        assert repository._slots == {held}
+
+    def test_slot_is_released_on_failure(self, new_service, async_repository, repository, tmp_path):
+        """Si falla una consulta el cupo también se libera."""
+        async def failing_fetch(*args, **kwargs):
+            raise RuntimeError("conexión perdida")
+
+        async_repository.get_entity_by_tenant = failing_fetch
+
+        result = export(new_service(max_concurrent_exports=1), 1, tmp_path / "a.sqlite")
+
+        assert result.success is False
+        assert async_repository.released_slots == [0]
+        assert repository._slots == set()
+
+
+class TestAsyncExportIfUnchanged:
+    """Suite de tests del HIT por registro de cambios en el camino asíncrono."""
+
+    def test_unchanged_tenant_is_served_without_postgres(self, new_service, repository, artifact_store, tmp_path):
+        """Sin cambios notificados se sirve el artefacto sin consultar PostgreSQL."""
+        invalidation_store = LocalInvalidationStore(str(tmp_path / "invalidations"))
+        invalidation_store.heartbeat(live_since=0)
+        first = export(
+            new_service(artifact_store=artifact_store, invalidation_store=invalidation_store),
+            1, tmp_path / "first.sqlite"
+        )
+        repository.calls.clear()
+
+        result = export(
+            new_service(artifact_store=artifact_store, invalidation_store=invalidation_store),
+            1, tmp_path / "again.sqlite", get_profile()
+        )
+
+        assert result.success is True
+        assert result.cache_status == 'HIT'
+        assert result.content_hash == first.content_hash
+        assert repository.calls == []
@@ -0,0 +1,118 @@
+"""
+Tests unitarios de la lectura de requests del servidor asíncrono (src/async_server.py),
+con streams en memoria (sin sockets ni psycopg).
+"""
+import asyncio
+import json
+
+import pytest
+
+from config.settings import get_settings
+
+
+class FakeWriter:
+    """StreamWriter en memoria: acumula lo escrito."""
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 0)
+
+
+class FakeAsyncRepository:
+    """Repositorio asíncrono mínimo para /health."""
+
+    def pool_stats(self):
+        return {'size': 0}
+
+
+@pytest.fixture
+def async_server(handler_module):
+    """Módulo async_server (importarlo no requiere psycopg)."""
+    import async_server
+    return async_server
+
+
+@pytest.fixture
+def export_server(async_server):
+    server = async_server.AsyncExportServer(get_settings(), FakeAsyncRepository(), export_service=None)
+    yield server
+    server._executor.shutdown(wait=True)
+
+
+def handle(server, raw: bytes) -> FakeWriter:
+    """Atiende una conexión cuyo cliente envió raw y cerró."""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await server.handle_connection(reader, writer)
+        return writer
+    return asyncio.run(run())
+
+
+def responses(writer: FakeWriter):
+    """Separa las respuestas escritas en (status, headers, cuerpo JSON)."""
+    parsed = []
+    data = writer.data
+    while data:
+        head, _, rest = data.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines[1:])
+        length = int(headers['Content-Length'])
+        parsed.append((int(lines[0].split(' ')[1]), headers, json.loads(rest[:length])))
+        data = rest[length:]
+    return parsed
+
+
+class TestAsyncServerRequests:
+    """Suite de tests de los límites de lectura de requests."""
+
+    def test_oversized_body_is_rejected_without_reading_it(self, async_server, export_server):
+        """Un cuerpo mayor que MAX_REQUEST_BODY_BYTES responde 413 y cierra la conexión."""
+        length = async_server.MAX_REQUEST_BODY_BYTES + 1
+        raw = (
+            b'GET /health HTTP/1.1\r\nContent-Length: ' + str(length).encode() + b'\r\n\r\n'
+            + b'GET /health HTTP/1.1\r\n\r\n'
+        )
+
+        writer = handle(export_server, raw)
+
+        (status, headers, body), = responses(writer)
+        assert status == 413
+        assert body['status'] == 413
+        assert headers['Connection'] == 'close'
+        assert writer.closed
+
+    def test_small_body_is_discarded_and_connection_kept(self, export_server):
+        """Un cuerpo dentro del límite se descarta y el siguiente request se atiende."""
+        raw = (
+            b'GET /health HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello'
+            b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n'
+        )
+
+        writer = handle(export_server, raw)
+
+        assert [status for status, _, _ in responses(writer)] == [200, 200]
+
+    @pytest.mark.parametrize('length', ['-1', 'abc'])
+    def test_invalid_content_length_closes_the_connection(self, export_server, length):
+        """Un Content-Length inválido cierra la conexión sin responder."""
+        raw = b'GET /health HTTP/1.1\r\nContent-Length: ' + length.encode() + b'\r\n\r\n'
+
+        writer = handle(export_server, raw)
+
+        assert writer.data == b''
+        assert writer.closed
@@ -0,0 +1,77 @@
+"""
+Tests unitarios de la exportación por lotes (ExportService.export_tenants_batch y el
+evento batch del handler): una query por tabla para todo el lote y archivos idénticos
+a los de la exportación individual.
+"""
+import json
+import logging
+import os
+
+import pytest
+
+from application.export_service import BATCH_FILE_NAME, ExportService
+from domain.models import ENTITY_MODELS
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.test_delta_sync import table_contents
+
+
+class TestBatchExport:
+    """Suite de tests de la exportación por lotes."""
+
+    @pytest.fixture
+    def new_service(self, repository):
+        return lambda: ExportService(repository, SQLiteBuilder(), sqlite_builder_factory=SQLiteBuilder)
+
+    @pytest.fixture
+    def output_dir(self, tmp_path):
+        path = tmp_path / "batch"
+        path.mkdir()
+        return str(path)
+
+    def test_batch_files_match_individual_exports(self, new_service, tmp_path, output_dir):
+        """Cada archivo del lote es igual al de la exportación individual del tenant."""
+        results = new_service().export_tenants_batch([1, 2], output_dir)
+
+        for tenant_id in (1, 2):
+            single = new_service().export_tenant_data(tenant_id, str(tmp_path / f"single_{tenant_id}.sqlite"))
+            batch_path = os.path.join(output_dir, BATCH_FILE_NAME.format(tenant_id=tenant_id))
+            assert results[tenant_id].success is True
+            assert results[tenant_id].content_hash == single.content_hash
+            assert table_contents(batch_path) == table_contents(single.file_path)
+
+    def test_batch_runs_one_query_per_table(self, new_service, repository, output_dir):
+        """Las tablas se consultan una vez para todo el lote, no por tenant."""
+        new_service().export_tenants_batch([1, 2], output_dir)
+
+        fetched = [call for call in repository.calls if len(call) == 3]
+        assert sorted(call[0] for call in fetched) == sorted(f"{entity_name}_batch" for entity_name in ENTITY_MODELS)
+        assert all(call[1] == (1, 2) for call in fetched)
+
+    def test_tenant_without_rows_is_not_found(self, new_service, output_dir):
+        """Un tenant del lote sin filas propias queda como not_found; el resto se exporta."""
+        results = new_service().export_tenants_batch([1, 999], output_dir)
+
+        assert results[1].success is True
+        assert results[999].not_found is True
+
+    def test_fetch_log_sums_rows_over_tenants(self, new_service, output_dir, caplog):
+        """El log de cada tabla del lote cuenta filas de todos los tenants, no tenants."""
+        with caplog.at_level(logging.INFO, logger='application.export_service'):
+            new_service().export_tenants_batch([1, 2], output_dir)
+
+        assert any("3 registros de 2 tenants" in message and 'customers' in message for message in caplog.messages)
+
+    def test_handler_batch_event_summarizes_tenants(self, handler_module):
+        """El evento batch responde el resumen por tenant."""
+        response = handler_module.lambda_handler({'batch': True, 'tenant_ids': [1, 2, 999]}, None)
+
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert body['tenants']['1']['success'] is True
+        assert body['tenants']['2']['records_exported']['customers'] == 1
+        assert body['tenants']['999']['not_found'] is True
+
+    def test_handler_rejects_invalid_tenant_ids(self, handler_module):
+        """tenant_ids vacío o no positivo es un 400."""
+        assert handler_module.lambda_handler({'batch': True, 'tenant_ids': []}, None)['statusCode'] == 400
+        assert handler_module.lambda_handler({'batch': True, 'tenant_ids': [0]}, None)['statusCode'] == 400
@@ -0,0 +1,51 @@
+"""
+Tests unitarios de la exportación en paquete (núcleo + una parte por tabla pesada).
+"""
+import os
+import sqlite3
+
+import pytest
+
+from application.export_service import ExportService
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.test_delta_sync import table_contents
+from utils.hashing import file_sha256
+
+
+class TestBundleExport:
+    """Suite de tests de ExportService.export_tenant_bundle."""
+
+    def test_core_plus_parts_equals_full_export(self, export_service, repository, tmp_path):
+        """Integrar las partes al núcleo reproduce el archivo completo."""
+        bundle_dir = tmp_path / "bundle"
+        bundle_dir.mkdir()
+
+        result = export_service.export_tenant_bundle(1, str(bundle_dir))
+
+        assert result.success is True
+        parts = result.bundle['parts']
+        assert [part['name'] for part in parts] == ['core', 'ListPriceDetail', 'CobranzaDetail']
+        assert not os.path.exists(bundle_dir / "full.sqlite")
+        for part in parts:
+            assert part['sha256'] == file_sha256(str(bundle_dir / part['file']))
+        assert result.file_size == sum(part['file_size'] for part in parts)
+
+        core_path = str(bundle_dir / "core.sqlite")
+        connection = sqlite3.connect(core_path)
+        with connection:
+            assert connection.execute("SELECT COUNT(*) FROM ListPriceDetail").fetchone()[0] == 0
+            for part in parts[1:]:
+                connection.execute("ATTACH DATABASE ? AS part", (str(bundle_dir / part['file']),))
+                table = part['tables'][0]
+                connection.execute(f"INSERT INTO main.{table} SELECT * FROM part.{table}")
+                connection.commit()
+                connection.execute("DETACH DATABASE part")
+        connection.close()
+
+        full = ExportService(repository, SQLiteBuilder()).export_tenant_data(1, str(tmp_path / "full.sqlite"))
+        assert table_contents(core_path) == table_contents(full.file_path)
+
+    def test_core_entities_cannot_be_split(self, export_service, tmp_path):
+        """Las entidades del núcleo no pueden ir en partes separadas."""
+        with pytest.raises(ValueError):
+            export_service.export_tenant_bundle(1, str(tmp_path), part_entities=['customers'])
@@ -0,0 +1,81 @@
+"""
+Tests unitarios de ChunkSyncService (descargas incrementales por fragmentos).
+"""
+import hashlib
+import random
+
+import pytest
+
+from application.chunk_sync_service import ChunkSyncService
+from infrastructure.chunk_store import LocalChunkStore
+from utils.chunking import DEFAULT_PAGE_SIZE
+
+
+def write_file(path, data):
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def rebuild(manifest, base_manifest, base_data, pack):
+    """Reconstruye el archivo como el cliente: fragmentos del archivo previo o del paquete."""
+    base_chunks = {c['id']: c for c in base_manifest['chunks']} if base_manifest else {}
+    pack_offset = 0
+    pack_chunks = {}
+    parts = []
+    for chunk in manifest['chunks']:
+        if chunk['id'] in base_chunks:
+            base = base_chunks[chunk['id']]
+            parts.append(base_data[base['offset']:base['offset'] + base['size']])
+        elif chunk['id'] in pack_chunks:
+            parts.append(pack_chunks[chunk['id']])
+        else:
+            pack_chunks[chunk['id']] = pack[pack_offset:pack_offset + chunk['size']]
+            pack_offset += chunk['size']
+            parts.append(pack_chunks[chunk['id']])
+    return b''.join(parts)
+
+
+class TestChunkSyncService:
+    """Suite de tests de publicación y plan de descarga."""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        return ChunkSyncService(LocalChunkStore(str(tmp_path / "chunks")))
+
+    @pytest.fixture
+    def base_data(self):
+        return random.Random(36).randbytes(DEFAULT_PAGE_SIZE * 400)
+
+    def test_local_change_downloads_only_nearby_chunks(self, service, base_data, tmp_path):
+        """Cambiar una página solo obliga a descargar su fragmento; el resto se reutiliza."""
+        base_hash = write_file(tmp_path / "base.sqlite", base_data)
+        base_manifest = service.publish(str(tmp_path / "base.sqlite"), base_hash)
+
+        changed = bytearray(base_data)
+        changed[DEFAULT_PAGE_SIZE * 200 + 10] ^= 0xFF
+        new_hash = write_file(tmp_path / "new.sqlite", bytes(changed))
+        manifest = service.publish(str(tmp_path / "new.sqlite"), new_hash)
+
+        plan = service.plan(manifest, base_hash)
+
+        assert plan['base'] == base_hash
+        assert len(plan['missing']) == 1
+        assert plan['missing_bytes'] + plan['reused_bytes'] == len(changed)
+        rebuilt = rebuild(manifest, base_manifest, base_data, service.read_pack(plan['missing']))
+        assert hashlib.sha256(rebuilt).hexdigest() == new_hash
+
+    def test_unknown_base_downloads_everything(self, service, base_data, tmp_path):
+        """Sin manifiesto base conocido se descargan todos los fragmentos."""
+        content_hash = write_file(tmp_path / "base.sqlite", base_data)
+        manifest = service.publish(str(tmp_path / "base.sqlite"), content_hash)
+
+        plan = service.plan(manifest, 'f' * 64)
+
+        assert plan['base'] is None
+        assert plan['missing_bytes'] == len(base_data)
+        assert rebuild(manifest, None, b'', service.read_pack(plan['missing'])) == base_data
+
+    def test_missing_chunk_in_pack_is_an_error(self, service):
+        """Un fragmento inexistente no se puede empaquetar."""
+        with pytest.raises(KeyError):
+            service.read_pack(['0' * 64])
@@ -0,0 +1,93 @@
+"""
+Tests unitarios del arranque en frío: configuración cacheada, imports diferidos del
+handler y la inicialización anticipada (handler.prime).
+"""
+import os
+import subprocess
+import sys
+
+from config.settings import get_settings
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+
+# Módulos que una exportación simple no necesita: el handler los importa al usarlos
+DEFERRED_MODULES = (
+    'application.async_export_service', 'application.chunk_sync_service', 'application.precompute_scheduler',
+    'infrastructure.async_postgres_repository', 'infrastructure.chunk_store',
+    'infrastructure.invalidation_store', 'infrastructure.refresh_dispatcher'
+)
+
+
+class TestSettingsCache:
+    """Suite de tests de get_settings."""
+
+    def test_settings_are_read_once(self, settings_env, monkeypatch):
+        """get_settings retorna la misma instancia hasta limpiar la caché."""
+        first = get_settings()
+        monkeypatch.setenv('POSTGRES_HOST', 'otro-host')
+
+        assert get_settings() is first
+        get_settings.cache_clear()
+        assert get_settings().postgres_host == 'otro-host'
+
+
+class TestDeferredImports:
+    """Suite de tests de los imports del handler."""
+
+    def test_handler_import_skips_rarely_used_modules(self, tmp_path):
+        """Importar el handler (fuera de Lambda) no carga los módulos de uso ocasional."""
+        env = {key: value for key, value in os.environ.items() if key != 'AWS_LAMBDA_FUNCTION_NAME'}
+        env['PYTHONPATH'] = os.path.abspath(SRC_DIR)
+        script = (
+            "import sys, handler; "
+            f"print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+        )
+
+        output = subprocess.run(
+            [sys.executable, '-c', script], env=env, cwd=str(tmp_path), capture_output=True, text=True, check=True
+        )
+
+        assert output.stdout.strip() == ''
+
+
+class TestPrime:
+    """Suite de tests de handler.prime."""
+
+    def test_prime_builds_schema_template(self, handler_module):
+        handler_module.prime()
+
+        assert handler_module._schema_template is not None
+        assert handler_module._connection_pools is None
+
+    def test_prime_disabled_only_reads_settings(self, handler_module, settings_env):
+        settings_env(INIT_PRIMING_ENABLED='false')
+
+        handler_module.prime()
+
+        assert handler_module._schema_template is None
+
+    def test_prime_opens_persistent_connection(self, handler_module, settings_env, repository, monkeypatch):
+        """Con conexiones persistentes se conecta una vez y se devuelve la conexión."""
+        settings_env(LAMBDA_PERSISTENT_CONNECTIONS='true')
+        opened = []
+        monkeypatch.setattr(
+            handler_module, 'use_persistent_connections', lambda settings, **limits: opened.append(limits)
+        )
+        connect = repository.connect
+        monkeypatch.setattr(repository, 'connect', lambda: opened.append('connect') or connect())
+
+        handler_module.prime()
+
+        max_connections = get_settings().postgres_pool_max_connections + 1
+        assert opened == [{'min_connections': 1, 'max_connections': max_connections}, 'connect']
+        assert repository.connected is False
+
+    def test_prime_failure_is_not_raised(self, handler_module, settings_env, repository, monkeypatch):
+        """Un error de la inicialización se registra y la primera invocación lo repite."""
+        settings_env(LAMBDA_PERSISTENT_CONNECTIONS='true')
+        monkeypatch.setattr(handler_module, 'use_persistent_connections', lambda settings, **limits: None)
+        monkeypatch.setattr(repository, 'connect', lambda: (_ for _ in ()).throw(OSError("sin red")))
+
+        handler_module.prime()
+
+        assert handler_module._schema_template is not None
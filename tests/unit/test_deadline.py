@@ -0,0 +1,158 @@
+"""
+Tests unitarios de la exportación con plazo (tiempo restante de la invocación de Lambda).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import pytest
+
+from application.export_service import ExportService, build_artifact_key
+from domain.models import Deadline
+from domain.profiles import get_profile
+from infrastructure.postgres_repository import PostgresRepository
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.conftest import export_event
+
+
+class LambdaContext:
+    """Contexto de Lambda con tiempo restante fijo."""
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class TestDeadline:
+    """Suite de tests del plazo de exportación."""
+
+    @pytest.fixture
+    def service(self, repository, artifact_store):
+        return ExportService(repository, SQLiteBuilder(), artifact_store=artifact_store)
+
+    def test_slow_optional_tables_are_skipped(self, service, repository, artifact_store, tmp_path):
+        """Si se agota el plazo, las tablas opcionales pendientes (y sus dependientes) se omiten."""
+        repository.delays['cobranzas'] = 2
+
+        start = time.monotonic()
+        result = service.export_tenant_data(1, str(tmp_path / "a.sqlite"), deadline=Deadline.after(0.3))
+
+        assert time.monotonic() - start < 1.5
+        assert result.success is True
+        assert result.skipped_tables == ['cobranzas', 'cobranza_details']
+        assert 'cobranzas' not in result.records_exported
+        # Un archivo parcial no se guarda como artefacto
+        assert artifact_store.get(build_artifact_key(1, get_profile())) is None
+
+    def test_slow_required_table_times_out(self, service, repository, tmp_path):
+        """Si una tabla obligatoria no llega a tiempo, la exportación falla con timed_out."""
+        repository.delays['customers'] = 2
+
+        result = service.export_tenant_data(1, str(tmp_path / "a.sqlite"), deadline=Deadline.after(0.3))
+
+        assert result.success is False
+        assert result.timed_out is True
+
+    def test_deadline_is_propagated_to_the_repository(self, service, repository, tmp_path):
+        """El repositorio recibe el plazo (de él deriva el statement_timeout)."""
+        deadline = Deadline.after(30)
+
+        service.export_tenant_data(1, str(tmp_path / "a.sqlite"), deadline=deadline)
+
+        assert repository.deadline is deadline
+
+    def test_handler_answers_504_when_budget_runs_out(self, handler_module, settings_env, repository):
+        """El plazo es el tiempo restante de la invocación menos la reserva; agotado, 504."""
+        settings_env(DEADLINE_RESERVE_MS=2000)
+        repository.delays['customers'] = 2
+
+        response = handler_module.lambda_handler(export_event(1), LambdaContext(2300))
+
+        assert response['statusCode'] == 504
+
+    def test_running_queries_are_cancelled_at_deadline(self, service, repository, tmp_path):
+        """Al agotarse el plazo las queries en curso se cancelan en vez de esperarlas."""
+        # statement_timeout mayor que el plazo: sin cancelación la query seguiría 5 s
+        repository.set_deadline = lambda deadline: None
+        repository.delays['cobranzas'] = 5
+
+        start = time.monotonic()
+        result = service.export_tenant_data(1, str(tmp_path / "a.sqlite"), deadline=Deadline.after(0.3))
+
+        assert time.monotonic() - start < 1.5
+        assert result.success is True
+        assert result.skipped_tables == ['cobranzas', 'cobranza_details']
+        assert repository.cancelled_queries == 1
+
+    @pytest.mark.parametrize(
+        'remaining_ms, budget_ms', [(10000, 8000), (2300, 500), (600, 300), (0, 0)]
+    )
+    def test_budget_keeps_a_floor_when_reserve_exceeds_remaining_time(
+        self, handler_module, settings_env, remaining_ms, budget_ms
+    ):
+        """Con menos tiempo que la reserva el plazo no es negativo (ver MIN_DEADLINE_BUDGET_MS)."""
+        settings_env(DEADLINE_RESERVE_MS=2000)
+
+        deadline = handler_module._request_deadline(
+            LambdaContext(remaining_ms), handler_module.get_settings()
+        )
+
+        assert budget_ms - 50 <= deadline.remaining_seconds() * 1000 <= budget_ms
+
+
+class BlockingCursor:
+    """Cursor cuya query corre hasta que se cancela la conexión."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        self.connection.started.set()
+        if self.connection.cancelled.wait(5):
+            raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+
+    def fetchall(self):
+        return []
+
+
+class BlockingConnection:
+    """Conexión de psycopg2 mínima: connection.cancel() interrumpe la query en curso."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+
+    def cursor(self):
+        return BlockingCursor(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class TestCancelRunningQueries:
+    """Suite de tests de la cancelación de queries en PostgresRepository."""
+
+    def test_running_query_is_cancelled_on_its_connection(self):
+        """cancel_running_queries envía el cancel a la conexión de cada query en curso."""
+        postgres_repository = PostgresRepository('localhost', 5432, 'db', 'user', 'password')
+        connection = BlockingConnection()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(postgres_repository._run_tracked, connection, 'SELECT 1', None)
+            assert connection.started.wait(5)
+            start = time.monotonic()
+            postgres_repository.cancel_running_queries()
+
+            with pytest.raises(psycopg2.extensions.QueryCanceledError):
+                future.result(timeout=5)
+        assert time.monotonic() - start < 1
+        assert postgres_repository._running_connections == {}
@@ -0,0 +1,131 @@
+"""
+Tests unitarios de la sincronización incremental (ExportService.export_tenant_delta).
+Una delta aplicada sobre la exportación completa previa debe dejar la base del
+cliente igual a una exportación completa nueva.
+"""
+import logging
+import shutil
+import sqlite3
+
+import pytest
+
+from application.export_service import FULL_REPLACE_ENTITIES, ExportService, parse_watermark
+from domain.profiles import get_profile
+from infrastructure.sqlite_builder import SQLITE_TABLES, SQLiteBuilder
+
+
+def apply_delta(base_path, delta_path):
+    """Aplica una delta como el cliente: SyncApplyStep en una transacción con la delta adjunta."""
+    connection = sqlite3.connect(base_path, isolation_level=None)
+    try:
+        connection.execute("ATTACH DATABASE ? AS delta", (delta_path,))
+        steps = connection.execute("SELECT Sql FROM delta.SyncApplyStep ORDER BY Step").fetchall()
+        connection.execute("BEGIN")
+        for (statement,) in steps:
+            connection.execute(statement)
+        connection.execute("COMMIT")
+        connection.execute("DETACH DATABASE delta")
+    finally:
+        connection.close()
+
+
+def table_contents(path):
+    """Contenido de todas las tablas exportadas, ordenado."""
+    connection = sqlite3.connect(path)
+    try:
+        return {
+            table: sorted(connection.execute(f"SELECT * FROM {table}").fetchall(), key=repr)
+            for table in SQLITE_TABLES.values()
+        }
+    finally:
+        connection.close()
+
+
+def deleted_rows(path):
+    """Filas de SyncDeletedRow de una delta."""
+    connection = sqlite3.connect(path)
+    try:
+        return set(connection.execute("SELECT TableName, Id FROM SyncDeletedRow").fetchall())
+    finally:
+        connection.close()
+
+
+class TestDeltaSync:
+    """Suite de tests de la exportación delta."""
+
+    @pytest.fixture
+    def new_service(self, repository):
+        """Crea un servicio nuevo por exportación (como una invocación de Lambda)."""
+        return lambda: ExportService(repository, SQLiteBuilder())
+
+    def export_full(self, new_service, path, profile=None):
+        result = new_service().export_tenant_data(1, str(path), profile)
+        assert result.success is True
+        return result
+
+    def assert_delta_converges(self, new_service, tmp_path, full_result, profile=None):
+        """Aplica la delta sobre la exportación previa y la compara con una exportación nueva."""
+        since = parse_watermark(full_result.sync_watermark)
+        delta = new_service().export_tenant_delta(1, str(tmp_path / "delta.sqlite"), since, profile)
+        assert delta.success is True
+
+        client_path = str(tmp_path / "client.sqlite")
+        shutil.copyfile(full_result.file_path, client_path)
+        apply_delta(client_path, delta.file_path)
+
+        self.export_full(new_service, tmp_path / "fresh.sqlite", profile)
+        assert table_contents(client_path) == table_contents(str(tmp_path / "fresh.sqlite"))
+        return delta
+
+    def test_delta_converges_after_scope_changes(self, new_service, repository, tmp_path):
+        """Bajas, altas y filas que salen del alcance sin cambiar su propio updated_at."""
+        full_result = self.export_full(new_service, tmp_path / "full.sqlite")
+
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+        repository.add('customers', tenant_id=1, id=13, name='Cliente 13')
+        # Cliente dado de baja: su lista de precios sale del alcance del tenant
+        repository.remove('customers', 11)
+        # Asignación borrada: la lista 1 y sus detalles salen del alcance
+        repository.delete('client_list_prices', 1)
+        # Producto que pasa a un tipo no exportado
+        repository.update('products', 4, type='Kit')
+        repository.remove('cobranzas', 2)
+
+        delta = self.assert_delta_converges(new_service, tmp_path, full_result)
+
+        assert {('Customer', 11), ('Product', 4), ('Cobranza', 2)} <= deleted_rows(delta.file_path)
+        assert set(FULL_REPLACE_ENTITIES) <= set(delta.sync['replaced'])
+
+    def test_delta_converges_with_projected_profile(self, new_service, repository, tmp_path):
+        """Con un perfil de columnas y catálogo podado la delta también converge."""
+        profile = get_profile('pricing')
+        full_result = self.export_full(new_service, tmp_path / "full.sqlite", profile)
+
+        repository.delete('client_list_prices', 2)
+        repository.update('list_price_details', 1, price='99.00')
+
+        self.assert_delta_converges(new_service, tmp_path, full_result, profile)
+
+    def test_delta_without_changes_only_replaces_full_entities(self, new_service, repository, tmp_path):
+        """Sin cambios la delta no trae filas de las entidades con updated_at."""
+        full_result = self.export_full(new_service, tmp_path / "full.sqlite")
+
+        delta = new_service().export_tenant_delta(
+            1, str(tmp_path / "delta.sqlite"), parse_watermark(full_result.sync_watermark)
+        )
+
+        assert delta.records_exported['customers'] == 0
+        assert delta.records_exported['client_list_prices'] == 2
+        assert sum(delta.sync['deleted'].values()) == 0
+
+    def test_delta_fetch_log_counts_upserts_and_deletes(self, new_service, repository, tmp_path, caplog):
+        """El log de cada entidad delta informa altas y bajas, no el tamaño de la tupla."""
+        full_result = self.export_full(new_service, tmp_path / "full.sqlite")
+        repository.remove('customers', 11)
+
+        with caplog.at_level(logging.INFO, logger='application.export_service'):
+            new_service().export_tenant_delta(
+                1, str(tmp_path / "delta.sqlite"), parse_watermark(full_result.sync_watermark)
+            )
+
+        assert any("0 altas/modificaciones y 1 bajas de customers" in message for message in caplog.messages)
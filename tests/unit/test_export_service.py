@@ -2,146 +2,184 @@
 Tests unitarios para ExportService.
 Demuestra el uso de mocks y testing de la capa de aplicación.
 """
+import sqlite3
+from unittest.mock import Mock
+
 import pytest
-from unittest.mock import Mock, MagicMock, patch
-from decimal import Decimal
 
-from src.application.export_service import ExportService
-from src.domain.models import Cliente, Producto, ListaPrecio
-from src.utils.exceptions import DatabaseConnectionError, ExportError
+from application.export_service import ExportService
+from domain.models import ENTITY_MODELS
+from domain.profiles import get_profile
+from infrastructure.sqlite_builder import SQLITE_TABLES, SQLiteBuilder
+
+
+def read_rows(path, table, columns='*'):
+    """Lee las filas de una tabla del archivo SQLite exportado, ordenadas por Id."""
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(f"SELECT {columns} FROM {table} ORDER BY Id").fetchall()
+    finally:
+        connection.close()
 
 
 class TestExportService:
     """Suite de tests para ExportService."""
 
-    @pytest.fixture
-    def mock_repository(self):
-        """Crea un mock del repositorio de datos."""
-        return Mock()
-
     @pytest.fixture
     def mock_sqlite_builder(self):
         """Crea un mock del SQLite builder."""
-        return Mock()
-
-    @pytest.fixture
-    def export_service(self, mock_repository, mock_sqlite_builder):
-        """Crea una instancia de ExportService con mocks."""
-        return ExportService(mock_repository, mock_sqlite_builder)
+        builder = Mock()
+        builder.finalize.return_value = 'sha256'
+        return builder
 
-    @pytest.fixture
-    def sample_cliente(self):
-        """Cliente de ejemplo."""
-        return Cliente(
-            id=1,
-            tenant_id=123,
-            codigo="CLI001",
-            nombre="Cliente Test"
-        )
-
-    @pytest.fixture
-    def sample_producto(self):
-        """Producto de ejemplo."""
-        return Producto(
-            id=1,
-            tenant_id=123,
-            codigo="PROD001",
-            nombre="Producto Test",
-            precio_base=Decimal("10.50")
-        )
-
-    @pytest.fixture
-    def sample_lista_precio(self):
-        """Lista de precio de ejemplo."""
-        return ListaPrecio(
-            id=1,
-            tenant_id=123,
-            producto_id=1,
-            precio=Decimal("12.00")
-        )
-
-    def test_export_tenant_data_success(
-        self,
-        export_service,
-        mock_repository,
-        mock_sqlite_builder,
-        sample_cliente,
-        sample_producto,
-        sample_lista_precio
-    ):
+    def test_export_tenant_data_success(self, export_service, repository, tmp_path):
         """Test de exportación exitosa."""
         # Arrange
-        tenant_id = 123
-        output_path = "/tmp/test.sqlite"
-
-        mock_repository.get_clientes_by_tenant.return_value = [sample_cliente]
-        mock_repository.get_productos_by_tenant.return_value = [sample_producto]
-        mock_repository.get_listas_precios_by_tenant.return_value = [sample_lista_precio]
+        tenant_id = 1
+        output_path = str(tmp_path / "test.sqlite")
 
-        with patch('os.path.getsize', return_value=1024):
-            with patch('os.path.exists', return_value=True):
-                # Act
-                result = export_service.export_tenant_data(tenant_id, output_path)
+        # Act
+        result = export_service.export_tenant_data(tenant_id, output_path)
 
         # Assert
         assert result.success is True
         assert result.file_path == output_path
-        assert result.file_size == 1024
-        assert result.records_exported['clientes'] == 1
-        assert result.records_exported['productos'] == 1
-        assert result.records_exported['listas_precios'] == 1
-
-        # Verificar que se llamaron los métodos correctos
-        mock_repository.connect.assert_called_once()
-        mock_repository.get_clientes_by_tenant.assert_called_once_with(tenant_id)
-        mock_repository.get_productos_by_tenant.assert_called_once_with(tenant_id)
-        mock_repository.get_listas_precios_by_tenant.assert_called_once_with(tenant_id)
-
-        mock_sqlite_builder.create_database.assert_called_once_with(output_path)
-        mock_sqlite_builder.create_schema.assert_called_once()
-        mock_sqlite_builder.insert_clientes.assert_called_once()
-        mock_sqlite_builder.insert_productos.assert_called_once()
-        mock_sqlite_builder.insert_listas_precios.assert_called_once()
-
-    def test_export_tenant_data_no_data(
-        self,
-        export_service,
-        mock_repository,
-        mock_sqlite_builder
-    ):
+        assert result.file_size > 0
+        assert result.content_hash
+        assert result.records_exported == {
+            entity_name: len(repository.rows(entity_name, tenant_id)) for entity_name in ENTITY_MODELS
+        }
+        assert result.records_exported['customers'] == 2
+        assert result.records_exported['products'] == 4
+
+        # Verificar que el archivo contiene las filas del tenant
+        assert read_rows(output_path, 'Customer', 'Id, Name') == [(10, 'Cliente 10'), (11, 'Cliente 11')]
+        assert repository.connected is False
+
+    def test_export_tenant_data_no_data(self, repository, mock_sqlite_builder, tmp_path):
         """Test cuando no hay datos para exportar."""
         # Arrange
+        export_service = ExportService(repository, mock_sqlite_builder)
         tenant_id = 999
-        output_path = "/tmp/test.sqlite"
-
-        mock_repository.get_clientes_by_tenant.return_value = []
-        mock_repository.get_productos_by_tenant.return_value = []
-        mock_repository.get_listas_precios_by_tenant.return_value = []
+        output_path = str(tmp_path / "test.sqlite")
 
         # Act
         result = export_service.export_tenant_data(tenant_id, output_path)
 
         # Assert
         assert result.success is False
+        assert result.not_found is True
         assert "No se encontraron datos" in result.error_message
         mock_sqlite_builder.create_database.assert_not_called()
 
-    def test_export_tenant_data_connection_error(
-        self,
-        export_service,
-        mock_repository,
-        mock_sqlite_builder
-    ):
+    def test_export_tenant_data_connection_error(self, repository, mock_sqlite_builder, tmp_path):
         """Test cuando falla la conexión a la base de datos."""
         # Arrange
-        tenant_id = 123
-        output_path = "/tmp/test.sqlite"
-        mock_repository.connect.side_effect = Exception("Connection failed")
+        repository.connect = Mock(side_effect=Exception("Connection failed"))
+        repository.disconnect = Mock()
+        export_service = ExportService(repository, mock_sqlite_builder)
 
         # Act
-        result = export_service.export_tenant_data(tenant_id, output_path)
+        result = export_service.export_tenant_data(1, str(tmp_path / "test.sqlite"))
 
         # Assert
         assert result.success is False
-        assert result.error_message is not None
-        mock_repository.disconnect.assert_called_once()
+        assert "Connection failed" in result.error_message
+        repository.disconnect.assert_called_once()
+        mock_sqlite_builder.create_database.assert_not_called()
+
+    def test_export_tenant_data_fetch_error(self, export_service, repository, tmp_path):
+        """Test cuando falla una query: la exportación falla con el error de la tabla."""
+        repository.failures['locations'] = RuntimeError("relation does not exist")
+
+        result = export_service.export_tenant_data(1, str(tmp_path / "test.sqlite"))
+
+        assert result.success is False
+        assert "locations" in result.error_message
+
+
+class TestExportProfiles:
+    """Suite de tests de la exportación por perfiles."""
+
+    def test_profile_queries_only_its_tables_and_columns(self, export_service, repository, tmp_path):
+        """Un perfil solo consulta sus tablas, con sus columnas (más id y foreign keys)."""
+        profile = get_profile('collections')
+
+        result = export_service.export_tenant_data(1, str(tmp_path / "test.sqlite"), profile)
+
+        assert result.success is True
+        assert result.profile == 'collections'
+        assert sorted(result.records_exported) == sorted(profile.tables)
+        fetched = {call[0]: call[2] for call in repository.calls if len(call) == 3}
+        assert set(fetched) == set(profile.tables)
+        assert fetched['products'] == ('id', 'sku', 'name')
+
+    def test_omitted_columns_are_null_and_schema_is_stable(self, export_service, tmp_path):
+        """Las columnas omitidas quedan en NULL; las tablas fuera del perfil existen vacías."""
+        output_path = str(tmp_path / "test.sqlite")
+
+        export_service.export_tenant_data(1, output_path, get_profile('lite'))
+
+        assert read_rows(output_path, 'Customer', 'Name, Geofence') == [('Cliente 10', None), ('Cliente 11', None)]
+        assert read_rows(output_path, 'Location', 'Name, Geofence') == [('Bodega 1', None)]
+
+        pricing_path = str(tmp_path / "pricing.sqlite")
+        export_service.export_tenant_data(1, pricing_path, get_profile('pricing'))
+        assert read_rows(pricing_path, SQLITE_TABLES['cobranzas']) == []
+
+    def test_referenced_scope_prunes_products(self, export_service, tmp_path):
+        """Con product_scope 'referenced' solo se exportan los productos que usa el tenant."""
+        output_path = str(tmp_path / "test.sqlite")
+
+        result = export_service.export_tenant_data(1, output_path, get_profile('pricing'))
+
+        assert read_rows(output_path, 'Product', 'Id') == [(1,), (2,), (3,)]
+        assert result.product_pruning['catalog_rows'] == 4
+        assert result.product_pruning['exported_rows'] == 3
+
+    def test_unknown_profile_is_rejected(self):
+        """Un perfil inexistente es un error de validación."""
+        with pytest.raises(ValueError):
+            get_profile('nope')
+
+    def test_export_is_byte_reproducible(self, repository, tmp_path):
+        """La misma entrada produce los mismos bytes (mismo hash de contenido)."""
+        first = ExportService(repository, SQLiteBuilder()).export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        second = ExportService(repository, SQLiteBuilder()).export_tenant_data(1, str(tmp_path / "b.sqlite"))
+
+        assert first.content_hash == second.content_hash
+        assert (tmp_path / "a.sqlite").read_bytes() == (tmp_path / "b.sqlite").read_bytes()
+
+
+class TestProductPruning:
+    """Suite de tests del catálogo de productos podado (product_scope 'referenced')."""
+
+    def test_products_referenced_by_cobranzas_are_kept(self, export_service, tmp_path):
+        """Los productos de los detalles de cobranza cuentan como referenciados."""
+        output_path = str(tmp_path / "test.sqlite")
+
+        result = export_service.export_tenant_data(2, output_path, get_profile('collections'))
+
+        assert result.success is True
+        assert read_rows(output_path, 'Product', 'Id') == [(4,)]
+        assert result.product_pruning == {
+            'catalog_rows': 4, 'exported_rows': 1, 'rows_saved': 3, 'estimated_bytes_saved': 300
+        }
+
+    def test_catalog_stats_failure_does_not_fail_export(self, export_service, repository, tmp_path):
+        """Si fallan las estadísticas del catálogo, la exportación sigue sin el reporte de ahorro."""
+        repository.get_product_catalog_stats = Mock(side_effect=RuntimeError("stats timeout"))
+
+        result = export_service.export_tenant_data(1, str(tmp_path / "test.sqlite"), get_profile('pricing'))
+
+        assert result.success is True
+        assert result.product_pruning == {'exported_rows': 3}
+
+    def test_catalog_scope_does_not_measure_pruning(self, export_service, repository, tmp_path):
+        """Con el catálogo completo no se consultan las estadísticas."""
+        repository.get_product_catalog_stats = Mock()
+
+        result = export_service.export_tenant_data(1, str(tmp_path / "test.sqlite"))
+
+        assert result.product_pruning == {}
+        repository.get_product_catalog_stats.assert_not_called()
@@ -0,0 +1,72 @@
+"""
+Tests unitarios del límite de exportaciones simultáneas del clúster (cupos de
+exportación con advisory locks).
+"""
+import pytest
+
+from application.export_service import ExportService
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.conftest import export_event
+
+
+class SlotRecordingBuilder(SQLiteBuilder):
+    """Builder que registra los cupos tomados al empezar a construir el SQLite."""
+
+    def __init__(self, repository):
+        super().__init__()
+        self.repository = repository
+        self.slots_while_building = None
+
+    def create_database(self, file_path):
+        self.slots_while_building = set(self.repository._slots)
+        super().create_database(file_path)
+
+
+class TestExportSlots:
+    """Suite de tests de los cupos de exportación en ExportService y el handler."""
+
+    @pytest.fixture
+    def new_service(self, repository):
+        return lambda builder=None: ExportService(
+            repository, builder or SQLiteBuilder(), max_concurrent_exports=1, export_slot_wait_seconds=0
+        )
+
+    def test_export_without_free_slot_is_overloaded(self, new_service, repository, tmp_path):
+        """Con todos los cupos ocupados la exportación falla como sobrecarga, sin consultar datos."""
+        held_slot = repository.acquire_export_slot(1, 0)
+        repository.calls.clear()
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "test.sqlite"))
+
+        assert held_slot == 0
+        assert result.success is False
+        assert result.overloaded is True
+        assert not [call for call in repository.calls if len(call) == 3]
+
+    def test_slot_is_released_before_building_sqlite(self, new_service, repository, tmp_path):
+        """El cupo cubre solo las queries: se libera antes de construir el archivo."""
+        builder = SlotRecordingBuilder(repository)
+
+        result = new_service(builder).export_tenant_data(1, str(tmp_path / "test.sqlite"))
+
+        assert result.success is True
+        assert ('export_slot', 0) in repository.calls
+        assert builder.slots_while_building == set()
+        assert repository._slots == set()
+
+    def test_slot_is_released_when_export_fails(self, new_service, repository, tmp_path):
+        """Una query fallida no deja el cupo tomado."""
+        repository.failures['customers'] = RuntimeError("connection reset")
+
+        assert new_service().export_tenant_data(1, str(tmp_path / "test.sqlite")).success is False
+        assert repository._slots == set()
+
+    def test_handler_answers_503_with_retry_after(self, handler_module, settings_env, repository):
+        """Sin cupo el handler responde 503 con Retry-After configurado."""
+        settings_env(EXPORT_MAX_CONCURRENCY=1, EXPORT_SLOT_WAIT_SECONDS=0, EXPORT_OVERLOAD_RETRY_AFTER_SECONDS=7)
+        repository.acquire_export_slot(1, 0)
+
+        response = handler_module.lambda_handler(export_event(1), None)
+
+        assert response['statusCode'] == 503
+        assert response['headers']['Retry-After'] == '7'
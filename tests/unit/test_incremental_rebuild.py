@@ -0,0 +1,71 @@
+"""
+Tests unitarios de la reconstrucción incremental: las tablas cuya huella no cambió
+se copian del artefacto previo en lugar de consultarse en PostgreSQL.
+"""
+import pytest
+
+from application.export_service import ExportService, build_artifact_key
+from domain.profiles import get_profile
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.test_delta_sync import table_contents
+
+
+class TestIncrementalRebuild:
+    """Suite de tests de la reutilización de tablas del artefacto previo."""
+
+    @pytest.fixture
+    def new_service(self, repository, artifact_store):
+        """Crea un servicio nuevo por exportación, con el almacén de artefactos compartido."""
+        return lambda: ExportService(repository, SQLiteBuilder(), artifact_store=artifact_store)
+
+    def fetched_entities(self, repository):
+        return [call[0] for call in repository.calls if len(call) == 3]
+
+    def test_first_export_is_a_miss_and_stores_the_artifact(self, new_service, artifact_store, tmp_path):
+        """Sin artefacto previo se consultan todas las tablas y se guarda el resultado."""
+        result = new_service().export_tenant_data(1, str(tmp_path / "a.sqlite"))
+
+        assert result.cache_status == 'MISS'
+        assert result.reused_tables == []
+        artifact = artifact_store.get(build_artifact_key(1, get_profile()))
+        assert artifact.metadata['content_hash'] == result.content_hash
+        assert artifact.records_exported == result.records_exported
+
+    def test_only_changed_tables_are_queried(self, new_service, repository, tmp_path):
+        """Con una tabla modificada solo se consulta esa tabla; el archivo es igual al completo."""
+        new_service().export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+        repository.calls.clear()
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "b.sqlite"))
+
+        assert result.cache_status == 'PARTIAL'
+        assert self.fetched_entities(repository) == ['customers']
+        assert 'customers' not in result.reused_tables
+        assert result.records_exported['products'] == 4
+
+        fresh = ExportService(repository, SQLiteBuilder()).export_tenant_data(1, str(tmp_path / "c.sqlite"))
+        assert result.content_hash == fresh.content_hash
+        assert table_contents(str(tmp_path / "b.sqlite")) == table_contents(str(tmp_path / "c.sqlite"))
+
+    def test_unchanged_tenant_is_a_hit(self, new_service, repository, tmp_path):
+        """Sin cambios no se consulta ninguna tabla y se sirve una copia del artefacto."""
+        first = new_service().export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        repository.calls.clear()
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "b.sqlite"))
+
+        assert result.cache_status == 'HIT'
+        assert self.fetched_entities(repository) == []
+        assert result.content_hash == first.content_hash
+        assert (tmp_path / "a.sqlite").read_bytes() == (tmp_path / "b.sqlite").read_bytes()
+
+    def test_fingerprint_failure_falls_back_to_full_export(self, new_service, repository, tmp_path):
+        """Si no se pueden calcular las huellas, se consultan todas las tablas."""
+        new_service().export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        repository.get_table_fingerprints = lambda *args, **kwargs: 1 / 0
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "b.sqlite"))
+
+        assert result.success is True
+        assert result.cache_status == 'MISS'
@@ -0,0 +1,109 @@
+"""
+Tests unitarios del registro de cambios notificados (LocalInvalidationStore) y del
+HIT sin consultar PostgreSQL en ExportService.
+"""
+import time
+
+import pytest
+
+from application.export_service import ExportService, build_artifact_key, parse_watermark
+from domain.profiles import ALL_ENTITIES, get_profile
+from infrastructure.invalidation_store import LocalInvalidationStore
+from infrastructure.sqlite_builder import SQLiteBuilder
+
+
+@pytest.fixture
+def invalidation_store(tmp_path):
+    return LocalInvalidationStore(str(tmp_path / "invalidations"))
+
+
+class TestLocalInvalidationStore:
+    """Suite de tests de LocalInvalidationStore."""
+
+    def test_changes_after_since_include_global_entities(self, invalidation_store):
+        """Se informan las entidades del tenant y las globales modificadas después de since."""
+        invalidation_store.heartbeat(live_since=100)
+        invalidation_store.mark_changed({1: ['customers'], 2: ['locations'], None: ['products']}, changed_at=200)
+        invalidation_store.mark_changed({1: ['cobranzas']}, changed_at=120)
+
+        assert invalidation_store.changed_entities(1, since=150, max_heartbeat_age_seconds=30) == [
+            'customers', 'products'
+        ]
+        assert invalidation_store.changed_entities(3, since=150, max_heartbeat_age_seconds=30) == ['products']
+        assert invalidation_store.changed_entities(1, since=250, max_heartbeat_age_seconds=30) == []
+
+    def test_unknown_without_live_heartbeat(self, invalidation_store):
+        """Sin latido, con latido viejo o escuchando desde después de since, no se puede asegurar nada."""
+        assert invalidation_store.changed_entities(1, since=150, max_heartbeat_age_seconds=30) is None
+
+        invalidation_store.heartbeat(live_since=200)
+        assert invalidation_store.changed_entities(1, since=150, max_heartbeat_age_seconds=30) is None
+
+        invalidation_store.heartbeat(live_since=100)
+        time.sleep(0.02)
+        assert invalidation_store.changed_entities(1, since=150, max_heartbeat_age_seconds=0.01) is None
+
+    def test_unreadable_history_counts_as_all_changed(self, invalidation_store):
+        """Un registro corrupto se reemplaza marcando todo como modificado."""
+        with open(invalidation_store._changes_path(1), 'w') as f:
+            f.write('{')
+        invalidation_store.heartbeat(live_since=100)
+
+        invalidation_store.mark_changed({1: ['customers']}, changed_at=200)
+
+        assert invalidation_store.changed_entities(1, since=150, max_heartbeat_age_seconds=30) == [
+            ALL_ENTITIES, 'customers'
+        ]
+
+
+class TestExportIfUnchanged:
+    """Suite de tests del HIT por registro de cambios en ExportService."""
+
+    @pytest.fixture
+    def new_service(self, repository, artifact_store, invalidation_store):
+        return lambda: ExportService(
+            repository, SQLiteBuilder(), artifact_store=artifact_store, invalidation_store=invalidation_store
+        )
+
+    @pytest.fixture
+    def since(self, new_service, artifact_store, invalidation_store, tmp_path):
+        """Exporta el tenant 1 (perfil por defecto y pricing) con el listener escuchando desde antes."""
+        invalidation_store.heartbeat(live_since=0)
+        new_service().export_tenant_data(1, str(tmp_path / "full.sqlite"))
+        new_service().export_tenant_data(1, str(tmp_path / "pricing.sqlite"), get_profile('pricing'))
+        artifact = artifact_store.get(build_artifact_key(1, get_profile()))
+        return parse_watermark(artifact.metadata['sync_watermark']).timestamp()
+
+    def test_unchanged_tenant_is_served_without_postgres(self, new_service, repository, since, tmp_path):
+        """Sin cambios notificados se sirve el artefacto sin conectarse a PostgreSQL."""
+        repository.calls.clear()
+        repository.connect = lambda: pytest.fail("no debe conectarse")
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "again.sqlite"))
+
+        assert result.success is True
+        assert result.cache_status == 'HIT'
+        assert repository.calls == []
+
+    def test_notified_change_falls_back_to_fingerprints(self, new_service, repository, invalidation_store, since, tmp_path):
+        """Un cambio de una entidad del perfil obliga a consultar PostgreSQL."""
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+        invalidation_store.mark_changed({1: ['customers']}, changed_at=since + 10)
+
+        result = new_service().export_tenant_data(1, str(tmp_path / "again.sqlite"))
+
+        assert result.cache_status == 'PARTIAL'
+        assert [call[0] for call in repository.calls if len(call) == 3][-1:] == ['customers']
+
+    def test_change_outside_profile_keeps_the_hit(self, new_service, repository, invalidation_store, since, tmp_path):
+        """Un cambio en una tabla que el perfil no exporta no invalida su artefacto."""
+        invalidation_store.mark_changed({1: ['cobranzas']}, changed_at=since + 10)
+        repository.calls.clear()
+
+        pricing = new_service().export_tenant_data(1, str(tmp_path / "pricing.sqlite"), get_profile('pricing'))
+        assert pricing.cache_status == 'HIT'
+        assert repository.calls == []
+
+        # El perfil por defecto exporta cobranzas: vuelve a comparar huellas en PostgreSQL
+        new_service().export_tenant_data(1, str(tmp_path / "full.sqlite"))
+        assert repository.calls != []
@@ -0,0 +1,66 @@
+"""
+Tests unitarios de la caché negativa de tenants sin datos.
+"""
+import time
+
+import pytest
+
+from application.export_service import ExportService
+from domain.profiles import get_profile
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.conftest import export_event
+from utils.ttl_cache import TTLCache
+
+
+class TestNegativeCache:
+    """Suite de tests de la caché negativa en ExportService."""
+
+    @pytest.fixture
+    def negative_cache(self):
+        return TTLCache(ttl_seconds=60)
+
+    @pytest.fixture
+    def new_service(self, repository, negative_cache):
+        return lambda: ExportService(repository, SQLiteBuilder(), negative_cache=negative_cache)
+
+    def test_unknown_tenant_is_answered_from_cache(self, new_service, repository, tmp_path):
+        """Un tenant inexistente se consulta una vez; después se responde sin PostgreSQL."""
+        first = new_service().export_tenant_data(999, str(tmp_path / "a.sqlite"))
+        repository.calls.clear()
+
+        second = new_service().export_tenant_data(999, str(tmp_path / "b.sqlite"))
+
+        assert first.not_found and second.not_found
+        assert repository.calls == []
+        assert repository.connected is False
+
+    def test_empty_profile_is_cached_per_profile(self, new_service, repository, tmp_path):
+        """Un tenant vacío para un perfil se cachea solo para ese perfil."""
+        repository.add('locations', tenant_id=3, id=3, name='Bodega 3')
+        pricing = get_profile('pricing')
+
+        assert new_service().export_tenant_data(3, str(tmp_path / "a.sqlite"), pricing).not_found
+        repository.calls.clear()
+        assert new_service().export_tenant_data(3, str(tmp_path / "b.sqlite"), pricing).not_found
+        assert repository.calls == []
+
+        full = new_service().export_tenant_data(3, str(tmp_path / "c.sqlite"))
+        assert full.success is True
+        assert full.records_exported['locations'] == 1
+
+    def test_entries_expire(self, repository, tmp_path):
+        """Vencida la entrada, el tenant se vuelve a consultar (puede haberse creado)."""
+        service = ExportService(repository, SQLiteBuilder(), negative_cache=TTLCache(ttl_seconds=0.05))
+        assert service.export_tenant_data(4, str(tmp_path / "a.sqlite")).not_found
+
+        repository.add('customers', tenant_id=4, id=40, name='Cliente 40')
+        time.sleep(0.06)
+
+        assert service.export_tenant_data(4, str(tmp_path / "b.sqlite")).success is True
+
+    def test_handler_answers_404(self, handler_module):
+        """El handler responde 404 a un tenant sin datos."""
+        response = handler_module.lambda_handler(export_event(999), None)
+
+        assert response['statusCode'] == 404
+        assert handler_module._negative_cache.get(999) is True
@@ -0,0 +1,84 @@
+"""
+Tests unitarios de PostgresRepository.
+Verifican las queries construidas sin conectarse a PostgreSQL.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from infrastructure.postgres_repository import PRODUCT_TYPES, PostgresRepository
+
+
+class TestPostgresRepositoryQueries:
+    """Suite de tests de las queries de exportación."""
+
+    @pytest.fixture
+    def postgres_repository(self):
+        """Repositorio sin conexión (solo se construyen queries)."""
+        return PostgresRepository('localhost', 5432, 'db', 'user', 'password')
+
+    def test_referenced_products_query_limits_catalog(self, postgres_repository):
+        """La query de productos referenciados filtra por el CTE del tenant."""
+        query, params = postgres_repository.entity_query('products', 7, ('id', 'sku'), referenced_products=True)
+
+        assert 'WITH referenced_products AS' in query
+        assert 'pp.id IN (SELECT product_id FROM referenced_products)' in query
+        assert params == (7, 7, PRODUCT_TYPES)
+
+    def test_catalog_products_query_has_no_tenant_filter(self, postgres_repository):
+        """El catálogo completo no depende del tenant."""
+        query, params = postgres_repository.entity_query('products', 7, ('id', 'sku'))
+
+        assert 'referenced_products' not in query
+        assert params == (PRODUCT_TYPES,)
+
+    def test_sync_watermark_is_capped_by_replica_replay(self, postgres_repository, monkeypatch):
+        """En una réplica la marca no pasa del último commit replicado."""
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        queries = []
+
+        def fetch_models(entity_name, tenant_id, query, params, model):
+            queries.append((entity_name, query))
+            return [{'now': now}]
+
+        monkeypatch.setattr(postgres_repository, '_fetch_models', fetch_models)
+
+        assert postgres_repository.get_sync_watermark() == now
+        (entity_name, query), = queries
+        assert entity_name == 'sync_watermark'
+        assert 'pg_is_in_recovery()' in query
+        assert 'LEAST(' in query
+        assert 'COALESCE(pg_last_xact_replay_timestamp(), pg_postmaster_start_time())' in query
+
+    @pytest.mark.parametrize('columns, joined', [(('id', 'price'), False), (('id', 'is_vat_applicable'), True)])
+    def test_list_price_details_join_product_only_for_vat(self, postgres_repository, columns, joined):
+        """La query individual y la de lotes unen product_product solo para is_vat_applicable."""
+        query, _ = postgres_repository.entity_query('list_price_details', 7, columns)
+        assert ('LEFT JOIN product_product pp' in query) is joined
+
+        batch_queries = []
+
+        def fetch_models(entity_name, tenant_id, query, params, model):
+            batch_queries.append(query)
+            return []
+
+        postgres_repository._fetch_models = fetch_models
+        postgres_repository.get_entity_by_tenants('list_price_details', [7, 8], columns)
+        assert ('LEFT JOIN product_product pp' in batch_queries[0]) is joined
+
+    def test_fingerprints_aggregate_metadata_not_rows(self, postgres_repository):
+        """Las huellas agregan conteo, ids y updated_at; no hashean las filas exportadas."""
+        query, params = postgres_repository.table_fingerprints_query(
+            7, {'customers': ('id', 'name'), 'products': None, 'client_list_prices': None},
+            referenced_products=True
+        )
+
+        assert 'md5(q::text)' not in query
+        assert 'INNER JOIN customer_customer AS t ON t.id = q.id' in query
+        assert 'INNER JOIN public.product_product AS t ON t.id = q.id' in query
+        assert query.count("MAX(t.updated_at)") == 2
+        # Solo se proyecta el id: sin columnas de datos ni JOINs opcionales
+        assert 'name' not in query
+        assert 'category_category' not in query
+        assert 'referenced_products' in query
+        assert params == (7, False, 7, 7, PRODUCT_TYPES, 7)
@@ -0,0 +1,80 @@
+"""
+Tests unitarios del planificador de precálculo de artefactos.
+"""
+import time
+
+import pytest
+
+from application.export_service import ExportService
+from application.precompute_scheduler import MAX_STALENESS_FACTOR, PrecomputeCandidate, PrecomputeScheduler
+from infrastructure.sqlite_builder import SQLiteBuilder
+
+
+def succeed(tenant_id, profile_name):
+    """Worker de nivel de módulo (corre en otro proceso)."""
+    if tenant_id == 2:
+        raise RuntimeError("sin conexión")
+    return {'success': True, 'cache_status': 'MISS'}
+
+
+class TestPrecomputeScheduler:
+    """Suite de tests de PrecomputeScheduler."""
+
+    @pytest.fixture
+    def export_service(self, repository, artifact_store):
+        return ExportService(repository, SQLiteBuilder(), artifact_store=artifact_store)
+
+    @pytest.fixture
+    def scheduler(self, export_service, repository):
+        return PrecomputeScheduler(export_service, repository, freshness_seconds=900, max_workers=2)
+
+    def test_fresh_unchanged_artifacts_are_skipped(self, scheduler, export_service, tmp_path):
+        """Un tenant sin artefacto entra al plan; uno con artefacto fresco y sin cambios no."""
+        export_service.export_tenant_data(1, str(tmp_path / "a.sqlite"))
+
+        planned = scheduler.plan({(1, None): 50, (2, None): 1})
+
+        assert [(candidate.tenant_id, candidate.score) for candidate in planned] == [(2, MAX_STALENESS_FACTOR)]
+
+    def test_changed_tenant_is_planned_with_boost(self, scheduler, export_service, repository, tmp_path):
+        """Datos modificados después de la marca del artefacto lo vuelven candidato."""
+        export_service.export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+
+        planned = scheduler.plan({(1, None): 3})
+
+        assert [candidate.tenant_id for candidate in planned] == [1]
+        assert planned[0].changed is True
+        assert planned[0].score > 3 * 2.0
+        assert repository.connected is False
+
+    def test_stale_artifact_is_planned_and_ordered_by_demand(self, scheduler, export_service, tmp_path):
+        """Un artefacto más viejo que la frescura se recalcula; más demanda, más prioridad."""
+        export_service.export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        export_service.export_tenant_data(2, str(tmp_path / "b.sqlite"))
+
+        planned = scheduler.plan({(1, None): 2, (2, None): 5}, now=time.time() + 3600)
+
+        assert [candidate.tenant_id for candidate in planned] == [2, 1]
+        assert all(candidate.changed is False for candidate in planned)
+
+    def test_unknown_profile_is_ignored(self, scheduler):
+        """Un perfil inexistente en el log de acceso no rompe el plan."""
+        assert [candidate.tenant_id for candidate in scheduler.plan({(1, 'nope'): 9, (2, None): 1})] == [2]
+
+    def test_change_signal_failure_keeps_planning(self, scheduler, export_service, repository, tmp_path):
+        """Si fallan las señales de cambio, se planifica solo por antigüedad."""
+        export_service.export_tenant_data(1, str(tmp_path / "a.sqlite"))
+        repository.get_tenant_change_times = lambda tenant_ids: 1 / 0
+
+        assert scheduler.plan({(1, None): 1}) == []
+
+    def test_run_collects_summaries_and_failures(self, scheduler):
+        """Cada candidato se exporta en un proceso; un worker que falla queda como error."""
+        candidates = [PrecomputeCandidate(tenant_id=1, profile=None, requests=1),
+                      PrecomputeCandidate(tenant_id=2, profile=None, requests=1)]
+
+        summaries = {summary['tenant_id']: summary for summary in scheduler.run(candidates, succeed)}
+
+        assert summaries[1]['success'] is True
+        assert summaries[2] == {**candidates[1].to_dict(), 'success': False, 'error': 'sin conexión'}
@@ -0,0 +1,140 @@
+"""
+Tests unitarios del hedging de queries de PostgresRepository: una query que supera el
+percentil de su historial se duplica en otra conexión del pool y gana la primera.
+Las conexiones son dobles en memoria con la interfaz de psycopg2 que usa el repositorio.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from infrastructure.postgres_repository import PostgresRepository
+from utils.latency_tracker import LatencyTracker
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if 'pg_cancel_backend' in query:
+            self.connection.pool.cancel(params[0])
+            self.rows = []
+            return
+        self.connection.queries.append(query)
+        self.connection.cancelled.wait(self.connection.latency)
+        self.rows = [{'id': 1, 'name': f"conexión {self.connection.pid}"}]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, pool, pid, latency):
+        self.pool = pool
+        self.pid = pid
+        self.latency = latency
+        self.queries = []
+        self.cancelled = threading.Event()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_backend_pid(self):
+        return self.pid
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    """Pool con una latencia fija por conexión (en el orden en que se entregan)."""
+
+    def __init__(self, latencies):
+        self.connections = [FakeConnection(self, pid, latency) for pid, latency in enumerate(latencies, start=1)]
+        self.available = list(self.connections)
+        self.maxconn = len(latencies)
+        self.cancelled_pids = []
+
+    def getconn(self):
+        return self.available.pop(0)
+
+    def putconn(self, connection, close=False):
+        self.available.append(connection)
+
+    def closeall(self):
+        self.available = []
+
+    def cancel(self, pid):
+        self.cancelled_pids.append(pid)
+        self.connections[pid - 1].cancelled.set()
+
+
+class TestQueryHedging:
+    """Suite de tests de PostgresRepository._execute_pooled."""
+
+    @pytest.fixture
+    def tracker(self):
+        tracker = LatencyTracker(min_samples=5)
+        for _ in range(5):
+            tracker.record('customers', 50)
+        return tracker
+
+    def connect(self, latencies, tracker):
+        repository = PostgresRepository(
+            'localhost', 5432, 'db', 'user', 'password', pool_max_connections=len(latencies),
+            latency_tracker=tracker
+        )
+        repository._pool = FakePool(latencies)
+        repository.connection = FakeConnection(repository._pool, 0, 0)
+        repository._hedge_executor = ThreadPoolExecutor(max_workers=len(latencies))
+        return repository
+
+    def test_slow_query_is_hedged_and_loser_cancelled(self, tracker):
+        """Sobre el percentil se lanza un duplicado; gana el más rápido y se cancela el otro."""
+        repository = self.connect([2.0, 0.01], tracker)
+
+        pool = repository._pool
+
+        start = time.time()
+        rows = repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+        elapsed = time.time() - start
+        repository.disconnect()
+
+        assert rows == [{'id': 1, 'name': 'conexión 2'}]
+        assert elapsed < 1
+        assert pool.cancelled_pids == [1]
+        timings = repository.get_query_timings()
+        assert timings['customers']['hedged'] == 1
+        assert timings['customers']['hedge_won'] == 1
+        assert timings['hedging']['hedge_rate'] == 1.0
+
+    def test_fast_query_is_not_hedged(self, tracker):
+        """Bajo el percentil no hay duplicado."""
+        repository = self.connect([0.01, 0.01], tracker)
+
+        rows = repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert rows == [{'id': 1, 'name': 'conexión 1'}]
+        assert repository.get_query_timings()['customers']['hedged'] == 0
+        assert repository._pool.connections[1].queries == []
+
+    def test_query_without_history_is_not_hedged(self):
+        """Sin muestras suficientes no hay umbral: la query corre una sola vez."""
+        repository = self.connect([0.2, 0.01], LatencyTracker(min_samples=5))
+
+        rows = repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert rows == [{'id': 1, 'name': 'conexión 1'}]
+        assert 'hedged' not in repository.get_query_timings()['customers']
@@ -0,0 +1,85 @@
+"""
+Tests unitarios de los reintentos de PostgresRepository: un error transitorio se
+reintenta con backoff en una conexión nueva; los demás errores fallan enseguida.
+"""
+import psycopg2
+import pytest
+
+from domain.models import Deadline
+from infrastructure.postgres_repository import PostgresRepository
+from utils.retry import RetryPolicy
+
+
+class ScriptedExecute:
+    """Reemplaza PostgresRepository._execute: falla con los errores dados y luego responde."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.fresh_connections = []
+
+    def __call__(self, entity_name, query, params, fresh_connection=False):
+        self.fresh_connections.append(fresh_connection)
+        if self.errors:
+            raise self.errors.pop(0)
+        return [{'id': 1}], 1.0, 1.0, {}, 'localhost:5432'
+
+
+class TestQueryRetry:
+    """Suite de tests de PostgresRepository._fetch_models con RetryPolicy."""
+
+    @pytest.fixture
+    def repository(self, monkeypatch):
+        monkeypatch.setattr('time.sleep', lambda seconds: None)
+        repository = PostgresRepository(
+            'localhost', 5432, 'db', 'user', 'password',
+            retry_policy=RetryPolicy(max_retries=2, base_delay_seconds=0.01)
+        )
+        repository.connection = object()
+        return repository
+
+    def test_transient_error_is_retried_on_a_fresh_connection(self, repository):
+        """Un corte de conexión se reintenta y la query termina bien."""
+        repository._execute = execute = ScriptedExecute(psycopg2.OperationalError("server closed the connection"))
+
+        rows = repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert rows == [{'id': 1}]
+        assert execute.fresh_connections == [False, True]
+        assert repository.get_retry_counts() == {'customers': 1}
+        assert repository.get_query_timings()['customers']['retries'] == 1
+
+    def test_non_transient_error_is_not_retried(self, repository):
+        """Un error de la query (no de la conexión) falla sin reintentos."""
+        repository._execute = execute = ScriptedExecute(psycopg2.ProgrammingError("relation does not exist"))
+
+        with pytest.raises(psycopg2.ProgrammingError):
+            repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert execute.fresh_connections == [False]
+        assert repository.get_retry_counts() == {}
+
+    def test_exhausted_retries_raise_and_are_counted(self, repository):
+        """Agotados los reintentos se propaga el error; los reintentos igual se cuentan."""
+        repository._execute = ScriptedExecute(*[psycopg2.OperationalError("timeout")] * 3)
+
+        with pytest.raises(psycopg2.OperationalError):
+            repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert repository.get_retry_counts() == {'customers': 2}
+
+    def test_retry_is_skipped_without_time_left(self, repository):
+        """Si el plazo no alcanza para esperar y reintentar, el error se propaga."""
+        repository.deadline = Deadline.after(0.01)
+        repository._execute = execute = ScriptedExecute(psycopg2.OperationalError("timeout"))
+
+        with pytest.raises(psycopg2.OperationalError):
+            repository._fetch_models('customers', 1, "SELECT 1", (), dict)
+
+        assert execute.fresh_connections == [False]
+
+    def test_backoff_is_bounded_by_the_cap(self):
+        """Full jitter: cada espera está entre 0 y min(max_delay, base * 2^n)."""
+        policy = RetryPolicy(max_retries=5, base_delay_seconds=0.1, max_delay_seconds=0.3)
+
+        for retry_number, cap in enumerate([0.1, 0.2, 0.3, 0.3]):
+            assert all(0 <= policy.backoff(retry_number) <= cap for _ in range(50))
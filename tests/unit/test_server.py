@@ -0,0 +1,96 @@
+"""
+Tests unitarios del servidor HTTP de larga duración (src/server.py), con el handler
+sobre el repositorio en memoria.
+"""
+import http.client
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from config.settings import get_settings
+
+
+@pytest.fixture
+def server_address(handler_module):
+    """Servidor escuchando en un puerto libre de localhost."""
+    import server
+    export_server = server.ExportServer(('127.0.0.1', 0), get_settings())
+    thread = threading.Thread(target=export_server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield export_server.server_address
+    export_server.shutdown()
+    export_server.server_close()
+
+
+def request(address, method, path, body=None, headers=None):
+    """Envía un request y retorna (status, headers, cuerpo)."""
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+class TestServer:
+    """Suite de tests de ExportServer."""
+
+    def test_build_export_event_translates_path_and_query(self):
+        """Un GET de exportación se traduce al evento de API Gateway."""
+        import server
+
+        event = server.build_export_event('/export/7?profile=lite&since=', {'If-None-Match': '"x"'})
+
+        assert event['pathParameters'] == {'tenant_id': '7'}
+        assert event['queryStringParameters'] == {'profile': 'lite', 'since': ''}
+        assert event['headers'] == {'If-None-Match': '"x"'}
+        assert server.build_export_event('/other/7', {}) is None
+
+    def test_health(self, server_address):
+        """GET /health responde el estado del proceso."""
+        status, _, body = request(server_address, 'GET', '/health')
+
+        assert status == 200
+        assert json.loads(body)['status'] == 'ok'
+
+    def test_export_returns_sqlite_file(self, server_address, tmp_path):
+        """GET /export/{tenant_id} responde el archivo SQLite del tenant."""
+        status, headers, body = request(server_address, 'GET', '/export/1')
+
+        assert status == 200
+        assert int(headers['Content-Length']) == len(body)
+        path = tmp_path / "export.sqlite"
+        path.write_bytes(body)
+        connection = sqlite3.connect(str(path))
+        try:
+            assert connection.execute("SELECT COUNT(*) FROM Customer").fetchone() == (2,)
+        finally:
+            connection.close()
+
+    def test_unknown_route_is_404(self, server_address):
+        assert request(server_address, 'GET', '/nope')[0] == 404
+        assert request(server_address, 'POST', '/nope', body=b'{}')[0] == 404
+
+    def test_batch_body_too_large_is_413(self, server_address):
+        """Un cuerpo de POST /batch sobre MAX_BATCH_BODY_BYTES se rechaza sin leerlo."""
+        import server
+        oversized = b' ' * (server.MAX_BATCH_BODY_BYTES + 1)
+
+        status, _, body = request(server_address, 'POST', '/batch', body=oversized)
+
+        assert status == 413
+        assert json.loads(body)['status'] == 413
+
+    def test_batch_invalid_json_is_400(self, server_address):
+        assert request(server_address, 'POST', '/batch', body=b'[1, 2]')[0] == 400
+        assert request(server_address, 'POST', '/batch', body=b'{')[0] == 400
+
+    def test_batch(self, server_address):
+        """POST /batch ejecuta el evento de lotes."""
+        status, _, body = request(server_address, 'POST', '/batch', body=json.dumps({'tenant_ids': [1, 2]}))
+
+        assert status == 200
+        assert set(json.loads(body)['tenants']) == {'1', '2'}
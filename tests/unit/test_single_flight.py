@@ -0,0 +1,151 @@
+"""
+Tests unitarios de la coalescencia de exportaciones concurrentes del mismo tenant:
+SingleFlight en el contenedor y el lock del tenant entre contenedores.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pydantic import ValidationError
+
+from application.export_service import ExportService
+from config.settings import DEFAULT_TENANT_LOCK_TIMEOUT_SECONDS, get_settings
+from infrastructure.artifact_store import LocalArtifactStore
+from infrastructure.sqlite_builder import SQLiteBuilder
+from tests.unit.conftest import export_event
+from utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Suite de tests de SingleFlight."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Las llamadas que llegan durante la ejecución reciben el mismo resultado."""
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        executions = []
+
+        def work():
+            executions.append(1)
+            started.set()
+            release.wait(5)
+            return 'resultado'
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(flight.do, 'tenant-1', work)
+            started.wait(5)
+            followers = [executor.submit(flight.do, 'tenant-1', work) for _ in range(3)]
+            time.sleep(0.05)
+            release.set()
+
+            assert leader.result() == ('resultado', False)
+            assert [f.result() for f in followers] == [('resultado', True)] * 3
+        assert len(executions) == 1
+
+    def test_error_is_raised_to_every_caller(self):
+        """La excepción de la ejecución llega también a las llamadas que esperaban."""
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("falló")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.do, 'k', work)
+            started.wait(5)
+            follower = executor.submit(flight.do, 'k', work)
+            time.sleep(0.05)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(RuntimeError):
+                    future.result()
+
+    def test_later_calls_execute_again(self):
+        """Una llamada posterior a la ejecución vuelve a ejecutar la función."""
+        flight = SingleFlight()
+        assert flight.do('k', lambda: 1) == (1, False)
+        assert flight.do('k', lambda: 2) == (2, False)
+
+
+class TestExportCoalescing:
+    """Suite de tests de la coalescencia de exportaciones."""
+
+    def test_concurrent_requests_share_one_export(self, handler_module, repository):
+        """Dos solicitudes simultáneas del mismo tenant y perfil consultan PostgreSQL una vez."""
+        repository.delays['customers'] = 0.3
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(handler_module.lambda_handler, export_event(1), None)
+            time.sleep(0.1)
+            second = executor.submit(handler_module.lambda_handler, export_event(1), None)
+            responses = [first.result(), second.result()]
+
+        assert [r['statusCode'] for r in responses] == [200, 200]
+        assert responses[0]['body'] == responses[1]['body']
+        assert [call[0] for call in repository.calls].count('customers') == 1
+
+    def test_tenant_lock_waits_for_other_container_and_reuses_its_artifact(
+        self, repository, artifact_store, tmp_path
+    ):
+        """Otro contenedor espera el lock del tenant y reutiliza el artefacto que quedó."""
+        def container():
+            return ExportService(
+                repository, SQLiteBuilder(),
+                artifact_store=artifact_store, tenant_lock_timeout_seconds=5
+            )
+        repository.delays['customers'] = 0.3
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(container().export_tenant_data, 1, str(tmp_path / "a.sqlite"))
+            time.sleep(0.1)
+            second = executor.submit(container().export_tenant_data, 1, str(tmp_path / "b.sqlite"))
+            first_result, second_result = first.result(), second.result()
+
+        assert first_result.cache_status == 'MISS'
+        assert second_result.cache_status == 'HIT'
+        assert second_result.fetch_times_by_table['tenant_lock_wait'] >= 100
+        assert second_result.content_hash == first_result.content_hash
+
+    def test_tenant_lock_is_off_without_shared_artifact_store(self, settings_env):
+        """Con el almacén en el /tmp del contenedor el lock no se toma por defecto."""
+        assert get_settings().tenant_lock_timeout_seconds == 0
+
+        settings_env(ARTIFACT_CACHE_DIR='/mnt/efs/artifacts')
+        assert get_settings().tenant_lock_timeout_seconds == DEFAULT_TENANT_LOCK_TIMEOUT_SECONDS
+
+    def test_tenant_lock_requires_shared_artifact_store(self, settings_env):
+        """Activar el lock sin almacén compartido es un error de configuración."""
+        with pytest.raises(ValidationError, match='tenant_lock_timeout_seconds'):
+            settings_env(TENANT_LOCK_TIMEOUT_SECONDS=5)
+            get_settings()
+
+    def test_waiter_reuses_artifact_from_shared_store(self, settings_env, repository, tmp_path):
+        """
+        Dos contenedores, cada uno con su almacén sobre el mismo directorio compartido: el
+        que espera el lock sirve el artefacto del otro sin volver a leer las tablas.
+        """
+        settings_env(ARTIFACT_CACHE_DIR=str(tmp_path / 'efs'))
+        settings = get_settings()
+
+        def container():
+            return ExportService(
+                repository, SQLiteBuilder(),
+                artifact_store=LocalArtifactStore(settings.artifact_cache_dir),
+                tenant_lock_timeout_seconds=settings.tenant_lock_timeout_seconds
+            )
+        repository.delays['customers'] = 0.3
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(container().export_tenant_data, 1, str(tmp_path / "a.sqlite"))
+            time.sleep(0.1)
+            second = executor.submit(container().export_tenant_data, 1, str(tmp_path / "b.sqlite"))
+            first_result, second_result = first.result(), second.result()
+
+        assert second_result.cache_status == 'HIT'
+        assert second_result.fetch_times_by_table['tenant_lock_wait'] >= 100
+        assert second_result.content_hash == first_result.content_hash
+        assert [call[0] for call in repository.calls].count('customers') == 1
+        assert (tmp_path / "a.sqlite").read_bytes() == (tmp_path / "b.sqlite").read_bytes()
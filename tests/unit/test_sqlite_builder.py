@@ -0,0 +1,61 @@
+"""
+Tests unitarios de SQLiteBuilder.
+"""
+import sqlite3
+
+import pytest
+
+from domain.models import Customer, Product
+from infrastructure.sqlite_builder import (
+    SQLITE_APPLICATION_ID, SQLITE_PAGE_SIZE, SQLiteBuilder, _HEADER_COUNTER_OFFSETS, _HEADER_COUNTER_VALUE
+)
+from utils.hashing import file_sha256
+
+
+def build_file(path, customers, products=()):
+    """Construye un archivo con el esquema completo y las filas indicadas."""
+    builder = SQLiteBuilder()
+    builder.create_database(str(path))
+    builder.create_schema()
+    builder.insert_customers(list(customers))
+    builder.insert_products(list(products))
+    return builder.finalize()
+
+
+class TestReproducibleBuild:
+    """Suite de tests de los archivos byte-reproducibles."""
+
+    @pytest.fixture
+    def customers(self):
+        return [Customer(id=1, name='Cliente 1', is_pay_mon=True), Customer(id=2, name='Cliente 2')]
+
+    def test_same_input_produces_same_bytes(self, customers, tmp_path):
+        """La misma entrada produce el mismo archivo y el hash retornado es el del archivo."""
+        first = build_file(tmp_path / "a.sqlite", customers, [Product(id=1, sku='A')])
+        second = build_file(tmp_path / "b.sqlite", customers, [Product(id=1, sku='A')])
+
+        assert first == second == file_sha256(str(tmp_path / "a.sqlite"))
+        assert (tmp_path / "a.sqlite").read_bytes() == (tmp_path / "b.sqlite").read_bytes()
+
+    def test_different_input_produces_different_hash(self, customers, tmp_path):
+        """Un cambio en los datos cambia el hash de contenido."""
+        first = build_file(tmp_path / "a.sqlite", customers)
+        second = build_file(tmp_path / "b.sqlite", customers[:1])
+
+        assert first != second
+
+    def test_header_fields_are_fixed(self, customers, tmp_path):
+        """Encabezado fijo: tamaño de página, application_id y contadores de transacciones."""
+        path = tmp_path / "a.sqlite"
+        build_file(path, customers)
+
+        header = path.read_bytes()[:100]
+        for offset in _HEADER_COUNTER_OFFSETS:
+            assert header[offset:offset + 4] == _HEADER_COUNTER_VALUE
+        connection = sqlite3.connect(str(path))
+        try:
+            assert connection.execute("PRAGMA page_size").fetchone()[0] == SQLITE_PAGE_SIZE
+            assert connection.execute("PRAGMA application_id").fetchone()[0] == SQLITE_APPLICATION_ID
+            assert connection.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+        finally:
+            connection.close()
@@ -0,0 +1,121 @@
+"""
+Tests unitarios de las estructuras derivadas opcionales (extras) del archivo SQLite.
+"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from application.export_service import build_artifact_key
+from domain.profiles import ExportProfile
+
+
+def export_with_extras(export_service, tmp_path, *extras):
+    """Exporta el tenant 1 con todas las tablas y los extras indicados; retorna la conexión al archivo."""
+    output_path = str(tmp_path / "extras.sqlite")
+    result = export_service.export_tenant_data(1, output_path, ExportProfile(name='extras', extras=extras))
+    assert result.success is True
+    return result, sqlite3.connect(output_path)
+
+
+class TestSearchExtra:
+    """Suite de tests del índice de búsqueda FTS5."""
+
+    def test_search_ignores_diacritics_and_supports_prefixes(self, export_service, repository, tmp_path):
+        """'cafe*' encuentra 'Café Pérez'; los resultados apuntan al Id de la fila."""
+        repository.update('customers', 10, name='Café Pérez')
+
+        result, connection = export_with_extras(export_service, tmp_path, 'search')
+        with connection:
+            rows = connection.execute(
+                "SELECT c.Id FROM CustomerSearch s JOIN Customer c ON c.Id = s.rowid "
+                "WHERE CustomerSearch MATCH 'cafe*'"
+            ).fetchall()
+            products = connection.execute(
+                "SELECT rowid FROM ProductSearch WHERE ProductSearch MATCH '750003'"
+            ).fetchall()
+        connection.close()
+
+        assert rows == [(10,)]
+        assert products == [(3,)]
+        assert result.derived_tables['search']['rows'] > 0
+
+
+class TestGeoExtra:
+    """Suite de tests del índice espacial R*Tree."""
+
+    def test_box_query_finds_customers_with_valid_coordinates(self, export_service, repository, tmp_path):
+        """Las coordenadas vacías, fuera de rango o (0, 0) no se indexan."""
+        repository.update('customers', 11, lat='0', lng='0')
+        repository.add('customers', tenant_id=1, id=13, name='Cliente 13', lat='', lng='')
+        repository.add('customers', tenant_id=1, id=14, name='Cliente 14', lat='120', lng='-99.13')
+
+        result, connection = export_with_extras(export_service, tmp_path, 'geo')
+        with connection:
+            indexed = connection.execute("SELECT Id FROM CustomerGeo ORDER BY Id").fetchall()
+            nearby = connection.execute(
+                "SELECT c.Id FROM CustomerGeo g JOIN Customer c ON c.Id = g.Id "
+                "WHERE g.MinLat >= ? AND g.MaxLat <= ? AND g.MinLng >= ? AND g.MaxLng <= ?",
+                (19.4, 19.5, -99.2, -99.1)
+            ).fetchall()
+            locations = connection.execute("SELECT Id FROM LocationGeo").fetchall()
+        connection.close()
+
+        assert indexed == [(10,)]
+        assert nearby == [(10,)]
+        assert locations == [(1,)]
+        assert result.derived_tables['geo']['rows'] == 2
+
+
+class TestPricesExtra:
+    """Suite de tests de la tabla de precios resueltos CustomerProductPrice."""
+
+    def test_first_assigned_price_list_wins(self, export_service, repository, tmp_path):
+        """Un producto en varias listas del cliente toma el precio de la primera asignada."""
+        # Segunda lista del cliente 10 (la 4 también tiene el producto 2, con otro precio)
+        repository.add('client_list_prices', id=5, id_client=10, id_list_price=4)
+
+        result, connection = export_with_extras(export_service, tmp_path, 'prices')
+        with connection:
+            prices = connection.execute(
+                "SELECT IdClient, IdProduct, IdListPrice, Price FROM CustomerProductPrice"
+            ).fetchall()
+        connection.close()
+
+        assert prices == [
+            (10, 1, 1, '10.50'),
+            (10, 2, 1, '20.50'),
+            (11, 3, 2, '30.50'),
+        ]
+        assert result.derived_tables['prices']['rows'] == 3
+
+
+class TestReceivablesExtra:
+    """Suite de tests de los resúmenes de cobranza."""
+
+    def test_balances_are_grouped_by_customer_and_age(self, export_service, repository, tmp_path):
+        """Saldo por cliente y antigüedad de vencimientos respecto a la fecha de construcción."""
+        today = datetime.now(timezone.utc).date()
+        repository.update('cobranzas', 1, validity=(today - timedelta(days=45)).isoformat())
+        repository.update('cobranzas', 2, validity=(today + timedelta(days=10)).isoformat(), total='80.25')
+
+        result, connection = export_with_extras(export_service, tmp_path, 'receivables')
+        with connection:
+            summary = connection.execute(
+                "SELECT IdClient, AsOf, InvoiceCount, OverdueInvoiceCount, OpenBalance, "
+                "CurrentBalance, Overdue31To60, DetailAmount FROM ReceivableSummary"
+            ).fetchall()
+            aging = connection.execute("SELECT Bucket, InvoiceCount, Amount FROM ReceivableAging").fetchall()
+        connection.close()
+
+        assert summary == [
+            (10, today.isoformat(), 1, 1, 150.0, 0.0, 150.0, 2.0),
+            (11, today.isoformat(), 1, 0, 80.25, 80.25, 0.0, 2.0),
+        ]
+        assert aging == [('31-60', 1, 150.0), ('current', 1, 80.25)]
+        assert result.derived_tables['receivables']['rows'] == 4
+
+    def test_receivables_artifact_key_includes_the_date(self):
+        """El artefacto con receivables depende de la fecha: otro día no se reutiliza."""
+        today = f"{datetime.now(timezone.utc):%Y%m%d}"
+
+        assert build_artifact_key(1, ExportProfile(name='x', extras=('receivables',))).endswith(today)
+        assert not build_artifact_key(1, ExportProfile(name='x', extras=('search',))).endswith(today)
@@ -0,0 +1,121 @@
+"""
+Tests unitarios de stale-while-revalidate en el handler: un artefacto reciente se sirve
+sin consultar PostgreSQL y, si ya tiene cierta antigüedad, se refresca en segundo plano.
+"""
+import base64
+import json
+import sqlite3
+
+import pytest
+
+from application.export_service import build_artifact_key
+from config.settings import get_settings
+from domain.profiles import get_profile
+from infrastructure.refresh_dispatcher import ThreadRefreshDispatcher
+from tests.unit.conftest import export_event
+
+
+class RecordingDispatcher:
+    """Despachador de refrescos que solo registra los eventos."""
+
+    def __init__(self):
+        self.dispatched = []
+
+    def dispatch(self, refresh_key, event):
+        self.dispatched.append((refresh_key, event))
+        return True
+
+
+def age_artifact(handler_module, tenant_id, seconds):
+    """Envejece el artefacto del perfil por defecto de un tenant en el almacén del contenedor."""
+    _, meta_path = handler_module._artifact_store._paths(build_artifact_key(tenant_id, get_profile()))
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['created_at'] -= seconds
+    meta['validated_at'] = None
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def customer_names(response, tmp_path):
+    """Nombres de clientes del archivo de una respuesta."""
+    path = tmp_path / "response.sqlite"
+    path.write_bytes(base64.b64decode(response['body']))
+    connection = sqlite3.connect(str(path))
+    try:
+        return [row[0] for row in connection.execute("SELECT Name FROM Customer ORDER BY Id")]
+    finally:
+        connection.close()
+
+
+class TestStaleWhileRevalidate:
+    """Suite de tests de _export_or_serve_stale."""
+
+    @pytest.fixture
+    def dispatcher(self, handler_module, monkeypatch):
+        dispatcher = RecordingDispatcher()
+        monkeypatch.setattr(handler_module, '_refresh_dispatcher', dispatcher)
+        return dispatcher
+
+    def test_stale_artifact_is_served_and_refreshed(self, handler_module, settings_env, dispatcher, repository, tmp_path):
+        """Un artefacto con más de revalidate_after se sirve de inmediato y se refresca aparte."""
+        settings_env(ARTIFACT_MAX_STALE_SECONDS=3600, ARTIFACT_REVALIDATE_AFTER_SECONDS=60)
+        first = handler_module.lambda_handler(export_event(1), None)
+        assert first['headers']['X-Cache'] == 'MISS'
+
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+        age_artifact(handler_module, 1, 120)
+        repository.calls.clear()
+
+        response = handler_module.lambda_handler(export_event(1), None)
+
+        assert response['statusCode'] == 200
+        assert response['headers']['X-Cache'] == 'STALE'
+        assert int(response['headers']['Age']) >= 120
+        assert customer_names(response, tmp_path)[0] == 'Cliente 10'
+        assert repository.calls == []
+        assert len(dispatcher.dispatched) == 1
+        refresh_key, refresh_event = dispatcher.dispatched[0]
+        assert refresh_event['refresh'] is True
+
+        # El refresco reconstruye el artefacto y la siguiente solicitud ya lo ve
+        assert handler_module.lambda_handler(refresh_event, None)['statusCode'] == 200
+        refreshed = handler_module.lambda_handler(export_event(1), None)
+        assert customer_names(refreshed, tmp_path)[0] == 'Cliente 10 (editado)'
+
+    def test_recent_artifact_is_served_without_refresh(self, handler_module, settings_env, dispatcher):
+        """Un artefacto más reciente que revalidate_after no dispara refrescos."""
+        settings_env(ARTIFACT_MAX_STALE_SECONDS=3600, ARTIFACT_REVALIDATE_AFTER_SECONDS=60)
+        handler_module.lambda_handler(export_event(1), None)
+
+        response = handler_module.lambda_handler(export_event(1), None)
+
+        assert response['headers']['X-Cache'] == 'STALE'
+        assert dispatcher.dispatched == []
+
+    def test_failed_export_falls_back_to_cached_artifact(self, handler_module, settings_env, dispatcher, repository):
+        """Si PostgreSQL falla se sirve el artefacto dentro de circuit_breaker_max_stale_seconds."""
+        settings_env(ARTIFACT_MAX_STALE_SECONDS=0, CIRCUIT_BREAKER_MAX_STALE_SECONDS=86400)
+        handler_module.lambda_handler(export_event(1), None)
+        repository.update('customers', 10, name='Cliente 10 (editado)')
+        repository.failures['customers'] = RuntimeError("server closed the connection unexpectedly")
+
+        response = handler_module.lambda_handler(export_event(1), None)
+
+        assert response['statusCode'] == 200
+        assert response['headers']['X-Cache'] == 'STALE'
+
+
+class TestRefreshDispatcher:
+    """Suite de tests de la elección del despachador de refrescos."""
+
+    def test_lambda_backend_without_function_name_falls_back_to_thread(
+        self, handler_module, settings_env, monkeypatch
+    ):
+        """Fuera de Lambda y sin REFRESH_FUNCTION_NAME los refrescos se ejecutan en un hilo."""
+        monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+        settings_env(REFRESH_BACKEND='lambda', REFRESH_FUNCTION_NAME='')
+
+        dispatcher = handler_module._get_refresh_dispatcher(get_settings())
+
+        assert isinstance(dispatcher, ThreadRefreshDispatcher)